@@ -0,0 +1,319 @@
+# api_enrichment.py
+# Exact counts and publish times from the YouTube Data API, merged into rows before they are written.
+
+import http.client
+import json
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_API_BASE_URL = 'https://www.googleapis.com/youtube/v3'
+# videos.list accepts up to 50 IDs per call and costs 1 quota unit whatever the parts.
+VIDEOS_PER_CALL = 50
+VIDEOS_LIST_COST = 1
+VIDEO_PARTS = 'snippet,statistics'
+
+# Row field -> (API part, API field). Counts are written as plain integers ("1234567"),
+# which normalize.py parses like the display labels; upload_date becomes the ISO
+# publish time ("2025-03-03T12:34:56Z").
+API_FIELDS = {
+    'raw_views_count': ('statistics', 'viewCount'),
+    'likes_count': ('statistics', 'likeCount'),
+    'comments_count': ('statistics', 'commentCount'),
+    'upload_date': ('snippet', 'publishedAt'),
+}
+
+# Placeholder value of YOUTUBE_API_KEY in config.py, i.e. no key configured.
+PLACEHOLDER_API_KEY = 'YOUR_FALLBACK_API_KEY_IF_NEEDED'
+
+def api_key_configured(api_key):
+    return bool(api_key) and api_key != PLACEHOLDER_API_KEY
+
+class ApiError(Exception):
+    """A videos.list call failed (HTTP error or unreadable response)."""
+
+class QuotaExceeded(ApiError):
+    """The daily quota is used up, locally counted or reported by the API."""
+
+class QuotaRateLimiter:
+    """
+    Token bucket for the call rate plus a running count of the daily quota units.
+    acquire() blocks until a call may be made, and raises QuotaExceeded once the day's
+    budget is spent; the budget resets when the UTC day changes (as the API's does,
+    give or take the Pacific-time reset).
+    """
+    def __init__(self, calls_per_second=5.0, daily_quota=10_000):
+        self.calls_per_second = calls_per_second
+        self.daily_quota = daily_quota
+        self.units_used = 0
+        self._day = time.gmtime().tm_yday
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cost=VIDEOS_LIST_COST):
+        with self._lock:
+            today = time.gmtime().tm_yday
+            if today != self._day:
+                self._day, self.units_used = today, 0
+            if self.daily_quota is not None and self.units_used + cost > self.daily_quota:
+                raise QuotaExceeded(f"Daily quota of {self.daily_quota} units used up.")
+            while True:
+                now = time.monotonic()
+                self._tokens = min(1.0, self._tokens + (now - self._updated) * self.calls_per_second)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    break
+                time.sleep((1.0 - self._tokens) / self.calls_per_second)
+            self.units_used += cost
+
+    def exhaust(self):
+        """Marks the day's quota as spent (the API said so)."""
+        with self._lock:
+            self.units_used = self.daily_quota if self.daily_quota is not None else self.units_used
+
+class YouTubeDataClient:
+    """
+    Minimal videos.list client over a small pool of keep-alive HTTP connections, so
+    consecutive calls reuse their TLS session instead of reconnecting. base_url can
+    point at a local stub server (see benchmarks/api_enrichment_check.py).
+    """
+    def __init__(self, api_key, base_url=DEFAULT_API_BASE_URL, pool_size=2, timeout=10.0, rate_limiter=None):
+        self.api_key = api_key
+        parts = urlsplit(base_url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._host = parts.netloc
+        self._path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or QuotaRateLimiter()
+        self.calls = 0
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _get(self, path):
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self._connection_class(self._host, timeout=self.timeout)
+        try:
+            connection.request('GET', path, headers={'Accept-Encoding': 'identity', 'Connection': 'keep-alive'})
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise ApiError(f"videos.list request failed: {e}") from e
+        if response.will_close:
+            connection.close()
+        else:
+            try:
+                self._pool.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        return response.status, body
+
+    def videos(self, video_ids):
+        """Returns {video_id: resource} for up to VIDEOS_PER_CALL IDs. Unknown or private videos are left out."""
+        if len(video_ids) > VIDEOS_PER_CALL:
+            raise ValueError(f"videos.list takes at most {VIDEOS_PER_CALL} IDs per call.")
+        self.rate_limiter.acquire(VIDEOS_LIST_COST)
+        query = urlencode({'part': VIDEO_PARTS, 'id': ','.join(video_ids), 'maxResults': VIDEOS_PER_CALL, 'key': self.api_key})
+        status, body = self._get(f"{self._path}/videos?{query}")
+        self.calls += 1
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            raise ApiError(f"videos.list returned HTTP {status} with an unreadable body.") from e
+        if status != 200:
+            error = payload.get('error', {}) if isinstance(payload, dict) else {}
+            reasons = {item.get('reason') for item in error.get('errors', [])}
+            if status == 403 and reasons & {'quotaExceeded', 'dailyLimitExceeded', 'rateLimitExceeded'}:
+                self.rate_limiter.exhaust()
+                raise QuotaExceeded(error.get('message', 'Quota exceeded.'))
+            raise ApiError(f"videos.list returned HTTP {status}: {error.get('message', body[:200])}")
+        return {item['id']: item for item in payload.get('items', [])}
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+class ApiResponseCache:
+    """
+    Persistent cache of videos.list resources keyed by video ID, kept in a SQLite file.
+    Videos the API did not return are cached too (as None), so they are not asked for
+    again until the entry is older than ttl_seconds.
+    """
+    def __init__(self, path, ttl_seconds=None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " video_id TEXT PRIMARY KEY,"
+            " resource TEXT,"
+            " fetched_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def get_many(self, video_ids):
+        """Returns {video_id: resource or None} for the fresh entries among video_ids."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for video_id in video_ids:
+                row = self._conn.execute("SELECT resource, fetched_at FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+                if row is None or (self.ttl_seconds is not None and now - row[1] >= self.ttl_seconds):
+                    continue
+                found[video_id] = json.loads(row[0]) if row[0] is not None else None
+            self.hits += len(found)
+            self.misses += len(video_ids) - len(found)
+        return found
+
+    def put_many(self, resources, video_ids):
+        """Stores the resources returned for video_ids; IDs without one are stored as not found."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO videos (video_id, resource, fetched_at) VALUES (?, ?, ?)",
+                [(video_id, json.dumps(resources[video_id]) if video_id in resources else None, now) for video_id in video_ids],
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def merge_api_resource(row, resource):
+    """
+    Returns a copy of a row with the exact API values in place of the scraped labels,
+    and the 'api' extraction status: 'ok', 'absent' (the API does not return the
+    video, e.g. private) or 'failed' (no resource, e.g. quota spent). Fields the API
+    hides (likes on some videos) keep the scraped label.
+    """
+    row = dict(row, extraction_status=dict(row.get('extraction_status') or {}))
+    missing = set(row.get('missing_fields') or ())
+    if resource is ApiEnrichmentStage.FAILED:
+        row['extraction_status']['api'] = 'failed'
+        return row
+    if resource is None:
+        row['extraction_status']['api'] = 'absent'
+        return row
+    for field, (part, key) in API_FIELDS.items():
+        value = resource.get(part, {}).get(key)
+        if value is not None:
+            row[field] = str(value)
+            missing.discard(field)
+    row['extraction_status']['api'] = 'ok'
+    row['missing_fields'] = sorted(missing)
+    return row
+
+class ApiEnrichmentStage:
+    """
+    Asynchronous stage between the account threads and the output writer, with the
+    same put_many/close interface. Rows are collected until VIDEOS_PER_CALL distinct
+    video IDs are pending (or max_wait seconds pass), looked up in the cache, and the
+    rest fetched in one videos.list call; the enriched rows then go to the writer in
+    their original order. When the API fails or the quota is spent, rows are passed
+    on with their scraped values, so enrichment never holds back or drops output.
+    """
+    FAILED = object()
+    _STOP = object()
+
+    def __init__(self, client, output_writer, cache=None, max_wait=2.0, queue_maxsize=500):
+        self.client = client
+        self.output_writer = output_writer
+        self.cache = cache
+        self.max_wait = max_wait
+        self.enriched = 0
+        self.failed = 0
+        self._quota_reported = False
+        self._queue = queue.Queue(maxsize=queue_maxsize)
+        self._thread = threading.Thread(target=self._run, name='api-enrichment', daemon=True)
+        self._thread.start()
+
+    def put(self, row):
+        self._queue.put(row)
+
+    def put_many(self, rows):
+        for row in rows:
+            self._queue.put(row)
+
+    def _lookup(self, video_ids):
+        """Returns {video_id: resource, None if unknown, or FAILED}."""
+        resources = self.cache.get_many(video_ids) if self.cache is not None else {}
+        missing = [video_id for video_id in video_ids if video_id not in resources]
+        if not missing:
+            return resources
+        try:
+            fetched = self.client.videos(missing)
+        except QuotaExceeded as e:
+            if not self._quota_reported:
+                print(f"API enrichment: {e} Writing scraped values until the quota resets.")
+                self._quota_reported = True
+            fetched = None
+        except ApiError as e:
+            print(f"API enrichment: {e}")
+            fetched = None
+        if fetched is None:
+            resources.update((video_id, self.FAILED) for video_id in missing)
+            return resources
+        self._quota_reported = False
+        if self.cache is not None:
+            self.cache.put_many(fetched, missing)
+        resources.update((video_id, fetched.get(video_id)) for video_id in missing)
+        return resources
+
+    def _flush(self, rows):
+        if not rows:
+            return
+        try:
+            video_ids = list(dict.fromkeys(row['video_id'] for row in rows))
+            resources = self._lookup(video_ids)
+            rows = [merge_api_resource(row, resources.get(row['video_id'], self.FAILED)) for row in rows]
+        except Exception as e:
+            # Never lose rows to an enrichment bug
+            print(f"API enrichment: Error enriching {len(rows)} rows: {e}")
+            traceback.print_exc()
+        for row in rows:
+            status = (row.get('extraction_status') or {}).get('api')
+            if status == 'ok':
+                self.enriched += 1
+            elif status == 'failed':
+                self.failed += 1
+        self.output_writer.put_many(rows)
+
+    def _run(self):
+        rows = []
+        video_ids = set()
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                stopping = True
+            elif item is not None:
+                rows.append(item)
+                video_ids.add(item['video_id'])
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_wait
+            if stopping or len(video_ids) >= VIDEOS_PER_CALL or (deadline is not None and time.monotonic() >= deadline):
+                self._flush(rows)
+                rows, video_ids, deadline = [], set(), None
+
+    def close(self):
+        """Enriches and forwards everything still queued. The output writer stays open."""
+        self._queue.put(self._STOP)
+        self._thread.join()
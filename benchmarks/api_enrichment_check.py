@@ -0,0 +1,138 @@
+# benchmarks/api_enrichment_check.py
+# End-to-end check of the YouTube Data API enrichment stage against a local stub server.
+#
+# Usage:
+#   python benchmarks/api_enrichment_check.py
+#
+# A stub videos.list endpoint on localhost answers with deterministic statistics (and
+# a quotaExceeded error once its call budget is spent). Rows go through
+# ApiEnrichmentStage into a collecting writer, and the check verifies batching (at most
+# 50 IDs per call), keep-alive connection reuse, the response cache, the merged values
+# and the fallback to scraped values when the quota runs out. Exits with status 1 on
+# any failure.
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import harness  # Puts the repository on sys.path
+from api_enrichment import VIDEOS_PER_CALL, ApiEnrichmentStage, ApiResponseCache, QuotaRateLimiter, YouTubeDataClient
+
+def stub_resource(video_id):
+    number = int(video_id[1:])
+    return {
+        'id': video_id,
+        'snippet': {'publishedAt': f'2025-03-{number % 28 + 1:02d}T12:00:00Z'},
+        'statistics': {'viewCount': str(1_000_000 + number), 'likeCount': str(1000 + number), 'commentCount': str(number)},
+    }
+
+class StubApi(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, call_budget=None):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.call_budget = call_budget
+        self.calls = []
+        self.requests = 0
+        self.connections = set()
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        self.server.requests += 1
+        self.server.connections.add(self.client_address)
+        if parts.path != '/youtube/v3/videos' or query.get('key') != ['test-key']:
+            return self._reply(400, {'error': {'message': 'Bad request', 'errors': [{'reason': 'badRequest'}]}})
+        if self.server.call_budget is not None and len(self.server.calls) >= self.server.call_budget:
+            return self._reply(403, {'error': {'message': 'Quota exceeded.', 'errors': [{'reason': 'quotaExceeded'}]}})
+        video_ids = query['id'][0].split(',')
+        self.server.calls.append(video_ids)
+        # Private videos are not returned, like the real API does
+        items = [stub_resource(video_id) for video_id in video_ids if not video_id.startswith('p')]
+        self._reply(200, {'kind': 'youtube#videoListResponse', 'items': items})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class CollectingWriter:
+    def __init__(self):
+        self.rows = []
+
+    def put_many(self, rows):
+        self.rows.extend(rows)
+
+def scraped_row(video_id):
+    return {'video_id': video_id, 'raw_views_count': '1.2M views', 'likes_count': None, 'comments_count': 'View 12 comments',
+            'upload_date': 'NaN', 'extraction_status': {'core': 'ok'}, 'missing_fields': ['likes_count', 'upload_date']}
+
+def run_stage(server, cache, rows, daily_quota=None):
+    client = YouTubeDataClient('test-key', f'http://127.0.0.1:{server.server_port}/youtube/v3',
+                               rate_limiter=QuotaRateLimiter(calls_per_second=100, daily_quota=daily_quota))
+    writer = CollectingWriter()
+    stage = ApiEnrichmentStage(client, writer, cache, max_wait=0.2)
+    stage.put_many(rows)
+    stage.close()
+    client.close()
+    return stage, writer.rows
+
+def main():
+    failures = []
+    def check(condition, message):
+        print(f"  {'ok' if condition else 'FAIL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    server = StubApi()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ApiResponseCache(os.path.join(tmp, 'api_cache.sqlite3'), ttl_seconds=3600)
+        video_ids = [f'v{i:04d}' for i in range(120)] + ['p0001', 'p0002'] + ['v0003', 'v0007']  # Two re-scans
+        stage, rows = run_stage(server, cache, [scraped_row(video_id) for video_id in video_ids])
+        check([row['video_id'] for row in rows] == video_ids, "every row is forwarded, in order")
+        check(all(len(call) <= VIDEOS_PER_CALL for call in server.calls), f"at most {VIDEOS_PER_CALL} IDs per call")
+        check(len(server.calls) == 3, f"122 distinct IDs take 3 calls (made {len(server.calls)})")
+        check(len(server.connections) == 1, f"one keep-alive connection (used {len(server.connections)})")
+        expected = stub_resource('v0042')
+        row = rows[42]
+        check(row['raw_views_count'] == expected['statistics']['viewCount'] and row['likes_count'] == '1042'
+              and row['comments_count'] == '42' and row['upload_date'] == expected['snippet']['publishedAt'],
+              "exact counts and publish time merged")
+        check(row['extraction_status'] == {'core': 'ok', 'api': 'ok'} and row['missing_fields'] == [],
+              "api status set and filled fields no longer missing")
+        check(rows[120]['extraction_status']['api'] == 'absent' and rows[120]['raw_views_count'] == '1.2M views',
+              "a video the API does not return keeps its scraped values")
+
+        calls_before = len(server.calls)
+        _, rows = run_stage(server, cache, [scraped_row(video_id) for video_id in video_ids[:60]])
+        check(len(server.calls) == calls_before and all(row['extraction_status']['api'] == 'ok' for row in rows),
+              "a second pass is answered from the cache")
+        cache.close()
+
+        server.calls.clear()
+        server.requests = 0
+        server.call_budget = 1
+        stage, rows = run_stage(server, None, [scraped_row(f'v{i:04d}') for i in range(200, 350)], daily_quota=1000)
+        statuses = [row['extraction_status']['api'] for row in rows]
+        check(len(rows) == 150 and statuses.count('ok') == 50 and statuses.count('failed') == 100,
+              "after quotaExceeded, rows keep their scraped values")
+        check(server.requests == 2, f"no more calls once the API reported the quota spent (made {server.requests})")
+    server.shutdown()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
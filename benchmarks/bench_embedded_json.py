@@ -0,0 +1,95 @@
+# benchmarks/bench_embedded_json.py
+# Validates and benchmarks the embedded-JSON extraction mode against saved captures.
+#
+# Usage:
+#   python benchmarks/bench_embedded_json.py [--rounds 500]
+#
+# Each case in benchmarks/json_fixtures/<case>/ holds capture.json (the string returned
+# by EMBEDDED_JSON_SCRIPT) and expected.json ({video_id: {field: value}}). Exits with
+# status 1 if a short is missing, unexpected, or any expected field differs.
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from harness import BENCHMARKS_DIR
+from bench_extract import percentile
+from config import CSV_HEADERS, YOUTUBE_BASE_URL
+from embedded_json import build_row, map_capture, parse_capture
+
+JSON_FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, 'json_fixtures')
+
+def load_json_cases(fixtures_dir=JSON_FIXTURES_DIR):
+    """Returns a list of dicts with 'name', 'raw' (capture.json text) and 'expected' keys."""
+    cases = []
+    for name in sorted(os.listdir(fixtures_dir)):
+        case_dir = os.path.join(fixtures_dir, name)
+        if not os.path.isfile(os.path.join(case_dir, 'expected.json')):
+            continue
+        with open(os.path.join(case_dir, 'capture.json'), encoding='utf-8') as f:
+            raw = f.read()
+        with open(os.path.join(case_dir, 'expected.json'), encoding='utf-8') as f:
+            expected = json.load(f)
+        cases.append({'name': name, 'raw': raw, 'expected': expected})
+    return cases
+
+def extract_rows(raw):
+    videos = map_capture(parse_capture(raw))
+    return [build_row(video_id, fields, 'bench', CSV_HEADERS, YOUTUBE_BASE_URL) for video_id, fields in videos.items()]
+
+def validate(cases):
+    problems = []
+    for case in cases:
+        rows = {row['video_id']: row for row in extract_rows(case['raw'])}
+        for video_id in sorted(set(case['expected']) - set(rows)):
+            problems.append(f"{case['name']}: short {video_id} not extracted")
+        for video_id in sorted(set(rows) - set(case['expected'])):
+            problems.append(f"{case['name']}: unexpected short {video_id} extracted")
+        for video_id, fields in case['expected'].items():
+            for field, expected_value in fields.items():
+                if video_id in rows and rows[video_id].get(field) != expected_value:
+                    problems.append(f"{case['name']}: {video_id}/{field}: expected {expected_value!r}, got {rows[video_id].get(field)!r}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the embedded-JSON extraction mode against saved captures.")
+    parser.add_argument('--rounds', type=int, default=500, help="Passes over the capture corpus.")
+    args = parser.parse_args()
+
+    cases = load_json_cases()
+    if not cases:
+        print("No JSON fixture cases found.")
+        return 1
+    problems = validate(cases)
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        return 1
+
+    latencies = []
+    rows = 0
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for case in cases:
+            capture_started = time.perf_counter()
+            rows += len(extract_rows(case['raw']))
+            latencies.append(time.perf_counter() - capture_started)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for case in cases:
+        extract_rows(case['raw'])
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{len(cases)} capture cases, {args.rounds} rounds.")
+    print(f"rows/s: {rows / elapsed:.1f}  rows per capture: {rows / (args.rounds * len(cases)):.1f}")
+    print(f"per capture p50/p99 ms: {percentile(latencies, 50) * 1000:.3f} / {percentile(latencies, 99) * 1000:.3f}")
+    print(f"peak memory MB: {peak_bytes / (1024 * 1024):.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# benchmarks/bench_extract.py
+# Micro-benchmark for extract_shorts_data against the recorded HTML fixtures.
+#
+# Usage:
+#   python benchmarks/bench_extract.py                  # all backends, 200 rounds
+#   python benchmarks/bench_extract.py --backend lxml --rounds 1000 --json results.json
+#   python benchmarks/bench_extract.py --ready-latency 0.5   # simulated page load time for the wait report
+#
+# Runs with no browser and no network. Exits with status 1 if any selector stops
+# matching or any extracted field differs from the fixture's expected.json.
+# Also reports the load-wait time per short recovered by the readiness waits compared
+# with the fixed sleeps they replaced.
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from bs4 import BeautifulSoup
+
+from harness import FakeDriver, load_fixture_cases, load_scraper
+from config import DWELL_AFTER_CLICK_SEC, DWELL_AFTER_NAVIGATE_SEC, READY_QUIET_MS
+from extractor import EXTRACTION_BACKENDS, FIELD_GROUPS, FIELD_SELECTORS, SUBTREE_SELECTORS, ExtractionEngine
+
+# Fields that are random or time dependent and therefore not compared with expected.json.
+UNCHECKED_FIELDS = ('timestamp_scan', 'dummy_account_id', 'watch_duration_sec')
+
+# Fixed sleeps per short that only waited for content to load, before the readiness
+# waits replaced them. Each was human_like_delay(random.uniform(2, 5)), i.e. a sleep
+# drawn from uniform(u, 5) with u ~ uniform(2, 5): 4.25 s on average.
+LEGACY_LOAD_SLEEPS = {'description click': 4.25, 'sound click': 4.25, 'next short': 4.25}
+
+
+class RecordingEngine(ExtractionEngine):
+    """ExtractionEngine that records parse latency and unmatched selectors per field group."""
+    def __init__(self, backend_name):
+        super().__init__(backend_name)
+        self.latencies = defaultdict(list)
+        self.missing = set()
+
+    def parse(self, driver, group, url, subtrees):
+        started = time.perf_counter()
+        extraction = super().parse(driver, group, url, subtrees)
+        self.latencies[group].append(time.perf_counter() - started)
+        self.missing.update((group, key) for key in extraction.missing_roots)
+        self.missing.update((group, name) for name in extraction.missing_fields)
+        return extraction
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def run_case(scraper, engine, driver):
+    """Runs extract_shorts_data once on a fresh copy of the fixture page states."""
+    driver.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scraper.extract_shorts_data(driver, 'bench', set(), engine)
+
+def validate(scraper, backend_name, cases):
+    """Returns a list of human readable problems; empty if every fixture extracts as expected."""
+    problems = []
+    for case in cases:
+        engine = RecordingEngine(backend_name)
+        rows = run_case(scraper, engine, FakeDriver(case))
+        for group, name in sorted(engine.missing):
+            selector = FIELD_SELECTORS.get(name)
+            if selector and name in case['expected'] and case['expected'][name] == selector.default:
+                continue  # The fixture records this field as legitimately absent.
+            where = f"selector '{selector.path}'" if selector else f"subtree '{name}'"
+            problems.append(f"{case['name']}: {group}/{name}: {where} matched nothing")
+        if len(rows) != 1:
+            problems.append(f"{case['name']}: expected 1 row, got {len(rows)}")
+            continue
+        for field, expected_value in case['expected'].items():
+            if field in UNCHECKED_FIELDS:
+                continue
+            if rows[0].get(field) != expected_value:
+                problems.append(f"{case['name']}: {field}: expected {expected_value!r}, got {rows[0].get(field)!r}")
+    return problems
+
+def benchmark_backend(scraper, backend_name, cases, rounds):
+    """Times end-to-end extraction and per-group parsing, then measures peak memory in a separate pass."""
+    engine = RecordingEngine(backend_name)
+    drivers = [FakeDriver(case) for case in cases]
+    rows = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for driver in drivers:
+            rows += len(run_case(scraper, engine, driver))
+    elapsed = time.perf_counter() - started
+
+    # tracemalloc slows allocation down, so memory is measured apart from the timings.
+    tracemalloc.start()
+    for driver in drivers:
+        run_case(scraper, RecordingEngine(backend_name), driver)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'backend': backend_name,
+        'rows': rows,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'peak_memory_mb': peak_bytes / (1024 * 1024),
+        'groups': {},
+    }
+    for group in FIELD_GROUPS:
+        latencies = engine.latencies[group]
+        result['groups'][group] = {
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+        }
+    return result
+
+def benchmark_full_page(cases, rounds):
+    """Baseline: the pre-subtree approach of parsing the whole page with BeautifulSoup for each group."""
+    state_for_group = {'core': 'initial', 'description': 'description', 'sound': 'sound'}
+    latencies = defaultdict(list)
+    for _ in range(max(1, rounds // 10)):
+        for case in cases:
+            for group, state in state_for_group.items():
+                started = time.perf_counter()
+                BeautifulSoup(case['pages'][state], 'html.parser')
+                latencies[group].append(time.perf_counter() - started)
+    return {
+        'backend': 'full-page bs4 (baseline)',
+        'groups': {group: {'p50_ms': percentile(values, 50) * 1000, 'p99_ms': percentile(values, 99) * 1000}
+                   for group, values in latencies.items()},
+    }
+
+def benchmark_readiness(cases, ready_latency):
+    """
+    Runs one short per fixture (extraction, then moving to the next short) with real
+    readiness waits against pages that take ready_latency seconds to load. The dwell
+    that follows each replaced sleep is the expected value of its DWELL_* range.
+    Returns seconds per short.
+    """
+    scraper = load_scraper(disable_ready_waits=False)
+    waited = []
+    wait_until_ready = scraper.wait_until_ready
+    def timed_wait(*args, **kwargs):
+        result = wait_until_ready(*args, **kwargs)
+        waited.append(result.waited)
+        return result
+    scraper.wait_until_ready = timed_wait
+
+    for case in cases:
+        driver = FakeDriver(case, ready_latency)
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper.extract_shorts_data(driver, 'bench', set(), ExtractionEngine('lxml'))
+            previous_url = driver.current_url
+            driver.navigate(f"{previous_url}-next")
+            scraper.wait_for_page(driver, 'bench', SUBTREE_SELECTORS['reel'], previous_url)
+    mean = lambda bounds: sum(bounds) / 2
+    return {
+        'legacy_load_sleep_sec': sum(LEGACY_LOAD_SLEEPS.values()),
+        'ready_wait_sec': sum(waited) / len(cases),
+        'dwell_sec': 2 * mean(DWELL_AFTER_CLICK_SEC) + mean(DWELL_AFTER_NAVIGATE_SEC),
+    }
+
+def print_readiness(result, ready_latency):
+    now = result['ready_wait_sec'] + result['dwell_sec']
+    print(f"\nLoad waits per short (simulated page load {ready_latency * 1000:.0f} ms + {READY_QUIET_MS} ms quiet period):")
+    print(f"  fixed sleeps before:    {result['legacy_load_sleep_sec']:.2f} s  ({', '.join(LEGACY_LOAD_SLEEPS)})")
+    print(f"  readiness waits now:    {result['ready_wait_sec']:.2f} s  (measured)")
+    print(f"  dwell after them now:   {result['dwell_sec']:.2f} s  (expected, DWELL_AFTER_CLICK_SEC x2 + DWELL_AFTER_NAVIGATE_SEC)")
+    print(f"  recovered per short:    {result['legacy_load_sleep_sec'] - now:.2f} s")
+
+def print_results(results):
+    groups = list(FIELD_GROUPS)
+    header = f"{'backend':<26}{'rows/s':>10}{'peak MB':>10}" + ''.join(f"{group + ' p50/p99 ms':>28}" for group in groups)
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        rows_per_sec = f"{result['rows_per_sec']:.1f}" if 'rows_per_sec' in result else '-'
+        peak = f"{result['peak_memory_mb']:.2f}" if 'peak_memory_mb' in result else '-'
+        line = f"{result['backend']:<26}{rows_per_sec:>10}{peak:>10}"
+        for group in groups:
+            stats = result['groups'].get(group, {})
+            line += f"{stats.get('p50_ms', 0):>18.3f} /{stats.get('p99_ms', 0):>8.3f}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extract_shorts_data against recorded HTML fixtures.")
+    parser.add_argument('--backend', action='append', choices=list(EXTRACTION_BACKENDS),
+                        help="Backend to benchmark (repeatable). Defaults to all backends.")
+    parser.add_argument('--rounds', type=int, default=200, help="Passes over the fixture corpus per backend.")
+    parser.add_argument('--json', dest='json_path', help="Also write the results to this JSON file.")
+    parser.add_argument('--ready-latency', type=float, default=0.25,
+                        help="Simulated page load time in seconds for the readiness wait report.")
+    args = parser.parse_args()
+
+    scraper = load_scraper()
+    cases = load_fixture_cases()
+    if not cases:
+        print("No fixture cases found.")
+        return 1
+    backends = args.backend or list(EXTRACTION_BACKENDS)
+
+    failed = False
+    for backend_name in backends:
+        problems = validate(scraper, backend_name, cases)
+        for problem in problems:
+            print(f"[{backend_name}] FAIL {problem}")
+        failed = failed or bool(problems)
+    if failed:
+        print("Extraction does not match the fixtures. Fix the selectors before benchmarking.")
+        return 1
+
+    print(f"{len(cases)} fixture cases, {args.rounds} rounds per backend.\n")
+    results = [benchmark_backend(scraper, backend_name, cases, args.rounds) for backend_name in backends]
+    results.append(benchmark_full_page(cases, args.rounds))
+    print_results(results)
+    readiness = benchmark_readiness(cases, args.ready_latency)
+    print_readiness(readiness, args.ready_latency)
+    results.append({'backend': 'readiness', 'ready_latency_sec': args.ready_latency, **readiness})
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# benchmarks/bench_import.py
+# Cold-start times of the command-line entry points, and a guard against heavy imports.
+#
+# Usage:
+#   python benchmarks/bench_import.py [--runs 5] [--budget-ms 250] [--top 5] [--json import.json]
+#
+# Runs each command below --runs times, each time in a fresh interpreter started with
+# -X importtime. Reports the median wall time (bare interpreter startup shown for
+# comparison) and the slowest top-level imports. Exits with status 1 if a command loads
+# a module it has no use for (Selenium for --help, pandas for scraping, tkinter or
+# undetected_chromedriver before a browser is started, ...) or if a command that
+# needs neither Selenium nor pandas takes longer than --budget-ms.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules too slow to import unless a command needs them.
+HEAVY_MODULES = ('selenium', 'undetected_chromedriver', 'tkinter', 'pandas', 'numpy', 'pyarrow', 'bs4', 'lxml')
+
+# (label, interpreter arguments, heavy modules the command may load)
+COMMANDS = (
+    ('python startup', ['-c', 'pass'], ()),
+    ('import lhana', ['-c', 'import lhana'], ()),
+    ('lhana --help', ['-m', 'lhana', '--help'], ()),
+    ('bench --help', ['-m', 'lhana', 'bench', '--help'], ()),
+    ('post-process ndjson --help', ['-m', 'lhana', 'post-process', 'ndjson', '--help'], ()),
+    ('post-process archive --help', ['-m', 'lhana', 'post-process', 'archive', '--help'], ('lxml',)),
+    ('post-process normalize --help', ['-m', 'lhana', 'post-process', 'normalize', '--help'], ('pandas', 'numpy', 'pyarrow')),
+    ('coordinator --help', ['-m', 'lhana', 'coordinator', '--help'], ()),
+    ('scrape --help', ['-m', 'lhana', 'scrape', '--help'], ('selenium', 'lxml')),
+)
+# Commands built on Selenium or pandas are held to the module check only.
+UNBUDGETED = ('python startup', 'post-process normalize --help', 'scrape --help')
+
+def parse_importtime(stderr):
+    """Returns [(module, cumulative_us, depth)] from -X importtime output, in import order."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(cumulative), depth))
+    return imports
+
+def run_command(arguments):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=REPO_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - started, result.returncode, parse_importtime(result.stderr)
+
+def forbidden_modules(imports, allowed):
+    """Top-level heavy packages imported by a command that may not load them."""
+    loaded = {module.split('.')[0] for module, _, _ in imports}
+    return sorted(name for name in HEAVY_MODULES if name in loaded and name not in allowed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and guard the cold start of the lhana commands.")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per command.")
+    parser.add_argument('--budget-ms', type=float, default=250.0,
+                        help="Median wall time allowed per command (scrape and normalize are exempt, 0 disables).")
+    parser.add_argument('--top', type=int, default=5, help="Slowest top-level imports shown per command.")
+    parser.add_argument('--json', help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    failures = []
+    results = []
+    print(f"{'command':<32}{'median':>10}{'imports':>10}   slowest imports")
+    for label, arguments, allowed in COMMANDS:
+        wall_times, import_times = [], []
+        for _ in range(args.runs):
+            elapsed, returncode, imports = run_command(arguments)
+            if returncode != 0:
+                failures.append(f"{label}: exited with status {returncode}")
+                break
+            wall_times.append(elapsed)
+            import_times.append(sum(us for _, us, depth in imports if depth == 0) / 1e6)
+        if not wall_times:
+            continue
+        median = statistics.median(wall_times)
+        top = sorted((entry for entry in imports if entry[2] == 0), key=lambda entry: -entry[1])[:args.top]
+        print(f"{label:<32}{median * 1000:>8.0f}ms{statistics.median(import_times) * 1000:>8.0f}ms   "
+              + ", ".join(f"{module} {us / 1000:.0f}ms" for module, us, _ in top))
+
+        forbidden = forbidden_modules(imports, allowed)
+        if forbidden:
+            failures.append(f"{label}: imports {', '.join(forbidden)}")
+        if args.budget_ms and label not in UNBUDGETED and median * 1000 > args.budget_ms:
+            failures.append(f"{label}: {median * 1000:.0f}ms is over the {args.budget_ms:.0f}ms budget")
+        results.append({'command': label, 'median_ms': round(median * 1000, 1),
+                        'import_ms': round(statistics.median(import_times) * 1000, 1),
+                        'slowest_imports': [{'module': module, 'ms': round(us / 1000, 1)} for module, us, _ in top],
+                        'forbidden_imports': forbidden})
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'commands': results}, f, indent=2)
+    for failure in failures:
+        print(f"  FAIL {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
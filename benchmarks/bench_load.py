@@ -0,0 +1,246 @@
+# benchmarks/bench_load.py
+# End-to-end load test: real headless Chrome browsers scraping the local mock Shorts feed.
+#
+# Usage:
+#   python benchmarks/bench_load.py                                   # 1, 2 and 4 browsers, 20 shorts each
+#   python benchmarks/bench_load.py --concurrency 1 2 4 8 --shorts 50 --latency-ms 80 --json load.json
+#   python benchmarks/bench_load.py --lean --headed
+#
+# Starts benchmarks/mock_shorts_site.py in-process and runs dummy_account_task in one
+# thread per browser, pointed at it through YOUTUBE_BASE_URL, for each concurrency level.
+# Reports total and per-browser shorts per minute, p50/p95 latency per scrape stage and
+# peak memory per browser (RSS and PSS of Chrome's process tree, read from /proc, so
+# Linux only). The browsers are plain Selenium headless Chrome: init_undetected_driver
+# expects a Windows Chrome install and logged-in profiles. The human-like dwell delays
+# are disabled, so the numbers are what the machine can sustain. Every scraped row is
+# checked against the mock feed's values; exits with status 1 if any differs.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+from harness import load_scraper
+from mock_shorts_site import MockShortsSite, short_fields, short_index
+from lean_mode import DEFAULT_BLOCKED_URL_PATTERNS, apply_lean_options, block_urls
+from metrics import METRICS
+from network_capture import enable_performance_logging
+
+# Fields compared with the mock feed's values.
+CHECKED_FIELDS = (
+    'caption', 'hashtags_on_caption', 'channel_name', 'raw_views_count', 'likes_count', 'comments_count',
+    'upload_date', 'extracted_keywords', 'description', 'hashtags_on_description', 'sound_id', 'sound_name',
+    'sound_artist', 'sound_usage',
+)
+REPORTED_STAGES = ('driver_init', 'wait_reel', 'capture', 'parse', 'click_description', 'click_sound', 'navigate', 'ready')
+
+class CollectingWriter:
+    def __init__(self):
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def put_many(self, rows):
+        with self._lock:
+            self.rows.extend(rows)
+
+# --- Browser Memory (Linux /proc) ---
+def _children_by_parent():
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+def _process_memory_kb(pid):
+    """Returns (RSS, PSS) of a process in kB; PSS counts shared pages once across the browser's processes."""
+    rss = pss = 0
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            rss = next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), 0)
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            pss = next((int(line.split()[1]) for line in f if line.startswith('Pss:')), 0)
+    except OSError:
+        pass
+    return rss, pss
+
+def tree_memory_mb(root_pid, children):
+    """(RSS, PSS) in MB of a process and all its descendants, e.g. chromedriver and the Chrome processes it started."""
+    rss = pss = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        process_rss, process_pss = _process_memory_kb(pid)
+        rss += process_rss
+        pss += process_pss
+        stack.extend(children.get(pid, ()))
+    return rss / 1024, pss / 1024
+
+class MemorySampler:
+    """Samples the memory of every launched browser every interval seconds and keeps the peaks."""
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.drivers = []
+        self.peaks = {}  # driver index -> (rss_mb, pss_mb)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='memory-sampler', daemon=True)
+
+    def add(self, driver):
+        with self._lock:
+            self.drivers.append(driver)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def sample(self):
+        children = _children_by_parent()
+        with self._lock:
+            drivers = list(enumerate(self.drivers))
+        for number, driver in drivers:
+            process = getattr(getattr(driver, 'service', None), 'process', None)
+            if process is None or process.poll() is not None:
+                continue
+            rss, pss = tree_memory_mb(process.pid, children)
+            peak_rss, peak_pss = self.peaks.get(number, (0.0, 0.0))
+            self.peaks[number] = (max(peak_rss, rss), max(peak_pss, pss))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def make_driver_factory(sampler, headed=False):
+    """A stand-in for init_undetected_driver that launches plain Selenium Chrome with the same options."""
+    from selenium import webdriver
+
+    def launch(profile_path=None, headless=False, position_index=None, capture_network=False, lean=False):
+        options = webdriver.ChromeOptions()
+        if capture_network:
+            enable_performance_logging(options)
+        if lean:
+            apply_lean_options(options)
+        if not headed:
+            options.add_argument("--headless=new")
+        for argument in ("--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--mute-audio", "--window-size=480,900"):
+            options.add_argument(argument)
+        driver = webdriver.Chrome(options=options)
+        if lean:
+            block_urls(driver, DEFAULT_BLOCKED_URL_PATTERNS)
+        sampler.add(driver)
+        sampler.sample()
+        return driver
+    return launch
+
+def check_rows(rows):
+    """Returns a list of mismatches between scraped rows and the mock feed's values."""
+    problems = []
+    for row in rows:
+        index = short_index(row['video_id'])
+        if index is None:
+            problems.append(f"{row['video_id']}: not a mock short")
+            continue
+        expected = short_fields(index)
+        for field in CHECKED_FIELDS:
+            if row.get(field) != expected[field]:
+                problems.append(f"{row['video_id']}: {field}: expected {expected[field]!r}, got {row.get(field)!r}")
+    return problems
+
+def run_level(scraper, browsers, headed, verbose):
+    """Scrapes MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT shorts in each of `browsers` concurrent browsers. Returns the level's report."""
+    METRICS.reset()
+    sampler = MemorySampler().start()
+    scraper.init_undetected_driver = make_driver_factory(sampler, headed)
+    writer = CollectingWriter()
+    results = []
+    threads = [
+        threading.Thread(target=lambda i=i: results.append(scraper.dummy_account_task(
+            {'id': f'load_{i + 1}', 'profile_path': None, 'position_index': None}, writer)))
+        for i in range(browsers)
+    ]
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with output:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+
+    summary = METRICS.summary()
+    accounts = summary['accounts'].values()
+    peaks = list(sampler.peaks.values())
+    return {
+        'browsers': browsers,
+        'shorts': len(writer.rows),
+        'failed_accounts': results.count(False),
+        'elapsed_sec': round(elapsed, 3),
+        'shorts_per_minute': round(len(writer.rows) / elapsed * 60, 2),
+        'shorts_per_minute_per_browser': round(sum(a.get('shorts_per_minute', 0) for a in accounts) / max(len(accounts), 1), 2),
+        'stages': {stage: {'p50_ms': round(s['p50_sec'] * 1000, 1), 'p95_ms': round(s['p95_sec'] * 1000, 1), 'count': s['count']}
+                   for stage, s in summary['stages'].items() if stage in REPORTED_STAGES},
+        'peak_rss_mb_per_browser': round(sum(p[0] for p in peaks) / len(peaks), 1) if peaks else None,
+        'peak_pss_mb_per_browser': round(sum(p[1] for p in peaks) / len(peaks), 1) if peaks else None,
+        'problems': check_rows(writer.rows),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the scraper against the local mock Shorts feed.")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4], help="Browser counts to sweep.")
+    parser.add_argument('--shorts', type=int, default=20, help="Shorts per browser.")
+    parser.add_argument('--feed-size', type=int, default=1000, help="Shorts in the mock feed.")
+    parser.add_argument('--latency-ms', type=int, default=50, help="Mock server response delay.")
+    parser.add_argument('--render-ms', type=int, default=100, help="Delay before clicked content renders.")
+    parser.add_argument('--lean', action='store_true', help="Run with LEAN_MODE request blocking.")
+    parser.add_argument('--headed', action='store_true', help="Show the browser windows.")
+    parser.add_argument('--verbose', action='store_true', help="Keep the scraper's own output.")
+    parser.add_argument('--json', help="Also write the reports to this JSON file.")
+    args = parser.parse_args()
+
+    site = MockShortsSite(feed_size=args.feed_size, latency_ms=args.latency_ms, render_ms=args.render_ms).start()
+    scraper = load_scraper(disable_ready_waits=False)
+    scraper.YOUTUBE_BASE_URL = site.url
+    scraper.MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT = min(args.shorts, args.feed_size)
+    scraper.LEAN_MODE = args.lean
+    METRICS.enabled = True
+    print(f"Mock feed on {site.url} ({args.feed_size} shorts, {args.latency_ms} ms latency, {args.render_ms} ms render), "
+          f"{scraper.MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT} shorts per browser.")
+
+    reports = []
+    for browsers in args.concurrency:
+        report = run_level(scraper, browsers, args.headed, args.verbose)
+        reports.append(report)
+        memory = (f"{report['peak_rss_mb_per_browser']:.0f} MB RSS / {report['peak_pss_mb_per_browser']:.0f} MB PSS per browser"
+                  if report['peak_rss_mb_per_browser'] is not None else "memory not measured")
+        print(f"{browsers} browser{'s' if browsers > 1 else ''}: {report['shorts']} shorts in {report['elapsed_sec']:.1f}s, "
+              f"{report['shorts_per_minute']:.1f}/min total, {report['shorts_per_minute_per_browser']:.1f}/min per browser, {memory}")
+        for stage, latency in report['stages'].items():
+            print(f"    {stage:<18} p50 {latency['p50_ms']:>8.1f} ms   p95 {latency['p95_ms']:>8.1f} ms   ({latency['count']})")
+        if report['failed_accounts']:
+            print(f"    FAIL {report['failed_accounts']} browsers failed (run with --verbose)")
+        for problem in report['problems'][:10]:
+            print(f"    FAIL {problem}")
+    site.shutdown()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'levels': reports}, f, indent=2)
+    ok = all(report['shorts'] and not report['problems'] and not report['failed_accounts'] for report in reports)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+# benchmarks/bench_normalize.py
+# Validates and benchmarks the vectorized count/date normalization (normalize.py).
+#
+# Usage:
+#   python benchmarks/bench_normalize.py [--rows 500000] [--chunksize 100000]
+#
+# Checks a table of known English and Indonesian labels, compares parsing the count columns
+# of one chunk column-wise with parsing them one row at a time, then normalizes a synthetic
+# raw CSV of --rows rows chunk by chunk end to end. Also checks that appending to a raw CSV
+# written with older columns starts a versioned file that normalizes cleanly. Exits with
+# status 1 if any known label parses wrong or an appended row lands under the wrong header.
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import harness  # Puts the repository on sys.path
+from config import CSV_HEADERS
+from output_pipeline import OutputWriter, create_sink, versioned_path
+from normalize import COUNT_COLUMNS, detect_locale, normalize_file, normalize_frame, parse_count, parse_counts
+
+# (raw fields, expected typed values). Unlisted raw fields are left empty.
+KNOWN_ROWS = [
+    ({'raw_views_count': '1,234,567', 'likes_count': 'like this video along with 12,345 other people',
+      'comments_count': 'View 321 comments', 'remix_count': 'Remix', 'sound_usage': '4.2K videos',
+      'upload_date': 'Mar 3, 2025'},
+     {'locale': 'en', 'views': 1234567, 'likes': 12345, 'comments': 321, 'remixes': None, 'sound_uses': 4200,
+      'upload_ts': '2025-03-03 00:00:00'}),
+    ({'raw_views_count': '98.765', 'likes_count': 'suka video ini bersama 1,2 rb orang lainnya',
+      'comments_count': 'Lihat 48 komentar', 'remix_count': 'Remix', 'sound_usage': '312 video',
+      'upload_date': '17 Feb 2025'},
+     {'locale': 'id', 'views': 98765, 'likes': 1200, 'comments': 48, 'remixes': None, 'sound_uses': 312,
+      'upload_ts': '2025-02-17 00:00:00'}),
+    ({'raw_views_count': '1,5 jt x ditonton', 'likes_count': '2,3 M', 'comments_count': 'Tidak ada komentar',
+      'remix_count': '12', 'upload_date': '3 hari yang lalu'},
+     {'locale': 'id', 'views': 1500000, 'likes': 2300000000, 'comments': 0, 'remixes': 12,
+      'upload_ts': '2025-03-07 12:00:00'}),
+    ({'raw_views_count': '2.5M views', 'likes_count': '1.2K', 'comments_count': 'No comments',
+      'upload_date': '2 hours ago'},
+     {'locale': 'en', 'views': 2500000, 'likes': 1200, 'comments': 0, 'upload_ts': '2025-03-10 10:00:00'}),
+    ({'raw_views_count': 'NaN', 'sound_usage': '1 video', 'upload_date': 'NaN'},
+     {'views': None, 'sound_uses': 1, 'upload_ts': None}),
+]
+SCAN_TIME = '2025-03-10T12:00:00'
+
+# Label templates for the synthetic history, per locale: (raw column, format).
+TEMPLATES = {
+    'en': {
+        'raw_views_count': lambda n: f"{n:,} views",
+        'likes_count': lambda n: f"like this video along with {n:,} other people",
+        'comments_count': lambda n: f"View {n:,} comments",
+        'remix_count': lambda n: "Remix" if n % 3 else f"{n / 1000:.1f}K",
+        'sound_usage': lambda n: f"{n / 1000:.1f}K videos",
+        'upload_date': lambda n: f"Mar {n % 28 + 1}, 2025" if n % 2 else f"{n % 23 + 1} hours ago",
+    },
+    'id': {
+        'raw_views_count': lambda n: f"{n:,}".replace(',', '.'),
+        'likes_count': lambda n: f"suka video ini bersama {n / 1000:.1f} rb orang lainnya".replace('.', ','),
+        'comments_count': lambda n: f"Lihat {n} komentar",
+        'remix_count': lambda n: "Remix" if n % 3 else f"{n / 1e6:.1f} jt".replace('.', ','),
+        'sound_usage': lambda n: f"{n} video",
+        'upload_date': lambda n: f"{n % 28 + 1} Agu 2025" if n % 2 else f"{n % 6 + 1} hari yang lalu",
+    },
+}
+
+def validate():
+    """Returns a list of human readable problems; empty if every known row parses as expected."""
+    rows = [dict({header: None for header in CSV_HEADERS}, timestamp_scan=SCAN_TIME, **raw) for raw, _ in KNOWN_ROWS]
+    normalized = normalize_frame(pd.DataFrame(rows))
+    problems = []
+    for i, (raw, expected) in enumerate(KNOWN_ROWS):
+        for column, expected_value in expected.items():
+            value = normalized[column].iloc[i]
+            if pd.isna(value):
+                value = None
+            elif column == 'upload_ts':
+                value = str(value)
+            elif column != 'locale':
+                value = int(value)
+            if value != expected_value:
+                problems.append(f"row {i} {column}: expected {expected_value!r}, got {value!r} (raw: {raw})")
+    for raw, expected in KNOWN_ROWS:
+        locale = expected.get('locale', 'en')
+        for raw_column, typed_column in COUNT_COLUMNS.items():
+            if typed_column in expected and parse_count(raw.get(raw_column), locale) != expected[typed_column]:
+                problems.append(f"parse_count({raw.get(raw_column)!r}, {locale!r}): expected {expected[typed_column]!r}")
+    return problems
+
+def check_header_change():
+    """
+    Appends a row with the current CSV_HEADERS to a raw CSV written with the 20 columns of
+    older versions. Returns a list of problems; empty if the old file is left untouched and
+    the row goes to a versioned file that normalizes.
+    """
+    legacy_headers = [header for header in CSV_HEADERS if header not in ('extraction_status', 'missing_fields')]
+    row = dict({header: 'NaN' for header in CSV_HEADERS}, timestamp_scan=SCAN_TIME, video_id='v_new',
+               raw_views_count='1.2K views', extraction_status='complete', missing_fields='[]')
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'raw.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(legacy_headers)
+            writer.writerow([SCAN_TIME, 'dummy_1', 'v_old'] + ['NaN'] * (len(legacy_headers) - 3))
+        with open(path, encoding='utf-8') as f:
+            legacy_text = f.read()
+
+        written_to = []
+        for _ in range(2):  # The second run must continue the versioned file, not start another
+            output_writer = OutputWriter(create_sink('csv', path, CSV_HEADERS), fsync_policy='none')
+            with contextlib.redirect_stdout(io.StringIO()):
+                output_writer.start()
+            output_writer.put(row)
+            output_writer.close()
+            written_to.append(output_writer.sink.filename)
+
+        with open(path, encoding='utf-8') as f:
+            if f.read() != legacy_text:
+                problems.append("appending with new columns changed the file written with the old ones")
+        expected_path = versioned_path(path, 2)
+        if written_to != [expected_path, expected_path]:
+            problems.append(f"new-column rows went to {written_to}, expected {expected_path} twice")
+        for csv_path, rows in ((path, 1), (expected_path, 2)):
+            try:
+                normalized_rows, _ = normalize_file(csv_path, csv_path + '.normalized.csv')
+            except Exception as e:
+                problems.append(f"normalizing {os.path.basename(csv_path)} failed: {e}")
+                continue
+            if normalized_rows != rows:
+                problems.append(f"{os.path.basename(csv_path)}: expected {rows} rows, normalized {normalized_rows}")
+    return problems
+
+def write_synthetic_csv(path, rows, seed=7):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        pd.DataFrame(columns=CSV_HEADERS).to_csv(f, index=False)
+        batch = []
+        for i in range(rows):
+            locale = 'id' if i % 2 else 'en'
+            n = rng.randint(1, 5_000_000)
+            row = {header: 'NaN' for header in CSV_HEADERS}
+            row.update(timestamp_scan=SCAN_TIME, dummy_account_id=f'dummy_{i % 4}', video_id=f'v{i:010d}')
+            row.update({column: template(n) for column, template in TEMPLATES[locale].items()})
+            batch.append(row)
+            if len(batch) == 50_000:
+                pd.DataFrame(batch, columns=CSV_HEADERS).to_csv(f, header=False, index=False)
+                batch = []
+        if batch:
+            pd.DataFrame(batch, columns=CSV_HEADERS).to_csv(f, header=False, index=False)
+
+def compare_count_parsing(path, rows):
+    """
+    Parses the count columns of one chunk column-wise (parse_counts) and row by row
+    (parse_count), given the same locales. Returns (vectorized s, per-row s, mismatches).
+    """
+    frame = pd.read_csv(path, nrows=rows, dtype=str, keep_default_na=False, na_values=['', 'NaN'])
+    locale = detect_locale(frame)
+
+    started = time.perf_counter()
+    vectorized = {column: parse_counts(frame[column], locale) for column in COUNT_COLUMNS}
+    vectorized_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    per_row = {column: [] for column in COUNT_COLUMNS}
+    for record, row_locale in zip(frame.to_dict('records'), locale):
+        for column in COUNT_COLUMNS:
+            per_row[column].append(parse_count(record[column], row_locale))
+    per_row_seconds = time.perf_counter() - started
+
+    mismatches = 0
+    for column in COUNT_COLUMNS:
+        expected = pd.Series(per_row[column], dtype='Int64')
+        mismatches += int((vectorized[column].reset_index(drop=True).fillna(-1) != expected.fillna(-1)).sum())
+    return vectorized_seconds, per_row_seconds, mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized count and date normalization.")
+    parser.add_argument('--rows', type=int, default=500_000, help="Rows in the synthetic raw CSV.")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows normalized per chunk.")
+    args = parser.parse_args()
+
+    problems = validate() + check_header_change()
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        return 1
+    print(f"{len(KNOWN_ROWS)} known label rows parse as expected.")
+    print("Rows appended with new columns go to a versioned CSV that normalizes cleanly.")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = os.path.join(tmp, 'raw.csv')
+        write_synthetic_csv(raw_path, args.rows)
+        chunk_rows = min(args.rows, args.chunksize)
+        vectorized_seconds, per_row_seconds, mismatches = compare_count_parsing(raw_path, chunk_rows)
+        rows, seconds = normalize_file(raw_path, os.path.join(tmp, 'normalized.csv'), args.chunksize)
+
+    print(f"count columns of one {chunk_rows}-row chunk ({len(COUNT_COLUMNS)} columns):")
+    print(f"  column-wise (parse_counts): {chunk_rows / vectorized_seconds:,.0f} rows/s")
+    print(f"  row by row (parse_count):   {chunk_rows / per_row_seconds:,.0f} rows/s")
+    if mismatches:
+        print(f"FAIL {mismatches} count values differ between the two parsers")
+        return 1
+    rate = rows / seconds
+    print(f"end to end, {args.chunksize}-row chunks (read CSV, locale, counts, dates, write CSV): "
+          f"{rate:,.0f} rows/s; 10M rows in ~{10_000_000 / rate / 60:.1f} min")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# benchmarks/bench_reextract.py
+# Validates and benchmarks the capture archive and its offline re-extraction (capture_archive.py).
+#
+# Usage:
+#   python benchmarks/bench_reextract.py [--captures 20000] [--workers 1 4]
+#
+# Runs extract_shorts_data on the recorded fixtures twice: with a normal engine, and with
+# a capture-only engine whose rows go into a capture archive. The archive is then
+# re-extracted in a process pool and every row must match the live one. It is extracted
+# once more by `capture_archive.py extract`, whose rows must reach the trend index, trend
+# sketches and video catalog like a scrape's. The archive is then filled with --captures
+# copies of the fixtures (under new video IDs) and timed re-extraction reports captures
+# per second for each worker count. Exits with status 1 if a re-extracted row differs
+# from the live extraction, a row lists a missing field that is not an output column,
+# or extract skips a consumer.
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from harness import FakeDriver, load_fixture_cases, load_scraper
+import capture_archive
+from config import CSV_HEADERS, ENABLE_TREND_INDEX, ENABLE_TREND_SKETCHES, ENABLE_VIDEO_CATALOG
+from capture_archive import CaptureArchive, reextract
+from extractor import ExtractionEngine
+
+# Fields that are random or time dependent and therefore not compared.
+UNCHECKED_FIELDS = ('timestamp_scan', 'watch_duration_sec')
+
+class CollectingWriter:
+    def __init__(self):
+        self.rows = []
+
+    def put_many(self, rows):
+        self.rows.extend(rows)
+
+def extract(scraper, case, engine):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scraper.extract_shorts_data(FakeDriver(case), 'bench', set(), engine)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark re-extraction from the capture archive.")
+    parser.add_argument('--captures', type=int, default=20_000, help="Captures in the timed archive.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1], help="Worker counts to time.")
+    parser.add_argument('--backend', default='lxml', help="Parser backend.")
+    args = parser.parse_args()
+
+    scraper = load_scraper()
+    cases = load_fixture_cases()
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = CaptureArchive(os.path.join(tmp, 'validate'))
+        live_rows = []
+        for case in cases:
+            live_rows.extend(extract(scraper, case, ExtractionEngine(args.backend)))
+            archive.put_many(extract(scraper, case, ExtractionEngine(args.backend, capture_only=True)))
+        writer = CollectingWriter()
+        reextract(archive, writer, workers=2, backend_name=args.backend)
+        archive.close()
+        if len(writer.rows) != len(live_rows):
+            failures.append(f"expected {len(live_rows)} rows, got {len(writer.rows)}")
+        for live, archived in zip(live_rows, writer.rows):
+            for field, value in live.items():
+                if field not in UNCHECKED_FIELDS and archived.get(field) != value:
+                    failures.append(f"{live['video_id']}: {field}: live {value!r}, re-extracted {archived.get(field)!r}")
+        print(f"  {'ok' if not failures else 'FAIL'} {len(writer.rows)} re-extracted rows match the live extraction")
+        unknown = sorted({field for row in live_rows + writer.rows for field in row['missing_fields'] if field not in CSV_HEADERS})
+        print(f"  {'ok' if not unknown else 'FAIL'} missing_fields only lists output columns")
+        if unknown:
+            failures.append(f"missing_fields lists {', '.join(unknown)}, which are not in CSV_HEADERS")
+        # The extract command feeds the same consumers as a scrape; their files go to the temporary directory
+        stdout = io.StringIO()
+        saved_cwd, saved_argv = os.getcwd(), sys.argv
+        os.chdir(tmp)
+        sys.argv = ['capture_archive.py', '--archive', 'validate', 'extract', '--workers', '2', '--format', 'csv',
+                    '--output', 'extracted.csv', '--backend', args.backend]
+        try:
+            with contextlib.redirect_stdout(stdout):
+                capture_archive.main()
+        finally:
+            os.chdir(saved_cwd)
+            sys.argv = saved_argv
+        expected = [f"Output writer: {len(live_rows)} rows written"]
+        if ENABLE_TREND_INDEX:
+            expected.append(f"Trend index: {len(live_rows)} rows indexed")
+        if ENABLE_TREND_SKETCHES:
+            expected.append(f"Trend sketches: {len(live_rows)} rows added")
+        if ENABLE_VIDEO_CATALOG:
+            expected.append(f"Video catalog: {len(live_rows)} snapshots recorded")
+        unfed = [line for line in expected if line not in stdout.getvalue()]
+        print(f"  {'ok' if not unfed else 'FAIL'} extract feeds the writer, trend index, sketches and catalog")
+        failures.extend(f"extract output lacks {line!r}" for line in unfed)
+        for failure in failures:
+            print(f"    {failure}")
+
+        # One capture per fixture, copied under new video IDs
+        templates = [extract(scraper, case, ExtractionEngine(args.backend, capture_only=True))[0] for case in cases]
+        archive = CaptureArchive(os.path.join(tmp, 'timed'))
+        started = time.perf_counter()
+        for start in range(0, args.captures, 1000):
+            archive.put_many([dict(templates[i % len(templates)], video_id=f'v{i:09d}')
+                              for i in range(start, min(start + 1000, args.captures))])
+        archive_seconds = time.perf_counter() - started
+        raw_bytes = sum(len(html.encode('utf-8')) for template in templates
+                        for subtrees in template['subtrees'].values() for html in subtrees.values()) / len(templates)
+        stats = archive.stats()
+        print(f"archived {stats['captures']} captures at {stats['captures'] / archive_seconds:,.0f} per second, "
+              f"{stats['bytes_per_capture'] / 1024:.1f} KB each ({raw_bytes / 1024:.1f} KB of HTML before compression)")
+        for workers in args.workers:
+            writer = CollectingWriter()
+            started = time.perf_counter()
+            rows, failed = reextract(archive, writer, workers=workers, backend_name=args.backend)
+            elapsed = time.perf_counter() - started
+            print(f"  {workers} worker{'s' if workers > 1 else ''}: re-extracted {rows} captures in {elapsed:.2f}s "
+                  f"({rows / elapsed:,.0f} per second), {failed} failed")
+        archive.close()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
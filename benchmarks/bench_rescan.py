@@ -0,0 +1,103 @@
+# benchmarks/bench_rescan.py
+# Validates and benchmarks the re-scan scheduler's video catalog (rescan_scheduler.py).
+#
+# Usage:
+#   python benchmarks/bench_rescan.py [--videos 200000] [--batch-size 50]
+#
+# Fills a catalog with synthetic first snapshots, then runs refresh rounds in which a
+# stand-in backend returns new view counts (some videos growing fast, most stalled).
+# Reports how long picking a due batch and recording its snapshots take as the catalog
+# grows, and checks that fast-growing videos come back sooner than stalled ones.
+# Exits with status 1 if the scheduling order is wrong.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import harness  # Puts the repository on sys.path
+from config import CSV_HEADERS
+from rescan_scheduler import RescanScheduler, VideoCatalog
+
+def snapshot_row(video_id, scanned, views):
+    row = {header: "NaN" for header in CSV_HEADERS}
+    row.update(video_id=video_id, timestamp_scan=scanned.isoformat(), raw_views_count=f"{views:,} views",
+               upload_date="2 days ago")
+    return row
+
+class CatalogWriter:
+    """Output writer stand-in that hands written rows straight to the catalog, like the batch callback."""
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def put_many(self, rows):
+        self.catalog.observe_rows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the re-scan scheduler's catalog.")
+    parser.add_argument('--videos', type=int, default=200_000, help="Videos in the synthetic catalog.")
+    parser.add_argument('--batch-size', type=int, default=50, help="Videos per refresh batch.")
+    parser.add_argument('--rounds', type=int, default=200, help="Refresh batches to time.")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    first_scan = datetime.now() - timedelta(hours=24)
+    views = {f'v{i:09d}': rng.randint(1_000, 5_000_000) for i in range(args.videos)}
+    fast = {video_id for video_id in views if rng.random() < 0.05}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = VideoCatalog(os.path.join(tmp, 'catalog.sqlite3'))
+        started = time.perf_counter()
+        video_ids = list(views)
+        for start in range(0, len(video_ids), 20_000):
+            catalog.observe_rows([snapshot_row(video_id, first_scan, views[video_id]) for video_id in video_ids[start:start + 20_000]])
+        fill_seconds = time.perf_counter() - started
+        print(f"catalog of {args.videos} videos filled at {args.videos / fill_seconds:,.0f} snapshots/s "
+              f"({os.path.getsize(catalog.path) / 1e6:.0f} MB)")
+
+        def refresh(batch):
+            # Fast videos gained 50% since their last snapshot, the others nothing
+            now = datetime.now()
+            for video_id in batch:
+                if video_id in fast:
+                    views[video_id] = int(views[video_id] * 1.5)
+            return [snapshot_row(video_id, now, views[video_id]) for video_id in batch]
+
+        scheduler = RescanScheduler(catalog, refresh, CatalogWriter(catalog), args.batch_size)
+        claim_times, record_times = [], []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            batch = catalog.claim_due(args.batch_size)
+            claim_times.append(time.perf_counter() - started)
+            if not batch:
+                break
+            rows = refresh(batch)
+            started = time.perf_counter()
+            scheduler.output_writer.put_many(rows)
+            record_times.append(time.perf_counter() - started)
+        claim_times.sort()
+        record_times.sort()
+        print(f"  pick a due batch of {args.batch_size}: median {claim_times[len(claim_times) // 2] * 1000:.2f} ms, "
+              f"p99 {claim_times[int(len(claim_times) * 0.99)] * 1000:.2f} ms")
+        print(f"  record its snapshots and reschedule: median {record_times[len(record_times) // 2] * 1000:.2f} ms")
+
+        refreshed = [row[0] for row in catalog._conn.execute("SELECT video_id FROM videos WHERE refreshes > 0")]
+        intervals = {video_id: next_due - last_scan for video_id, next_due, last_scan in catalog._conn.execute(
+            "SELECT video_id, next_due, last_scan FROM videos WHERE refreshes > 0 AND next_due IS NOT NULL")}
+        fast_intervals = [intervals[video_id] for video_id in refreshed if video_id in fast and video_id in intervals]
+        slow_intervals = [intervals[video_id] for video_id in refreshed if video_id not in fast and video_id in intervals]
+        catalog.close()
+    if not fast_intervals or not slow_intervals:
+        print("FAIL not enough refreshed videos to compare, raise --rounds")
+        return 1
+    fast_hours = sum(fast_intervals) / len(fast_intervals) / 3600
+    slow_hours = sum(slow_intervals) / len(slow_intervals) / 3600
+    status = 'ok' if fast_hours < slow_hours else 'FAIL'
+    print(f"  {status} next refresh after {fast_hours:.1f} h for fast-growing videos, {slow_hours:.1f} h for stalled ones")
+    return 0 if status == 'ok' else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
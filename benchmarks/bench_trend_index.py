@@ -0,0 +1,118 @@
+# benchmarks/bench_trend_index.py
+# Validates and benchmarks the incremental hashtag / keyword / sound / channel index (trend_index.py).
+#
+# Usage:
+#   python benchmarks/bench_trend_index.py [--rows 300000] [--batch-size 10]
+#
+# Indexes synthetic rows the way the output writer does (one add_rows call per batch),
+# then answers tag-between-dates and co-occurrence questions from the index and checks
+# them against a brute-force scan of the same rows. Exits with status 1 on any mismatch.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import harness  # Puts the repository on sys.path
+from trend_index import TrendIndex, row_terms, to_epoch
+
+START = datetime(2025, 3, 1)
+
+def synthetic_rows(rows, seed=11):
+    """Rows with a long-tailed hashtag and sound popularity, scanned over 30 days in order."""
+    rng = random.Random(seed)
+    tags = [f'#Tag{i}' for i in range(20_000)]
+    sounds = [(f'sound{i:05d}', f'original sound - creator{i}') for i in range(5_000)]
+    for i in range(rows):
+        sound_id, sound_name = sounds[min(int(rng.paretovariate(1.1)) - 1, len(sounds) - 1)]
+        picked = {tags[min(int(rng.paretovariate(0.9)) - 1, len(tags) - 1)] for _ in range(rng.randint(0, 5))}
+        picked = sorted(picked)
+        yield {
+            'timestamp_scan': (START + timedelta(seconds=i * 30 * 86400 // rows)).isoformat(),
+            'dummy_account_id': f'dummy_{i % 4}',
+            'video_id': f'v{rng.randrange(rows):010d}',  # Some videos are scanned more than once
+            'hashtags_on_caption': picked[:2],
+            'hashtags_on_description': picked[2:],
+            'extracted_keywords': 'NaN' if i % 3 else f'keyword {i % 50}',
+            'sound_id': sound_id,
+            'sound_name': sound_name,
+            'channel_name': f'@channel{rng.randrange(2_000)}',
+        }
+
+def brute_force_search(rows, kind, term, since, until):
+    latest = {}
+    for row in rows:
+        scan_ts = to_epoch(row['timestamp_scan'])
+        if since <= scan_ts <= until and any(k == kind and t == term for k, t, _ in row_terms(row)):
+            latest[row['video_id']] = max(scan_ts, latest.get(row['video_id'], scan_ts))
+    return latest
+
+def brute_force_cooccur(rows, sound_name):
+    latest = {}
+    for row in rows:
+        if row['sound_name'] == sound_name:
+            scan_ts = to_epoch(row['timestamp_scan'])
+            if row['video_id'] not in latest or scan_ts > latest[row['video_id']][0]:
+                latest[row['video_id']] = (scan_ts, row)
+    counts = Counter()
+    for _, row in latest.values():
+        counts.update({label for kind, _, label in row_terms(row) if kind == 'tag'})
+    return counts
+
+def timed(function, repeat=5):
+    """Returns (result, best milliseconds)."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the incremental trend index.")
+    parser.add_argument('--rows', type=int, default=300_000, help="Synthetic rows to index.")
+    parser.add_argument('--batch-size', type=int, default=10, help="Rows per add_rows call (OUTPUT_BATCH_SIZE).")
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.rows))
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'trend_index.sqlite3')
+        index = TrendIndex(path)
+        started = time.perf_counter()
+        for start in range(0, len(rows), args.batch_size):
+            index.add_rows(rows[start:start + args.batch_size])
+        build_seconds = time.perf_counter() - started
+        if index.add_rows(rows[:1000]):
+            print("FAIL re-adding indexed rows indexed them again")
+            failures += 1
+        stats = index.stats()
+        print(f"indexed {args.rows} rows in batches of {args.batch_size}: {args.rows / build_seconds:,.0f} rows/s; "
+              f"{stats['postings']} postings in {stats['blocks']} blocks, "
+              f"{stats['posting_bytes'] / max(1, stats['postings']):.2f} bytes per posting; "
+              f"index file {os.path.getsize(path) / 1e6:.1f} MB")
+
+        since, until = to_epoch(START + timedelta(days=10)), to_epoch(START + timedelta(days=17)) - 1
+        for tag in ('#Tag0', '#Tag3', '#Tag500'):
+            shorts, ms = timed(lambda: index.search('tag', tag, since, until))
+            expected = brute_force_search(rows, 'tag', tag.lower(), since, until)
+            status = 'ok' if dict(shorts) == expected else 'FAIL'
+            failures += status == 'FAIL'
+            print(f"  {status} search {tag} over 7 days: {len(shorts)} shorts in {ms:.1f} ms")
+        for sound_name in ('original sound - creator0', 'original sound - creator40'):
+            pairs, ms = timed(lambda: index.cooccurring('sound', sound_name, 'tag', top=10))
+            expected = brute_force_cooccur(rows, sound_name)
+            status = 'ok' if all(expected[label] == count for label, count in pairs) and \
+                len(pairs) == min(10, len(expected)) else 'FAIL'
+            failures += status == 'FAIL'
+            print(f"  {status} co-occurring hashtags for '{sound_name}': top {len(pairs)} in {ms:.1f} ms")
+        index.close()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
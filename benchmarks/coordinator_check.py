@@ -0,0 +1,182 @@
+# benchmarks/coordinator_check.py
+# Runs the coordinator with several worker processes on this machine standing in for nodes.
+#
+# Usage:
+#   python benchmarks/coordinator_check.py [--workers 3] [--accounts 8] [--shorts 40] [--lease-sec 3]
+#
+# Starts a coordinator in-process and --workers worker processes (this script again),
+# each running CoordinatorWorker with a stand-in task instead of a browser: a job writes
+# its account's shorts into the worker's own CSV shard, with video IDs drawn from a
+# pool shared by all accounts so the shards overlap like real feeds do. The first
+# worker kills itself (SIGKILL, so Linux/macOS only) in the middle of a job. The
+# check verifies that the dead worker's jobs are leased again once their leases lapse,
+# that every job completes and that merging the shards yields every video exactly once,
+# keeping the most complete row. It then times the merge on --merge-rows synthetic rows.
+# Exits with status 1 on any failure.
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import harness  # Puts the repository on sys.path
+from config import CSV_HEADERS
+from coordinator import Coordinator, CoordinatorClient, CoordinatorServer, CoordinatorWorker, find_shards, merge_shards
+from output_pipeline import OutputWriter, create_sink
+
+class CollectingWriter:
+    def __init__(self):
+        self.rows = []
+
+    def put_many(self, rows):
+        self.rows.extend(rows)
+
+def video_id(account_index, n, pool_size):
+    return f"v{(account_index * 7 + n) % pool_size:06d}"
+
+def make_row(account_id, vid, missing_fields=(), scanned_at=None):
+    row = {header: '' for header in CSV_HEADERS}
+    row.update(timestamp_scan=(scanned_at or datetime.now()).isoformat(), dummy_account_id=account_id, video_id=vid,
+               caption=f"caption of {vid}", missing_fields=list(missing_fields))
+    return row
+
+def write_shard(path, rows):
+    writer = OutputWriter(create_sink('csv', path, CSV_HEADERS), batch_size=1000, fsync_policy='none').start()
+    writer.put_many(rows)
+    writer.close()
+
+# --- Worker Process ---
+def run_worker(port, worker_id, shard_path, pool_size, row_delay, die_after):
+    worker = CoordinatorWorker(CoordinatorClient('127.0.0.1', port, worker_id), 2, poll_interval=0.5)
+    writer = OutputWriter(create_sink('csv', shard_path, CSV_HEADERS), batch_size=1, flush_interval=0.1,
+                          fsync_policy='none', on_batch_written=worker.record_rows).start()
+    written = [0]
+    lock = threading.Lock()
+
+    def task(job):
+        leased = job.payload
+        account_index = int(leased['job_id'].rsplit('_', 1)[1])
+        for n in range(leased['progress'], leased['shorts']):
+            if job.cancelled():
+                return False
+            time.sleep(row_delay)
+            writer.put(make_row(leased['job_id'], video_id(account_index, n, pool_size)))
+            with lock:
+                written[0] += 1
+                dying = written[0] == die_after
+            if dying:
+                time.sleep(1.0)  # Let a heartbeat report the rows, then die without a word
+                os.kill(os.getpid(), signal.SIGKILL)
+        return True
+
+    try:
+        worker.run(task)
+    finally:
+        writer.close()
+    return 0
+
+# --- Check ---
+def main():
+    parser = argparse.ArgumentParser(description="Check the coordinator with local worker processes.")
+    parser.add_argument('--workers', type=int, default=3, help="Worker processes (two job slots each).")
+    parser.add_argument('--accounts', type=int, default=8, help="Account jobs.")
+    parser.add_argument('--shorts', type=int, default=40, help="Shorts per account job.")
+    parser.add_argument('--row-delay', type=float, default=0.02, help="Seconds per short in the stand-in task.")
+    parser.add_argument('--lease-sec', type=float, default=3.0, help="Lease duration.")
+    parser.add_argument('--merge-rows', type=int, default=200_000, help="Rows in the timed merge.")
+    parser.add_argument('--verbose', action='store_true', help="Show the workers' output.")
+    parser.add_argument('--as-worker', nargs=5, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    pool_size = max(1, args.accounts * args.shorts // 2)
+    if args.as_worker:
+        port, worker_id, shard_path, row_delay, die_after = args.as_worker
+        return run_worker(int(port), worker_id, shard_path, pool_size, float(row_delay), int(die_after))
+
+    failures = []
+    def check(condition, message):
+        print(f"  {'ok' if condition else 'FAIL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        coordinator = Coordinator(os.path.join(tmp, 'coordinator.sqlite3'), lease_seconds=args.lease_sec, max_attempts=3)
+        coordinator.seed([{'id': f'dummy_{i}', 'profile_path': None} for i in range(args.accounts)], args.shorts)
+        server = CoordinatorServer(coordinator, '127.0.0.1', 0)
+        server_thread = threading.Thread(target=server.run, kwargs={'check_interval': 0.5}, daemon=True)
+        server_thread.start()
+        port = server.server_address[1]
+
+        output = os.path.join(tmp, 'out.csv')
+        die_after = args.shorts // 3
+        started = time.perf_counter()
+        workers = [
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--accounts', str(args.accounts), '--shorts', str(args.shorts),
+                 '--as-worker', str(port), f'w{i}', f'{os.path.splitext(output)[0]}.shard-w{i}.csv', str(args.row_delay),
+                 str(die_after if i == 0 else 0)],
+                stdout=None if args.verbose else subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+            )
+            for i in range(args.workers)
+        ]
+        for worker in workers:
+            worker.wait(timeout=120)
+        server_thread.join(timeout=max(10.0, args.lease_sec * 3))
+        elapsed = time.perf_counter() - started
+
+        status = coordinator.status()
+        print(f"{args.workers} workers ran {args.accounts} jobs of {args.shorts} shorts in {elapsed:.1f}s")
+        check(workers[0].returncode == -signal.SIGKILL, "the first worker died in the middle of a job")
+        check(all(worker.returncode == 0 for worker in workers[1:]), "the other workers exited cleanly")
+        check(status['counts']['completed'] == args.accounts, f"every job completed ({status['counts']})")
+        retried = [job for job in status['jobs'] if job['attempts'] > 1]
+        check(coordinator.expired >= 1 and retried and all(job['worker'] != 'w0' for job in retried),
+              f"the dead worker's leases lapsed and {len(retried)} jobs were finished by others")
+        check(not server_thread.is_alive(), "the coordinator exited once every job was done and every worker had left")
+
+        shards = find_shards(output)
+        check(len(shards) == args.workers, f"one shard per worker ({len(shards)})")
+        merged = CollectingWriter()
+        rows_read, rows_written = merge_shards(shards, merged)
+        expected = {video_id(i, n, pool_size) for i in range(args.accounts) for n in range(args.shorts)}
+        merged_ids = [row['video_id'] for row in merged.rows]
+        check(len(merged_ids) == len(set(merged_ids)) == rows_written, "every video is written once")
+        check(set(merged_ids) == expected, f"no video is lost ({len(expected)} expected, {len(set(merged_ids))} merged)")
+        print(f"  merged {rows_read} rows into {rows_written} ({rows_read - rows_written} duplicates dropped)")
+        server.coordinator.close()
+
+        # The most complete row wins, then the latest scan
+        earlier = datetime(2025, 3, 1, 12, 0)
+        write_shard(os.path.join(tmp, 'pick.shard-a.csv'), [
+            make_row('a', 'partial', missing_fields=['description'], scanned_at=earlier + timedelta(hours=1)),
+            make_row('a', 'rescanned', scanned_at=earlier),
+        ])
+        write_shard(os.path.join(tmp, 'pick.shard-b.csv'), [
+            make_row('b', 'partial', scanned_at=earlier),
+            make_row('b', 'rescanned', scanned_at=earlier + timedelta(hours=1)),
+        ])
+        picked = CollectingWriter()
+        merge_shards(find_shards(os.path.join(tmp, 'pick.csv')), picked)
+        accounts = {row['video_id']: row['dummy_account_id'] for row in picked.rows}
+        check(accounts == {'partial': 'b', 'rescanned': 'b'}, "the complete row wins over a partial one, then the latest scan")
+
+        # Timed merge: four shards, a quarter of the rows duplicated across them
+        per_shard = args.merge_rows // 4
+        for shard in range(4):
+            write_shard(os.path.join(tmp, f'timed.shard-{shard}.csv'),
+                        [make_row(f's{shard}', f'v{(shard * per_shard * 3 // 4) + n:09d}') for n in range(per_shard)])
+        timed = CollectingWriter()
+        started = time.perf_counter()
+        rows_read, rows_written = merge_shards(find_shards(os.path.join(tmp, 'timed.csv')), timed)
+        elapsed = time.perf_counter() - started
+        print(f"timed merge: {rows_read} rows read, {rows_written} unique written in {elapsed:.2f}s "
+              f"({rows_read / elapsed:,.0f} rows per second)")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
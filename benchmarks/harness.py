@@ -0,0 +1,169 @@
+# benchmarks/harness.py
+# Offline stand-ins for a live Chrome session, used by the benchmarks to run the
+# extraction logic against recorded Shorts page states without a browser or network.
+
+import importlib.util
+import json
+import os
+import sys
+import time
+
+import lxml.html
+from selenium.common.exceptions import NoSuchElementException
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, 'fixtures')
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from extractor import CAPTURE_SCRIPT, parse_step
+from readiness import READY_SCRIPT
+
+# Page states recorded for every fixture case, in the order the scraper reaches them.
+PAGE_STATES = ('initial', 'description', 'sound')
+
+# Clicking these elements moves the fake page to the next recorded state.
+CLICK_TRANSITIONS = {
+    'div#expanded': 'description',
+    'div#pivot-button': 'sound',
+}
+
+def load_scraper(disable_ready_waits=True):
+    """
+    Imports youtube-shorts-scraper.py as a module (its file name is not importable)
+    with the anti-bot sleeps disabled so benchmarks measure extraction only. The page
+    readiness waits are disabled too unless disable_ready_waits is False.
+    """
+    spec = importlib.util.spec_from_file_location('youtube_shorts_scraper', os.path.join(REPO_DIR, 'youtube-shorts-scraper.py'))
+    scraper = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(scraper)
+    scraper.human_like_delay = lambda *args, **kwargs: None
+    scraper.simulate_watch_video = lambda *args, **kwargs: 0
+    if disable_ready_waits:
+        scraper.wait_for_page = lambda *args, **kwargs: None
+    return scraper
+
+def load_fixture_cases(fixtures_dir=FIXTURES_DIR):
+    """
+    Loads every fixture case directory: one HTML file per page state plus expected.json.
+    Returns a list of dicts with 'name', 'url', 'pages' and 'expected' keys.
+    """
+    cases = []
+    for name in sorted(os.listdir(fixtures_dir)):
+        case_dir = os.path.join(fixtures_dir, name)
+        expected_path = os.path.join(case_dir, 'expected.json')
+        if not os.path.isfile(expected_path):
+            continue
+        with open(expected_path, encoding='utf-8') as f:
+            expected = json.load(f)
+        pages = {}
+        for state in PAGE_STATES:
+            with open(os.path.join(case_dir, f'{state}.html'), encoding='utf-8') as f:
+                pages[state] = f.read()
+        cases.append({'name': name, 'url': expected['url'], 'pages': pages, 'expected': expected['fields']})
+    return cases
+
+def _select(document, selector):
+    """Minimal document.querySelector() for the simple 'tag#id.class' selectors the scraper uses."""
+    step = parse_step(selector)
+    predicates = f"[@id='{step.id}']" if step.id else ''
+    for css_class in step.classes:
+        predicates += f"[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+    matches = document.xpath(f"descendant::{step.tag}{predicates}[1]")
+    return matches[0] if matches else None
+
+
+class FakeElement:
+    """WebElement stand-in: always visible and enabled, clicking it advances the fake page state."""
+    def __init__(self, driver, selector):
+        self._driver = driver
+        self._selector = selector
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        next_state = CLICK_TRANSITIONS.get(self._selector)
+        if next_state:
+            self._driver.change_state(next_state)
+
+    def send_keys(self, *keys):
+        pass
+
+
+class FakeDriver:
+    """
+    WebDriver stand-in that serves the recorded page states of one fixture case.
+    Supports the calls extract_shorts_data makes: find_element, execute_script with
+    the subtree capture script, execute_async_script with the readiness script,
+    page_source and current_url. A new page state takes ready_latency seconds to
+    "load", which the readiness script waits out (plus its quiet period).
+    """
+    def __init__(self, case, ready_latency=0.0):
+        self.case = case
+        self.current_url = case['url']
+        self.state = PAGE_STATES[0]
+        self.ready_latency = ready_latency
+        self._changed_at = time.perf_counter()
+        self._documents = {}
+
+    def reset(self):
+        self.state = PAGE_STATES[0]
+        self.current_url = self.case['url']
+        self._changed_at = time.perf_counter()
+
+    def change_state(self, state):
+        self.state = state
+        self._changed_at = time.perf_counter()
+
+    def navigate(self, url):
+        """Moves to another short: same recorded page, new URL."""
+        self.current_url = url
+        self.change_state(PAGE_STATES[0])
+
+    @property
+    def page_source(self):
+        return self.case['pages'][self.state]
+
+    def _document(self):
+        if self.state not in self._documents:
+            self._documents[self.state] = lxml.html.document_fromstring(self.page_source)
+        return self._documents[self.state]
+
+    def find_element(self, by, value):
+        selector = value if by in ('css selector', 'tag name') else None
+        if selector is None or _select(self._document(), selector) is None:
+            raise NoSuchElementException(f"FakeDriver: no element for {by}={value!r} in state '{self.state}'")
+        return FakeElement(self, selector)
+
+    def execute_script(self, script, *args):
+        if script == CAPTURE_SCRIPT:
+            subtrees = {}
+            for key, selector in args[0].items():
+                node = _select(self._document(), selector)
+                subtrees[key] = lxml.html.tostring(node, encoding='unicode', with_tail=False) if node is not None else None
+            return {'url': self.current_url, 'subtrees': subtrees}
+        raise NotImplementedError("FakeDriver only supports the extractor capture script.")
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, *args):
+        if script != READY_SCRIPT:
+            raise NotImplementedError("FakeDriver only supports the readiness script.")
+        selector, previous_url, quiet_ms, timeout_ms = args
+        started = time.perf_counter()
+        loaded_in = max(0.0, self._changed_at + self.ready_latency - started)
+        url_ready = not previous_url or self.current_url != previous_url
+        present = url_ready and (selector is None or _select(self._document(), selector) is not None)
+        time.sleep(min(loaded_in + quiet_ms / 1000, timeout_ms / 1000) if present else timeout_ms / 1000)
+        reason = 'ready' if present else ('missing' if url_ready else 'url_unchanged')
+        return {'ok': present, 'reason': reason, 'waited_ms': (time.perf_counter() - started) * 1000, 'url': self.current_url}
+
+    def quit(self):
+        pass
@@ -0,0 +1,249 @@
+# benchmarks/mock_shorts_site.py
+# Local stand-in for the YouTube Shorts feed, for load tests with real browsers and no internet.
+#
+# Usage:
+#   python benchmarks/mock_shorts_site.py --port 8800 --feed-size 1000 --latency-ms 80 --render-ms 150
+#   (then set YOUTUBE_BASE_URL = 'http://127.0.0.1:8800' in config.py, or run benchmarks/bench_load.py)
+#
+# Serves a synthetic feed of --feed-size shorts with the elements the scraper depends on:
+# ytd-reel-video-renderer with the like/comment/remix/pivot buttons, div#metapanel, the
+# description header, the div#expanded description (filled in when clicked), the
+# div#pivot-button sound pop-up (yt-page-header-view-model) and the "Next video" button
+# and ARROW_DOWN navigation, which swap in the next short without a page load, like the
+# real feed. Every response is delayed by --latency-ms, and clicked content renders
+# --render-ms later. The values of each short are deterministic (short_fields), so
+# scraped rows can be checked against them.
+
+import argparse
+import html
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHANNELS = ('dailyvibes', 'kitchenhacks', 'streetfood.id', 'gymtok', 'petclips', 'studywithme', 'carspotter', 'dancecrew')
+SOUNDS = (
+    ('original sound - dailyvibes', 'dailyvibes'), ('Espresso', 'Sabrina Carpenter'), ('APT.', 'ROSE & Bruno Mars'),
+    ('Sial', 'Mahalini'), ('Die With A Smile', 'Lady Gaga & Bruno Mars'), ('original sound - gymtok', 'gymtok'),
+)
+HASHTAGS = ('#shorts', '#fyp', '#viral', '#trending', '#foryou', '#funny', '#food', '#fitness', '#pets', '#dance')
+KEYWORDS = ('Morning routine ideas', 'Easy recipes', 'Workout at home', 'Cute animals', 'Dance challenge', 'Study tips')
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+SHORT_PATH = re.compile(r"^/(shorts|fragment)/([A-Za-z0-9_-]{11})$")
+
+def video_id(index):
+    return f"mock{index:07d}"
+
+def short_index(value):
+    return int(value[4:]) if value.startswith('mock') and value[4:].isdigit() else None
+
+def short_fields(index):
+    """The values the scraper should extract for a short of the feed."""
+    rng = random.Random(index)
+    caption_tags = rng.sample(HASHTAGS, 2)
+    description_tags = rng.sample(HASHTAGS, 2)
+    sound_index = rng.randrange(len(SOUNDS))
+    sound_name, sound_artist = SOUNDS[sound_index]
+    likes = rng.randint(10, 500_000)
+    comments = rng.randint(0, 20_000)
+    return {
+        'video_id': video_id(index),
+        'caption': f"Mock short number {index} {' '.join(caption_tags)}",
+        'hashtags_on_caption': caption_tags,
+        'hashtags_on_description': description_tags,
+        'description': f"Synthetic description of short {index}. {' '.join(description_tags)}",
+        'channel_name': f"@{rng.choice(CHANNELS)}",
+        'raw_views_count': f"{rng.randint(1_000, 9_000_000):,}",
+        'likes_count': f"like this video along with {likes:,} other people",
+        'comments_count': f"View {comments:,} comments",
+        'remix_count': "Remix",
+        'upload_date': f"{rng.choice(MONTHS)} {rng.randint(1, 28)}, 2025",
+        'extracted_keywords': rng.choice(KEYWORDS),
+        'sound_id': f"sound{sound_index:06d}",
+        'sound_name': sound_name,
+        'sound_artist': sound_artist,
+        'sound_usage': f"{rng.randint(1, 99)}.{rng.randint(0, 9)}K videos",
+    }
+
+def _links(hashtags, css_class):
+    return ' '.join(f'<a class="{css_class}" href="/hashtag/{html.escape(tag[1:])}">{html.escape(tag)}</a>' for tag in hashtags)
+
+def render_short(index):
+    """The markup of one short: reel, metapanel, description panel, and the clicked content as templates."""
+    f = short_fields(index)
+    e = html.escape
+    title = e(f['caption'].rsplit(' #', 2)[0])
+    description = e(f['description'].rsplit(' #', 2)[0])
+    month_day, year = f['upload_date'].split(', ')
+    return f"""<ytd-reel-video-renderer id="0" class="reel-video-in-sequence" is-active="" data-index="{index}">
+  <div id="player-container"><div class="html5-video-container"><video class="video-stream" muted></video></div></div>
+  <div id="overlay"><ytd-reel-player-overlay-renderer>
+    <div id="metapanel-container"><yt-reel-channel-bar-view-model><span class="yt-core-attributed-string" role="text"><a class="yt-core-attributed-string__link" href="/{e(f['channel_name'])}">{e(f['channel_name'])}</a></span></yt-reel-channel-bar-view-model></div>
+    <div id="actions"><reel-action-bar-view-model>
+      <div id="like-button"><button class="yt-spec-button-shape-next" aria-label="{e(f['likes_count'])}">Like</button></div>
+      <div id="comments-button"><button class="yt-spec-button-shape-next" aria-label="{e(f['comments_count'])}">Comments</button></div>
+      <div id="remix-button"><button class="yt-spec-button-shape-next" aria-label="{e(f['remix_count'])}">Remix</button></div>
+      <div id="pivot-button"><pivot-button-view-model><a class="yt-spec-button-shape-next" aria-label="See more videos using this sound" href="/source/{f['sound_id']}/shorts"><img class="yt-core-image" alt="Sound" width="48" height="48" src="https://i.ytimg.com/vi/{f['sound_id']}/default.jpg"></a></pivot-button-view-model></div>
+    </reel-action-bar-view-model></div>
+  </ytd-reel-player-overlay-renderer></div>
+</ytd-reel-video-renderer>
+<div id="metapanel"><yt-reel-metapanel-view-model>
+  <div><yt-shorts-video-title-view-model><h2><span class="yt-core-attributed-string" role="text">{title} {_links(f['hashtags_on_caption'], 'yt-core-attributed-string__link')}</span></h2></yt-shorts-video-title-view-model></div>
+  <div><yt-shorts-suggested-action-view-model><div class="ytShortsSuggestedActionViewModelStaticHost"><div class="ytShortsSuggestedActionViewModelStaticHostPrimaryText"><span class="yt-core-attributed-string" role="text">{e(f['extracted_keywords'])}</span></div></div></yt-shorts-suggested-action-view-model></div>
+</yt-reel-metapanel-view-model></div>
+<ytd-engagement-panel-section-list-renderer target-id="engagement-panel-structured-description"><div id="items">
+  <ytd-video-description-header-renderer><div id="factoids">
+    <factoid-renderer><div class="ytwFactoidRendererFactoid" role="text" aria-label="{e(f['likes_count'])}"><span class="ytwFactoidRendererValue"><span>Likes</span></span></div></factoid-renderer>
+    <view-count-factoid-renderer><factoid-renderer><div class="ytwFactoidRendererFactoid" role="text" aria-label="{e(f['raw_views_count'])} views"><span class="ytwFactoidRendererValue"><span class="yt-core-attributed-string" role="text">{e(f['raw_views_count'])}</span></span></div></factoid-renderer></view-count-factoid-renderer>
+    <factoid-renderer><div class="ytwFactoidRendererFactoid" role="text" aria-label="{e(f['upload_date'])}"><span class="ytwFactoidRendererValue"><span>{e(month_day)}</span></span><span class="ytwFactoidRendererLabel"><span>{year}</span></span></div></factoid-renderer>
+  </div></ytd-video-description-header-renderer>
+  <ytd-expandable-video-description-body-renderer>
+    <div id="expanded"><yt-formatted-string split-lines=""></yt-formatted-string><span class="more-button">...more</span></div>
+  </ytd-expandable-video-description-body-renderer>
+</div></ytd-engagement-panel-section-list-renderer>
+<template id="description-content">{description} {_links(f['hashtags_on_description'], 'yt-simple-endpoint')}</template>
+<template id="sound-panel"><ytd-engagement-panel-section-list-renderer target-id="engagement-panel-sound"><yt-page-header-view-model>
+  <yt-content-preview-image-view-model><img class="yt-core-image" alt="" width="96" height="96" src="https://i.ytimg.com/vi/{f['sound_id']}/hqdefault.jpg"></yt-content-preview-image-view-model>
+  <h1><yt-dynamic-text-view-model><span class="yt-core-attributed-string" role="text">{e(f['sound_name'])}</span></yt-dynamic-text-view-model></h1>
+  <yt-content-metadata-view-model><yt-avatar-stack-view-model><span class="yt-core-attributed-string" role="text">{e(f['sound_artist'])}</span></yt-avatar-stack-view-model>
+  <span id="text" class="yt-core-attributed-string" role="text">{e(f['sound_usage'])}</span></yt-content-metadata-view-model>
+</yt-page-header-view-model></ytd-engagement-panel-section-list-renderer></template>"""
+
+PAGE_SCRIPT = """
+const FEED_SIZE = %(feed_size)d;
+const RENDER_MS = %(render_ms)d;
+const root = document.getElementById('short-root');
+let navigating = false;
+const currentIndex = () => parseInt(root.querySelector('ytd-reel-video-renderer').dataset.index, 10);
+const videoId = index => 'mock' + String(index).padStart(7, '0');
+async function go(delta) {
+    if (navigating) return;
+    navigating = true;
+    const next = (currentIndex() + delta + FEED_SIZE) %% FEED_SIZE;
+    try {
+        const response = await fetch('/fragment/' + videoId(next));
+        root.innerHTML = await response.text();
+        history.pushState(null, '', '/shorts/' + videoId(next));
+    } finally {
+        navigating = false;
+    }
+}
+document.addEventListener('click', event => {
+    if (event.target.closest('div#pivot-button')) {
+        event.preventDefault();
+        setTimeout(() => {
+            if (!root.querySelector('yt-page-header-view-model')) {
+                root.appendChild(root.querySelector('#sound-panel').content.cloneNode(true));
+            }
+        }, RENDER_MS);
+    } else if (event.target.closest('div#expanded')) {
+        setTimeout(() => {
+            const body = root.querySelector('div#expanded yt-formatted-string');
+            if (!body.childNodes.length) body.appendChild(root.querySelector('#description-content').content.cloneNode(true));
+            root.querySelector('div#expanded .more-button').remove();
+        }, RENDER_MS);
+    } else if (event.target.closest('#navigation-button-down button')) {
+        go(1);
+    } else if (event.target.closest('#navigation-button-up button')) {
+        go(-1);
+    }
+}, true);
+document.addEventListener('keydown', event => {
+    if (event.key === 'ArrowDown') go(1);
+    if (event.key === 'ArrowUp') go(-1);
+});
+"""
+
+def render_page(index, feed_size, render_ms):
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Mock Shorts - {video_id(index)}</title></head>
+<body><ytd-app><ytd-shorts page-subtype="shorts">
+<div id="short-root">{render_short(index)}</div>
+<div id="navigation-button-up"><button class="yt-spec-button-shape-next" aria-label="Previous video">Up</button></div>
+<div id="navigation-button-down"><button class="yt-spec-button-shape-next" aria-label="Next video">Down</button></div>
+</ytd-shorts></ytd-app>
+<script>{PAGE_SCRIPT % {'feed_size': feed_size, 'render_ms': render_ms}}</script>
+</body></html>"""
+
+class MockShortsSite(ThreadingHTTPServer):
+    """
+    The mock feed on 127.0.0.1 (port 0 picks a free one; see .url). /shorts redirects
+    to a random short of the feed, so concurrent browsers start at different places.
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, feed_size=1000, latency_ms=0, render_ms=100, seed=None):
+        super().__init__(('127.0.0.1', port), MockShortsHandler)
+        self.feed_size = feed_size
+        self.latency_ms = latency_ms
+        self.render_ms = render_ms
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='mock-shorts-site', daemon=True).start()
+        return self
+
+    def random_index(self):
+        with self._lock:
+            self.requests += 1
+            return self._rng.randrange(self.feed_size)
+
+class MockShortsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        site = self.server
+        path = self.path.split('?', 1)[0]
+        if site.latency_ms:
+            time.sleep(site.latency_ms / 1000)
+        if path in ('/shorts', '/shorts/', '/'):
+            return self._reply(302, b'', headers={'Location': f"/shorts/{video_id(site.random_index())}"})
+        match = SHORT_PATH.match(path)
+        index = short_index(match.group(2)) if match else None
+        if index is None or index >= site.feed_size:
+            return self._reply(404, b'Not found', 'text/plain')
+        if match.group(1) == 'fragment':
+            body = render_short(index)
+        else:
+            body = render_page(index, site.feed_size, site.render_ms)
+        self._reply(200, body.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def _reply(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic YouTube Shorts feed on localhost.")
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--feed-size', type=int, default=1000, help="Shorts in the feed (navigation wraps around).")
+    parser.add_argument('--latency-ms', type=int, default=0, help="Delay of every response.")
+    parser.add_argument('--render-ms', type=int, default=100, help="Delay before clicked content (description, sound pop-up) appears.")
+    args = parser.parse_args()
+    site = MockShortsSite(args.port, args.feed_size, args.latency_ms, args.render_ms)
+    print(f"Mock Shorts feed of {args.feed_size} shorts on {site.url}/shorts (Ctrl-C to stop).")
+    try:
+        site.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/network_capture_check.py
+# End-to-end check of the 'network' extraction mode with no internet access.
+#
+# Usage:
+#   python benchmarks/network_capture_check.py            # replay synthetic DevTools events (no browser)
+#   python benchmarks/network_capture_check.py --chrome   # local stand-in server + headless Chrome
+#
+# With --chrome, a local HTTP server serves a page that fetches the canned reel watch
+# sequence from benchmarks/network_fixtures/ the way the Shorts feed does, and a headless
+# Chrome with performance logging loads it. Exits with status 1 if the captured shorts
+# differ from expected.json.
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from harness import BENCHMARKS_DIR
+from network_capture import DEFAULT_URL_PATTERNS, NetworkCapture, enable_performance_logging
+
+NETWORK_FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, 'network_fixtures')
+SEQUENCE_PATH = '/youtubei/v1/reel/reel_watch_sequence'
+
+STAND_IN_PAGE = f"""<!DOCTYPE html>
+<html><body><ytd-reel-video-renderer></ytd-reel-video-renderer>
+<script>
+fetch('{SEQUENCE_PATH}?prettyPrint=false', {{method: 'POST', body: '{{}}'}})
+    .then(r => r.json()).then(() => {{ document.title = 'loaded'; }});
+</script></body></html>
+"""
+
+def load_network_fixture():
+    with open(os.path.join(NETWORK_FIXTURES_DIR, 'reel_watch_sequence.json'), encoding='utf-8') as f:
+        body = f.read()
+    with open(os.path.join(NETWORK_FIXTURES_DIR, 'expected.json'), encoding='utf-8') as f:
+        expected = json.load(f)['video_ids']
+    return body, expected
+
+
+class ReplayDriver:
+    """Driver stand-in that replays the DevTools events of one finished sequence request."""
+    def __init__(self, url, body):
+        self._body = body
+        events = [
+            {'method': 'Network.responseReceived', 'params': {'requestId': '1000.1', 'response': {'url': url, 'status': 200}}},
+            {'method': 'Network.dataReceived', 'params': {'requestId': '1000.1', 'dataLength': len(body)}},
+            {'method': 'Network.loadingFinished', 'params': {'requestId': '1000.1'}},
+            {'method': 'Network.responseReceived', 'params': {'requestId': '1000.2', 'response': {'url': 'https://www.youtube.com/s/player/base.js'}}},
+            {'method': 'Network.loadingFinished', 'params': {'requestId': '1000.2'}},
+        ]
+        self._log = [{'level': 'INFO', 'message': json.dumps({'message': event, 'webview': 'X'})} for event in events]
+
+    def get_log(self, log_type):
+        log, self._log = self._log, []
+        return log
+
+    def execute_cdp_cmd(self, command, params):
+        return {'body': self._body, 'base64Encoded': False}
+
+def run_replay(body):
+    capture = NetworkCapture(ReplayDriver(f"https://www.youtube.com{SEQUENCE_PATH}?prettyPrint=false", body), DEFAULT_URL_PATTERNS)
+    return capture.drain_videos()
+
+def run_chrome(body, timeout):
+    from selenium import webdriver
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, content, content_type):
+            data = content.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._send(STAND_IN_PAGE, 'text/html; charset=utf-8')
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._send(body, 'application/json; charset=utf-8')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    enable_performance_logging(options)
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.get(f"http://127.0.0.1:{server.server_address[1]}/shorts/dQw4w9WgXcQ")
+        capture = NetworkCapture(driver, DEFAULT_URL_PATTERNS)
+        videos = {}
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not videos:
+            videos.update(capture.drain_videos())
+            time.sleep(0.2)
+        return videos
+    finally:
+        driver.quit()
+        server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the DevTools network capture mode offline.")
+    parser.add_argument('--chrome', action='store_true', help="Use a local stand-in server and headless Chrome.")
+    parser.add_argument('--timeout', type=float, default=15.0, help="Seconds to wait for the captured response.")
+    args = parser.parse_args()
+
+    body, expected = load_network_fixture()
+    started = time.perf_counter()
+    videos = run_chrome(body, args.timeout) if args.chrome else run_replay(body)
+    elapsed = time.perf_counter() - started
+
+    if list(videos) != expected:
+        print(f"FAIL captured {list(videos)}, expected {expected}")
+        return 1
+    print(f"OK: {len(videos)} shorts captured from one feed response in {elapsed * 1000:.1f} ms.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# benchmarks/parquet_dataset_check.py
+# Checks the partitioned Parquet dataset written for FORMAT_EXT = 'parquet'.
+#
+# Usage:
+#   python benchmarks/parquet_dataset_check.py [--keep DIR]
+#
+# Writes a few synthetic scans through ParquetDatasetSink into a temporary dataset (or
+# --keep DIR, left in place for inspection) and verifies the partition layout by scan
+# date and account, hashtags stored as list columns, dictionary encoding of the channel
+# and sound names, that compaction keeps one row per video_id (the latest
+# timestamp_scan) and that query() reads only the partitions and columns it needs.
+# Exits with status 1 on any failure; skips (status 0) when pyarrow is not installed.
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import harness  # Puts the repository on sys.path
+from config import CSV_HEADERS
+
+failures = []
+
+def check(condition, message):
+    print(f"  {'ok' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+def make_row(scanned_at, account_id, vid, channel, sound, hashtags=(), views='1.2K views'):
+    row = {header: 'NaN' for header in CSV_HEADERS}
+    row.update(timestamp_scan=scanned_at.isoformat(), dummy_account_id=account_id, video_id=vid,
+               caption=f"caption of {vid} {' '.join(hashtags)}", hashtags_on_caption=list(hashtags),
+               hashtags_on_description=[], channel_name=channel, raw_views_count=views, sound_name=sound,
+               sound_artist=channel, extraction_status={'caption': 'ok'}, missing_fields=['likes_count'])
+    return row
+
+def write_scan(root, rows):
+    from parquet_dataset import ParquetDatasetSink
+    sink = ParquetDatasetSink(root)
+    sink.open()
+    sink.write_rows(rows)
+    sink.close()
+
+def partition_dirs(root):
+    return sorted(os.path.relpath(os.path.dirname(path), root)
+                  for path in glob.glob(os.path.join(root, '*', '*', '*.parquet')))
+
+def run_checks(root):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from parquet_dataset import _open_dataset, compact, query
+
+    today = datetime.now().replace(microsecond=0)
+    old = (today - timedelta(days=30)).replace(hour=10, minute=0, second=0)
+    recent = (today - timedelta(days=2)).replace(hour=10, minute=0, second=0)
+    write_scan(root, [
+        make_row(old, '1', 'v1', 'Daily Vibes', 'original sound - dailyvibes', ('#dance', '#fyp')),
+        make_row(old, '1', 'v2', 'Cooking Corner', 'lofi beat', ('#food',)),
+        make_row(old, '2', 'v3', 'Daily Vibes', 'original sound - dailyvibes'),
+    ])
+    write_scan(root, [
+        make_row(recent, '1', 'v1', 'Daily Vibes', 'original sound - dailyvibes', ('#dance', '#fyp'), '2.5K views'),
+        make_row(recent, '1', 'v3', 'Daily Vibes', 'original sound - dailyvibes', (), '800 views'),
+        make_row(recent, '2', 'v4', 'Cooking Corner', 'lofi beat', ('#food', '#recipe')),
+    ])
+    # v4 scanned again later the same day: two copies in one partition
+    later = recent + timedelta(hours=2)
+    write_scan(root, [make_row(later, '2', 'v4', 'Cooking Corner', 'lofi beat', ('#food', '#recipe'), '9K views')])
+
+    print("Layout")
+    expected = sorted({f"scan_date={day:%Y-%m-%d}{os.sep}account={account}"
+                       for day, account in ((old, '1'), (old, '2'), (recent, '1'), (recent, '2'))})
+    check(sorted(set(partition_dirs(root))) == expected, "files are partitioned as scan_date=YYYY-MM-DD/account=<id>")
+    path = sorted(glob.glob(os.path.join(root, f"scan_date={old:%Y-%m-%d}", 'account=1', '*.parquet')))[0]
+    schema = pq.read_schema(path)
+    check(all(name not in schema.names for name in ('scan_date', 'account')),
+          "partition columns live in the paths, not in the files")
+    check(schema.field('hashtags_on_caption').type == pa.list_(pa.string())
+          and schema.field('missing_fields').type == pa.list_(pa.string()),
+          "hashtags and missing_fields are list<string> columns")
+    hashtags = pq.read_table(path, columns=['video_id', 'hashtags_on_caption']).to_pydict()
+    check(dict(zip(hashtags['video_id'], hashtags['hashtags_on_caption'])) == {'v1': ['#dance', '#fyp'], 'v2': ['#food']},
+          "hashtag lists are stored as lists, not as their string repr")
+    metadata = pq.ParquetFile(path).metadata
+    column_encodings = {metadata.row_group(0).column(i).path_in_schema: metadata.row_group(0).column(i).encodings
+                        for i in range(metadata.num_columns)}
+    for column in ('channel_name', 'sound_name'):
+        check(pa.types.is_dictionary(schema.field(column).type)
+              and any('DICTIONARY' in encoding for encoding in column_encodings[column]),
+              f"{column} is dictionary encoded")
+
+    print("Compaction")
+    rows_before, rows_after, files_before, files_after = compact(root)
+    check((rows_before, rows_after) == (7, 4), f"compaction keeps one row per video_id ({rows_before} -> {rows_after} rows)")
+    table = _open_dataset(root).to_table(columns=['video_id', 'timestamp_scan', 'raw_views_count', 'scan_date']).to_pandas()
+    latest = {row.video_id: (row.timestamp_scan.to_pydatetime(), row.raw_views_count) for row in table.itertuples()}
+    check(latest == {'v1': (recent, '2.5K views'), 'v2': (old, '1.2K views'), 'v3': (recent, '800 views'), 'v4': (later, '9K views')},
+          "the row with the latest timestamp_scan wins, across and within partitions")
+    check(files_after == len(set(partition_dirs(root))) == 3,
+          f"one file per remaining partition ({files_before} -> {files_after} files)")
+    check(not os.path.exists(os.path.join(root, f"scan_date={old:%Y-%m-%d}", 'account=2')),
+          "partitions emptied by compaction are removed")
+    check(compact(root)[:2] == (4, 4), "compacting again changes nothing")
+
+    print("Queries")
+    # An unreadable file in an old partition: a query that opens it fails
+    with open(os.path.join(root, f"scan_date={old:%Y-%m-%d}", 'account=1', 'part-broken.parquet'), 'wb') as f:
+        f.write(b'not a parquet file')
+    since = today - timedelta(days=7)
+    dataset = _open_dataset(root)
+    fragments = list(dataset.get_fragments(filter=ds.field('scan_date') >= since.strftime('%Y-%m-%d')))
+    check(len(fragments) == 2 and not any(f"{old:%Y-%m-%d}" in fragment.path for fragment in fragments),
+          "a date filter only selects the files of recent partitions")
+    try:
+        frame = query(root, ['video_id', 'raw_views_count'], since=since)
+        check(sorted(frame['video_id']) == ['v1', 'v3', 'v4'], "query(since=...) returns the recent rows without opening old partitions")
+        check(list(frame.columns) == ['video_id', 'raw_views_count'], "query reads only the requested columns")
+        frame = query(root, ['video_id'], account='2', since=since)
+        check(list(frame['video_id']) == ['v4'], "query(account=...) prunes the other accounts")
+        frame = query(root, ['video_id'], sound_name='original sound - dailyvibes', since=since)
+        check(sorted(frame['video_id']) == ['v1', 'v3'] and list(frame.columns) == ['video_id'],
+              "filtering on a column it does not return keeps it out of the result")
+    except Exception as exc:
+        check(False, f"query opened a pruned partition: {exc}")
+    try:
+        query(root, ['video_id'])
+        check(False, "a query over every partition reads the broken file")
+    except Exception:
+        check(True, "a query over every partition reads the broken file (the pruning above is real)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the partitioned Parquet dataset.")
+    parser.add_argument('--keep', help="Write the dataset here and leave it in place.")
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("Skipped: the Parquet dataset needs the 'pyarrow' package (pip install pyarrow).")
+        return 0
+    root = args.keep or tempfile.mkdtemp(prefix='lhana_parquet_')
+    try:
+        run_checks(root)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# benchmarks/record_fixtures.py
+# Records a live Shorts page as a fixture case for bench_extract.py.
+#
+# Usage:
+#   python benchmarks/record_fixtures.py <case_name> [--url https://www.youtube.com/shorts/<id>] [--profile PATH]
+#
+# Saves the page source at each state the scraper reaches (initial, description
+# expanded, sound pop-up open) and writes expected.json from the current extractor
+# output. Review expected.json by hand before committing the case.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from selenium.webdriver.common.by import By
+
+from harness import FIXTURES_DIR, PAGE_STATES, load_scraper
+from extractor import ExtractionEngine, parse_sound_id
+
+# Element clicked to reach each page state after the initial one.
+STATE_CLICKS = {
+    'description': "div#expanded",
+    'sound': "div#pivot-button",
+}
+
+def record_case(driver, case_dir, settle_seconds):
+    """Saves one HTML file per page state, then the extractor's current view of the short."""
+    os.makedirs(case_dir, exist_ok=True)
+    engine = ExtractionEngine('lxml')
+    fields = {}
+    for state in PAGE_STATES:
+        if state in STATE_CLICKS:
+            driver.find_element(By.CSS_SELECTOR, STATE_CLICKS[state]).click()
+            time.sleep(settle_seconds)
+        with open(os.path.join(case_dir, f'{state}.html'), 'w', encoding='utf-8') as f:
+            f.write(driver.page_source)
+        group = {'initial': 'core', 'description': 'description', 'sound': 'sound'}[state]
+        extraction = engine.extract(driver, group)
+        fields.update(extraction.fields)
+        url = extraction.url
+
+    video_id = url.split("/shorts/")[1].split("?")[0] if "/shorts/" in url else None
+    fields['video_id'] = video_id
+    fields['video_url_full'] = f"https://www.youtube.com/shorts/{video_id}"
+    fields['sound_id'] = parse_sound_id(fields.pop('sound_image_src')) or "NaN"
+    with open(os.path.join(case_dir, 'expected.json'), 'w', encoding='utf-8') as f:
+        json.dump({'url': f"https://www.youtube.com/shorts/{video_id}", 'fields': fields}, f, indent=4, ensure_ascii=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a live Shorts page as an extraction fixture.")
+    parser.add_argument('case_name', help="Directory name of the new case under benchmarks/fixtures.")
+    parser.add_argument('--url', default="https://www.youtube.com/shorts", help="Shorts URL to record.")
+    parser.add_argument('--profile', help="Chrome profile path to use.")
+    parser.add_argument('--settle', type=float, default=3.0, help="Seconds to wait after each click.")
+    args = parser.parse_args()
+
+    scraper = load_scraper()
+    scraper.calculate_window_layout()
+    driver = scraper.init_undetected_driver(profile_path=args.profile, headless=False, position_index=0)
+    try:
+        driver.get(args.url)
+        time.sleep(args.settle * 2)
+        case_dir = os.path.join(FIXTURES_DIR, args.case_name)
+        record_case(driver, case_dir, args.settle)
+        print(f"Recorded fixture case to {case_dir}. Review expected.json before committing.")
+    finally:
+        driver.quit()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
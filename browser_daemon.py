@@ -0,0 +1,319 @@
+# browser_daemon.py
+#
+# Long-lived daemon keeping one warm browser per dummy account, so scrape jobs skip
+# the Chrome start, profile load, VPN activation and feed settle of a cold run.
+#
+# Start the daemon:   python youtube-shorts-scraper.py --daemon
+# Submit jobs:        python browser_daemon.py submit --account dummy_1 --shorts 10
+#                     python browser_daemon.py status | recycle --account dummy_1 | stop
+
+import argparse
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Chrome-only: JS heap of the page in bytes, used to recycle browsers that keep growing.
+HEAP_SCRIPT = "return (window.performance && performance.memory) ? performance.memory.usedJSHeapSize : null;"
+
+class WarmBrowser:
+    """One dummy account's browser, kept on the Shorts feed between jobs."""
+    def __init__(self, account_info, position_index):
+        self.account_info = dict(account_info, position_index=position_index)
+        self.account_id = account_info['id']
+        self.driver = None
+        self.session = None
+        self.state = 'stopped'  # stopped, launching, idle, busy, failed
+        self.shorts_served = 0
+        self.jobs_served = 0
+        self.launches = 0
+        self.launch_seconds = None
+        self.launched_at = None
+        self.last_error = None
+        self.lock = threading.Lock()  # held while a job or a relaunch uses the browser
+
+    def heap_mb(self):
+        try:
+            heap = self.driver.execute_script(HEAP_SCRIPT)
+        except Exception:
+            return None
+        return heap / (1024 * 1024) if heap else None
+
+    def is_healthy(self):
+        """True if the browser still answers WebDriver commands."""
+        if self.driver is None:
+            return False
+        try:
+            return self.driver.execute_script("return document.readyState;") in ('interactive', 'complete')
+        except Exception:
+            return False
+
+    def status(self):
+        return {
+            'account': self.account_id,
+            'state': self.state,
+            'shorts_served': self.shorts_served,
+            'jobs_served': self.jobs_served,
+            'launches': self.launches,
+            'launch_sec': round(self.launch_seconds, 2) if self.launch_seconds is not None else None,
+            'uptime_sec': round(time.monotonic() - self.launched_at, 1) if self.launched_at else None,
+            'last_error': self.last_error,
+        }
+
+
+class BrowserDaemon:
+    """
+    Keeps a warm, health-checked browser per account and runs scrape jobs on them.
+    launch(account_info) returns a driver already settled on the Shorts feed,
+    new_session(driver) the per-browser scraping state, and
+    run_job(driver, account_id, session, shorts) scrapes and returns
+    (rows, seconds until the first row or None).
+    A browser is relaunched after recycle_after_shorts shorts, when its page heap
+    exceeds recycle_heap_mb, or when a health check fails.
+    """
+    def __init__(self, accounts, launch, new_session, run_job, recycle_after_shorts=200,
+                 recycle_heap_mb=None, health_check_interval=60):
+        self.launch = launch
+        self.new_session = new_session
+        self.run_job = run_job
+        self.recycle_after_shorts = recycle_after_shorts
+        self.recycle_heap_mb = recycle_heap_mb
+        self.health_check_interval = health_check_interval
+        self.browsers = {account['id']: WarmBrowser(account, i) for i, account in enumerate(accounts)}
+        self._stopping = threading.Event()
+        self._health_thread = threading.Thread(target=self._health_loop, name='daemon-health', daemon=True)
+
+    def _quit(self, browser):
+        if browser.driver is not None:
+            try:
+                browser.driver.quit()
+            except Exception:
+                pass
+        browser.driver = None
+        browser.session = None
+        browser.state = 'stopped'
+
+    def _relaunch(self, browser, reason):
+        """Replaces the browser's driver. Must be called with browser.lock held."""
+        if browser.driver is not None:
+            print(f"Browser daemon: Recycling {browser.account_id} ({reason}).")
+        self._quit(browser)
+        browser.state = 'launching'
+        started = time.monotonic()
+        try:
+            browser.driver = self.launch(browser.account_info)
+            browser.session = self.new_session(browser.driver)
+        except Exception as e:
+            browser.last_error = str(e)
+            print(f"Browser daemon: Could not launch {browser.account_id}: {e}")
+            traceback.print_exc()
+            self._quit(browser)
+            browser.state = 'failed'
+            return False
+        browser.launch_seconds = time.monotonic() - started
+        browser.launched_at = time.monotonic()
+        browser.launches += 1
+        browser.shorts_served = 0
+        browser.state = 'idle'
+        print(f"Browser daemon: {browser.account_id} warm after {browser.launch_seconds:.1f}s.")
+        return True
+
+    def _recycle_reason(self, browser):
+        if self.recycle_after_shorts and browser.shorts_served >= self.recycle_after_shorts:
+            return f"served {browser.shorts_served} shorts"
+        if self.recycle_heap_mb:
+            heap = browser.heap_mb()
+            if heap is not None and heap >= self.recycle_heap_mb:
+                return f"page heap at {heap:.0f} MB"
+        return None
+
+    def start(self):
+        """Launches every browser (in parallel) and starts the health checks."""
+        threads = []
+        for browser in self.browsers.values():
+            def warm(browser=browser):
+                with browser.lock:
+                    self._relaunch(browser, 'start')
+            thread = threading.Thread(target=warm, name=f'daemon-launch-{browser.account_id}', daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        self._health_thread.start()
+        return self
+
+    def _health_loop(self):
+        while not self._stopping.wait(self.health_check_interval):
+            for browser in self.browsers.values():
+                # Busy browsers are checked before their next job instead.
+                if self._stopping.is_set() or not browser.lock.acquire(blocking=False):
+                    continue
+                try:
+                    if not browser.is_healthy():
+                        self._relaunch(browser, 'failed health check')
+                    else:
+                        reason = self._recycle_reason(browser)
+                        if reason:
+                            self._relaunch(browser, reason)
+                finally:
+                    browser.lock.release()
+
+    def _pick_browser(self, account_id):
+        if account_id is not None:
+            if account_id not in self.browsers:
+                raise KeyError(f"Unknown account '{account_id}'")
+            return self.browsers[account_id]
+        # Any account: prefer an idle warm browser, otherwise wait for the first one.
+        for browser in self.browsers.values():
+            if browser.state == 'idle' and not browser.lock.locked():
+                return browser
+        return next(iter(self.browsers.values()))
+
+    def submit(self, shorts, account_id=None):
+        """Runs one scrape job and returns its result dict. Blocks until it is done."""
+        browser = self._pick_browser(account_id)
+        queued = time.monotonic()
+        with browser.lock:
+            if self._stopping.is_set():
+                return {'ok': False, 'error': 'daemon is stopping'}
+            cold = False
+            if not browser.is_healthy():
+                cold = True
+                if not self._relaunch(browser, 'not healthy'):
+                    return {'ok': False, 'account': browser.account_id, 'error': browser.last_error}
+            browser.state = 'busy'
+            started = time.monotonic()
+            try:
+                rows, first_row_seconds = self.run_job(browser.driver, browser.account_id, browser.session, shorts)
+            except Exception as e:
+                browser.last_error = str(e)
+                print(f"Browser daemon: Job on {browser.account_id} failed: {e}")
+                traceback.print_exc()
+                self._relaunch(browser, 'job failed')
+                return {'ok': False, 'account': browser.account_id, 'error': str(e)}
+            elapsed = time.monotonic() - started
+            browser.shorts_served += rows
+            browser.jobs_served += 1
+            browser.state = 'idle'
+            reason = self._recycle_reason(browser)
+            if reason:
+                self._relaunch(browser, reason)
+        return {
+            'ok': True,
+            'account': browser.account_id,
+            'rows': rows,
+            'cold_start': cold,
+            'wait_sec': round(started - queued, 3),
+            'first_row_sec': round(first_row_seconds, 3) if first_row_seconds is not None else None,
+            'elapsed_sec': round(elapsed, 3),
+        }
+
+    def recycle(self, account_id):
+        browser = self._pick_browser(account_id)
+        with browser.lock:
+            ok = self._relaunch(browser, 'requested')
+        return {'ok': ok, 'account': browser.account_id}
+
+    def status(self):
+        return {'ok': True, 'browsers': [browser.status() for browser in self.browsers.values()]}
+
+    def stop(self):
+        """Stops the health checks and closes every browser once its current job is done."""
+        self._stopping.set()
+        for browser in self.browsers.values():
+            with browser.lock:
+                self._quit(browser)
+
+
+# --- Local Socket Server ---
+class _CommandHandler(socketserver.StreamRequestHandler):
+    """One JSON command per line, answered with one JSON line."""
+    def handle(self):
+        for line in self.rfile:
+            try:
+                command = json.loads(line)
+                response = self.server.dispatch(command)
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            if response.get('stopping'):
+                break
+
+
+class DaemonServer(socketserver.ThreadingTCPServer):
+    """Serves 'submit', 'status', 'recycle' and 'stop' commands on a local TCP port."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, daemon, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        super().__init__((host, port), _CommandHandler)
+        self.browser_daemon = daemon
+
+    def dispatch(self, command):
+        cmd = command.get('cmd')
+        if cmd == 'submit':
+            return self.browser_daemon.submit(int(command.get('shorts', 10)), command.get('account'))
+        if cmd == 'status':
+            return self.browser_daemon.status()
+        if cmd == 'recycle':
+            return self.browser_daemon.recycle(command.get('account'))
+        if cmd == 'stop':
+            # shutdown() waits for serve_forever, so it cannot run on this handler's thread.
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True, 'stopping': True}
+        return {'ok': False, 'error': f"Unknown command '{cmd}'"}
+
+def serve(daemon, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Warms up the browsers and serves commands until 'stop' or Ctrl-C."""
+    daemon.start()
+    server = DaemonServer(daemon, host, port)
+    print(f"Browser daemon: Listening on {host}:{port} with {len(daemon.browsers)} warm browsers.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nBrowser daemon: Interrupted.")
+    finally:
+        server.server_close()
+        daemon.stop()
+        print("Browser daemon: All browsers closed.")
+
+def send_command(command, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=None):
+    """Sends one command to a running daemon and returns its decoded response."""
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall(json.dumps(command).encode('utf-8') + b'\n')
+        with conn.makefile('rb') as f:
+            return json.loads(f.readline())
+
+def main():
+    parser = argparse.ArgumentParser(description="Send commands to a running browser daemon (start it with youtube-shorts-scraper.py --daemon).")
+    parser.add_argument('command', choices=('submit', 'status', 'recycle', 'stop'))
+    parser.add_argument('--account', help="Dummy account ID (submit: any idle account if omitted).")
+    parser.add_argument('--shorts', type=int, default=10, help="Shorts to scrape for 'submit'.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    command = {'cmd': args.command}
+    if args.account:
+        command['account'] = args.account
+    if args.command == 'submit':
+        command['shorts'] = args.shorts
+    started = time.perf_counter()
+    try:
+        response = send_command(command, args.host, args.port)
+    except OSError as e:
+        print(f"Could not reach the browser daemon on {args.host}:{args.port}: {e}")
+        return 1
+    response['round_trip_sec'] = round(time.perf_counter() - started, 3)
+    print(json.dumps(response, indent=2))
+    return 0 if response.get('ok') else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,411 @@
+# capture_archive.py
+# Append-only archive of the captured DOM subtrees of each short, re-extracted offline.
+#
+# Usage:
+#   python capture_archive.py stats
+#   python capture_archive.py extract                                  # whole archive, all cores
+#   python capture_archive.py extract --since 2025-03-01 --output backfill.csv --workers 8
+#   python capture_archive.py show <video_id> --group core             # the latest capture's HTML
+#
+# With ENABLE_CAPTURE_ARCHIVE, the account threads only capture the subtrees the
+# selector table reads (see extractor.py) and append them here, one compressed frame
+# per short, instead of parsing them. `extract` parses the archive in a process pool
+# into the normal output format, so a fixed or new selector can be backfilled over
+# every capture without opening a browser.
+#
+# Layout: <dir>/captures.bin holds the frames, <dir>/index.sqlite3 the offset of each
+# frame with its video ID, account and scan time. Only one process (the scraper)
+# appends at a time; readers can extract while it runs.
+
+import argparse
+import collections
+import json
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from config import CSV_HEADERS
+from extractor import ExtractionEngine, missing_columns, parse_sound_id
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, only needed for CAPTURE_ARCHIVE_COMPRESSION = 'zstd'
+    zstandard = None
+
+DATA_FILE = 'captures.bin'
+INDEX_FILE = 'index.sqlite3'
+
+# Frame: magic, codec, payload length, CRC32 of the payload, then the compressed JSON record.
+FRAME_HEADER = struct.Struct('<4sBII')
+FRAME_MAGIC = b'LCAP'
+CODECS = {'zlib': 1, 'zstd': 2}
+
+# Live row fields kept in the archive; everything else is re-extracted from the subtrees.
+RECORD_FIELDS = ('timestamp_scan', 'dummy_account_id', 'video_id', 'video_url_full', 'watch_duration_sec', 'extraction_status')
+
+SOUND_DEFAULTS = {'sound_id': "NaN", 'sound_name': "NaN", 'sound_artist': "NaN", 'sound_usage': "NaN"}
+
+class ArchiveError(Exception):
+    """A frame could not be read back (torn write, wrong offset or corrupted bytes)."""
+
+def encode_frame(record, compression='zlib'):
+    """Serializes and compresses one capture record into a frame."""
+    payload = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("CAPTURE_ARCHIVE_COMPRESSION = 'zstd' requires the 'zstandard' package (pip install zstandard).")
+        payload = zstandard.ZstdCompressor(level=9).compress(payload)
+    elif compression == 'zlib':
+        payload = zlib.compress(payload, 6)
+    else:
+        raise ValueError(f"Unknown archive compression '{compression}'. Options: {', '.join(CODECS)}")
+    return FRAME_HEADER.pack(FRAME_MAGIC, CODECS[compression], len(payload), zlib.crc32(payload)) + payload
+
+def decode_frame(header, payload):
+    """Returns the record of a frame, checking its header and checksum."""
+    magic, codec, length, crc = FRAME_HEADER.unpack(header)
+    if magic != FRAME_MAGIC or length != len(payload) or zlib.crc32(payload) != crc:
+        raise ArchiveError("Bad frame header or checksum.")
+    if codec == CODECS['zstd']:
+        if zstandard is None:
+            raise ImportError("This archive holds zstd frames; install the 'zstandard' package (pip install zstandard).")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec == CODECS['zlib']:
+        payload = zlib.decompress(payload)
+    else:
+        raise ArchiveError(f"Unknown frame codec {codec}.")
+    return json.loads(payload)
+
+def read_frame(f, offset):
+    """Reads the frame starting at offset from an open archive file and returns its record."""
+    f.seek(offset)
+    header = f.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        raise ArchiveError(f"Truncated frame at offset {offset}.")
+    payload = f.read(FRAME_HEADER.unpack(header)[2])
+    return decode_frame(header, payload)
+
+class CaptureArchive:
+    """
+    Writer and reader of a capture archive, with the same put/put_many interface as the
+    output writer so account threads can hand it their rows. Each row must carry the
+    'subtrees' captured for it ({group: {subtree_key: outerHTML}}, see
+    ExtractionEngine.take_captured). Frames are compressed on the calling thread and
+    appended under a lock, then indexed. on_records_written(rows) is called after each
+    append, e.g. to journal progress.
+
+    Opening the archive writable first indexes frames written after the last indexed
+    one (a crash between the append and the index insert) and cuts off a torn tail, so
+    a lost index is rebuilt from the data file the same way.
+    """
+    def __init__(self, directory, compression='zlib', writable=True, on_records_written=None):
+        self.directory = directory
+        self.compression = compression
+        self.on_records_written = on_records_written
+        self.data_path = os.path.join(directory, DATA_FILE)
+        self.captures_written = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+        self._file = None
+        if writable:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS captures ("
+            " capture_id INTEGER PRIMARY KEY,"
+            " video_id TEXT,"
+            " dummy_account_id TEXT,"
+            " scan_ts TEXT,"
+            " offset INTEGER NOT NULL,"
+            " length INTEGER NOT NULL"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS captures_video ON captures (video_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS captures_scan_ts ON captures (scan_ts)")
+        if writable:
+            self._file = open(self.data_path, 'ab')
+            self._recover_tail()
+
+    def _index_entry(self, record, offset, length):
+        return (record.get('video_id'), record.get('dummy_account_id'), record.get('timestamp_scan'), offset, length)
+
+    def _recover_tail(self):
+        last = self._conn.execute("SELECT offset, length FROM captures ORDER BY offset DESC LIMIT 1").fetchone()
+        indexed_end = last[0] + last[1] if last else 0
+        size = os.path.getsize(self.data_path)
+        if size == indexed_end:
+            return
+        entries = []
+        offset = indexed_end
+        with open(self.data_path, 'rb') as f:
+            while offset < size:
+                try:
+                    record = read_frame(f, offset)
+                except (ArchiveError, ValueError, zlib.error, struct.error):
+                    break
+                length = f.tell() - offset
+                entries.append(self._index_entry(record, offset, length))
+                offset += length
+        self._conn.executemany(
+            "INSERT INTO captures (video_id, dummy_account_id, scan_ts, offset, length) VALUES (?, ?, ?, ?, ?)", entries,
+        )
+        if offset < size:
+            print(f"Capture archive: Dropping {size - offset} bytes of a torn write at the end of {self.data_path}.")
+            self._file.truncate(offset)
+        if entries:
+            print(f"Capture archive: Indexed {len(entries)} captures missing from the index.")
+        self._file.seek(0, os.SEEK_END)
+
+    def put(self, row):
+        self.put_many([row])
+
+    def put_many(self, rows):
+        """Archives the capture of each row."""
+        if not rows:
+            return
+        records = [dict({field: row.get(field) for field in RECORD_FIELDS}, subtrees=row.get('subtrees') or {}) for row in rows]
+        frames = [encode_frame(record, self.compression) for record in records]
+        with self._lock:
+            offset = self._file.tell()
+            entries = []
+            for record, frame in zip(records, frames):
+                entries.append(self._index_entry(record, offset, len(frame)))
+                offset += len(frame)
+            self._file.write(b''.join(frames))
+            self._file.flush()  # Readers only see frames that are on disk and indexed
+            self._conn.executemany(
+                "INSERT INTO captures (video_id, dummy_account_id, scan_ts, offset, length) VALUES (?, ?, ?, ?, ?)", entries,
+            )
+            self.captures_written += len(frames)
+            self.bytes_written += sum(len(frame) for frame in frames)
+        if self.on_records_written is not None:
+            self.on_records_written(records)
+
+    def entries(self, since=None, video_ids=None):
+        """Returns the frame offsets of the captures (in the order they were taken), optionally filtered."""
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("scan_ts >= ?")
+            params.append(since)
+        if video_ids:
+            conditions.append(f"video_id IN ({', '.join('?' * len(video_ids))})")
+            params.extend(video_ids)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(f"SELECT offset FROM captures{where} ORDER BY capture_id", params)]
+
+    def latest(self, video_id):
+        """Returns the most recent capture record of a video, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT offset FROM captures WHERE video_id = ? ORDER BY capture_id DESC LIMIT 1", (video_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        with open(self.data_path, 'rb') as f:
+            return read_frame(f, row[0])
+
+    def stats(self):
+        with self._lock:
+            captures, videos, stored_bytes, first_scan, last_scan = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT video_id), COALESCE(SUM(length), 0), MIN(scan_ts), MAX(scan_ts) FROM captures"
+            ).fetchone()
+        return {
+            'captures': captures,
+            'videos': videos,
+            'bytes': stored_bytes,
+            'bytes_per_capture': stored_bytes / captures if captures else 0.0,
+            'first_scan': first_scan,
+            'last_scan': last_scan,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._conn.close()
+
+# --- Offline Re-extraction ---
+def row_from_capture(record, engine):
+    """
+    Rebuilds the output row of an archived short from its subtrees, the way
+    extract_shorts_data builds it from the live page: the stage statuses recorded at
+    capture time decide which groups count, and fields that do not match are listed in
+    missing_fields with their defaults.
+    """
+    subtrees = record.get('subtrees') or {}
+    statuses = dict(record.get('extraction_status') or {})
+    missing_fields = set()
+
+    core, _, core_missing = engine.parse_group('core', subtrees.get('core') or {})
+    missing_fields.update(core_missing)
+
+    description = engine.default_fields('description')
+    if 'description' in subtrees:
+        description, _, description_missing = engine.parse_group('description', subtrees['description'])
+        missing_fields.update(description_missing)
+    elif statuses.get('description') == 'failed':
+        missing_fields.update(('description', 'hashtags_on_description'))
+
+    sound = dict(SOUND_DEFAULTS)
+    if statuses.get('sound') == 'ok':
+        fields, _, sound_missing = engine.parse_group('sound', subtrees.get('sound') or {})
+        missing_fields.update(sound_missing)
+        sound.update(
+            sound_id=parse_sound_id(fields['sound_image_src']) or "NaN",
+            sound_name=fields['sound_name'],
+            sound_artist=fields['sound_artist'],
+            sound_usage=fields['sound_usage'] if fields['sound_usage'] is not None else core['remix_count'],
+        )
+    elif statuses.get('sound') != 'absent':
+        missing_fields.update(SOUND_DEFAULTS)
+
+    return {
+        'timestamp_scan': record.get('timestamp_scan'),
+        'dummy_account_id': record.get('dummy_account_id'),
+        'video_id': record.get('video_id'),
+        'caption': core['caption'],
+        'hashtags_on_caption': core['hashtags_on_caption'],
+        'hashtags_on_description': description['hashtags_on_description'],
+        'description': description['description'],
+        'channel_name': core['channel_name'],
+        'raw_views_count': core['raw_views_count'],
+        'likes_count': core['likes_count'],
+        'comments_count': core['comments_count'],
+        'remix_count': core['remix_count'],
+        'upload_date': core['upload_date'],
+        'extracted_keywords': core['extracted_keywords'],
+        **sound,
+        'video_url_full': record.get('video_url_full'),
+        'watch_duration_sec': record.get('watch_duration_sec'),
+        'extraction_status': statuses,
+        'missing_fields': missing_columns(missing_fields, CSV_HEADERS),
+    }
+
+# Per-process state of the re-extraction workers, set up once by _init_worker.
+_worker = {}
+
+def _init_worker(data_path, backend_name):
+    _worker['file'] = open(data_path, 'rb')
+    _worker['engine'] = ExtractionEngine(backend_name)
+
+def _extract_chunk(offsets):
+    """Returns (rows, failed captures, first error) for a chunk of frame offsets."""
+    rows, failed, first_error = [], 0, None
+    for offset in offsets:
+        try:
+            rows.append(row_from_capture(read_frame(_worker['file'], offset), _worker['engine']))
+        except Exception as e:
+            failed += 1
+            first_error = first_error or f"offset {offset}: {e}"
+    return rows, failed, first_error
+
+def reextract(archive, output_writer, workers=None, chunk_size=256, since=None, video_ids=None, backend_name='lxml'):
+    """
+    Parses the archived captures in a pool of worker processes and streams the rows, in
+    capture order, to the output writer. Each worker opens the archive file once and
+    reads its chunks by offset, so only offsets and finished rows cross processes.
+    Returns (rows written, captures that could not be extracted).
+    """
+    offsets = archive.entries(since, video_ids)
+    workers = workers or os.cpu_count() or 1
+    chunks = [offsets[start:start + chunk_size] for start in range(0, len(offsets), chunk_size)]
+    rows_written = failed = 0
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(archive.data_path, backend_name)) as executor:
+        # A few chunks in flight per worker keeps every core busy without reading ahead of the writer
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_extract_chunk, chunk))
+            if len(pending) >= workers * 4:
+                rows_written, failed = _drain(pending.popleft(), output_writer, rows_written, failed)
+        while pending:
+            rows_written, failed = _drain(pending.popleft(), output_writer, rows_written, failed)
+    return rows_written, failed
+
+def _drain(future, output_writer, rows_written, failed):
+    rows, chunk_failed, first_error = future.result()
+    if first_error:
+        print(f"Capture archive: {chunk_failed} captures could not be extracted ({first_error}).")
+    output_writer.put_many(rows)
+    return rows_written + len(rows), failed + chunk_failed
+
+def main():
+    from config import (
+        CAPTURE_ARCHIVE_DIR, EXTRACTION_BACKEND, FORMAT_EXT, OUTPUT_COMPRESSION, OUTPUT_ROTATE_BYTES,
+        RAW_DATA_CSV, REEXTRACT_WORKERS,
+    )
+    from output_pipeline import OutputWriter, create_sink
+
+    parser = argparse.ArgumentParser(description="Inspect the capture archive and re-extract it into the output format.")
+    parser.add_argument('--archive', default=CAPTURE_ARCHIVE_DIR, help="Archive directory.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="Captures, videos and size.")
+    extract_parser = commands.add_parser('extract', help="Parse the captures on all cores and write the rows.")
+    extract_parser.add_argument('--output', default=RAW_DATA_CSV.replace('.csv', '_reextracted.csv'),
+                                help="Output file (the extension follows --format like the scraper's output).")
+    extract_parser.add_argument('--format', default=FORMAT_EXT, help="Output format: csv, json, ndjson or parquet.")
+    extract_parser.add_argument('--workers', type=int, default=REEXTRACT_WORKERS, help="Worker processes (default: CPU cores).")
+    extract_parser.add_argument('--chunk-size', type=int, default=256, help="Captures per worker task.")
+    extract_parser.add_argument('--backend', default=EXTRACTION_BACKEND, help="Parser backend: lxml or bs4.")
+    extract_parser.add_argument('--since', help="Only captures taken on or after this day, YYYY-MM-DD.")
+    extract_parser.add_argument('--video-id', action='append', dest='video_ids', help="Only this video (repeatable).")
+    extract_parser.add_argument('--rows-only', action='store_true',
+                                help="Only write the rows: no API enrichment, trend index, trend sketches or video catalog.")
+    show_parser = commands.add_parser('show', help="Print the latest capture of a video.")
+    show_parser.add_argument('video_id')
+    show_parser.add_argument('--group', help="Print the HTML of this field group (core, description, sound).")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.archive, DATA_FILE)):
+        print(f"No capture archive in {args.archive}.")
+        return 1
+    archive = CaptureArchive(args.archive, writable=False)
+    started = time.perf_counter()
+    try:
+        if args.command == 'stats':
+            print(archive.stats())
+        elif args.command == 'show':
+            record = archive.latest(args.video_id)
+            if record is None:
+                print(f"No capture of {args.video_id}.")
+                return 1
+            if args.group:
+                for key, html in (record['subtrees'].get(args.group) or {}).items():
+                    print(f"--- {key} ---\n{html}")
+            else:
+                sizes = {group: {key: len(html) for key, html in subtrees.items()} for group, subtrees in record['subtrees'].items()}
+                print(json.dumps(dict({field: record.get(field) for field in RECORD_FIELDS}, subtree_chars=sizes), indent=2))
+        else:
+            # The rows take the scraper's path: API stage, then trend index, sketches and catalog per written batch
+            from row_pipeline import RowPipeline
+            if args.rows_only:
+                pipeline = RowPipeline(api_enrichment=False, trend_index=False, trend_sketches=False, video_catalog=False)
+            else:
+                pipeline = RowPipeline()
+            output_writer = OutputWriter(
+                create_sink(args.format, args.output, CSV_HEADERS, compression=OUTPUT_COMPRESSION, rotate_bytes=OUTPUT_ROTATE_BYTES),
+                batch_size=1000, flush_interval=5.0, fsync_policy='close', queue_maxsize=10_000,
+                on_batch_written=pipeline.add_rows,
+            ).start()
+            try:
+                rows, failed = reextract(archive, pipeline.writer_for(output_writer), args.workers, args.chunk_size,
+                                         args.since, args.video_ids, args.backend)
+            finally:
+                pipeline.close()
+            elapsed = time.perf_counter() - started
+            print(f"Re-extracted {rows} captures to {output_writer.sink.filename} in {elapsed:.1f}s "
+                  f"({rows / elapsed if elapsed else 0:,.0f} per second), {failed} failed.")
+    finally:
+        archive.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
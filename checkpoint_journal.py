@@ -0,0 +1,91 @@
+# checkpoint_journal.py
+
+import glob
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+AccountProgress = namedtuple('AccountProgress', ['count', 'video_ids'])
+
+class CheckpointJournal:
+    """
+    Append-only progress journal, one NDJSON file per account. Every short the output
+    writer has written is recorded as {"video_id", "count", "ts"}, where count is the
+    account's progress counter, so a crashed or killed run can be resumed from the
+    journal. Records are appended per output batch, with one flush (and fsync) per
+    account file and batch. A torn last line from a crash is ignored when reading.
+    """
+    def __init__(self, directory, resume=False, fsync=True):
+        self.directory = directory
+        self.fsync = fsync
+        self._files = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if not resume:
+            # A fresh run starts every account from zero.
+            for path in glob.glob(os.path.join(directory, '*.ndjson')):
+                os.remove(path)
+
+    def _path(self, account_id):
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_.-]', '_', str(account_id)) + '.ndjson')
+
+    def _open(self, account_id):
+        path = self._path(account_id)
+        torn = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+        f = open(path, 'a', encoding='utf-8')
+        if torn:
+            f.write('\n')  # Close off the torn line so the next record starts on its own
+        return f
+
+    def progress(self, account_id):
+        """Returns the AccountProgress recorded for an account (count 0 if it never wrote a row)."""
+        count = 0
+        video_ids = set()
+        try:
+            with open(self._path(account_id), encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from a crash
+                    video_ids.add(record['video_id'])
+                    count = max(count, record.get('count', 0))
+        except FileNotFoundError:
+            pass
+        return AccountProgress(count, video_ids)
+
+    def record_rows(self, rows):
+        """Journals rows the output writer has written. Called from the writer thread."""
+        by_account = {}
+        for row in rows:
+            by_account.setdefault(row.get('dummy_account_id'), []).append(row)
+        with self._lock:
+            for account_id, account_rows in by_account.items():
+                if account_id not in self._counts:
+                    self._counts[account_id] = self.progress(account_id).count
+                f = self._files.get(account_id)
+                if f is None:
+                    f = self._files[account_id] = self._open(account_id)
+                now = time.time()
+                lines = []
+                for row in account_rows:
+                    self._counts[account_id] += 1
+                    lines.append(json.dumps({'video_id': row.get('video_id'), 'count': self._counts[account_id], 'ts': now}) + '\n')
+                f.write(''.join(lines))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files = {}
@@ -12,21 +12,90 @@ CSV_HEADERS = [
     'hashtags_on_description', 'description', 'channel_name', 'raw_views_count',
     'likes_count', 'comments_count', 'remix_count', 'upload_date', 'extracted_keywords',
     'sound_id', 'sound_name', 'sound_artist', 'sound_usage', 'video_url_full',
-    'watch_duration_sec'
+    'watch_duration_sec', 'extraction_status', 'missing_fields'
 ]
 
-# YouTube Data API Key (optional): Used for more accurate data if integrated.
+# YouTube Data API Key (optional): Exact counts and publish times for scraped shorts (see YouTube Data API Enrichment below).
 # It's highly recommended to set this as an environment variable for security.
 # Example: export YOUTUBE_API_KEY="YOUR_API_KEY_HERE"
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY", "YOUR_FALLBACK_API_KEY_IF_NEEDED") # Replace YOUR_FALLBACK_API_KEY_IF_NEEDED with a valid key if you don't use env var
 
 # --- Scraping Behavior Configuration ---
+# Site the browsers open. Only change it to point the scraper at a local stand-in such as
+# benchmarks/mock_shorts_site.py.
+YOUTUBE_BASE_URL = 'https://www.youtube.com'
 # Target number of unique shorts to scrape per dummy account.
 MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT = 15 
 # Initial delay between starting each dummy account thread (in seconds).
 THREAD_START_DELAY_MIN = 5
 THREAD_START_DELAY_MAX = 15
 
+# --- Readiness Waits & Dwell Pacing ---
+# Page loads are awaited on concrete signals (new /shorts/<id> URL, the expected subtree present,
+# no DOM changes for READY_QUIET_MS) instead of fixed sleeps. Give up waiting after READY_TIMEOUT_SEC.
+READY_TIMEOUT_SEC = 10
+READY_QUIET_MS = 300
+# Deliberate pause (random, in seconds) after each action, once the page is ready. This is pacing
+# to look human, configured and measured ('dwell' metrics stage) separately from load waits ('ready').
+DWELL_AFTER_FEED_OPEN_SEC = (1, 3)
+DWELL_AFTER_CLICK_SEC = (0.5, 1.5)
+DWELL_AFTER_NAVIGATE_SEC = (1, 3)
+
+# --- Browser Worker Pool ---
+# Accounts are queued as jobs and run on a fixed number of browser workers; a worker
+# picks up the next account as soon as its current one finishes or fails.
+# Maximum number of browsers open at the same time. None sizes it from the CPU count and available memory.
+MAX_CONCURRENT_BROWSERS = None
+# Resources assumed per browser when sizing the pool automatically.
+BROWSER_CPU_PER_WORKER = 1
+BROWSER_MEMORY_PER_WORKER_MB = 1024
+# Memory (in MB) left free for the OS and the scraper itself when sizing the pool.
+BROWSER_MEMORY_RESERVE_MB = 1024
+# Abort an account job (and close its browser) after this many minutes. None disables the timeout.
+ACCOUNT_JOB_TIMEOUT_MIN = 30
+
+# --- Lean Browser Mode ---
+# Run the browsers headless and drop video streams, fonts and the images the scraper never
+# reads (the sound thumbnail is kept), to fit more accounts on one machine.
+LEAN_MODE = False
+# DevTools URL patterns blocked in lean mode. None uses lean_mode.DEFAULT_BLOCKED_URL_PATTERNS.
+LEAN_BLOCKED_URL_PATTERNS = None
+# Count the bytes each browser downloads and report them per short at the end of each account
+# (run once with LEAN_MODE off and once on to compare).
+MEASURE_TRANSFER_BYTES = True
+
+# --- Browser Daemon ---
+# `python youtube-shorts-scraper.py --daemon` keeps one warm browser per account on the Shorts
+# feed and takes scrape jobs on a local port (see browser_daemon.py), skipping Chrome startup per job.
+DAEMON_HOST = '127.0.0.1'
+DAEMON_PORT = 8765
+# IDs of the accounts to keep warm. None keeps every account in DUMMY_ACCOUNTS warm.
+DAEMON_ACCOUNTS = None
+# Relaunch a browser after it served this many shorts (0 disables).
+DAEMON_RECYCLE_AFTER_SHORTS = 200
+# Relaunch a browser once the Shorts page's JS heap grows beyond this (in MB). None disables.
+DAEMON_RECYCLE_HEAP_MB = 1500
+# Seconds between health checks of idle browsers; dead ones are relaunched.
+DAEMON_HEALTH_CHECK_SEC = 60
+
+# --- Multi-Node Coordinator ---
+# `python coordinator.py serve` leases one job per account in DUMMY_ACCOUNTS to any number of
+# `python youtube-shorts-scraper.py --worker HOST:PORT` processes, on this or other machines.
+# Each worker writes its own shard next to RAW_DATA_CSV; `python coordinator.py merge` combines them.
+# Use '0.0.0.0' to accept workers from other machines (trusted networks only, see COORDINATOR_TOKEN).
+COORDINATOR_HOST = '127.0.0.1'
+COORDINATOR_PORT = 8766
+# Shared secret sent with every command; workers and coordinator must use the same one. None disables the check.
+COORDINATOR_TOKEN = os.getenv("LHANA_COORDINATOR_TOKEN")
+# Job ledger of the coordinator (kept for `serve --resume`).
+COORDINATOR_DB_PATH = 'lhana_coordinator.sqlite3'
+# A job goes back to the queue when its worker has not sent a heartbeat for this long (heartbeats every third of it).
+COORDINATOR_LEASE_SEC = 90
+# Leases per job (including the ones lost with a dead worker) before it is marked failed.
+COORDINATOR_MAX_ATTEMPTS = 3
+# Name of this worker in the coordinator's status and in its shard's file name. None uses <hostname>-<pid>.
+WORKER_ID = None
+
 # --- Browser Window & Layout Configuration ---
 # Minimum reasonable size for a browser window (in pixels).
 MIN_BROWSER_WINDOW_SIZE = 300
@@ -35,6 +104,9 @@ HORIZONTAL_PADDING = 10
 VERTICAL_PADDING = 10
 # Assumed height of the taskbar/dock (in pixels) to avoid overlapping.
 TASKBAR_HEIGHT_ASSUMPTION = 50
+# Window size of headless browsers (LEAN_MODE). Headed ones are tiled on the screen instead, which is only
+# measured (with Tk) when headed browsers are started.
+HEADLESS_WINDOW_SIZE = (1280, 900)
 
 # --- Dummy Account Profiles ---
 # IMPORTANT: Replace these paths with your actual Chrome user profile paths.
@@ -68,4 +140,165 @@ VPN_EXTENSIONS_BASE_PATH = os.path.join(os.getcwd(), 'extensions') # os.path.joi
 CUSTOM_CHROMEDRIVER_DIR = os.path.join(os.getcwd(), 'chromedriver_custom') # os.path.join(os.getcwd(), 'chromedriver_custom') if you want a custom path
 
 # OUTPUT MODE
-FORMAT_EXT = 'csv'  # Options: 'csv', 'json'
\ No newline at end of file
+FORMAT_EXT = 'csv'  # Options: 'csv', 'json', 'ndjson' (append-only, one record per line, readable while the run is going),
+                    # 'parquet' (columnar dataset partitioned by scan date and account, needs pyarrow; see parquet_dataset.py)
+
+# --- Extraction Configuration ---
+# How shorts are read from the page. Options:
+# 'dom' (default): scrape the short on screen from the rendered DOM, with the description and sound clicks.
+# 'embedded_json': read YouTube's embedded page data in one call; yields the current and the prefetched
+#                  shorts per navigation, without clicks (extracted_keywords is not available in this mode).
+# 'network': record the Shorts feed API responses the browser downloads (DevTools network events)
+#            and map every short they describe; throughput follows the feed prefetch.
+EXTRACTION_MODE = 'dom'
+# 'network' mode only: URL fragments of the feed API responses to capture.
+NETWORK_CAPTURE_URL_PATTERNS = [
+    '/youtubei/v1/reel/reel_watch_sequence',
+    '/youtubei/v1/reel/reel_item_watch',
+    '/youtubei/v1/player',
+]
+# Parser backend used on the captured DOM subtrees. Options: 'lxml' (fast, default), 'bs4'.
+# Falls back to 'bs4' if lxml is not installed.
+EXTRACTION_BACKEND = 'lxml'
+# Set to True to also fetch and parse the full page the old way and report the bytes and
+# parse time saved per short. Only for diagnostics, it doubles the extraction cost.
+EXTRACTION_REPORT_SAVINGS = False
+# 'dom' mode: extra attempts for each extraction stage (core metadata, description, sound) when
+# its page elements are missing or a click fails, and the pause before each retry. A stage that
+# still fails does not drop the short: the row is written with the fields collected so far and
+# its 'extraction_status' / 'missing_fields' columns say what is missing.
+EXTRACTION_STAGE_RETRIES = 2
+EXTRACTION_RETRY_DELAY_SEC = 1
+
+# --- Capture Archive ---
+# 'dom' mode only: instead of parsing in the browser threads, store the captured DOM subtrees of each
+# short (compressed) in an append-only archive. `python capture_archive.py extract` then parses the
+# whole archive on all cores into the normal output format, and can be re-run after a selector fix.
+ENABLE_CAPTURE_ARCHIVE = False
+# Directory holding the archive file and its offset index.
+CAPTURE_ARCHIVE_DIR = 'lhana_capture_archive'
+# Per-capture compression. Options: 'zlib', 'zstd' (requires `pip install zstandard`).
+CAPTURE_ARCHIVE_COMPRESSION = 'zlib'
+# Worker processes for `capture_archive.py extract` (None = one per CPU core).
+REEXTRACT_WORKERS = None
+
+# --- Re-enrichment Queue ---
+# Shorts written with an incomplete stage are queued in this SQLite file. Run
+# `python youtube-shorts-scraper.py --reenrich` to revisit only those shorts and fill the gaps.
+ENABLE_ENRICHMENT_QUEUE = True
+ENRICHMENT_QUEUE_PATH = 'lhana_enrichment_queue.sqlite3'
+# Re-enrichment passes per short before it is given up on.
+ENRICHMENT_MAX_ATTEMPTS = 3
+# Shorts revisited per --reenrich run (None = the whole queue).
+ENRICHMENT_BATCH_SIZE = 50
+
+# --- YouTube Data API Enrichment ---
+# With a YOUTUBE_API_KEY set, scraped rows are batched (up to 50 video IDs per videos.list call) and
+# get exact view, like and comment counts and the publish time before they are written.
+ENABLE_API_ENRICHMENT = True
+API_BASE_URL = 'https://www.googleapis.com/youtube/v3'
+# Call rate and daily quota budget (videos.list costs 1 unit per call; the default project quota is 10,000).
+API_CALLS_PER_SECOND = 5
+API_DAILY_QUOTA = 10000
+# SQLite cache of API responses; a video is asked for again once its entry is older than this (in hours).
+API_CACHE_PATH = 'lhana_api_cache.sqlite3'
+API_CACHE_TTL_HOURS = 6
+# Longest a row waits for its batch to fill before the call is made anyway.
+API_BATCH_MAX_WAIT_SEC = 2
+# Skip capturing the description header (view count, upload date) from the page while the API provides them.
+API_SKIP_DOM_COUNTS = True
+
+# --- Output Pipeline Configuration ---
+# All account threads feed one writer thread, which appends rows in batches.
+# A batch is written when it holds OUTPUT_BATCH_SIZE rows or OUTPUT_FLUSH_INTERVAL_SEC has passed.
+OUTPUT_BATCH_SIZE = 10
+OUTPUT_FLUSH_INTERVAL_SEC = 5
+# When to fsync the output file. Options: 'none' (leave it to the OS), 'batch' (after every batch), 'close' (once at the end).
+OUTPUT_FSYNC_POLICY = 'batch'
+# Maximum rows waiting to be written. Account threads block when it is full (backpressure).
+OUTPUT_QUEUE_MAXSIZE = 100
+# A row the output file rejects is retried with the next batches this many times, then moved to
+# OUTPUT_DEAD_LETTER_PATH (one JSON record per line, with the error) so it cannot stall the writer.
+OUTPUT_MAX_WRITE_ATTEMPTS = 3
+OUTPUT_DEAD_LETTER_PATH = 'lhana_rejected_rows.ndjson'
+# NDJSON only: stream compression of the segment files. Options: None, 'gzip', 'zstd' (requires `pip install zstandard`).
+OUTPUT_COMPRESSION = None
+# NDJSON only: start a new segment file once the current one reaches this size in bytes (0 disables rotation).
+OUTPUT_ROTATE_BYTES = 100 * 1024 * 1024
+
+# --- Checkpoint Journal ---
+# Record every written short per account, so `python youtube-shorts-scraper.py --resume` picks each
+# account up where it stopped after a crash: full accounts are skipped, partial ones are topped up
+# to MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT. A run without --resume starts the journal over.
+ENABLE_CHECKPOINT_JOURNAL = True
+# Directory holding one journal file per account.
+CHECKPOINT_JOURNAL_DIR = 'lhana_checkpoints'
+
+# --- Video Catalog & Re-scan Scheduler ---
+# Keep every known video with its view/like snapshots (a time series, fed by the written rows), and
+# refresh them with `python youtube-shorts-scraper.py --rescan`: fast-growing videos often, stalled ones rarely.
+ENABLE_VIDEO_CATALOG = True
+# SQLite file holding the catalog and the snapshots.
+VIDEO_CATALOG_PATH = 'lhana_video_catalog.sqlite3'
+# How re-scans read a video. Options: 'api' (batched videos.list calls, needs YOUTUBE_API_KEY),
+# 'browser' (visits youtube.com/shorts/<id> with the first dummy account).
+RESCAN_BACKEND = 'api'
+# Videos handed to the backend per batch, and at most per --rescan run.
+RESCAN_BATCH_SIZE = 50
+RESCAN_MAX_VIDEOS_PER_RUN = 1000
+# A video is due again when its views should have grown by this fraction at its latest rate,
+# but never sooner/later than the bounds below (in hours).
+RESCAN_TARGET_GROWTH = 0.1
+RESCAN_MIN_INTERVAL_HOURS = 1
+RESCAN_MAX_INTERVAL_HOURS = 168
+# Stop re-scanning videos older than this (in days), or after this many refreshes in a row returned nothing.
+RESCAN_MAX_AGE_DAYS = 30
+RESCAN_MAX_FAILURES = 3
+
+# --- Trend Index ---
+# Keep an inverted index from hashtags, keywords, sounds and channels to the written shorts, updated
+# as rows are written, for `python trend_index.py search/cooccur` lookups without scanning the output.
+ENABLE_TREND_INDEX = True
+# SQLite file holding the index.
+TREND_INDEX_PATH = 'lhana_trend_index.sqlite3'
+
+# --- Trend Sketches ---
+# Keep approximate top sounds, hashtags and keywords over the last hour and day in fixed memory,
+# fed by the written rows and saved at the end of every run (`python trend_sketch.py top`).
+ENABLE_TREND_SKETCHES = True
+# File the sketches are loaded from and saved to; sketches of several machines combine with `trend_sketch.py merge`.
+TREND_SKETCH_PATH = 'lhana_trend_sketches.npz'
+# Count-min sketch size per time bucket. Counts overestimate by at most ~2/width of the bucket's total.
+TREND_SKETCH_WIDTH = 2048
+TREND_SKETCH_DEPTH = 4
+# Heavy-hitter candidates kept per time bucket (top-K queries can return up to this many).
+TREND_SKETCH_CANDIDATES = 100
+
+# --- Seen-Video Index ---
+# Skip videos that any account already scraped, in this run or a previous one,
+# before spending time on the description and sound pop-up clicks.
+ENABLE_SEEN_INDEX = True
+# SQLite file holding the IDs of scraped videos.
+SEEN_INDEX_PATH = 'lhana_seen_videos.sqlite3'
+# Scrape a known video again once its last scrape is older than this (in hours). None never re-scrapes.
+SEEN_INDEX_RESCRAPE_TTL_HOURS = None
+
+# --- Sound Cache ---
+# Reuse sound metadata for sounds already seen (keyed by the sound button link), so the
+# sound pop-up is only opened for new sounds or when the cached entry is stale.
+ENABLE_SOUND_CACHE = True
+# SQLite file holding the cached sounds.
+SOUND_CACHE_PATH = 'lhana_sound_cache.sqlite3'
+# Re-open the pop-up to refresh sound_usage once a cached entry is older than this (in hours). None never refreshes.
+SOUND_CACHE_TTL_HOURS = 24
+
+# --- Metrics ---
+# Time every scrape stage (browser start, waits, captures, parsing, clicks, delays, writes)
+# per account and for the whole run. Cheap enough to leave on.
+ENABLE_METRICS = True
+# Files written at the end of the run: Prometheus text format (e.g. for the node_exporter
+# textfile collector) and a JSON summary with p50/p95/p99 per stage and shorts per minute.
+METRICS_PROMETHEUS_PATH = 'lhana_metrics.prom'
+METRICS_JSON_PATH = 'lhana_metrics.json'
+# Also rewrite both files every this many seconds while the run is going. None only writes them at the end.
+METRICS_DUMP_INTERVAL_SEC = None
@@ -0,0 +1,699 @@
+# coordinator.py
+# Hands the dummy accounts out as leased jobs to scraper processes on any number of machines.
+#
+# Usage:
+#   python coordinator.py serve [--resume]                    # once, on any machine
+#   python youtube-shorts-scraper.py --worker HOST:PORT       # on every machine, or several times on one
+#   python coordinator.py status | stop
+#   python coordinator.py merge [shard ...] --output merged.csv
+#
+# The coordinator keeps a ledger of one job per account in DUMMY_ACCOUNTS (SQLite, so a
+# restarted coordinator continues with --resume) and answers JSON commands on a TCP
+# port, like browser_daemon.py. Workers lease a job, renew the lease with heartbeats
+# while they scrape, and report it completed. A job whose worker stops sending
+# heartbeats goes back to the queue once its lease lapses, and the next worker to lease
+# it only scrapes the shorts the dead one had not reported as written.
+#
+# Every worker writes its rows to its own shard next to the configured output
+# (lhana_shorts_raw_data.shard-<worker>.csv). `merge` combines the shards into one
+# output with a single row per video_id.
+
+import argparse
+import csv
+import glob
+import hmac
+import json
+import os
+import random
+import re
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+
+from browser_daemon import _CommandHandler, send_command
+from ndjson_reader import iter_records, list_segments
+from worker_pool import JOB_STATES, Job
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+
+# Job states in the ledger; 'completed' and 'failed' are final.
+LEDGER_STATES = ('pending', 'leased', 'completed', 'failed')
+
+class CoordinatorError(Exception):
+    """The coordinator rejected a command (unknown command, wrong token, bad arguments)."""
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def shard_output_path(path, worker_id):
+    """Output path of one worker's shard, e.g. 'data.csv' -> 'data.shard-node1-4242.csv'."""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.shard-{re.sub(r'[^A-Za-z0-9_.-]', '_', str(worker_id))}{ext}"
+
+# --- Job Ledger ---
+class Coordinator:
+    """
+    Ledger of the account jobs, kept in a SQLite file. A lease lasts lease_seconds and is
+    renewed by the worker's heartbeats, which also report the rows it has written for
+    the job. Once a lease lapses the job goes back to the queue with those rows counted
+    as progress; it is marked failed after max_attempts leases. Every lease gets a new
+    lease ID, so a worker whose lease was taken over cannot complete the job.
+    """
+    def __init__(self, path, lease_seconds=90, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " position INTEGER NOT NULL,"
+            " account TEXT NOT NULL,"
+            " shorts INTEGER NOT NULL,"
+            " state TEXT NOT NULL DEFAULT 'pending',"
+            " worker_id TEXT,"
+            " lease_id INTEGER NOT NULL DEFAULT 0,"
+            " lease_expires REAL,"
+            " lease_base INTEGER NOT NULL DEFAULT 0,"
+            " rows_done INTEGER NOT NULL DEFAULT 0,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workers ("
+            " worker_id TEXT PRIMARY KEY,"
+            " host TEXT,"
+            " slots INTEGER,"
+            " state TEXT NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " completed INTEGER NOT NULL DEFAULT 0"
+            ") WITHOUT ROWID"
+        )
+
+    def seed(self, accounts, shorts, resume=False):
+        """
+        Queues one job of `shorts` shorts per account. Without resume the previous ledger is
+        dropped; with it, finished jobs are kept and jobs leased to the previous run's
+        workers are queued again (their progress is kept).
+        """
+        now = time.time()
+        with self._lock:
+            if resume:
+                self._conn.execute("UPDATE jobs SET state = 'pending', worker_id = NULL, lease_expires = NULL "
+                                   "WHERE state = 'leased'")
+                self._conn.execute("UPDATE workers SET state = 'left'")
+            else:
+                self._conn.execute("DELETE FROM jobs")
+                self._conn.execute("DELETE FROM workers")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (job_id, position, account, shorts, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(account['id'], position, json.dumps(account), shorts, now) for position, account in enumerate(accounts)],
+            )
+
+    def _touch(self, worker_id, now, state='active'):
+        self._conn.execute(
+            "INSERT INTO workers (worker_id, state, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT(worker_id) DO UPDATE SET state = excluded.state, last_seen = excluded.last_seen",
+            (worker_id, state, now),
+        )
+
+    def _expire(self, now):
+        """Queues the jobs whose lease has lapsed again. Must be called with the lock held."""
+        expired = self._conn.execute(
+            "SELECT job_id, worker_id, attempts, rows_done FROM jobs WHERE state = 'leased' AND lease_expires < ?", (now,)
+        ).fetchall()
+        for job_id, worker_id, attempts, rows_done in expired:
+            state = 'failed' if attempts >= self.max_attempts else 'pending'
+            self._conn.execute("UPDATE jobs SET state = ?, worker_id = NULL, lease_expires = NULL, updated_at = ? "
+                               "WHERE job_id = ?", (state, now, job_id))
+            action = "giving up on it" if state == 'failed' else "queued again"
+            print(f"Coordinator: Lease of job {job_id} on {worker_id} expired after attempt {attempts}/{self.max_attempts} "
+                  f"({rows_done} rows written), {action}.")
+        self.expired += len(expired)
+        return len(expired)
+
+    def expire_leases(self):
+        with self._lock:
+            return self._expire(time.time())
+
+    def register(self, worker_id, host=None, slots=None):
+        with self._lock:
+            self._touch(worker_id, time.time())
+            self._conn.execute("UPDATE workers SET host = ?, slots = ? WHERE worker_id = ?", (host, slots, worker_id))
+        print(f"Coordinator: Worker {worker_id} joined ({slots} browsers on {host}).")
+        return {'ok': True, 'lease_sec': self.lease_seconds}
+
+    def lease(self, worker_id, account_ids=None):
+        """
+        Leases the next queued job to a worker. account_ids limits it to the accounts the
+        worker has profiles for. Returns {'job': None, 'done': True} once none of those
+        jobs is queued or leased anymore.
+        """
+        now = time.time()
+        allowed = set(account_ids) if account_ids is not None else None
+        with self._lock:
+            self._expire(now)
+            self._touch(worker_id, now)
+            rows = self._conn.execute(
+                "SELECT job_id, account, shorts, rows_done, lease_id, attempts, state FROM jobs "
+                "WHERE state IN ('pending', 'leased') ORDER BY position"
+            ).fetchall()
+            rows = [row for row in rows if allowed is None or row[0] in allowed]
+            pending = next((row for row in rows if row[6] == 'pending'), None)
+            if pending is None:
+                return {'ok': True, 'job': None, 'done': not rows}
+            job_id, account, shorts, rows_done, lease_id, attempts, _ = pending
+            self._conn.execute(
+                "UPDATE jobs SET state = 'leased', worker_id = ?, lease_id = ?, lease_expires = ?, lease_base = rows_done, "
+                "attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                (worker_id, lease_id + 1, now + self.lease_seconds, now, job_id),
+            )
+        return {'ok': True, 'job': {
+            'job_id': job_id, 'account': json.loads(account), 'shorts': shorts, 'progress': rows_done,
+            'lease_id': lease_id + 1, 'attempt': attempts + 1,
+        }}
+
+    def heartbeat(self, worker_id, leases):
+        """
+        Renews a worker's leases, given as {job_id: [lease_id, rows written so far]}.
+        Returns the job IDs whose lease the worker no longer holds, so it can stop them.
+        """
+        now = time.time()
+        lost = []
+        with self._lock:
+            self._touch(worker_id, now)
+            for job_id, (lease_id, rows) in leases.items():
+                updated = self._conn.execute(
+                    "UPDATE jobs SET lease_expires = ?, rows_done = lease_base + ?, updated_at = ? "
+                    "WHERE job_id = ? AND state = 'leased' AND worker_id = ? AND lease_id = ?",
+                    (now + self.lease_seconds, int(rows), now, job_id, worker_id, lease_id),
+                ).rowcount
+                if not updated:
+                    lost.append(job_id)
+        return {'ok': True, 'lost': lost}
+
+    def complete(self, worker_id, job_id, lease_id, ok, rows, released=False):
+        """
+        Records the end of a leased job. A failed job is queued again until it used up its
+        attempts; a released one (its worker was stopped) is queued without using one up.
+        """
+        now = time.time()
+        with self._lock:
+            self._touch(worker_id, now)
+            current = self._conn.execute(
+                "SELECT attempts FROM jobs WHERE job_id = ? AND state = 'leased' AND worker_id = ? AND lease_id = ?",
+                (job_id, worker_id, lease_id),
+            ).fetchone()
+            if current is None:
+                return {'ok': True, 'accepted': False}
+            attempts = current[0] - 1 if released else current[0]
+            state = 'completed' if ok else 'pending' if attempts < self.max_attempts else 'failed'
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, worker_id = CASE WHEN ? = 'completed' THEN worker_id END, lease_expires = NULL, "
+                "rows_done = lease_base + ?, attempts = ?, updated_at = ? WHERE job_id = ?",
+                (state, state, int(rows), attempts, now, job_id),
+            )
+            if ok:
+                self._conn.execute("UPDATE workers SET completed = completed + 1 WHERE worker_id = ?", (worker_id,))
+        if not ok:
+            print(f"Coordinator: Job {job_id} {'released' if released else 'failed'} on {worker_id}, "
+                  f"{'queued again' if state == 'pending' else 'giving up on it'}.")
+        return {'ok': True, 'accepted': True, 'state': state}
+
+    def leave(self, worker_id):
+        with self._lock:
+            self._touch(worker_id, time.time(), state='left')
+        print(f"Coordinator: Worker {worker_id} left.")
+        return {'ok': True}
+
+    def finished(self):
+        """True once every job is completed or failed and no worker is still active."""
+        now = time.time()
+        with self._lock:
+            open_jobs = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'leased')").fetchone()[0]
+            active = self._conn.execute("SELECT COUNT(*) FROM workers WHERE state = 'active' AND last_seen >= ?",
+                                        (now - self.lease_seconds,)).fetchone()[0]
+        return open_jobs == 0 and active == 0
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            jobs = self._conn.execute(
+                "SELECT job_id, state, worker_id, attempts, rows_done, shorts FROM jobs ORDER BY position"
+            ).fetchall()
+            workers = self._conn.execute(
+                "SELECT worker_id, host, slots, state, last_seen, completed FROM workers ORDER BY worker_id"
+            ).fetchall()
+        counts = {state: 0 for state in LEDGER_STATES}
+        for job in jobs:
+            counts[job[1]] += 1
+        return {
+            'ok': True,
+            'counts': counts,
+            'rows': sum(job[4] for job in jobs),
+            'expired_leases': self.expired,
+            'jobs': [{'job_id': job_id, 'state': state, 'worker': worker_id, 'attempts': attempts, 'rows': rows, 'shorts': shorts}
+                     for job_id, state, worker_id, attempts, rows, shorts in jobs],
+            'workers': [{'worker': worker_id, 'host': host, 'slots': slots, 'state': state,
+                         'last_seen_sec': round(now - last_seen, 1), 'completed': completed}
+                        for worker_id, host, slots, state, last_seen, completed in workers],
+        }
+
+    def format_summary(self):
+        status = self.status()
+        counts = status['counts']
+        return (f"{len(status['jobs'])} jobs: " + ", ".join(f"{counts[state]} {state}" for state in LEDGER_STATES)
+                + f"; {status['rows']} rows written by {len(status['workers'])} workers, {self.expired} leases expired")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- TCP Server ---
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    """
+    Serves the workers' 'register', 'lease', 'heartbeat', 'complete' and 'leave' commands,
+    plus 'status' and 'stop', one JSON line each (the browser daemon's protocol). When a
+    token is set, commands without it are rejected.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, coordinator, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+        super().__init__((host, port), _CommandHandler)
+        self.coordinator = coordinator
+        self.token = token
+
+    def dispatch(self, command):
+        if self.token and not hmac.compare_digest(str(command.get('token', '')), self.token):
+            return {'ok': False, 'error': 'invalid token'}
+        cmd = command.get('cmd')
+        worker_id = command.get('worker')
+        if cmd in ('register', 'lease', 'heartbeat', 'complete', 'leave') and not worker_id:
+            return {'ok': False, 'error': f"'{cmd}' needs a worker ID"}
+        if cmd == 'register':
+            return self.coordinator.register(worker_id, command.get('host'), command.get('slots'))
+        if cmd == 'lease':
+            return self.coordinator.lease(worker_id, command.get('accounts'))
+        if cmd == 'heartbeat':
+            return self.coordinator.heartbeat(worker_id, command.get('leases') or {})
+        if cmd == 'complete':
+            return self.coordinator.complete(worker_id, command['job'], command['lease'], bool(command.get('ok')),
+                                             command.get('rows', 0), bool(command.get('released')))
+        if cmd == 'leave':
+            return self.coordinator.leave(worker_id)
+        if cmd == 'status':
+            return self.coordinator.status()
+        if cmd == 'stop':
+            # shutdown() waits for serve_forever, so it cannot run on this handler's thread.
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True, 'stopping': True}
+        return {'ok': False, 'error': f"Unknown command '{cmd}'"}
+
+    def run(self, exit_when_done=True, check_interval=None):
+        """
+        Serves until 'stop' or Ctrl-C, or with exit_when_done, until every job is finished
+        and every worker has left. Lapsed leases are reclaimed every check_interval seconds.
+        """
+        check_interval = check_interval or min(5.0, self.coordinator.lease_seconds / 3)
+        stopping = threading.Event()
+
+        def check():
+            last_counts = None
+            while not stopping.wait(check_interval):
+                self.coordinator.expire_leases()
+                counts = self.coordinator.status()['counts']
+                if counts != last_counts:
+                    print(f"Coordinator: {self.coordinator.format_summary()}")
+                    last_counts = counts
+                if exit_when_done and self.coordinator.finished():
+                    print("Coordinator: Every job is finished and every worker has left.")
+                    self.shutdown()
+                    return
+
+        checker = threading.Thread(target=check, name='coordinator-leases', daemon=True)
+        checker.start()
+        host, port = self.server_address[:2]
+        print(f"Coordinator: Listening on {host}:{port}, leases last {self.coordinator.lease_seconds:.0f}s.")
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            print("\nCoordinator: Interrupted, run `python coordinator.py serve --resume` to continue.")
+        finally:
+            stopping.set()
+            self.server_close()
+            print(f"Coordinator: {self.coordinator.format_summary()}")
+
+
+# --- Worker Side ---
+class CoordinatorClient:
+    """Sends one command per connection to the coordinator, like browser_daemon.send_command."""
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, worker_id=None, token=None, timeout=10):
+        self.host = host
+        self.port = port
+        self.worker_id = worker_id or default_worker_id()
+        self.token = token
+        self.timeout = timeout
+
+    def call(self, cmd, **fields):
+        """Returns the coordinator's response. Raises OSError if it cannot be reached, CoordinatorError if it refuses."""
+        command = dict(fields, cmd=cmd, worker=self.worker_id)
+        if self.token:
+            command['token'] = self.token
+        response = send_command(command, self.host, self.port, timeout=self.timeout)
+        if not response.get('ok'):
+            raise CoordinatorError(response.get('error'))
+        return response
+
+
+class CoordinatorWorker:
+    """
+    The worker_pool.BrowserWorkerPool of a --worker process: max_workers slots, each
+    running one job at a time, except that the jobs are leased from the coordinator.
+    A heartbeat thread renews the leases and reports the rows written for each job
+    (fed by record_rows from the output writer); a job whose lease was lost or that
+    exceeded job_timeout is aborted. task(job) gets a worker_pool.Job whose payload is
+    the leased job: {'job_id', 'account', 'shorts', 'progress', 'lease_id', 'attempt'}.
+    """
+    def __init__(self, client, max_workers, accounts=None, job_timeout=None, start_delay=(0, 0), poll_interval=5.0):
+        self.client = client
+        self.max_workers = max(1, max_workers)
+        self.accounts = accounts
+        self.job_timeout = job_timeout
+        self.start_delay = start_delay
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = 30.0
+        self.retry_seconds = 90.0
+        self.jobs = []
+        self.lost = 0
+        self._running = {}
+        self._rows = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._drained = threading.Event()
+        self._finished = threading.Event()
+
+    def _call(self, cmd, retry=True, **fields):
+        """Sends a command, retrying for retry_seconds while the coordinator is unreachable. Returns None on failure."""
+        deadline = time.monotonic() + (self.retry_seconds if retry else 0)
+        delay = 1.0
+        while True:
+            try:
+                return self.client.call(cmd, **fields)
+            except CoordinatorError as e:
+                print(f"Coordinator worker: '{cmd}' refused: {e}")
+                return None
+            except (OSError, ValueError) as e:
+                if time.monotonic() >= deadline or self._stopping.is_set():
+                    print(f"Coordinator worker: Could not reach the coordinator on {self.client.host}:{self.client.port} ({e}).")
+                    return None
+                time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+                delay = min(delay * 2, 15.0)
+
+    def record_rows(self, rows):
+        """Counts rows the output writer has written for the running jobs. Called from the writer thread."""
+        with self._lock:
+            for row in rows:
+                job_id = row.get('dummy_account_id')
+                if job_id in self._rows:
+                    self._rows[job_id] += 1
+
+    def _slot(self, slot, task):
+        # Stagger the first browser launches instead of starting all of them at once.
+        if slot and self._stopping.wait(random.uniform(*self.start_delay) * slot):
+            return
+        while not (self._stopping.is_set() or self._drained.is_set()):
+            response = self._call('lease', accounts=self.accounts)
+            if response is None:
+                return
+            leased = response.get('job')
+            if leased is None:
+                if response.get('done'):
+                    self._drained.set()
+                    return
+                self._stopping.wait(self.poll_interval)  # Jobs are still leased elsewhere and may come back
+                continue
+            job = Job(leased['job_id'], leased)
+            job.slot = slot
+            job.started_at = time.monotonic()
+            job.deadline = job.started_at + self.job_timeout if self.job_timeout else None
+            job.state = 'running'
+            with self._lock:
+                self._running[job.job_id] = job
+                self._rows[job.job_id] = 0
+            self.jobs.append(job)
+            print(f"Coordinator worker: Slot {slot} leased job {job.job_id} (attempt {leased['attempt']}, "
+                  f"{leased['progress']}/{leased['shorts']} shorts already written).")
+            try:
+                ok = task(job)
+            except Exception as e:
+                ok = False
+                if not job.cancelled():
+                    print(f"Coordinator worker: Job {job.job_id} raised an error: {e}")
+                    traceback.print_exc()
+            job.finished_at = time.monotonic()
+            with self._lock:
+                self._running.pop(job.job_id, None)
+                rows = self._rows.pop(job.job_id, 0)
+                if not job.cancelled():
+                    job.state = 'completed' if ok else 'failed'
+            print(f"Coordinator worker: Slot {slot} finished job {job.job_id} ({job.state}, {rows} rows) in {job.elapsed():.0f}s.")
+            result = self._call('complete', job=job.job_id, lease=leased['lease_id'], ok=job.state == 'completed', rows=rows,
+                                released=job.state == 'cancelled' and self._stopping.is_set())
+            if result is not None and not result.get('accepted'):
+                print(f"Coordinator worker: Job {job.job_id} was handed to another worker, its rows stay in this shard.")
+
+    def _heartbeat(self):
+        while not self._finished.wait(self.heartbeat_interval):
+            with self._lock:
+                leases = {job_id: [job.payload['lease_id'], self._rows.get(job_id, 0)] for job_id, job in self._running.items()}
+                running = dict(self._running)
+            try:
+                response = self.client.call('heartbeat', leases=leases)
+            except (CoordinatorError, OSError, ValueError) as e:
+                print(f"Coordinator worker: Heartbeat failed ({e}), the leases lapse in {self.retry_seconds:.0f}s without one.")
+                continue
+            for job_id in response.get('lost', []):
+                job = running.get(job_id)
+                if job is not None and not job.cancelled():
+                    print(f"Coordinator worker: Lost the lease of job {job_id}, aborting it.")
+                    self.lost += 1
+                    job.cancel('cancelled')
+            now = time.monotonic()
+            for job in running.values():
+                if job.deadline is not None and now >= job.deadline and not job.cancelled():
+                    print(f"Coordinator worker: Job {job.job_id} exceeded its {self.job_timeout:.0f}s timeout, aborting it.")
+                    job.cancel('timed_out')
+
+    def shutdown(self):
+        """Stops leasing jobs and aborts the running ones; they are released back to the coordinator."""
+        self._stopping.set()
+        with self._lock:
+            running = list(self._running.values())
+        for job in running:
+            job.cancel('cancelled')
+
+    def run(self, task, shutdown_grace=30):
+        """
+        Registers with the coordinator and runs leased jobs until it has none left for this
+        worker. On Ctrl-C the running jobs are aborted and released, as in BrowserWorkerPool.run.
+        """
+        registered = self._call('register', host=socket.gethostname(), slots=self.max_workers)
+        if registered is None:
+            return self.summary()
+        self.retry_seconds = registered['lease_sec']
+        self.heartbeat_interval = registered['lease_sec'] / 3
+        print(f"Coordinator worker: {self.client.worker_id} registered with {self.client.host}:{self.client.port}, "
+              f"running up to {self.max_workers} browsers.")
+        slots = [
+            threading.Thread(target=self._slot, args=(slot, task), name=f'coordinator-slot-{slot}', daemon=True)
+            for slot in range(self.max_workers)
+        ]
+        heartbeat = threading.Thread(target=self._heartbeat, name='coordinator-heartbeat', daemon=True)
+        heartbeat.start()
+        for thread in slots:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in slots):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\nCoordinator worker: Interrupted, closing running browsers and releasing their jobs "
+                  "(press Ctrl-C again to stop waiting)...")
+            self.shutdown()
+            deadline = time.monotonic() + shutdown_grace
+            for thread in slots:
+                thread.join(max(0.0, deadline - time.monotonic()))
+            raise
+        finally:
+            self._finished.set()
+            self._call('leave', retry=False)
+        return self.summary()
+
+    def summary(self):
+        counts = {state: 0 for state in JOB_STATES}
+        for job in self.jobs:
+            if job.state in counts:
+                counts[job.state] += 1
+        return counts
+
+    def format_summary(self):
+        counts = self.summary()
+        return (f"{len(self.jobs)} leased jobs on {self.max_workers} workers: "
+                + ", ".join(f"{counts[state]} {state}" for state in JOB_STATES) + f", {self.lost} leases lost")
+
+
+# --- Shard Merge ---
+def find_shards(output_path):
+    """Returns the shard outputs next to an output path, one path per shard (NDJSON shards by their base path)."""
+    stem = os.path.splitext(output_path)[0]
+    shards = set()
+    for path in glob.glob(glob.escape(stem) + '.shard-*'):
+        shards.add(re.sub(r'\.\d{5}\.ndjson(\.gz|\.zst)?$', '.ndjson', path))
+    return sorted(shards)
+
+def iter_shard_rows(path):
+    """
+    Yields the rows of one shard: a CSV or JSON file, or an NDJSON output. Rows cut off
+    by a worker that was killed mid-write are skipped.
+    """
+    if '.ndjson' in os.path.basename(path) or list_segments(path):
+        yield from iter_records(path)
+    elif path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        try:
+            rows = json.loads(text)
+        except ValueError:
+            # The closing bracket is only written on close; cut after the last complete row
+            end = text.rfind('\n}')
+            rows = json.loads(text[:end + 2] + '\n]') if end >= 0 else []
+        yield from rows
+    elif os.path.isdir(path):
+        raise ValueError(f"{path}: Parquet shards cannot be merged here, read them as one dataset instead.")
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if None not in row.values():
+                    yield row
+
+def _missing_count(row):
+    missing = row.get('missing_fields')
+    if isinstance(missing, str):  # A list written to CSV, e.g. "['description', 'sound_name']"
+        return len(re.findall(r"'[^']*'", missing))
+    return len(missing or ())
+
+def merge_shards(paths, output_writer):
+    """
+    Writes the rows of every shard to output_writer, one per video_id: the one with the
+    fewest missing fields, and of those the latest scan. The shards are read twice, once
+    to pick the rows and once to write them, so memory holds a small tuple per video
+    rather than the rows. Returns (rows read, rows written).
+    """
+    best = {}
+    rows_read = 0
+    for shard, path in enumerate(paths):
+        for position, row in enumerate(iter_shard_rows(path)):
+            rows_read += 1
+            video_id = row.get('video_id')
+            if not video_id:
+                continue
+            rank = (-_missing_count(row), str(row.get('timestamp_scan') or ''))
+            current = best.get(video_id)
+            if current is None or rank > current[0]:
+                best[video_id] = (rank, shard, position)
+    keep = {(shard, position) for _, shard, position in best.values()}
+    best = None
+
+    rows_written = 0
+    for shard, path in enumerate(paths):
+        batch = []
+        for position, row in enumerate(iter_shard_rows(path)):
+            if (shard, position) in keep:
+                batch.append(row)
+                if len(batch) >= 1000:
+                    output_writer.put_many(batch)
+                    rows_written += len(batch)
+                    batch = []
+        if batch:
+            output_writer.put_many(batch)
+            rows_written += len(batch)
+    return rows_read, rows_written
+
+
+def main():
+    from config import (
+        COORDINATOR_DB_PATH, COORDINATOR_HOST, COORDINATOR_LEASE_SEC, COORDINATOR_MAX_ATTEMPTS, COORDINATOR_PORT,
+        COORDINATOR_TOKEN, CSV_HEADERS, DUMMY_ACCOUNTS, FORMAT_EXT, MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT, OUTPUT_COMPRESSION,
+        OUTPUT_ROTATE_BYTES, RAW_DATA_CSV,
+    )
+    from output_pipeline import OutputWriter, create_sink
+
+    parser = argparse.ArgumentParser(description="Lease the dummy accounts to --worker scraper processes and merge their shards.")
+    parser.add_argument('--host', default=COORDINATOR_HOST)
+    parser.add_argument('--port', type=int, default=COORDINATOR_PORT)
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help="Queue one job per account and hand them out to workers.")
+    serve_parser.add_argument('--resume', action='store_true', help="Continue the ledger of an interrupted run.")
+    serve_parser.add_argument('--keep-serving', action='store_true', help="Do not exit once every job is finished.")
+    commands.add_parser('status', help="Jobs and workers of a running coordinator.")
+    commands.add_parser('stop', help="Stop a running coordinator.")
+    merge_parser = commands.add_parser('merge', help="Combine worker shards into one output, one row per video.")
+    merge_parser.add_argument('shards', nargs='*', help=f"Shard files or NDJSON base paths (default: every shard of {RAW_DATA_CSV}).")
+    merge_parser.add_argument('--output', default=RAW_DATA_CSV.replace('.csv', '_merged.csv'),
+                              help="Output file (the extension follows --format like the scraper's output).")
+    merge_parser.add_argument('--format', default=FORMAT_EXT, help="Output format: csv, json, ndjson or parquet.")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        coordinator = Coordinator(COORDINATOR_DB_PATH, COORDINATOR_LEASE_SEC, COORDINATOR_MAX_ATTEMPTS)
+        coordinator.seed(DUMMY_ACCOUNTS, MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT, resume=args.resume)
+        try:
+            CoordinatorServer(coordinator, args.host, args.port, COORDINATOR_TOKEN).run(exit_when_done=not args.keep_serving)
+        finally:
+            coordinator.close()
+        return 0
+    if args.command == 'merge':
+        shards = args.shards or find_shards(RAW_DATA_CSV)
+        if not shards:
+            print(f"No shards found next to {RAW_DATA_CSV}.")
+            return 1
+        sink = create_sink(args.format, args.output, CSV_HEADERS, compression=OUTPUT_COMPRESSION, rotate_bytes=OUTPUT_ROTATE_BYTES)
+        existing = list_segments(sink.base_path) if args.format == 'ndjson' else [sink.filename]
+        if any(os.path.exists(path) for path in existing):
+            print(f"{existing[0]} already exists, remove it or choose another --output.")
+            return 1
+        started = time.perf_counter()
+        output_writer = OutputWriter(sink, batch_size=1000, flush_interval=5.0, fsync_policy='close', queue_maxsize=100).start()
+        try:
+            rows_read, rows_written = merge_shards(shards, output_writer)
+        finally:
+            output_writer.close()
+        elapsed = time.perf_counter() - started
+        print(f"Merged {len(shards)} shards into {output_writer.sink.filename} in {elapsed:.1f}s: {rows_read} rows read, "
+              f"{rows_written} unique videos written ({rows_read - rows_written} duplicates dropped).")
+        return 0
+
+    command = {'cmd': args.command}
+    if COORDINATOR_TOKEN:
+        command['token'] = COORDINATOR_TOKEN
+    try:
+        response = send_command(command, args.host, args.port, timeout=10)
+    except OSError as e:
+        print(f"Could not reach the coordinator on {args.host}:{args.port}: {e}")
+        return 1
+    print(json.dumps(response, indent=2))
+    return 0 if response.get('ok') else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
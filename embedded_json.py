@@ -0,0 +1,212 @@
+# embedded_json.py
+
+import json
+import re
+from collections import deque
+from datetime import datetime
+
+from extractor import parse_sound_id
+
+# Keys dropped inside the page before serializing: large player/tracking payloads
+# that never carry shorts metadata.
+DROPPED_KEYS = [
+    'streamingData', 'playerConfig', 'storyboards', 'attestation', 'adPlacements', 'playerAds',
+    'frameworkUpdates', 'responseContext', 'trackingParams', 'clickTrackingParams', 'loggingDirectives',
+    'heartbeatParams', 'playbackTracking', 'captions', 'annotations', 'endscreen', 'cards', 'messages',
+]
+
+# One round trip: the initial page data, the initial player response and the data
+# bound to every rendered reel (current and prefetched), as a single JSON string.
+# Repeated objects are serialized once, which also protects against cycles.
+EMBEDDED_JSON_SCRIPT = """
+const dropped = new Set(arguments[0]);
+const seen = new WeakSet();
+const items = [];
+const push = (source, data) => { if (data) items.push({source: source, data: data}); };
+push('initial_data', window.ytInitialData);
+push('player_response', window.ytInitialPlayerResponse);
+document.querySelectorAll('ytd-reel-video-renderer').forEach(reel => {
+    push('reel', reel.data || (reel.polymerController && reel.polymerController.data));
+});
+return JSON.stringify({url: location.href, items: items}, (key, value) => {
+    if (dropped.has(key)) return undefined;
+    if (value && typeof value === 'object') {
+        if (seen.has(value)) return undefined;
+        seen.add(value);
+    }
+    return value;
+});
+"""
+
+# Candidate locations of each field, tried in order until one yields a value. The first
+# key of a path is searched anywhere in the item (breadth-first), the remaining keys and
+# list indexes are followed from there. YouTube text objects ({'simpleText'}, {'runs'},
+# {'content'}) are flattened to plain strings.
+VIDEO_ID_PATHS = [
+    ('videoDetails', 'videoId'),
+    ('reelWatchEndpoint', 'videoId'),
+    ('currentVideoEndpoint', 'watchEndpoint', 'videoId'),
+]
+
+FIELD_PATHS = {
+    'caption': [
+        ('videoDetails', 'title'),
+        ('reelPlayerHeaderRenderer', 'reelTitleText'),
+        ('shortsVideoTitleViewModel', 'text'),
+        ('videoDescriptionHeaderRenderer', 'title'),
+    ],
+    'description': [
+        ('videoDetails', 'shortDescription'),
+        ('expandableVideoDescriptionBodyRenderer', 'attributedDescriptionBodyText'),
+    ],
+    'channel_name': [
+        ('reelChannelBarViewModel', 'channelName'),
+        ('reelPlayerHeaderRenderer', 'channelTitleText'),
+        ('videoDetails', 'author'),
+    ],
+    'raw_views_count': [
+        ('videoDetails', 'viewCount'),
+        ('videoDescriptionHeaderRenderer', 'views'),
+    ],
+    'likes_count': [
+        ('likeButtonRenderer', 'accessibility', 'label'),
+        ('likeButtonRenderer', 'likeCountWithLikeText'),
+        ('likeButtonRenderer', 'likeCount'),
+    ],
+    'comments_count': [
+        ('viewCommentsButton', 'buttonRenderer', 'accessibility', 'label'),
+        ('viewCommentsButton', 'buttonRenderer', 'text'),
+    ],
+    'remix_count': [
+        ('remixButton', 'buttonRenderer', 'accessibility', 'label'),
+        ('remixButton', 'buttonRenderer', 'text'),
+    ],
+    'upload_date': [
+        ('playerMicroformatRenderer', 'publishDate'),
+        ('videoDescriptionHeaderRenderer', 'publishDate'),
+        ('reelPlayerHeaderRenderer', 'timestampText'),
+    ],
+    'sound_name': [
+        ('reelSoundMetadata', 'musicTitle'),
+        ('pivotButtonRenderer', 'soundAttributionTitle'),
+    ],
+    'sound_artist': [
+        ('reelSoundMetadata', 'artistName'),
+        ('pivotButtonRenderer', 'soundArtist'),
+    ],
+    'sound_image_src': [
+        ('pivotButtonRenderer', 'thumbnail', 'thumbnails', 0, 'url'),
+        ('reelSoundMetadata', 'thumbnail', 'thumbnails', 0, 'url'),
+    ],
+}
+
+HASHTAG_PATTERN = re.compile(r"#[^\s#.,!?:;()\[\]{}\"']+")
+
+def _flatten_text(value):
+    """Turns a YouTube text object (or a plain value) into a string, or None."""
+    if value is None:
+        return None
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    if isinstance(value, dict):
+        if 'simpleText' in value:
+            return str(value['simpleText'])
+        if 'runs' in value:
+            return ''.join(run.get('text', '') for run in value['runs'] if isinstance(run, dict))
+        if 'content' in value:
+            return str(value['content'])
+    return None
+
+def _find_key(data, key):
+    """Breadth-first search for the first value stored under key, so the shallowest match wins."""
+    pending = deque([data])
+    while pending:
+        node = pending.popleft()
+        if isinstance(node, dict):
+            if key in node:
+                return node[key]
+            pending.extend(node.values())
+        elif isinstance(node, list):
+            pending.extend(node)
+    return None
+
+def _resolve(data, path):
+    value = _find_key(data, path[0])
+    for step in path[1:]:
+        if isinstance(step, int):
+            value = value[step] if isinstance(value, list) and len(value) > step else None
+        else:
+            value = value.get(step) if isinstance(value, dict) else None
+        if value is None:
+            return None
+    return value
+
+def _first_value(data, paths):
+    for path in paths:
+        text = _flatten_text(_resolve(data, path))
+        if text:
+            return text
+    return None
+
+def parse_capture(raw):
+    """Parses the string returned by EMBEDDED_JSON_SCRIPT (or an already decoded dict)."""
+    return json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+
+def map_capture(capture):
+    """
+    Maps every item of a capture to metadata dicts keyed by video ID, merging items that
+    describe the same video (the first item with a value wins per field). Items that
+    only carry a video ID and no metadata are left out.
+    Returns a dict {video_id: {field: value}} in discovery order.
+    """
+    videos = {}
+    for item in capture.get('items', []):
+        data = item.get('data')
+        video_id = _first_value(data, VIDEO_ID_PATHS)
+        if not video_id:
+            continue
+        fields = {}
+        for field, paths in FIELD_PATHS.items():
+            value = _first_value(data, paths)
+            if value is not None:
+                fields[field] = value
+        if not fields:
+            continue
+        merged = videos.setdefault(video_id, {})
+        for field, value in fields.items():
+            merged.setdefault(field, value)
+    return videos
+
+def build_row(video_id, fields, dummy_id, headers, base_url):
+    """Builds an output row in the CSV_HEADERS schema from mapped metadata fields; base_url is YOUTUBE_BASE_URL."""
+    caption = fields.get('caption', "Caption not found")
+    description = fields.get('description', "Description not found")
+    sound_id = parse_sound_id(fields.get('sound_image_src')) or "NaN"
+    full_video_url = f"{base_url}/shorts/{video_id}"
+    row = {
+        'timestamp_scan': datetime.now().isoformat(),
+        'dummy_account_id': dummy_id,
+        'video_id': video_id,
+        'caption': caption,
+        'hashtags_on_caption': HASHTAG_PATTERN.findall(fields.get('caption', '')),
+        'hashtags_on_description': HASHTAG_PATTERN.findall(fields.get('description', '')),
+        'description': description,
+        'channel_name': fields.get('channel_name', "Channel not found"),
+        'raw_views_count': fields.get('raw_views_count'),
+        'likes_count': fields.get('likes_count'),
+        'comments_count': fields.get('comments_count'),
+        'remix_count': fields.get('remix_count'),
+        'upload_date': fields.get('upload_date', "NaN"),
+        'extracted_keywords': "NaN",
+        'sound_id': sound_id,
+        'sound_name': fields.get('sound_name', "NaN"),
+        'sound_artist': fields.get('sound_artist', "NaN"),
+        'sound_usage': fields.get('remix_count', "NaN"),
+        'video_url_full': full_video_url,
+        'watch_duration_sec': 0,
+    }
+    return {header: row.get(header) for header in headers}
+
+def capture_embedded_json(driver):
+    """Runs the capture script in the page and returns the decoded capture dict."""
+    return parse_capture(driver.execute_script(EMBEDDED_JSON_SCRIPT, DROPPED_KEYS))
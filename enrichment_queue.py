@@ -0,0 +1,77 @@
+# enrichment_queue.py
+
+import json
+import sqlite3
+import threading
+import time
+
+class EnrichmentQueue:
+    """
+    Persistent queue of shorts that were written with missing fields, kept across runs
+    in a SQLite file and shared by all account threads. Each entry lists the extraction
+    stages that failed and the fields they left empty, so a later re-enrichment pass
+    (youtube-shorts-scraper.py --reenrich) only has to revisit those shorts instead of
+    the whole feed. An entry is removed once a complete row has been written for it,
+    and dropped after max_attempts passes that could not fill it.
+    """
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.queued = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " video_id TEXT PRIMARY KEY,"
+            " dummy_account_id TEXT,"
+            " failed_stages TEXT NOT NULL,"
+            " missing_fields TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " queued_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def add(self, video_id, dummy_id, failed_stages, missing_fields):
+        """Queues a short (or updates its entry) with the stages and fields still missing."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pending (video_id, dummy_account_id, failed_stages, missing_fields, queued_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET failed_stages = excluded.failed_stages, "
+                "missing_fields = excluded.missing_fields",
+                (video_id, dummy_id, json.dumps(sorted(failed_stages)), json.dumps(sorted(missing_fields)), time.time()),
+            )
+            self.queued += 1
+
+    def pending(self, limit=None):
+        """Returns queued entries as dicts, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, dummy_account_id, failed_stages, missing_fields, attempts FROM pending "
+                "WHERE attempts < ? ORDER BY queued_at LIMIT ?",
+                (self.max_attempts, -1 if limit is None else limit),
+            ).fetchall()
+        return [
+            {'video_id': row[0], 'dummy_account_id': row[1], 'failed_stages': json.loads(row[2]),
+             'missing_fields': json.loads(row[3]), 'attempts': row[4]}
+            for row in rows
+        ]
+
+    def record_attempt(self, video_id):
+        with self._lock:
+            self._conn.execute("UPDATE pending SET attempts = attempts + 1 WHERE video_id = ?", (video_id,))
+
+    def complete(self, video_id):
+        """Removes a short once a complete row has been written for it."""
+        with self._lock:
+            self._conn.execute("DELETE FROM pending WHERE video_id = ?", (video_id,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending WHERE attempts < ?", (self.max_attempts,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
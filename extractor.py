@@ -0,0 +1,374 @@
+# extractor.py
+
+import re
+import threading
+import time
+from collections import namedtuple
+
+from metrics import stage_timer
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is optional, the bs4 backend is used as a fallback
+    lxml = None
+    etree = None
+
+# --- Subtree Capture ---
+# CSS selectors of the DOM subtrees the scraper actually reads. Only these are
+# serialized in the browser and sent over the WebDriver wire, instead of the whole
+# multi-megabyte YouTube page returned by driver.page_source.
+SUBTREE_SELECTORS = {
+    'reel': 'ytd-reel-video-renderer',
+    'metapanel': 'div#metapanel',
+    'description_header': 'ytd-video-description-header-renderer',
+    'description_body': 'ytd-expandable-video-description-body-renderer',
+    'sound_popup': 'yt-page-header-view-model',
+}
+
+# Subtrees captured together for each interaction step of extract_shorts_data.
+FIELD_GROUPS = {
+    'core': ('reel', 'metapanel', 'description_header'),
+    'description': ('description_body',),
+    'sound': ('sound_popup',),
+}
+
+# One round trip: returns the current URL plus the outerHTML of each requested subtree.
+CAPTURE_SCRIPT = """
+const selectors = arguments[0];
+const subtrees = {};
+for (const [key, selector] of Object.entries(selectors)) {
+    const node = document.querySelector(selector);
+    subtrees[key] = node ? node.outerHTML : null;
+}
+return {url: location.href, subtrees: subtrees};
+"""
+
+# --- Selector Table ---
+# Each path is a space separated list of steps ("tag", "tag#id", "tag.class", "tag[n]").
+# Every step takes the first matching descendant of the previous match, exactly like
+# chained BeautifulSoup .find() calls; "[n]" picks the n-th match like find_all()[n].
+# 'attr' reads an attribute instead of the text, 'many' collects the text of every
+# match of that step below the path, and 'separator' is the get_text() separator.
+FieldSelector = namedtuple('FieldSelector', ['group', 'root', 'path', 'attr', 'many', 'separator', 'default'])
+
+CAPTION_PATH = 'yt-reel-metapanel-view-model yt-shorts-video-title-view-model h2 span'
+
+FIELD_SELECTORS = {
+    'caption': FieldSelector('core', 'metapanel', CAPTION_PATH, None, None, ' ', "Caption not found"),
+    'hashtags_on_caption': FieldSelector('core', 'metapanel', CAPTION_PATH, None, 'a.yt-core-attributed-string__link', '', []),
+    'channel_name': FieldSelector('core', 'reel', 'yt-reel-channel-bar-view-model span a', None, None, '', "Channel not found"),
+    'raw_views_count': FieldSelector('core', 'description_header', 'view-count-factoid-renderer span.ytwFactoidRendererValue span', None, None, '', None),
+    'likes_count': FieldSelector('core', 'reel', 'div#like-button button', 'aria-label', None, '', None),
+    'comments_count': FieldSelector('core', 'reel', 'div#comments-button button', 'aria-label', None, '', None),
+    'remix_count': FieldSelector('core', 'reel', 'div#remix-button button', 'aria-label', None, '', None),
+    'sound_pivot_href': FieldSelector('core', 'reel', 'div#pivot-button a', 'href', None, '', None),
+    'upload_date': FieldSelector('core', 'description_header', 'factoid-renderer[2] div.ytwFactoidRendererFactoid', 'aria-label', None, '', "NaN"),
+    'extracted_keywords': FieldSelector('core', 'metapanel', 'yt-shorts-suggested-action-view-model div.ytShortsSuggestedActionViewModelStaticHostPrimaryText span', None, None, ' ', "NaN"),
+    'description': FieldSelector('description', 'description_body', 'div#expanded yt-formatted-string', None, None, ' ', "Description not found"),
+    'hashtags_on_description': FieldSelector('description', 'description_body', 'div#expanded yt-formatted-string', None, 'a', '', []),
+    'sound_name': FieldSelector('sound', 'sound_popup', 'yt-dynamic-text-view-model', None, None, ' ', "NaN"),
+    'sound_artist': FieldSelector('sound', 'sound_popup', 'yt-avatar-stack-view-model', None, None, ' ', "NaN"),
+    'sound_usage': FieldSelector('sound', 'sound_popup', 'span#text.yt-core-attributed-string', None, None, ' ', None),
+    'sound_image_src': FieldSelector('sound', 'sound_popup', 'yt-content-preview-image-view-model img', 'src', None, '', None),
+}
+
+# Selector fields that are not output columns themselves: the column each one feeds,
+# or None for the ones only used to navigate.
+HELPER_FIELD_COLUMNS = {
+    'sound_image_src': 'sound_id',
+    'sound_pivot_href': None,
+}
+
+def missing_columns(missing_fields, headers):
+    """Returns the output columns in headers that the missing selector fields leave at their defaults, sorted."""
+    columns = {HELPER_FIELD_COLUMNS.get(field, field) for field in missing_fields}
+    return sorted(column for column in columns if column in headers)
+
+SOUND_ID_PATTERN = re.compile(r"https?://i\.ytimg\.com/vi/([a-zA-Z0-9_-]+)/")
+
+_STEP_PATTERN = re.compile(r"(?P<tag>[a-zA-Z0-9-]+)(?:#(?P<id>[\w-]+))?(?P<classes>(?:\.[\w-]+)*)(?:\[(?P<index>\d+)\])?")
+
+Step = namedtuple('Step', ['tag', 'id', 'classes', 'index'])
+
+def parse_step(step):
+    """Splits a selector table step such as 'span#text.yt-core-attributed-string' into its parts."""
+    match = _STEP_PATTERN.fullmatch(step)
+    if not match:
+        raise ValueError(f"Invalid selector step: {step!r}")
+    classes = tuple(c for c in match.group('classes').split('.') if c)
+    index = int(match.group('index')) if match.group('index') else 0
+    return Step(match.group('tag'), match.group('id'), classes, index)
+
+Extraction = namedtuple('Extraction', ['url', 'fields', 'missing_roots', 'missing_fields'])
+
+# --- Parser Backends ---
+class LxmlBackend:
+    """Parses subtrees with lxml, using XPath expressions compiled once from the selector table."""
+    name = 'lxml'
+
+    def __init__(self):
+        if etree is None:
+            raise ImportError("lxml is not installed.")
+        self._steps = {}
+        for selector in FIELD_SELECTORS.values():
+            for step in selector.path.split() + ([selector.many] if selector.many else []):
+                if step not in self._steps:
+                    self._steps[step] = self._compile(parse_step(step))
+        self._text = etree.XPath("descendant-or-self::text()[not(ancestor::script or ancestor::style)]")
+
+    @staticmethod
+    def _compile(step):
+        predicates = []
+        if step.id:
+            predicates.append(f"[@id='{step.id}']")
+        for css_class in step.classes:
+            predicates.append(f"[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]")
+        expression = f"descendant::{step.tag}{''.join(predicates)}"
+        return etree.XPath(expression), etree.XPath(f"{expression}[{step.index + 1}]")
+
+    def parse(self, html):
+        return lxml.html.fragment_fromstring(html)
+
+    def find(self, element, step):
+        matches = self._steps[step][1](element)
+        return matches[0] if matches else None
+
+    def find_all(self, element, step):
+        return self._steps[step][0](element)
+
+    def get_text(self, element, separator):
+        return separator.join(text.strip() for text in self._text(element) if text.strip())
+
+    def get_attr(self, element, attr):
+        return element.get(attr)
+
+
+class Bs4Backend:
+    """Pure-Python fallback that walks the same selector table with BeautifulSoup on the captured subtrees."""
+    name = 'bs4'
+
+    def __init__(self):
+        # Imported here so bs4 is only loaded when this backend is used
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+        self._steps = {}
+
+    def _matcher(self, step):
+        if step not in self._steps:
+            tag, element_id, classes, index = parse_step(step)
+            def match(node):
+                return (node.name == tag
+                        and (element_id is None or node.get('id') == element_id)
+                        and all(c in (node.get('class') or []) for c in classes))
+            self._steps[step] = (match, index)
+        return self._steps[step]
+
+    def parse(self, html):
+        soup = self._soup(html, 'html.parser')
+        return soup.find()
+
+    def find(self, element, step):
+        match, index = self._matcher(step)
+        if index == 0:
+            return element.find(match)
+        matches = element.find_all(match, limit=index + 1)
+        return matches[index] if len(matches) > index else None
+
+    def find_all(self, element, step):
+        match, _ = self._matcher(step)
+        return element.find_all(match)
+
+    def get_text(self, element, separator):
+        return element.get_text(strip=True, separator=separator)
+
+    def get_attr(self, element, attr):
+        return element.attrs.get(attr)
+
+
+EXTRACTION_BACKENDS = {
+    'lxml': LxmlBackend,
+    'bs4': Bs4Backend,
+}
+
+def get_backend(name):
+    """
+    Returns an extraction backend instance by name.
+    Falls back to the bs4 backend if the requested one cannot be loaded.
+    """
+    if name not in EXTRACTION_BACKENDS:
+        raise ValueError(f"Unknown extraction backend '{name}'. Options: {', '.join(EXTRACTION_BACKENDS)}")
+    try:
+        return EXTRACTION_BACKENDS[name]()
+    except ImportError as e:
+        print(f"Warning: Extraction backend '{name}' unavailable ({e}). Falling back to 'bs4'.")
+        return Bs4Backend()
+
+# --- Extraction Statistics ---
+class ExtractionStats:
+    """
+    Thread-safe counters for bytes transferred and parse time per short.
+    When baseline measurement is enabled, the full page is also fetched and parsed
+    the old way so the savings can be reported.
+    """
+    def __init__(self, measure_baseline=False):
+        self.measure_baseline = measure_baseline
+        self._lock = threading.Lock()
+        self.captures = 0
+        self.shorts = 0
+        self.subtree_bytes = 0
+        self.parse_seconds = 0.0
+        self.baseline_captures = 0
+        self.baseline_bytes = 0
+        self.baseline_parse_seconds = 0.0
+
+    def record_capture(self, subtree_bytes, parse_seconds):
+        with self._lock:
+            self.captures += 1
+            self.subtree_bytes += subtree_bytes
+            self.parse_seconds += parse_seconds
+
+    def record_baseline(self, page_bytes, parse_seconds):
+        with self._lock:
+            self.baseline_captures += 1
+            self.baseline_bytes += page_bytes
+            self.baseline_parse_seconds += parse_seconds
+
+    def record_short(self):
+        with self._lock:
+            self.shorts += 1
+
+    def summary(self):
+        """Returns per-short averages, plus savings against the full-page parse if it was measured."""
+        with self._lock:
+            shorts = max(self.shorts, 1)
+            summary = {
+                'shorts': self.shorts,
+                'bytes_per_short': self.subtree_bytes / shorts,
+                'parse_ms_per_short': self.parse_seconds * 1000 / shorts,
+            }
+            if self.baseline_captures:
+                # Scale both sides to the same number of captures before comparing.
+                ratio = self.captures / self.baseline_captures
+                summary['bytes_saved_per_short'] = (self.baseline_bytes * ratio - self.subtree_bytes) / shorts
+                summary['parse_ms_saved_per_short'] = (self.baseline_parse_seconds * ratio - self.parse_seconds) * 1000 / shorts
+            return summary
+
+    def format_summary(self):
+        summary = self.summary()
+        text = (f"{summary['shorts']} shorts, {summary['bytes_per_short'] / 1024:.1f} KB and "
+                f"{summary['parse_ms_per_short']:.1f} ms parse per short")
+        if 'bytes_saved_per_short' in summary:
+            text += (f" (saved {summary['bytes_saved_per_short'] / 1024:.1f} KB and "
+                     f"{summary['parse_ms_saved_per_short']:.1f} ms per short vs full-page parsing)")
+        return text
+
+# --- Extraction Engine ---
+class ExtractionEngine:
+    """
+    Captures the subtrees of one field group with a single script call and parses
+    them with the configured backend. Subtrees listed in skip_roots are neither captured
+    nor reported missing; their fields keep the defaults (e.g. when the YouTube Data
+    API provides them).
+
+    With capture_only, parse() leaves every field at its default and only keeps the
+    latest subtrees of each group, which take_captured() hands over for the capture
+    archive (see capture_archive.py); parsing happens offline instead.
+    """
+    def __init__(self, backend_name='lxml', stats=None, skip_roots=(), capture_only=False):
+        self.backend = get_backend(backend_name)
+        self.stats = stats
+        self.skip_roots = frozenset(skip_roots)
+        self.capture_only = capture_only
+        self._captured = {}
+
+    def capture(self, driver, group):
+        """Returns (url, {subtree_key: outerHTML or None}) for a field group."""
+        selectors = {key: SUBTREE_SELECTORS[key] for key in FIELD_GROUPS[group] if key not in self.skip_roots}
+        with stage_timer('capture'):
+            result = driver.execute_script(CAPTURE_SCRIPT, selectors) or {}
+        return result.get('url', ''), result.get('subtrees') or {}
+
+    def parse_group(self, group, subtrees):
+        """Parses the captured subtrees of a group and returns (fields, missing_roots, missing_fields)."""
+        roots = {}
+        missing_roots = []
+        for key in FIELD_GROUPS[group]:
+            if key in self.skip_roots:
+                continue
+            html = subtrees.get(key)
+            roots[key] = self.backend.parse(html) if html else None
+            if roots[key] is None:
+                missing_roots.append(key)
+
+        fields = {}
+        missing_fields = []
+        for name, selector in FIELD_SELECTORS.items():
+            if selector.group != group:
+                continue
+            value = self._extract_field(roots.get(selector.root), selector)
+            if value is None:
+                missing_fields.append(name)
+                value = list(selector.default) if isinstance(selector.default, list) else selector.default
+            fields[name] = value
+        return fields, missing_roots, missing_fields
+
+    def _extract_field(self, element, selector):
+        for step in selector.path.split():
+            if element is None:
+                return None
+            element = self.backend.find(element, step)
+        if element is None:
+            return None
+        if selector.many:
+            return [self.backend.get_text(match, selector.separator)
+                    for match in self.backend.find_all(element, selector.many)]
+        if selector.attr:
+            return self.backend.get_attr(element, selector.attr)
+        return self.backend.get_text(element, selector.separator)
+
+    def default_fields(self, group):
+        """Returns the fields of a group at their defaults."""
+        return {name: list(selector.default) if isinstance(selector.default, list) else selector.default
+                for name, selector in FIELD_SELECTORS.items() if selector.group == group}
+
+    def take_captured(self):
+        """Returns {group: subtrees} captured since the last call (capture_only mode) and starts over."""
+        captured, self._captured = self._captured, {}
+        return captured
+
+    def parse(self, driver, group, url, subtrees):
+        """Parses already captured subtrees of a group and records the extraction statistics."""
+        if self.capture_only:
+            # A retry captures the group again, so the latest subtrees replace the earlier ones
+            self._captured[group] = {key: html for key, html in subtrees.items() if html}
+            missing_roots = [key for key in FIELD_GROUPS[group] if key not in self.skip_roots and not subtrees.get(key)]
+            fields, missing_fields, parse_seconds = self.default_fields(group), [], 0.0
+        else:
+            with stage_timer('parse'):
+                started = time.perf_counter()
+                fields, missing_roots, missing_fields = self.parse_group(group, subtrees)
+                parse_seconds = time.perf_counter() - started
+
+        if self.stats is not None:
+            subtree_bytes = sum(len(html.encode('utf-8')) for html in subtrees.values() if html)
+            self.stats.record_capture(subtree_bytes, parse_seconds)
+            if self.stats.measure_baseline:
+                from bs4 import BeautifulSoup  # Only loaded to measure the old full-page parse
+                with stage_timer('page_source'):
+                    page_source = driver.page_source
+                started = time.perf_counter()
+                BeautifulSoup(page_source, 'html.parser')
+                self.stats.record_baseline(len(page_source.encode('utf-8')), time.perf_counter() - started)
+
+        return Extraction(url, fields, missing_roots, missing_fields)
+
+    def extract(self, driver, group):
+        """Captures and parses one field group from the live page."""
+        url, subtrees = self.capture(driver, group)
+        return self.parse(driver, group, url, subtrees)
+
+def parse_sound_id(sound_img_src):
+    """Extracts the sound ID from an i.ytimg.com thumbnail URL, or None if it doesn't match."""
+    match = SOUND_ID_PATTERN.search(sound_img_src or '')
+    return match.group(1) if match else None
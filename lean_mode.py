@@ -0,0 +1,86 @@
+# lean_mode.py
+
+import json
+
+from selenium.common.exceptions import WebDriverException
+
+# URL patterns (DevTools wildcards) dropped by the browser in lean mode: video streams,
+# fonts and the images the scraper never reads. Avatars, animated previews, storyboards
+# and the large Shorts thumbnail variants are blocked; i.ytimg.com/vi/<id>/hqdefault.jpg
+# and default.jpg stay allowed because the sound pop-up thumbnail uses them, and its
+# src is what sound_id is parsed from.
+DEFAULT_BLOCKED_URL_PATTERNS = (
+    # Video and audio streams
+    '*googlevideo.com/videoplayback*',
+    '*googlevideo.com/initplayback*',
+    # Fonts
+    '*fonts.gstatic.com/*',
+    '*.woff2*',
+    '*.woff?*',
+    '*.ttf*',
+    # Images other than the sound thumbnail
+    '*yt3.ggpht.com/*',
+    '*yt3.googleusercontent.com/*',
+    '*i.ytimg.com/vi_webp/*',
+    '*i.ytimg.com/an_webp/*',
+    '*i.ytimg.com/sb/*',
+    '*/oardefault*',
+    '*/oar2*',
+    '*/hq720*',
+    '*/maxresdefault*',
+    '*/sddefault*',
+    '*/mqdefault*',
+    '*/frame0*',
+)
+
+# Extra Chrome switches of the lean profile (headless is set by init_undetected_driver).
+LEAN_CHROME_ARGUMENTS = (
+    '--disable-remote-fonts',
+)
+
+def apply_lean_options(options):
+    for argument in LEAN_CHROME_ARGUMENTS:
+        options.add_argument(argument)
+
+def block_urls(driver, patterns=DEFAULT_BLOCKED_URL_PATTERNS):
+    """Makes the browser fail requests matching any pattern, for the lifetime of the tab."""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+
+
+class TransferMeter:
+    """
+    Adds up the bytes the browser received (encoded size, headers included) from the
+    DevTools network events in chromedriver's performance log, and counts the requests
+    lean mode blocked. Requires a driver created with enable_performance_logging().
+    NetworkCapture can feed it the entries it reads, since reading the log drains it.
+    """
+    def __init__(self, driver):
+        self.driver = driver
+        self.bytes_received = 0
+        self.requests = 0
+        self.blocked = 0
+
+    def consume(self, entries):
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            if method == 'Network.loadingFinished':
+                self.bytes_received += int(message.get('params', {}).get('encodedDataLength') or 0)
+                self.requests += 1
+            elif method == 'Network.loadingFailed' and message.get('params', {}).get('blockedReason'):
+                self.blocked += 1
+
+    def poll(self):
+        try:
+            self.consume(self.driver.get_log('performance'))
+        except WebDriverException as e:
+            print(f"Transfer meter: Could not read the performance log: {e}")
+
+    def format_summary(self, shorts):
+        per_short = self.bytes_received / shorts if shorts else 0
+        return (f"{self.bytes_received / (1024 * 1024):.1f} MB over {self.requests} requests, "
+                f"{per_short / 1024:.0f} KB per short, {self.blocked} requests blocked")
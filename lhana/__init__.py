@@ -0,0 +1,36 @@
+# lhana/__init__.py
+# Importable entry point for the scraper and its tools:
+#   python -m lhana --help
+#   from lhana import load_scraper
+#
+# The modules themselves stay flat in the repository root. Importing this package
+# loads none of them; lhana/cli.py imports each one only when its command runs.
+
+import importlib.util
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRAPER_PATH = os.path.join(REPO_DIR, 'youtube-shorts-scraper.py')
+SCRAPER_MODULE = 'youtube_shorts_scraper'
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+def load_scraper():
+    """
+    Imports youtube-shorts-scraper.py as the module youtube_shorts_scraper (its file
+    name is not importable) and returns it. Loaded once per process; importing it
+    starts no browser and reads no screen, main() does that.
+    """
+    scraper = sys.modules.get(SCRAPER_MODULE)
+    if scraper is None:
+        spec = importlib.util.spec_from_file_location(SCRAPER_MODULE, SCRAPER_PATH)
+        scraper = importlib.util.module_from_spec(spec)
+        sys.modules[SCRAPER_MODULE] = scraper
+        try:
+            spec.loader.exec_module(scraper)
+        except BaseException:
+            del sys.modules[SCRAPER_MODULE]
+            raise
+    return scraper
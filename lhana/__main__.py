@@ -0,0 +1,9 @@
+# lhana/__main__.py
+# Runs the command-line interface: python -m lhana <command> [arguments]
+
+import sys
+
+from lhana.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
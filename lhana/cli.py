@@ -0,0 +1,123 @@
+# lhana/cli.py
+# One command-line entry point for scraping, the offline tools and the benchmarks.
+#
+# Usage:
+#   python -m lhana scrape [--daemon | --reenrich | --rescan | --worker HOST:PORT]
+#   python -m lhana resume
+#   python -m lhana post-process normalize lhana_shorts_raw_data.csv
+#   python -m lhana post-process archive extract --workers 8
+#   python -m lhana coordinator serve
+#   python -m lhana bench extract
+#   python -m lhana bench import
+#
+# Every command imports its module only when it runs, so --help and the offline tools
+# start without Selenium, Chrome, pandas or a display. The arguments after the command
+# (or tool) name are passed on unchanged to that module's own parser.
+
+import argparse
+import importlib
+import os
+import runpy
+import sys
+
+from lhana import REPO_DIR, load_scraper
+
+PROG = 'python -m lhana'
+BENCHMARKS_DIR = os.path.join(REPO_DIR, 'benchmarks')
+
+# Command name -> help line.
+COMMANDS = {
+    'scrape': "Scrape the Shorts feed (the options of youtube-shorts-scraper.py).",
+    'resume': "Continue an interrupted scrape from its checkpoint journal.",
+    'post-process': "Run an offline tool on the scraped data.",
+    'coordinator': "Serve, inspect or stop the multi-node coordinator, merge its shards.",
+    'daemon': "Send jobs and commands to a running browser daemon.",
+    'bench': "Run a benchmark or check from benchmarks/.",
+}
+
+# Tool name -> (module, leading arguments, help line). A leading subcommand named like its
+# tool (merge) already names itself in the module's usage line.
+POST_PROCESS_TOOLS = {
+    'normalize': ('normalize', [], "Typed count and date columns from the raw output."),
+    'parquet': ('parquet_dataset', [], "Import, compact and query the Parquet dataset."),
+    'archive': ('capture_archive', [], "Inspect the capture archive and re-extract it."),
+    'index': ('trend_index', [], "Build and query the hashtag / keyword / sound / channel index."),
+    'sketch': ('trend_sketch', [], "Query, merge and build the trend sketches."),
+    'catalog': ('rescan_scheduler', [], "Video catalog status and snapshot history."),
+    'merge': ('coordinator', ['merge'], "Combine worker shards into one output."),
+    'ndjson': ('ndjson_reader', [], "Stream records from NDJSON output."),
+}
+
+# Commands that hand over to a module's main() as a whole.
+MODULE_COMMANDS = {
+    'coordinator': 'coordinator',
+    'daemon': 'browser_daemon',
+}
+
+def benchmark_scripts():
+    """Benchmark name -> script path: bench_extract.py is 'extract', checks keep their file name."""
+    scripts = {}
+    for filename in sorted(os.listdir(BENCHMARKS_DIR)):
+        name, extension = os.path.splitext(filename)
+        if extension != '.py' or name in ('harness', 'mock_shorts_site', 'record_fixtures'):
+            continue
+        scripts[name[len('bench_'):] if name.startswith('bench_') else name] = os.path.join(BENCHMARKS_DIR, filename)
+    return scripts
+
+def _listing(title, entries):
+    width = max(len(name) for name in entries) + 2
+    return f"{title}:\n" + "\n".join(f"  {name:<{width}}{help_text}" for name, help_text in entries.items())
+
+def _choice_parser(prog, description, dest, entries, title):
+    """A parser for the first word only; the remaining arguments belong to the chosen command."""
+    parser = argparse.ArgumentParser(prog=prog, description=description, epilog=_listing(title, entries),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     usage=f"{prog} <{dest}> [arguments]")
+    parser.add_argument(dest, choices=list(entries), metavar=f"<{dest}>", help=argparse.SUPPRESS)
+    return parser
+
+def run_main(module, prog, argv, **kwargs):
+    """Runs a module's main(**kwargs) as if it had been started as prog with argv."""
+    saved_argv = sys.argv
+    sys.argv = [prog] + argv
+    try:
+        return module.main(**kwargs)
+    finally:
+        sys.argv = saved_argv
+
+def run_benchmark(path, argv):
+    saved_path, saved_argv = list(sys.path), sys.argv
+    sys.path.insert(0, BENCHMARKS_DIR)
+    sys.argv = [path] + argv
+    try:
+        runpy.run_path(path, run_name='__main__')
+    finally:
+        sys.path[:], sys.argv = saved_path, saved_argv
+    return 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = _choice_parser(PROG, "LHANA YouTube Shorts scraper and tools.", 'command', COMMANDS, 'commands')
+    command = parser.parse_args(argv[:1]).command
+    rest = argv[1:]
+
+    if command == 'scrape':
+        return run_main(load_scraper(), f"{PROG} scrape", rest)
+    if command == 'resume':
+        return run_main(load_scraper(), f"{PROG} resume", rest, resume=True)
+    if command in MODULE_COMMANDS:
+        return run_main(importlib.import_module(MODULE_COMMANDS[command]), f"{PROG} {command}", rest)
+
+    if command == 'post-process':
+        tools = {name: help_text for name, (_, _, help_text) in POST_PROCESS_TOOLS.items()}
+        tool_parser = _choice_parser(f"{PROG} post-process", "Offline tools for the scraped data.", 'tool', tools, 'tools')
+        tool = tool_parser.parse_args(rest[:1]).tool
+        module, leading, _ = POST_PROCESS_TOOLS[tool]
+        prog = f"{PROG} post-process" if leading[:1] == [tool] else f"{PROG} post-process {tool}"
+        return run_main(importlib.import_module(module), prog, leading + rest[1:])
+
+    scripts = benchmark_scripts()
+    names = {name: os.path.relpath(path, REPO_DIR) for name, path in scripts.items()}
+    bench_parser = _choice_parser(f"{PROG} bench", "Benchmarks and checks; most run offline.", 'benchmark', names, 'benchmarks')
+    name = bench_parser.parse_args(rest[:1]).benchmark
+    return run_benchmark(scripts[name], rest[1:])
@@ -0,0 +1,301 @@
+# metrics.py
+
+import bisect
+import json
+import os
+import threading
+import time
+
+# Upper bounds (in seconds) of the latency histogram buckets: 0.25 ms to ~6 min,
+# each bucket sqrt(2) wider than the previous one.
+BUCKET_BOUNDS = tuple(0.00025 * 2 ** (i / 2) for i in range(42))
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Stages timed by the scraper, in report order.
+STAGES = (
+    'driver_init', 'wait_reel', 'capture', 'parse', 'page_source',
+    'click_description', 'click_sound', 'navigate', 'ready', 'dwell', 'write',
+)
+
+class Histogram:
+    """Fixed-bucket latency histogram. Histograms with the same buckets can be merged."""
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Estimates a quantile by linear interpolation inside the bucket that holds it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKET_BOUNDS[i - 1] if i > 0 else 0.0
+                upper = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_sec': round(self.total, 6),
+            'max_sec': round(self.max, 6),
+            **{f'p{int(q * 100)}_sec': round(self.quantile(q), 6) for q in QUANTILES},
+        }
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'started')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+
+class ScrapeMetrics:
+    """
+    Per-stage latency histograms and shorts throughput, per account and for the whole
+    run. Each thread binds the account it works for with bind_account(), so stage
+    timers deep in the call stack are attributed without passing the account around.
+    Stages timed outside an account (e.g. the writer thread) are only reported globally.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._histograms = {}  # (stage, account) -> Histogram
+        self._shorts = {}  # account -> count
+        self._account_started = {}  # account -> time.time() of the first bind
+        self._account_finished = {}  # account -> time.time() of the last unbind
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Clears every histogram and counter and restarts the run clock, e.g. between benchmark rounds."""
+        with self._lock:
+            self.started_at = time.time()
+            self._histograms = {}
+            self._shorts = {}
+            self._account_started = {}
+            self._account_finished = {}
+
+    def bind_account(self, account):
+        """
+        Attributes the stages timed by this thread to account. None unbinds the current
+        account, which also ends its throughput window.
+        """
+        previous = getattr(self._local, 'account', None)
+        self._local.account = account
+        with self._lock:
+            if account is not None:
+                self._account_started.setdefault(account, time.time())
+                self._account_finished.pop(account, None)
+            elif previous is not None:
+                self._account_finished[previous] = time.time()
+
+    def timer(self, stage):
+        """Context manager timing one stage for the account bound to this thread."""
+        return _StageTimer(self, stage) if self.enabled else _NULL_TIMER
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        key = (stage, getattr(self._local, 'account', None))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def record_shorts(self, count):
+        """Counts scraped shorts for the account bound to this thread."""
+        if not self.enabled:
+            return
+        account = getattr(self._local, 'account', None)
+        with self._lock:
+            self._shorts[account] = self._shorts.get(account, 0) + count
+
+    def _snapshot(self):
+        with self._lock:
+            histograms = {}
+            for key, histogram in self._histograms.items():
+                copy = histograms[key] = Histogram()
+                copy.merge(histogram)
+            now = time.time()
+            windows = {account: self._account_finished.get(account, now) - started
+                       for account, started in self._account_started.items()}
+            return histograms, dict(self._shorts), windows
+
+    @staticmethod
+    def _stage_order(stage):
+        return (STAGES.index(stage) if stage in STAGES else len(STAGES), stage)
+
+    def summary(self):
+        """Returns the per-account and global stage summaries and the throughput as a dict."""
+        histograms, shorts, account_windows = self._snapshot()
+        now = time.time()
+        accounts = {}
+        overall = {}
+        for (stage, account), histogram in sorted(histograms.items(), key=lambda item: (self._stage_order(item[0][0]), str(item[0][1]))):
+            overall.setdefault(stage, Histogram()).merge(histogram)
+            if account is not None:
+                accounts.setdefault(account, {'stages': {}})['stages'][stage] = histogram.summary()
+        for account, window in account_windows.items():
+            entry = accounts.setdefault(account, {'stages': {}})
+            entry['shorts'] = shorts.get(account, 0)
+            entry['active_sec'] = round(window, 3)
+            entry['shorts_per_minute'] = round(entry['shorts'] / max(window, 1e-9) * 60, 3)
+        total_shorts = sum(shorts.values())
+        return {
+            'generated_at': now,
+            'elapsed_sec': round(now - self.started_at, 3),
+            'shorts': total_shorts,
+            'shorts_per_minute': round(total_shorts / max(now - self.started_at, 1e-9) * 60, 3),
+            'stages': {stage: histogram.summary() for stage, histogram in overall.items()},
+            'accounts': accounts,
+        }
+
+    def format_prometheus(self):
+        """Renders the metrics in the Prometheus text exposition format."""
+        histograms, shorts, account_windows = self._snapshot()
+        now = time.time()
+        lines = [
+            '# HELP lhana_scrape_stage_seconds Time spent per scrape stage and account.',
+            '# TYPE lhana_scrape_stage_seconds histogram',
+        ]
+        overall = {}
+        for (stage, account), histogram in sorted(histograms.items(), key=lambda item: (self._stage_order(item[0][0]), str(item[0][1]))):
+            overall.setdefault(stage, Histogram()).merge(histogram)
+            labels = f'stage="{_escape(stage)}",account="{_escape(account if account is not None else "")}"'
+            cumulative = 0
+            for bound, n in zip(BUCKET_BOUNDS, histogram.counts):
+                cumulative += n
+                lines.append(f'lhana_scrape_stage_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'lhana_scrape_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'lhana_scrape_stage_seconds_sum{{{labels}}} {histogram.total:.6f}')
+            lines.append(f'lhana_scrape_stage_seconds_count{{{labels}}} {histogram.count}')
+
+        lines += [
+            '# HELP lhana_scrape_stage_latency_seconds Stage latency quantiles over all accounts.',
+            '# TYPE lhana_scrape_stage_latency_seconds summary',
+        ]
+        for stage, histogram in overall.items():
+            for q in QUANTILES:
+                lines.append(f'lhana_scrape_stage_latency_seconds{{stage="{_escape(stage)}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+            lines.append(f'lhana_scrape_stage_latency_seconds_sum{{stage="{_escape(stage)}"}} {histogram.total:.6f}')
+            lines.append(f'lhana_scrape_stage_latency_seconds_count{{stage="{_escape(stage)}"}} {histogram.count}')
+
+        lines += [
+            '# HELP lhana_shorts_scraped_total Shorts scraped per account.',
+            '# TYPE lhana_shorts_scraped_total counter',
+        ]
+        for account in sorted(account_windows):
+            lines.append(f'lhana_shorts_scraped_total{{account="{_escape(account)}"}} {shorts.get(account, 0)}')
+        lines += [
+            '# HELP lhana_shorts_per_minute Scrape throughput per account while it was running.',
+            '# TYPE lhana_shorts_per_minute gauge',
+        ]
+        for account, window in sorted(account_windows.items()):
+            rate = shorts.get(account, 0) / max(window, 1e-9) * 60
+            lines.append(f'lhana_shorts_per_minute{{account="{_escape(account)}"}} {rate:.3f}')
+        lines += [
+            '# HELP lhana_run_shorts_per_minute Scrape throughput of the whole run.',
+            '# TYPE lhana_run_shorts_per_minute gauge',
+            f'lhana_run_shorts_per_minute {sum(shorts.values()) / max(now - self.started_at, 1e-9) * 60:.3f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, prometheus_path=None, json_path=None):
+        """Writes the Prometheus text file and/or the JSON summary, replacing each file atomically."""
+        if prometheus_path:
+            _write_atomic(prometheus_path, self.format_prometheus())
+        if json_path:
+            _write_atomic(json_path, json.dumps(self.summary(), indent=2))
+
+    def format_summary(self):
+        """Short human-readable report: throughput and the slowest stages by total time."""
+        summary = self.summary()
+        stages = sorted(summary['stages'].items(), key=lambda item: item[1]['total_sec'], reverse=True)
+        parts = [f"{stage} {s['total_sec']:.1f}s (p50 {s['p50_sec'] * 1000:.0f} ms, p99 {s['p99_sec'] * 1000:.0f} ms)" for stage, s in stages[:5]]
+        return f"{summary['shorts']} shorts, {summary['shorts_per_minute']:.2f}/min. Top stages: " + '; '.join(parts)
+
+
+class MetricsDumper:
+    """Background thread rewriting the metrics files every interval seconds during the run."""
+    def __init__(self, metrics, interval, prometheus_path=None, json_path=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.prometheus_path = prometheus_path
+        self.json_path = json_path
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-dumper', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.metrics.write(self.prometheus_path, self.json_path)
+            except OSError as e:
+                print(f"Metrics: Error writing live metrics: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _write_atomic(path, content):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+# Registry shared by every module of the scraper.
+METRICS = ScrapeMetrics()
+
+def stage_timer(stage):
+    """Shorthand for METRICS.timer(stage)."""
+    return METRICS.timer(stage)
@@ -0,0 +1,132 @@
+# ndjson_reader.py
+# Streaming reader for the NDJSON output (FORMAT_EXT = 'ndjson').
+#
+# Usage:
+#   python ndjson_reader.py lhana_shorts_raw_data.ndjson            # print every record
+#   python ndjson_reader.py lhana_shorts_raw_data.ndjson --follow   # keep tailing a running scrape
+#
+# Records are decoded incrementally from the raw bytes, so files are never loaded into
+# memory and segments that are still being written (even compressed ones) can be read
+# up to the last flushed record. Lines that do not decode (e.g. a record cut off when a run
+# was killed) are skipped and reported on stderr instead of ending the stream.
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, only needed for .zst segments
+    zstandard = None
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_SEGMENT_PATTERN = re.compile(r"\.(\d{5})\.ndjson(\.gz|\.zst)?$")
+
+def list_segments(base_path):
+    """Returns the segment files of an NDJSON output, ordered by segment number."""
+    stem = base_path[:-len('.ndjson')] if base_path.endswith('.ndjson') else base_path
+    segments = []
+    for path in glob.glob(glob.escape(stem) + '.*.ndjson*'):
+        match = _SEGMENT_PATTERN.search(path)
+        if match and path[:match.start()] == stem:
+            segments.append((int(match.group(1)), path))
+    return [path for _, path in sorted(segments)]
+
+
+class _Decoder:
+    """Incremental decoder for one segment file; handles multi-member gzip and multi-frame zstd."""
+    def __init__(self, path):
+        if path.endswith('.gz'):
+            self._new = lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif path.endswith('.zst'):
+            if zstandard is None:
+                raise ImportError("Reading .zst segments requires the 'zstandard' package (pip install zstandard).")
+            self._new = lambda: zstandard.ZstdDecompressor().decompressobj()
+        else:
+            self._new = None
+        self._decompressor = self._new() if self._new else None
+
+    def decode(self, data):
+        if self._decompressor is None:
+            return data
+        output = []
+        while data:
+            output.append(self._decompressor.decompress(data))
+            if not self._decompressor.eof:
+                break
+            # End of one gzip member / zstd frame: continue with the next one.
+            data = self._decompressor.unused_data
+            self._decompressor = self._new()
+        return b''.join(output)
+
+
+class SegmentReader:
+    """Reads complete records from one segment, remembering its position between calls."""
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.skipped = 0
+        self._decoder = _Decoder(path)
+        self._pending = b''
+
+    def read_records(self):
+        """Yields every complete record appended since the last call."""
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while True:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.offset += len(chunk)
+                self._pending += self._decoder.decode(chunk)
+                *lines, self._pending = self._pending.split(b'\n')
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError as e:
+                        self.skipped += 1
+                        print(f"{self.path}: Skipped an undecodable line ({e}).", file=sys.stderr)
+                        continue
+                    yield record
+
+def iter_records(base_path, follow=False, poll_interval=1.0):
+    """
+    Lazily yields every record of an NDJSON output across all its segments.
+    With follow=True it keeps polling for new records and new segments, like tail -f.
+    A plain file path (not a segment base) is read as a single file.
+    """
+    readers = {}
+    while True:
+        paths = list_segments(base_path) or ([base_path] if os.path.isfile(base_path) else [])
+        for path in paths:
+            if path not in readers:
+                readers[path] = SegmentReader(path)
+            yield from readers[path].read_records()
+        if not follow:
+            return
+        time.sleep(poll_interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream records from the scraper's NDJSON output.")
+    parser.add_argument('path', help="NDJSON base path (e.g. lhana_shorts_raw_data.ndjson) or a single segment file.")
+    parser.add_argument('--follow', '-f', action='store_true', help="Keep waiting for new records.")
+    parser.add_argument('--interval', type=float, default=1.0, help="Polling interval in seconds with --follow.")
+    args = parser.parse_args()
+
+    try:
+        for record in iter_records(args.path, follow=args.follow, poll_interval=args.interval):
+            print(json.dumps(record, ensure_ascii=False))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# network_capture.py
+
+import base64
+import json
+
+from selenium.common.exceptions import WebDriverException
+
+from embedded_json import map_capture
+
+# Shorts feed endpoints whose JSON responses carry shorts metadata.
+DEFAULT_URL_PATTERNS = (
+    '/youtubei/v1/reel/reel_watch_sequence',
+    '/youtubei/v1/reel/reel_item_watch',
+    '/youtubei/v1/player',
+)
+
+# Some YouTube responses start with this anti-JSON-hijacking prefix.
+XSSI_PREFIX = ")]}'"
+
+def enable_performance_logging(options):
+    """Makes chromedriver record DevTools network events in the 'performance' log."""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+def decode_body(body, base64_encoded=False):
+    """Decodes a Network.getResponseBody result into JSON, or None if it is not JSON."""
+    if base64_encoded:
+        body = base64.b64decode(body).decode('utf-8', errors='replace')
+    body = body.lstrip()
+    if body.startswith(XSSI_PREFIX):
+        body = body[len(XSSI_PREFIX):]
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+def split_response_items(url, response):
+    """
+    Splits one API response into per-video items for map_capture: a reel watch
+    sequence holds one entry per upcoming short, other responses describe one video.
+    """
+    entries = response.get('entries') if isinstance(response, dict) else None
+    if isinstance(entries, list):
+        return [{'source': url, 'data': entry} for entry in entries]
+    return [{'source': url, 'data': response}]
+
+
+class NetworkCapture:
+    """
+    Picks the Shorts feed API responses out of the browser's DevTools network events
+    (read from chromedriver's performance log) and decodes each one as soon as it has
+    finished loading. Requires a driver created with enable_performance_logging().
+    """
+    def __init__(self, driver, url_patterns=DEFAULT_URL_PATTERNS, transfer_meter=None):
+        self.driver = driver
+        self.url_patterns = tuple(url_patterns)
+        self.transfer_meter = transfer_meter
+        self.responses = 0
+        self.response_bytes = 0
+        self.errors = 0
+        self._pending = {}
+
+    def _matches(self, url):
+        return any(pattern in url for pattern in self.url_patterns)
+
+    def _fetch_body(self, request_id):
+        try:
+            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except WebDriverException as e:
+            # The body is gone if the browser evicted it before we asked for it.
+            self.errors += 1
+            print(f"Network capture: Could not read response body for request {request_id}: {e}")
+            return None
+        self.response_bytes += len(result.get('body', ''))
+        return decode_body(result.get('body', ''), result.get('base64Encoded', False))
+
+    def process_log_entries(self, entries):
+        """Yields (url, decoded JSON) for every matching response finished in these log entries."""
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.responseReceived':
+                url = params.get('response', {}).get('url', '')
+                if self._matches(url):
+                    self._pending[params.get('requestId')] = url
+            elif method == 'Network.loadingFinished' and params.get('requestId') in self._pending:
+                url = self._pending.pop(params['requestId'])
+                response = self._fetch_body(params['requestId'])
+                if response is not None:
+                    self.responses += 1
+                    yield url, response
+            elif method == 'Network.loadingFailed':
+                self._pending.pop(params.get('requestId'), None)
+
+    def poll(self):
+        """Returns the (url, JSON) responses that finished since the last poll."""
+        entries = self.driver.get_log('performance')
+        if self.transfer_meter is not None:
+            self.transfer_meter.consume(entries)
+        return list(self.process_log_entries(entries))
+
+    def drain_videos(self):
+        """Maps every response captured since the last call to {video_id: fields}."""
+        items = []
+        for url, response in self.poll():
+            items.extend(split_response_items(url, response))
+        return map_capture({'items': items})
@@ -0,0 +1,277 @@
+# normalize.py
+# Turns the raw scraper output into typed columns: integer counts and absolute timestamps.
+#
+# Usage:
+#   python normalize.py lhana_shorts_raw_data.csv -o lhana_shorts_normalized.csv
+#   python normalize.py lhana_shorts_raw_data.ndjson -o lhana_shorts_normalized.ndjson --chunksize 200000
+#
+# The raw counts are the display strings and aria-labels YouTube shows ("1.2K", "View 321
+# comments", "suka video ini bersama 1,2 rb orang lainnya") and upload_date is a label such
+# as "Mar 3, 2025", "17 Feb 2025" or "3 hari yang lalu". Every column is parsed with pandas
+# string operations over a whole chunk at a time, using the English and Indonesian tables
+# below, and the input is read in chunks so memory stays bounded for any history size.
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ndjson_reader import iter_records, list_segments
+
+# Raw count columns and the typed columns they are normalized into.
+COUNT_COLUMNS = {
+    'raw_views_count': 'views',
+    'likes_count': 'likes',
+    'comments_count': 'comments',
+    'remix_count': 'remixes',
+    'sound_usage': 'sound_uses',
+}
+
+# --- Locale Tables ---
+# 'multipliers' maps the abbreviation after a number (lowercase) to its factor; note that
+# "M" is a million in English but a billion (miliar) in Indonesian. 'zero_phrases' are
+# labels that mean a count of zero. Month keys are the first three letters of the name.
+LOCALES = {
+    'en': {
+        'thousands_separator': ',',
+        'decimal_separator': '.',
+        'multipliers': {'k': 1e3, 'm': 1e6, 'b': 1e9},
+        'zero_phrases': ('no views', 'no likes', 'no comments'),
+        'months': {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+                   'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12},
+        'relative_units': {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400,
+                           'week': 604800, 'month': 2592000, 'year': 31536000},
+        'relative_suffix': r'ago',
+        # Words only found in this locale's labels, used to detect a row's locale
+        'markers': ('views', 'other people', 'comments', 'like this video', 'ago'),
+    },
+    'id': {
+        'thousands_separator': '.',
+        'decimal_separator': ',',
+        'multipliers': {'rb': 1e3, 'ribu': 1e3, 'jt': 1e6, 'juta': 1e6, 'm': 1e9, 'mlr': 1e9, 'miliar': 1e9},
+        'zero_phrases': ('tidak ada komentar', 'belum ada komentar', 'tidak ada penayangan'),
+        'months': {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'mei': 5, 'jun': 6,
+                   'jul': 7, 'agu': 8, 'agt': 8, 'sep': 9, 'okt': 10, 'nov': 11, 'des': 12},
+        'relative_units': {'detik': 1, 'menit': 60, 'jam': 3600, 'hari': 86400,
+                           'minggu': 604800, 'bulan': 2592000, 'tahun': 31536000},
+        'relative_suffix': r'(?:yang )?lalu',
+        'markers': ('suka', 'orang lainnya', 'komentar', 'lihat', 'ditonton', 'tayangan', 'rb', 'jt', 'lalu'),
+    },
+}
+
+# A number with its separators, optionally followed by a unit word ("1.2K", "1,2 rb", "12,345 other").
+COUNT_PATTERN = r'(?P<number>\d(?:[\d.,]*\d)?)\s*(?P<suffix>[^\W\d_]+)?'
+_COUNT_REGEX = re.compile(COUNT_PATTERN)
+# Absolute dates: month first ("Mar 3, 2025") or day first ("17 Feb 2025", "3 Mei 2025").
+MONTH_FIRST_PATTERN = r'(?P<month>[^\W\d_]{3})[^\W\d_]*\.?\s+(?P<day>\d{1,2}),?\s+(?P<year>\d{4})'
+DAY_FIRST_PATTERN = r'(?P<day>\d{1,2})\s+(?P<month>[^\W\d_]{3})[^\W\d_]*\.?\s+(?P<year>\d{4})'
+RELATIVE_PATTERN = (r'(?P<amount>\d+)\s+(?P<unit>[^\W\d_]+?)s?\s+(?:'
+                    + '|'.join(locale['relative_suffix'] for locale in LOCALES.values()) + r')\b')
+ISO_TIMESTAMP_PATTERN = r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}'
+
+# Month names and relative units do not clash between the locales, so one merged table serves both.
+ALL_MONTHS = {name: number for locale in LOCALES.values() for name, number in locale['months'].items()}
+ALL_RELATIVE_UNITS = {name: seconds for locale in LOCALES.values() for name, seconds in locale['relative_units'].items()}
+
+def _phrase_pattern(phrases):
+    return '|'.join(re.escape(phrase) for phrase in phrases)
+
+def _word_pattern(phrases):
+    """Matches any of the phrases as whole words (a digit may touch them, as in "1,2rb")."""
+    return rf"(?<![^\W\d_])(?:{_phrase_pattern(phrases)})(?![^\W\d_])"
+
+def _to_float(strings):
+    """Numeric strings (possibly missing) as a float array with NaN gaps."""
+    return pd.to_numeric(strings, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+def _per_label(series, parse, missing):
+    """
+    Applies a vectorized parse to the distinct labels of a column only, then maps the
+    results back to every row. Scraped labels repeat a lot ("Remix", dates, small counts),
+    so this parses far fewer strings than there are rows. parse takes a Series of labels
+    and returns an array; missing is the result for empty cells.
+    """
+    codes, labels = pd.factorize(series)
+    parsed = np.asarray(parse(pd.Series(labels, dtype=object)))
+    # Missing cells have code -1, which picks the appended missing value
+    return np.append(parsed, np.array([missing], dtype=parsed.dtype))[codes]
+
+# --- Vectorized Parsing ---
+def detect_locale(frame, default_locale='en'):
+    """
+    Returns each row's locale ('en' or 'id') from the wording of its count labels. Rows
+    without any marker word (e.g. only "Remix" and bare numbers) get default_locale.
+    """
+    # One pass per column: group 1 matches an Indonesian marker, group 2 an English one
+    pattern = f"({_word_pattern(LOCALES['id']['markers'])})|({_word_pattern(LOCALES['en']['markers'])})"
+    locale = np.full(len(frame), '', dtype=object)
+    for column in ('likes_count', 'comments_count', 'raw_views_count', 'sound_usage', 'upload_date'):
+        undecided = locale == ''
+        if column not in frame or not undecided.any():
+            continue
+        def classify(labels):
+            marker = labels.str.extract(pattern, flags=re.IGNORECASE)
+            return np.select([marker[0].notna().to_numpy(), marker[1].notna().to_numpy()], ['id', 'en'], '').astype(object)
+        locale[undecided] = _per_label(frame[column][undecided], classify, '')
+    locale[locale == ''] = default_locale
+    return pd.Series(locale, index=frame.index)
+
+def _parse_count_labels(labels, table):
+    """Count labels of one locale -> float array (NaN where there is no number)."""
+    parts = labels.str.extract(COUNT_PATTERN)
+    digits = parts['number'].str.replace(table['thousands_separator'], '', regex=False)
+    if table['decimal_separator'] != '.':
+        digits = digits.str.replace(table['decimal_separator'], '.', regex=False)
+    multipliers = parts['suffix'].str.lower().map(table['multipliers']).to_numpy(dtype=float, na_value=1.0)
+    counts = np.round(_to_float(digits) * multipliers)
+    # Only labels without a number can be a zero phrase
+    no_number = np.isnan(counts)
+    if no_number.any():
+        is_zero = labels[no_number].str.contains(_phrase_pattern(table['zero_phrases']), case=False, regex=True)
+        counts[np.flatnonzero(no_number)[is_zero.to_numpy(dtype=bool, na_value=False)]] = 0
+    return counts
+
+def parse_counts(series, locale):
+    """
+    Parses a column of count labels into nullable integers (pandas 'Int64'). locale is
+    a Series of 'en'/'id' aligned with series. Labels without a number (e.g. "Remix",
+    where YouTube hides the count) become <NA>; zero phrases become 0.
+    """
+    counts = np.full(len(series), np.nan)
+    for name, table in LOCALES.items():
+        rows = (locale == name).to_numpy(dtype=bool)
+        if rows.any():
+            counts[rows] = _per_label(series[rows], lambda labels: _parse_count_labels(labels, table), np.nan)
+    return pd.Series(counts, index=series.index).astype('Int64')
+
+def _parse_date_labels(labels):
+    """
+    upload_date labels -> (absolute datetime64 array, relative age in seconds array),
+    NaT / NaN where a label is not of that kind.
+    """
+    text = labels.str.strip().str.lower()
+    parts = text.str.extract(MONTH_FIRST_PATTERN).combine_first(text.str.extract(DAY_FIRST_PATTERN))
+    absolute = pd.to_datetime(pd.DataFrame({
+        'year': _to_float(parts['year']),
+        'month': parts['month'].map(ALL_MONTHS).to_numpy(dtype=float, na_value=np.nan),
+        'day': _to_float(parts['day']),
+    }), errors='coerce').to_numpy(dtype='datetime64[s]')
+    # Exact publish times from the YouTube Data API (api_enrichment.py), e.g. "2025-03-03T12:34:56Z"
+    is_iso = labels.str.match(ISO_TIMESTAMP_PATTERN).to_numpy(dtype=bool, na_value=False)
+    if is_iso.any():
+        absolute = absolute.copy()
+        absolute[is_iso] = pd.to_datetime(labels[is_iso], errors='coerce', utc=True, format='ISO8601') \
+            .dt.tz_localize(None).to_numpy(dtype='datetime64[s]')
+    relative = text.str.extract(RELATIVE_PATTERN)
+    age = _to_float(relative['amount']) * relative['unit'].map(ALL_RELATIVE_UNITS).to_numpy(dtype=float, na_value=np.nan)
+    return absolute, age
+
+def parse_upload_dates(series, scanned_at):
+    """
+    Parses upload_date labels into timestamps. Absolute dates are read in either order;
+    relative ones ("2 days ago", "3 hari yang lalu") are resolved against scanned_at, the
+    row's scrape time (months count as 30 days, years as 365). Unparseable labels are NaT.
+    """
+    codes, labels = pd.factorize(series)
+    absolute, age = _parse_date_labels(pd.Series(labels, dtype=object))
+    absolute = pd.Series(np.append(absolute, np.datetime64('NaT', 's'))[codes], index=series.index)
+    age = np.append(age, np.nan)[codes]
+    relative_dates = scanned_at - pd.to_timedelta(age, unit='s')
+    return absolute.fillna(relative_dates)
+
+def normalize_frame(frame, default_locale='en'):
+    """Returns a copy of a chunk of raw rows with the typed columns added."""
+    frame = frame.copy()
+    locale = detect_locale(frame, default_locale)
+    frame['locale'] = locale
+    for raw_column, typed_column in COUNT_COLUMNS.items():
+        if raw_column in frame:
+            frame[typed_column] = parse_counts(frame[raw_column], locale)
+    frame['scan_ts'] = pd.to_datetime(frame.get('timestamp_scan'), errors='coerce', format='ISO8601')
+    if 'upload_date' in frame:
+        frame['upload_ts'] = parse_upload_dates(frame['upload_date'], frame['scan_ts'])
+    return frame
+
+# --- Single Values ---
+def parse_count(text, locale='en'):
+    """
+    Parses one count label with the same tables, for code that handles rows one at a
+    time (e.g. while scraping). Returns an int, or None if the label has no number.
+    """
+    if not text or not isinstance(text, str):
+        return None
+    table = LOCALES[locale]
+    match = _COUNT_REGEX.search(text)
+    if not match:
+        lowered = text.lower()
+        return 0 if any(phrase in lowered for phrase in table['zero_phrases']) else None
+    digits = match.group('number').replace(table['thousands_separator'], '').replace(table['decimal_separator'], '.')
+    try:
+        value = float(digits)
+    except ValueError:
+        return None
+    return round(value * table['multipliers'].get((match.group('suffix') or '').lower(), 1.0))
+
+# --- Chunked File Processing ---
+def is_ndjson_path(path):
+    return '.ndjson' in os.path.basename(path) or bool(list_segments(path))
+
+def read_chunks(path, chunksize):
+    """Yields the raw rows of a CSV file or an NDJSON output as DataFrames of up to chunksize rows."""
+    if is_ndjson_path(path):
+        batch = []
+        for record in iter_records(path):
+            batch.append(record)
+            if len(batch) >= chunksize:
+                yield pd.DataFrame.from_records(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch)
+    else:
+        # Everything stays a string; only empty cells and the scraper's "NaN" placeholder are missing
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False, na_values=['', 'NaN'])
+
+def normalize_file(input_path, output_path, chunksize=100_000, default_locale='en'):
+    """
+    Normalizes a raw output file chunk by chunk into a CSV or NDJSON file (by the output
+    extension). The output appears atomically once every chunk is written.
+    Returns (rows, seconds).
+    """
+    started = time.perf_counter()
+    tmp_path = output_path + '.tmp'
+    rows = 0
+    first = True
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+        for chunk in read_chunks(input_path, chunksize):
+            normalized = normalize_frame(chunk, default_locale)
+            if is_ndjson_path(output_path):
+                out.write(normalized.to_json(orient='records', lines=True, date_format='iso', force_ascii=False))
+            else:
+                normalized.to_csv(out, header=first, index=False)
+            first = False
+            rows += len(normalized)
+    os.replace(tmp_path, output_path)
+    return rows, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize the raw scraper output into typed count and date columns.")
+    parser.add_argument('input', help="Raw CSV file or NDJSON output (base path or segment file).")
+    parser.add_argument('-o', '--output', help="Output .csv or .ndjson file (default: <input>_normalized.csv).")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows held in memory at a time.")
+    parser.add_argument('--locale', choices=sorted(LOCALES), default='en', help="Locale for rows whose labels have no locale hints.")
+    args = parser.parse_args()
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}_normalized.csv"
+    if not os.path.exists(args.input) and not list_segments(args.input):
+        print(f"Input not found: {args.input}")
+        return 1
+    rows, seconds = normalize_file(args.input, output, args.chunksize, args.locale)
+    print(f"Normalized {rows} rows in {seconds:.1f}s ({rows / seconds if seconds else 0:.0f} rows/s) into {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+# output_pipeline.py
+
+import csv
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+
+from metrics import stage_timer
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, only needed for OUTPUT_COMPRESSION = 'zstd'
+    zstandard = None
+
+# fsync policies: 'none' leaves flushing to the OS, 'batch' fsyncs after every batch,
+# 'close' fsyncs once when the writer is closed.
+FSYNC_POLICIES = ('none', 'batch', 'close')
+
+# --- Output Sinks ---
+def read_csv_header(filename):
+    """Returns the header row of a CSV file, or None if the file is missing or empty."""
+    if not os.path.isfile(filename) or os.path.getsize(filename) == 0:
+        return None
+    with open(filename, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), None)
+
+def versioned_path(filename, version):
+    """Returns the path of a later output version, e.g. 'data.csv' -> 'data.v2.csv'."""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.v{version}{ext}"
+
+
+class CsvSink:
+    """
+    Appends rows to a CSV file, writing the header only if the file is new or empty.
+    If the existing file was written with other columns (an older CSV_HEADERS), the
+    rows go to the first versioned file ('data.v2.csv', ...) that is new or has the
+    same columns instead, so no row lands under a header it does not match.
+    """
+    def __init__(self, filename, headers):
+        self.filename = filename
+        self.headers = headers
+        self._file = None
+        self._writer = None
+
+    def open(self):
+        requested = self.filename
+        header = read_csv_header(self.filename)
+        version = 1
+        while header is not None and header != list(self.headers):
+            version += 1
+            self.filename = versioned_path(requested, version)
+            header = read_csv_header(self.filename)
+        if self.filename != requested:
+            print(f"Output: {requested} was written with different columns, appending to {self.filename} instead.")
+        file_exists = header is not None
+        self._file = open(self.filename, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.headers)
+        if not file_exists:
+            self._writer.writeheader()
+
+    def write_rows(self, rows):
+        # Formatted in full before anything is written, so a row the CSV writer rejects
+        # (e.g. a key that is not a column) leaves the file as it was
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=self.headers).writerows(rows)
+        self._file.write(buffer.getvalue())
+
+    def rollback_point(self):
+        self._file.flush()
+        return self._file.tell()
+
+    def rollback(self, offset):
+        """Cuts the file back to a rollback_point(), dropping a partly written batch."""
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def flush(self, fsync=False):
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class JsonArraySink:
+    """
+    Streams rows into a single JSON array, one element at a time, so the whole run
+    never has to be held in memory. The closing bracket is written on close().
+    A file holds one run; with keep_existing (--resume) an earlier run's non-empty file
+    is kept and the rows go to the first unused versioned file ('data.v2.json', ...).
+    """
+    def __init__(self, filename, keep_existing=False):
+        self.filename = filename
+        self.keep_existing = keep_existing
+        self._file = None
+        self._first = True
+
+    def open(self):
+        if self.keep_existing:
+            requested = self.filename
+            version = 1
+            while os.path.isfile(self.filename) and os.path.getsize(self.filename) > 0:
+                version += 1
+                self.filename = versioned_path(requested, version)
+            if self.filename != requested:
+                print(f"Output: Keeping the rows of the interrupted run in {requested}, continuing in {self.filename}.")
+        self._file = open(self.filename, 'w', encoding='utf-8')
+        self._file.write('[')
+        self._first = True
+
+    def write_rows(self, rows):
+        parts = []
+        first = self._first
+        for row in rows:
+            parts.append('\n' if first else ',\n')
+            parts.append(json.dumps(row, ensure_ascii=False, indent=4))
+            first = False
+        self._file.write(''.join(parts))
+        self._first = first
+
+    def rollback_point(self):
+        self._file.flush()
+        return self._file.tell(), self._first
+
+    def rollback(self, point):
+        offset, self._first = point
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def flush(self, fsync=False):
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file:
+            self._file.write('\n]\n')
+            self._file.close()
+            self._file = None
+
+# File name suffix for each NDJSON compression option.
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+def ndjson_segment_path(base_path, index, compression=None):
+    """Returns the path of an NDJSON segment, e.g. 'data.ndjson' -> 'data.00003.ndjson.gz'."""
+    stem = base_path[:-len('.ndjson')] if base_path.endswith('.ndjson') else base_path
+    return f"{stem}.{index:05d}.ndjson{COMPRESSION_SUFFIXES[compression]}"
+
+def truncate_torn_line(path, chunk_size=64 * 1024):
+    """
+    Cuts a plain NDJSON file back to its last newline, dropping a record that a killed
+    run left half written. Returns the number of bytes dropped.
+    """
+    with open(path, 'r+b') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - chunk_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+        return size - end
+
+
+class NdjsonSink:
+    """
+    Appends one compact JSON record per line to numbered segment files, optionally
+    gzip or zstd compressed. A new segment is started once the current one reaches
+    rotate_bytes on disk. Every flush leaves the file readable up to the last record,
+    so readers can consume it while the run is still going.
+    """
+    def __init__(self, base_path, compression=None, rotate_bytes=0):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression '{compression}'. Options: None, 'gzip', 'zstd'")
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package (pip install zstandard).")
+        self.base_path = base_path
+        self.compression = compression
+        self.rotate_bytes = rotate_bytes
+        self.filename = None
+        self._index = 0
+        self._raw = None
+        self._stream = None
+
+    def open(self):
+        # Continue the newest existing segment, so reruns append instead of overwriting.
+        while os.path.exists(ndjson_segment_path(self.base_path, self._index + 1, self.compression)):
+            self._index += 1
+        path = ndjson_segment_path(self.base_path, self._index, self.compression)
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            if self.compression is not None:
+                # A killed run can leave a compressed segment cut mid-block, which cannot be
+                # repaired in place; appending after it would make the new records unreadable
+                self._index += 1
+            else:
+                dropped = truncate_torn_line(path)
+                if dropped:
+                    print(f"Output: Dropped a {dropped}-byte partial record at the end of {path}.")
+        self._open_segment()
+
+    def _open_segment(self):
+        self.filename = ndjson_segment_path(self.base_path, self._index, self.compression)
+        self._raw = open(self.filename, 'ab')
+        if self.compression == 'gzip':
+            # Appending starts a new gzip member; multi-member files are valid gzip.
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        elif self.compression == 'zstd':
+            self._stream = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = self._raw
+
+    def _close_segment(self):
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.close()
+        self._raw = self._stream = None
+
+    def write_rows(self, rows):
+        if self.rotate_bytes and self._raw.tell() >= self.rotate_bytes:
+            self._close_segment()
+            self._index += 1
+            self._open_segment()
+        data = ''.join(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n' for row in rows)
+        self._stream.write(data.encode('utf-8'))
+
+    def rollback_point(self):
+        # A compressed stream cannot be cut back, only plain segments
+        if self.compression is not None:
+            return None
+        self._raw.flush()
+        return self._index, self._raw.tell()
+
+    def rollback(self, point):
+        index, offset = point
+        self._raw.truncate(offset if index == self._index else 0)  # A segment started by the failed write is emptied
+
+    def flush(self, fsync=False):
+        if self.compression == 'zstd':
+            self._stream.flush(zstandard.FLUSH_BLOCK)
+        elif self._stream is not self._raw:
+            self._stream.flush()
+        self._raw.flush()
+        if fsync:
+            os.fsync(self._raw.fileno())
+
+    def close(self):
+        if self._raw:
+            self._close_segment()
+
+def create_sink(format_ext, filename, headers, compression=None, rotate_bytes=0, keep_existing=False):
+    """
+    Returns the sink for an output format ('csv', 'json', 'ndjson' or 'parquet').
+    keep_existing only matters for 'json', the one format that does not append.
+    """
+    if format_ext == 'csv':
+        return CsvSink(filename, headers)
+    if format_ext == 'json':
+        return JsonArraySink(filename.replace('.csv', '.json'), keep_existing=keep_existing)
+    if format_ext == 'ndjson':
+        return NdjsonSink(filename.replace('.csv', '.ndjson'), compression=compression, rotate_bytes=rotate_bytes)
+    if format_ext == 'parquet':
+        # Imported here so pandas and pyarrow are only loaded for Parquet output
+        from parquet_dataset import ParquetDatasetSink
+        return ParquetDatasetSink(filename.replace('.csv', '.parquet'))
+    raise ValueError(f"Unknown output format '{format_ext}'. Options: 'csv', 'json', 'ndjson', 'parquet'")
+
+# --- Single-Writer Pipeline ---
+class OutputWriter:
+    """
+    Single writer thread fed by every account thread through a bounded queue.
+    Rows are written in batches, flushed when the batch is full or the flush interval
+    elapses. A full queue blocks put(), applying backpressure when the disk is slow.
+    on_batch_written(rows) is called on the writer thread after each batch reached
+    the sink, e.g. to journal progress only for rows that are safely on disk.
+
+    A failed batch is rolled back (where the sink supports it) and written again row by
+    row, so one bad row cannot hold back the rest. Rows that still fail are retried with
+    the next batches, at most max_attempts times and max_retained rows at once; after
+    that they are appended to dead_letter_path (NDJSON, with the error) or logged and
+    dropped if it is None.
+    """
+    _STOP = object()
+
+    def __init__(self, sink, batch_size=10, flush_interval=5.0, fsync_policy='batch', queue_maxsize=100, on_batch_written=None,
+                 max_attempts=3, max_retained=1000, dead_letter_path=None):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync_policy}'. Options: {', '.join(FSYNC_POLICIES)}")
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.on_batch_written = on_batch_written
+        self.max_attempts = max(1, max_attempts)
+        self.max_retained = max_retained
+        self.dead_letter_path = dead_letter_path
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_rejected = 0
+        self._queue = queue.Queue(maxsize=queue_maxsize)
+        self._thread = threading.Thread(target=self._run, name='output-writer', daemon=True)
+        self._started = False
+
+    def start(self):
+        self.sink.open()
+        self._thread.start()
+        self._started = True
+        return self
+
+    def put(self, row):
+        """Queues one row for writing. Blocks while the queue is full."""
+        self._queue.put(row)
+
+    def put_many(self, rows):
+        for row in rows:
+            self._queue.put(row)
+
+    def close(self):
+        """Writes everything still queued, then closes the sink."""
+        if not self._started:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._started = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _write(self, rows):
+        """Writes rows to the sink as one unit. Returns None, or the error after rolling the write back."""
+        point = self.sink.rollback_point() if hasattr(self.sink, 'rollback_point') else None
+        try:
+            with stage_timer('write'):
+                self.sink.write_rows(rows)
+                self.sink.flush(fsync=self.fsync_policy == 'batch')
+        except Exception as e:
+            if point is not None:
+                try:
+                    self.sink.rollback(point)
+                except Exception as rollback_error:
+                    print(f"Output writer: Could not roll back the failed write to {self.sink.filename}: {rollback_error}")
+            return e
+        return None
+
+    def _written(self, rows):
+        self.rows_written += len(rows)
+        self.batches_written += 1
+        if self.on_batch_written is not None:
+            try:
+                self.on_batch_written(rows)
+            except Exception as e:
+                print(f"Output writer: Error in batch callback: {e}")
+                traceback.print_exc()
+
+    def _reject(self, row, error):
+        """Moves a row that cannot be written to the dead-letter file, or logs and drops it."""
+        self.rows_rejected += 1
+        if self.dead_letter_path:
+            try:
+                with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'error': str(error), 'row': row}, ensure_ascii=False, default=str) + '\n')
+                return
+            except Exception as e:
+                print(f"Output writer: Could not write to {self.dead_letter_path}: {e}")
+        video_id = row.get('video_id') if isinstance(row, dict) else None
+        print(f"Output writer: Dropped row {video_id or '?'}: {error}")
+
+    def _write_batch(self, batch):
+        """
+        Writes a batch of (row, failed attempts) pairs. Returns the pairs to retry with
+        the next batch.
+        """
+        error = self._write([row for row, _ in batch])
+        if error is None:
+            self._written([row for row, _ in batch])
+            return []
+        print(f"Output writer: Error writing {len(batch)} rows to {self.sink.filename}: {error}. Writing them one by one.")
+        written, retry = [], []
+        for row, attempts in batch:
+            error = self._write([row])
+            if error is None:
+                written.append(row)
+            elif attempts + 1 >= self.max_attempts:
+                self._reject(row, error)
+            else:
+                retry.append((row, attempts + 1))
+        if written:
+            self._written(written)
+        while len(retry) > self.max_retained:
+            row, _ = retry.pop(0)
+            self._reject(row, "too many rows waiting to be retried")
+        return retry
+
+    def _run(self):
+        batch = []  # (row, failed attempts)
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        while not stopping:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is self._STOP:
+                    stopping = True
+                else:
+                    batch.append((item, 0))
+            except queue.Empty:
+                pass
+
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                batch = self._write_batch(batch)
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+        for row, _ in batch:
+            self._reject(row, "could not be written before the writer closed")
+        if self.rows_rejected:
+            print(f"Output writer: {self.rows_rejected} rows could not be written to {self.sink.filename}"
+                  + (f", see {self.dead_letter_path}." if self.dead_letter_path else "."))
+        try:
+            self.sink.flush(fsync=self.fsync_policy in ('batch', 'close'))
+        finally:
+            self.sink.close()
@@ -0,0 +1,301 @@
+# parquet_dataset.py
+# Columnar output: a Parquet dataset partitioned by scan date and account.
+#
+# Usage:
+#   python parquet_dataset.py import lhana_shorts_raw_data.csv        # convert an existing CSV/NDJSON history
+#   python parquet_dataset.py compact                                 # merge small files, drop duplicate video_ids
+#   python parquet_dataset.py query --sound "original sound - dailyvibes" --days 7 --columns video_id,views
+#
+# Layout: <root>/scan_date=YYYY-MM-DD/account=<dummy id>/part-*.parquet. Hashtags and
+# missing_fields are list columns, counts are typed (see normalize.py) next to the raw
+# labels, and channel, sound and account names are dictionary encoded. Readers only
+# open the partitions and columns a query needs.
+
+import argparse
+import ast
+import glob
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import unquote
+
+import pandas as pd
+
+from config import RAW_DATA_CSV
+from normalize import COUNT_COLUMNS, normalize_frame, read_chunks
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, only needed for FORMAT_EXT = 'parquet' and this tool
+    pa = None
+
+# Where FORMAT_EXT = 'parquet' writes (see output_pipeline.create_sink)
+DEFAULT_DATASET_DIR = RAW_DATA_CSV.replace('.csv', '.parquet')
+
+PARTITION_COLUMNS = ('scan_date', 'account')
+LIST_COLUMNS = ('hashtags_on_caption', 'hashtags_on_description', 'missing_fields')
+# Low-cardinality text columns, stored with dictionary encoding.
+DICTIONARY_COLUMNS = ('dummy_account_id', 'channel_name', 'sound_name', 'sound_artist', 'locale')
+
+def dataset_schema():
+    """Arrow schema of the files (partition columns excluded, they live in the paths)."""
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('timestamp_scan', pa.timestamp('us')),
+        ('dummy_account_id', dictionary),
+        ('video_id', pa.string()),
+        ('caption', pa.string()),
+        ('hashtags_on_caption', pa.list_(pa.string())),
+        ('hashtags_on_description', pa.list_(pa.string())),
+        ('description', pa.string()),
+        ('channel_name', dictionary),
+        ('raw_views_count', pa.string()),
+        ('likes_count', pa.string()),
+        ('comments_count', pa.string()),
+        ('remix_count', pa.string()),
+        ('upload_date', pa.string()),
+        ('extracted_keywords', pa.string()),
+        ('sound_id', pa.string()),
+        ('sound_name', dictionary),
+        ('sound_artist', dictionary),
+        ('sound_usage', pa.string()),
+        ('video_url_full', pa.string()),
+        ('watch_duration_sec', pa.float64()),
+        ('extraction_status', pa.string()),
+        ('missing_fields', pa.list_(pa.string())),
+        ('locale', dictionary),
+        *((typed_column, pa.int64()) for typed_column in COUNT_COLUMNS.values()),
+        ('upload_ts', pa.timestamp('s')),
+    ])
+
+def _partitioning():
+    return ds.partitioning(pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS]), flavor='hive')
+
+def _open_dataset(root):
+    return ds.dataset(root, format='parquet', partitioning=_partitioning(), schema=_full_schema())
+
+def _full_schema():
+    schema = dataset_schema()
+    for column in PARTITION_COLUMNS:
+        schema = schema.append(pa.field(column, pa.string()))
+    return schema
+
+# --- Row Conversion ---
+def _as_list(value):
+    """Live rows carry real lists; CSV history stores them as "['#a', '#b']" strings."""
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    if isinstance(value, str) and value.startswith('['):
+        try:
+            return [str(item) for item in ast.literal_eval(value)]
+        except (ValueError, SyntaxError):
+            return None
+    return None
+
+def _as_status(value):
+    """extraction_status as a JSON string (live rows carry a dict, CSV history its repr)."""
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    if isinstance(value, str) and value.startswith('{'):
+        try:
+            return json.dumps(ast.literal_eval(value), sort_keys=True)
+        except (ValueError, SyntaxError):
+            return value
+    return None
+
+def rows_to_table(frame):
+    """Converts raw scraper rows (a DataFrame) into an Arrow table with the partition columns."""
+    frame = normalize_frame(frame)
+    schema = dataset_schema()
+    columns = {}
+    for field in schema:
+        name = field.name
+        values = frame[name] if name in frame else pd.Series([None] * len(frame), index=frame.index)
+        if name in LIST_COLUMNS:
+            values = values.map(_as_list)
+        elif name == 'extraction_status':
+            values = values.map(_as_status)
+        elif name == 'timestamp_scan':
+            values = frame['scan_ts']
+        elif name == 'watch_duration_sec':
+            values = pd.to_numeric(values, errors='coerce')
+        elif pa.types.is_string(field.type) or pa.types.is_dictionary(field.type):
+            # The scraper's "NaN" placeholders are missing values
+            values = values.astype(object).where(values.notna() & (values.astype(object) != 'NaN'), None)
+        columns[name] = pa.array(values, type=field.type, from_pandas=True)
+    table = pa.table(columns, schema=schema)
+    scan_dates = pc.strftime(table['timestamp_scan'], format='%Y-%m-%d').fill_null('unknown')
+    accounts = table['dummy_account_id'].cast(pa.string()).fill_null('unknown')
+    return table.append_column('scan_date', scan_dates).append_column('account', accounts)
+
+def write_table(root, table, basename=None):
+    """Writes a table into its partitions as new files. Returns the number of rows written."""
+    file_format = ds.ParquetFileFormat()
+    ds.write_dataset(
+        table, root, format='parquet', partitioning=_partitioning(),
+        basename_template=(basename or f"part-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}") + '-{i}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        file_options=file_format.make_write_options(compression='zstd', use_dictionary=list(DICTIONARY_COLUMNS)),
+    )
+    return table.num_rows
+
+# --- Output Sink ---
+class ParquetDatasetSink:
+    """
+    Output sink for FORMAT_EXT = 'parquet'. Parquet files cannot be appended to, so every
+    flushed batch becomes one new small file per partition it touches (a flushed batch
+    is on disk, as the checkpoint journal expects); run `python parquet_dataset.py compact`
+    afterwards to merge them.
+    """
+    def __init__(self, root):
+        if pa is None:
+            raise ImportError("Parquet output requires the 'pyarrow' package (pip install pyarrow).")
+        self.filename = root
+        self._pending = []
+
+    def open(self):
+        os.makedirs(self.filename, exist_ok=True)
+
+    def write_rows(self, rows):
+        self._pending.extend(rows)
+
+    def flush(self, fsync=False):
+        # Files are complete once written; there is no partial file to fsync. A failed
+        # batch is dropped here because the output writer hands it over again.
+        rows, self._pending = self._pending, []
+        if rows:
+            write_table(self.filename, rows_to_table(pd.DataFrame.from_records(rows)))
+
+    def close(self):
+        self.flush()
+
+def import_history(input_path, root, chunksize=100_000):
+    """Converts a raw CSV or NDJSON history into the dataset. Returns the number of rows imported."""
+    rows = 0
+    for chunk in read_chunks(input_path, chunksize):
+        rows += write_table(root, rows_to_table(chunk))
+    return rows
+
+# --- Compaction ---
+def _partition_dirs(root):
+    return sorted({os.path.dirname(path) for path in glob.glob(os.path.join(root, '*', '*', '*.parquet'))})
+
+def compact(root, max_rows_per_file=1_000_000):
+    """
+    Rewrites every partition as one file (or several of max_rows_per_file rows), keeping
+    a single row per video_id across the whole dataset: the one with the latest
+    timestamp_scan. Only video_id, timestamp_scan and the partition columns are read to
+    pick the winners; each partition is then rewritten on its own, so memory is bounded
+    by the largest partition. The merged file is in place before the old files are
+    deleted, so an interrupted compaction leaves duplicates (removed by the next run)
+    but never loses rows. Returns (rows before, rows after, files before, files after).
+    """
+    dataset = _open_dataset(root)
+    files_before = len(dataset.files)
+    index = dataset.to_table(columns=['video_id', 'timestamp_scan', *PARTITION_COLUMNS]).to_pandas()
+    rows_before = len(index)
+    if not rows_before:
+        return 0, 0, files_before, files_before
+    # Latest scan wins; ties go to the first partition in path order
+    index = index.sort_values(['timestamp_scan', 'scan_date', 'account'], ascending=[False, True, True], kind='stable')
+    winners = index.drop_duplicates('video_id')
+    keep = {(scan_date, account): set(group['video_id']) for (scan_date, account), group in winners.groupby(list(PARTITION_COLUMNS))}
+
+    rows_after = 0
+    for directory in _partition_dirs(root):
+        old_files = sorted(glob.glob(os.path.join(directory, '*.parquet')))
+        # Partition values are URI-encoded in the directory names
+        partition_key = tuple(unquote(part.split('=', 1)[1]) for part in os.path.relpath(directory, root).split(os.sep))
+        keep_ids = keep.get(partition_key, set())
+        table = pa.concat_tables(pq.read_table(path, schema=dataset_schema()) for path in old_files)
+        order = pd.DataFrame({'video_id': table['video_id'].to_pandas(), 'timestamp_scan': table['timestamp_scan'].to_pandas()})
+        # A video can appear twice in its winning partition; keep the latest copy only
+        order = order[order['video_id'].isin(keep_ids)].sort_values('timestamp_scan', ascending=False, kind='stable')
+        table = table.take(pa.array(order.drop_duplicates('video_id').index.sort_values()))
+        rows_after += table.num_rows
+
+        new_files = []
+        for start in range(0, table.num_rows, max_rows_per_file):
+            path = os.path.join(directory, f"compacted-{uuid.uuid4().hex[:12]}.parquet")
+            pq.write_table(table.slice(start, max_rows_per_file), path + '.tmp', compression='zstd',
+                           use_dictionary=list(DICTIONARY_COLUMNS))
+            os.replace(path + '.tmp', path)
+            new_files.append(path)
+        for path in old_files:
+            if path not in new_files:
+                os.remove(path)
+        if not new_files:
+            _remove_empty_dirs(directory, root)
+    return rows_before, rows_after, files_before, len(_open_dataset(root).files)
+
+def _remove_empty_dirs(directory, root):
+    while os.path.abspath(directory) != os.path.abspath(root) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+# --- Queries ---
+def query(root, columns=None, sound_name=None, channel_name=None, account=None, since=None):
+    """
+    Reads the matching rows as a pandas DataFrame. Only the requested columns (plus the
+    ones filtered on) are read, and partitions outside `since` (a date) or `account`
+    are skipped from their paths without opening any file.
+    """
+    dataset = _open_dataset(root)
+    condition = None
+    def both(expression):
+        return expression if condition is None else condition & expression
+    if since is not None:
+        condition = both(ds.field('scan_date') >= since.strftime('%Y-%m-%d'))
+    if account is not None:
+        condition = both(ds.field('account') == account)
+    if sound_name is not None:
+        condition = both(ds.field('sound_name') == sound_name)
+    if channel_name is not None:
+        condition = both(ds.field('channel_name') == channel_name)
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+def main():
+    parser = argparse.ArgumentParser(description="Import, compact and query the partitioned Parquet dataset.")
+    parser.add_argument('--root', default=DEFAULT_DATASET_DIR, help="Dataset directory.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="Convert a raw CSV or NDJSON history into the dataset.")
+    import_parser.add_argument('input')
+    import_parser.add_argument('--chunksize', type=int, default=100_000)
+    compact_parser = commands.add_parser('compact', help="Merge small files and drop duplicate video_ids.")
+    compact_parser.add_argument('--max-rows-per-file', type=int, default=1_000_000)
+    query_parser = commands.add_parser('query', help="Print matching rows.")
+    query_parser.add_argument('--columns', default='video_id,timestamp_scan,views,sound_name',
+                              help="Comma separated columns to read.")
+    query_parser.add_argument('--sound', help="Exact sound_name.")
+    query_parser.add_argument('--channel', help="Exact channel_name.")
+    query_parser.add_argument('--account', help="Dummy account ID.")
+    query_parser.add_argument('--days', type=int, help="Only shorts scanned in the last N days.")
+    args = parser.parse_args()
+
+    if pa is None:
+        print("This tool requires the 'pyarrow' package (pip install pyarrow).")
+        return 1
+    started = time.perf_counter()
+    if args.command == 'import':
+        rows = import_history(args.input, args.root, args.chunksize)
+        print(f"Imported {rows} rows into {args.root} in {time.perf_counter() - started:.1f}s.")
+    elif args.command == 'compact':
+        rows_before, rows_after, files_before, files_after = compact(args.root, args.max_rows_per_file)
+        print(f"Compacted {args.root}: {rows_before} -> {rows_after} rows, {files_before} -> {files_after} files "
+              f"in {time.perf_counter() - started:.1f}s.")
+    else:
+        since = datetime.now() - timedelta(days=args.days) if args.days else None
+        frame = query(args.root, args.columns.split(','), args.sound, args.channel, args.account, since)
+        with pd.option_context('display.max_rows', 100, 'display.width', 200):
+            print(frame)
+        print(f"{len(frame)} rows in {time.perf_counter() - started:.2f}s.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
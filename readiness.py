@@ -0,0 +1,62 @@
+# readiness.py
+
+from collections import namedtuple
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from metrics import stage_timer
+
+# Waits inside the page, in one async script call, until:
+#  1. the URL differs from previous_url and points at a short (skipped if previous_url is null),
+#  2. the element matching selector exists (document.body if selector is null), and
+#  3. that element's subtree has had no child or text mutations for quiet_ms.
+# Attribute changes are ignored, the playing video updates them constantly.
+# Resolves with {ok, reason, waited_ms, url}; ok is false only if the element never
+# appeared (or the URL never changed) before timeout_ms.
+READY_SCRIPT = """
+const [selector, previousUrl, quietMs, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const started = performance.now();
+let lastMutation = started;
+let observer = null;
+let finished = false;
+let timer = null;
+const finish = (ok, reason) => {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    clearInterval(timer);
+    done({ok: ok, reason: reason, waited_ms: performance.now() - started, url: location.href});
+};
+const urlReady = () => !previousUrl || (location.href !== previousUrl && /\\/shorts\\/[^\\/?#]+/.test(location.href));
+const check = () => {
+    const now = performance.now();
+    const element = urlReady() ? (selector ? document.querySelector(selector) : document.body) : null;
+    if (element && !observer) {
+        observer = new MutationObserver(() => { lastMutation = performance.now(); });
+        observer.observe(element, {childList: true, subtree: true, characterData: true});
+        lastMutation = now;
+    }
+    if (observer && now - lastMutation >= quietMs) return finish(true, 'ready');
+    if (now - started >= timeoutMs) return finish(!!observer, observer ? 'not_quiet' : (urlReady() ? 'missing' : 'url_unchanged'));
+};
+timer = setInterval(check, 50);
+check();
+"""
+
+ReadyResult = namedtuple('ReadyResult', ['ok', 'reason', 'waited', 'url'])
+
+def wait_until_ready(driver, selector=None, previous_url=None, quiet_ms=300, timeout=10):
+    """
+    Blocks until the page is ready by the READY_SCRIPT signals above, or timeout seconds.
+    The wait is timed as the 'ready' metrics stage, apart from deliberate dwell pacing.
+    Returns a ReadyResult (waited in seconds).
+    """
+    with stage_timer('ready'):
+        try:
+            # Leave the script some headroom over its own timeout before WebDriver gives up.
+            driver.set_script_timeout(timeout + 5)
+            result = driver.execute_async_script(READY_SCRIPT, selector, previous_url, quiet_ms, timeout * 1000) or {}
+        except (TimeoutException, WebDriverException) as e:
+            return ReadyResult(False, f'error: {e.__class__.__name__}', timeout, None)
+    return ReadyResult(bool(result.get('ok')), result.get('reason'), (result.get('waited_ms') or 0) / 1000, result.get('url'))
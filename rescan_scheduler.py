@@ -0,0 +1,315 @@
+# rescan_scheduler.py
+# Catalog of known videos with view/like snapshots, and the scheduler that refreshes them.
+#
+# Usage:
+#   python youtube-shorts-scraper.py --rescan            # refresh the videos that are due (RESCAN_BACKEND)
+#   python rescan_scheduler.py status                    # catalog size and the next due refreshes
+#   python rescan_scheduler.py history <video_id>        # a video's view/like time series
+#
+# Every written row is a snapshot of its video, so scraping, re-enrichment and re-scans
+# all feed the same time series. A video's next refresh is due when its views are
+# expected to have grown by RESCAN_TARGET_GROWTH, given its latest growth rate.
+
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from api_enrichment import API_FIELDS, VIDEOS_PER_CALL, ApiError, QuotaExceeded, merge_api_resource
+from normalize import ISO_TIMESTAMP_PATTERN, normalize_frame
+
+def refresh_interval(views, views_per_hour, age_hours, min_hours=1.0, max_hours=168.0, target_growth=0.1):
+    """
+    Hours until a video should be refreshed: the time its views take to grow by
+    target_growth at the current rate, within [min_hours, max_hours]. Without a rate
+    yet (first snapshot), young videos are refreshed sooner than old ones.
+    """
+    if views_per_hour is None:
+        hours = age_hours / 4 if age_hours is not None else min_hours
+    elif views_per_hour <= 0:
+        hours = max_hours
+    else:
+        hours = target_growth * max(views or 0, 1) / views_per_hour
+    return min(max(hours, min_hours), max_hours)
+
+class VideoCatalog:
+    """
+    Persistent catalog of known videos in a SQLite file: the latest snapshot of each
+    video with its growth rate and next refresh time, plus every snapshot as a time
+    series (rows are never overwritten). observe_rows is the output writer's batch
+    callback.
+
+    The next refresh times are kept in a B-tree index, so taking the most overdue
+    videos and rescheduling one are O(log n) each, also with millions of videos. A
+    video leaves the schedule (next_due NULL) once it is older than max_age_days or
+    could not be refreshed max_failures times in a row.
+    """
+    def __init__(self, path, min_interval_hours=1.0, max_interval_hours=168.0, target_growth=0.1,
+                 max_age_days=30, max_failures=3):
+        self.path = path
+        self.min_interval_hours = min_interval_hours
+        self.max_interval_hours = max_interval_hours
+        self.target_growth = target_growth
+        self.max_age_days = max_age_days
+        self.max_failures = max_failures
+        self.snapshots_recorded = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " video_id TEXT PRIMARY KEY,"
+            " first_seen REAL NOT NULL,"
+            " uploaded REAL,"
+            " last_scan REAL NOT NULL,"
+            " views INTEGER,"
+            " likes INTEGER,"
+            " views_per_hour REAL,"
+            " refreshes INTEGER NOT NULL DEFAULT 0,"
+            " failures INTEGER NOT NULL DEFAULT 0,"
+            " next_due REAL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS videos_next_due ON videos (next_due) WHERE next_due IS NOT NULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " video_id TEXT NOT NULL,"
+            " scan_ts REAL NOT NULL,"
+            " views INTEGER,"
+            " likes INTEGER,"
+            " comments INTEGER,"
+            " PRIMARY KEY (video_id, scan_ts)"
+            ") WITHOUT ROWID"
+        )
+
+    def _next_due(self, scan_ts, views, views_per_hour, uploaded, first_seen):
+        age_hours = (scan_ts - (uploaded if uploaded is not None else first_seen)) / 3600
+        if age_hours > self.max_age_days * 24:
+            return None
+        hours = refresh_interval(views, views_per_hour, age_hours, self.min_interval_hours,
+                                 self.max_interval_hours, self.target_growth)
+        return scan_ts + hours * 3600
+
+    def observe_rows(self, rows):
+        """Records written rows as snapshots and reschedules their videos. Returns the number recorded."""
+        if not rows:
+            return 0
+        frame = normalize_frame(pd.DataFrame.from_records(rows))
+        def column(name):
+            return frame[name] if name in frame else pd.Series(None, index=frame.index, dtype=object)
+        def epoch(value, utc=False):
+            # Scan times and scraped dates are local wall-clock times, like time.time() comparisons
+            # expect; API publish times ("...Z") come out of normalize_frame as naive UTC
+            if pd.isna(value):
+                return None
+            return value.tz_localize('UTC').timestamp() if utc else value.to_pydatetime().timestamp()
+        utc_upload = column('upload_date').astype(str).str.match(ISO_TIMESTAMP_PATTERN)
+        recorded = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for video_id, scan_ts, upload_ts, upload_is_utc, views, likes, comments in zip(
+                        column('video_id'), column('scan_ts'), column('upload_ts'), utc_upload,
+                        column('views'), column('likes'), column('comments')):
+                    if not isinstance(video_id, str) or pd.isna(scan_ts) or video_id == 'NaN':
+                        continue
+                    recorded += self._observe(video_id, epoch(scan_ts), epoch(upload_ts, upload_is_utc),
+                                              *(None if pd.isna(value) else int(value) for value in (views, likes, comments)))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.snapshots_recorded += recorded
+        return recorded
+
+    def _observe(self, video_id, scan_ts, uploaded, views, likes, comments):
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO snapshots (video_id, scan_ts, views, likes, comments) VALUES (?, ?, ?, ?, ?)",
+            (video_id, scan_ts, views, likes, comments))
+        if not cursor.rowcount:
+            return 0  # Same snapshot seen before
+        previous = self._conn.execute(
+            "SELECT first_seen, uploaded, last_scan, views, views_per_hour, refreshes FROM videos WHERE video_id = ?",
+            (video_id,)).fetchone()
+        if previous is None:
+            self._conn.execute(
+                "INSERT INTO videos (video_id, first_seen, uploaded, last_scan, views, likes, next_due) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (video_id, scan_ts, uploaded, scan_ts, views, likes, self._next_due(scan_ts, views, None, uploaded, scan_ts)))
+            return 1
+        first_seen, known_upload, last_scan, last_views, views_per_hour, refreshes = previous
+        uploaded = uploaded if uploaded is not None else known_upload
+        if scan_ts <= last_scan:
+            return 1  # An older snapshot arriving late only joins the time series
+        if views is not None and last_views is not None:
+            views_per_hour = max(views - last_views, 0) / ((scan_ts - last_scan) / 3600)
+        elif views is None:
+            views = last_views
+        self._conn.execute(
+            "UPDATE videos SET uploaded = ?, last_scan = ?, views = ?, likes = COALESCE(?, likes), views_per_hour = ?, "
+            "refreshes = ?, failures = 0, next_due = ? WHERE video_id = ?",
+            (uploaded, scan_ts, views, likes, views_per_hour, refreshes + 1,
+             self._next_due(scan_ts, views, views_per_hour, uploaded, first_seen), video_id))
+        return 1
+
+    def claim_due(self, limit, now=None, lease_seconds=1800):
+        """
+        Returns up to limit video IDs whose refresh is due, most overdue first, and pushes
+        their next_due lease_seconds ahead so they are not handed out twice while in flight.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            video_ids = [row[0] for row in self._conn.execute(
+                "SELECT video_id FROM videos WHERE next_due IS NOT NULL AND next_due <= ? ORDER BY next_due LIMIT ?",
+                (now, limit))]
+            self._conn.executemany("UPDATE videos SET next_due = ? WHERE video_id = ?",
+                                   [(now + lease_seconds, video_id) for video_id in video_ids])
+        return video_ids
+
+    def record_failure(self, video_id, retry_seconds=3600):
+        """A refresh returned nothing for a video (removed, private, or the page failed)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE videos SET failures = failures + 1, "
+                "next_due = CASE WHEN failures + 1 >= ? THEN NULL ELSE ? END WHERE video_id = ?",
+                (self.max_failures, time.time() + retry_seconds, video_id))
+
+    def history(self, video_id):
+        """Returns a video's snapshots as (scan_ts, views, likes, comments), oldest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT scan_ts, views, likes, comments FROM snapshots WHERE video_id = ? ORDER BY scan_ts",
+                (video_id,)).fetchall()
+
+    def status(self, now=None, upcoming=10):
+        now = time.time() if now is None else now
+        with self._lock:
+            videos, scheduled = self._conn.execute(
+                "SELECT COUNT(*), COUNT(next_due) FROM videos").fetchone()
+            due = self._conn.execute("SELECT COUNT(*) FROM videos WHERE next_due IS NOT NULL AND next_due <= ?", (now,)).fetchone()[0]
+            snapshots = self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            next_rows = self._conn.execute(
+                "SELECT video_id, next_due, views, views_per_hour FROM videos WHERE next_due IS NOT NULL "
+                "ORDER BY next_due LIMIT ?", (upcoming,)).fetchall()
+        return {'videos': videos, 'scheduled': scheduled, 'due': due, 'snapshots': snapshots, 'next': next_rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# --- Refresh Backends ---
+# A backend is a callable taking a list of video IDs and returning fresh output rows for
+# the ones it could read. The browser backend (direct /shorts/<id> visits) lives in
+# youtube-shorts-scraper.py, next to the extraction code it reuses.
+class ApiRescanBackend:
+    """Refreshes counts with batched videos.list calls (up to 50 IDs each)."""
+    batch_size = VIDEOS_PER_CALL
+
+    def __init__(self, client, headers, base_url):
+        self.client = client
+        self.headers = headers
+        self.base_url = base_url  # YOUTUBE_BASE_URL, for video_url_full
+
+    def __call__(self, video_ids):
+        rows = []
+        for start in range(0, len(video_ids), VIDEOS_PER_CALL):
+            batch = video_ids[start:start + VIDEOS_PER_CALL]
+            resources = self.client.videos(batch)
+            scanned = datetime.now().isoformat()
+            for video_id in batch:
+                resource = resources.get(video_id)
+                if resource is None:
+                    continue
+                row = {header: "NaN" for header in self.headers}
+                # Every API field counts as missing until the resource fills it in
+                row.update(timestamp_scan=scanned, dummy_account_id='api', video_id=video_id,
+                           video_url_full=f"{self.base_url}/shorts/{video_id}",
+                           extraction_status={}, missing_fields=list(API_FIELDS))
+                rows.append(merge_api_resource(row, resource))
+        return rows
+
+class RescanScheduler:
+    """
+    Hands due videos from the catalog to a refresh backend in batches and writes the
+    rows it returns; the catalog then sees them through the output writer's callback
+    and schedules each video's next refresh from its new growth rate.
+    """
+    def __init__(self, catalog, backend, output_writer, batch_size=50, lease_seconds=1800, retry_seconds=3600):
+        self.catalog = catalog
+        self.backend = backend
+        self.output_writer = output_writer
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.retry_seconds = retry_seconds
+        self.refreshed = 0
+        self.failed = 0
+
+    def run_once(self, now=None):
+        """Refreshes one batch of due videos. Returns the number of videos handed to the backend."""
+        video_ids = self.catalog.claim_due(self.batch_size, now, self.lease_seconds)
+        if not video_ids:
+            return 0
+        rows = self.backend(video_ids)
+        self.output_writer.put_many(rows)
+        refreshed = {row['video_id'] for row in rows}
+        for video_id in video_ids:
+            if video_id not in refreshed:
+                self.catalog.record_failure(video_id, self.retry_seconds)
+        self.refreshed += len(refreshed)
+        self.failed += len(video_ids) - len(refreshed)
+        return len(video_ids)
+
+    def run(self, max_videos=None):
+        """Refreshes due videos batch by batch until none are due (or max_videos were handed out)."""
+        handed_out = 0
+        try:
+            while max_videos is None or handed_out < max_videos:
+                claimed = self.run_once()
+                if not claimed:
+                    break
+                handed_out += claimed
+        except QuotaExceeded as e:
+            print(f"Re-scan: {e} Stopping until the quota resets.")
+        except ApiError as e:
+            # The claimed batch is handed out again once its lease expires
+            print(f"Re-scan: {e}")
+        print(f"Re-scan: Refreshed {self.refreshed} videos, {self.failed} could not be read.")
+        return self.refreshed
+
+def _format_time(epoch):
+    return datetime.fromtimestamp(epoch).strftime('%Y-%m-%d %H:%M')
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the video catalog of the re-scan scheduler.")
+    parser.add_argument('--catalog', default=None, help="Catalog file (default: VIDEO_CATALOG_PATH from config.py).")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="Catalog size and the next due refreshes.")
+    history_parser = commands.add_parser('history', help="A video's snapshots.")
+    history_parser.add_argument('video_id')
+    args = parser.parse_args()
+
+    if args.catalog is None:
+        from config import VIDEO_CATALOG_PATH
+        args.catalog = VIDEO_CATALOG_PATH
+    catalog = VideoCatalog(args.catalog)
+    try:
+        if args.command == 'status':
+            status = catalog.status()
+            print(f"{status['videos']} videos ({status['scheduled']} scheduled, {status['due']} due now), "
+                  f"{status['snapshots']} snapshots.")
+            for video_id, next_due, views, views_per_hour in status['next']:
+                rate = 'unknown' if views_per_hour is None else f"{views_per_hour:,.0f}/h"
+                print(f"  {_format_time(next_due)}  {video_id}  views {views}  growth {rate}")
+        else:
+            for scan_ts, views, likes, comments in catalog.history(args.video_id):
+                print(f"{_format_time(scan_ts)}  views {views}  likes {likes}  comments {comments}")
+    finally:
+        catalog.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# row_pipeline.py
+# What happens to scraped rows besides the output file, shared by the scraper and
+# `capture_archive.py extract`: the YouTube Data API stage in front of the output writer,
+# and the trend index, trend sketches and video catalog fed with every batch on disk.
+
+from config import (
+    YOUTUBE_API_KEY, ENABLE_API_ENRICHMENT, API_BASE_URL, API_CALLS_PER_SECOND, API_DAILY_QUOTA, API_CACHE_PATH,
+    API_CACHE_TTL_HOURS, API_BATCH_MAX_WAIT_SEC, ENABLE_VIDEO_CATALOG, VIDEO_CATALOG_PATH, RESCAN_TARGET_GROWTH,
+    RESCAN_MIN_INTERVAL_HOURS, RESCAN_MAX_INTERVAL_HOURS, RESCAN_MAX_AGE_DAYS, RESCAN_MAX_FAILURES,
+    ENABLE_TREND_INDEX, TREND_INDEX_PATH, ENABLE_TREND_SKETCHES, TREND_SKETCH_PATH, TREND_SKETCH_WIDTH,
+    TREND_SKETCH_DEPTH, TREND_SKETCH_CANDIDATES
+)
+from api_enrichment import ApiEnrichmentStage, ApiResponseCache, QuotaRateLimiter, YouTubeDataClient, api_key_configured
+
+class RowPipeline:
+    """
+    Opens the row consumers enabled in config.py (or by the arguments). Pass add_rows as
+    the output writer's on_batch_written callback, then put the rows into
+    writer_for(output_writer): the API stage when a key is configured, else the writer
+    itself. close() drains the API stage, closes the writer, then saves the consumers.
+    """
+    def __init__(self, api_enrichment=ENABLE_API_ENRICHMENT, trend_index=ENABLE_TREND_INDEX,
+                 trend_sketches=ENABLE_TREND_SKETCHES, video_catalog=ENABLE_VIDEO_CATALOG):
+        self.api_enrichment = api_enrichment
+        self.api_stage = None
+        self.output_writer = None
+        # Hashtag / keyword / sound / channel index, updated as rows are written
+        self.trend_index = None
+        if trend_index:
+            from trend_index import TrendIndex # The index and sketches load numpy, so only when enabled
+            self.trend_index = TrendIndex(TREND_INDEX_PATH)
+        # Known videos with their snapshot time series, for --rescan
+        self.video_catalog = None
+        if video_catalog:
+            from rescan_scheduler import VideoCatalog # Loads pandas to normalize the snapshots
+            self.video_catalog = VideoCatalog(
+                VIDEO_CATALOG_PATH, RESCAN_MIN_INTERVAL_HOURS, RESCAN_MAX_INTERVAL_HOURS, RESCAN_TARGET_GROWTH,
+                RESCAN_MAX_AGE_DAYS, RESCAN_MAX_FAILURES,
+            )
+        # Top-K sketches of the last hour and day, continued from the previous runs
+        self.trend_sketches = None
+        if trend_sketches:
+            from trend_sketch import load_trend_sketches
+            self.trend_sketches = load_trend_sketches(TREND_SKETCH_PATH, TREND_SKETCH_WIDTH, TREND_SKETCH_DEPTH,
+                                                      TREND_SKETCH_CANDIDATES)
+
+    def add_rows(self, rows):
+        # Runs on the writer thread once a batch is on disk
+        if self.trend_index is not None:
+            self.trend_index.add_rows(rows)
+        if self.trend_sketches is not None:
+            self.trend_sketches.add_rows(rows)
+        if self.video_catalog is not None:
+            self.video_catalog.observe_rows(rows)
+
+    def writer_for(self, output_writer):
+        """Exact counts and publish times from the YouTube Data API, merged into rows before the writer."""
+        self.output_writer = output_writer
+        if self.api_enrichment and api_key_configured(YOUTUBE_API_KEY):
+            api_cache_ttl = API_CACHE_TTL_HOURS * 3600 if API_CACHE_TTL_HOURS else None
+            self.api_stage = ApiEnrichmentStage(
+                YouTubeDataClient(YOUTUBE_API_KEY, API_BASE_URL, rate_limiter=QuotaRateLimiter(API_CALLS_PER_SECOND, API_DAILY_QUOTA)),
+                output_writer, ApiResponseCache(API_CACHE_PATH, ttl_seconds=api_cache_ttl), max_wait=API_BATCH_MAX_WAIT_SEC,
+            )
+            return self.api_stage
+        if self.api_enrichment:
+            print("API enrichment: No YOUTUBE_API_KEY configured, using the scraped counts and dates.")
+        return output_writer
+
+    def close(self):
+        api_stage = self.api_stage
+        if api_stage is not None:
+            api_stage.close() # Forwards the rows still waiting for a videos.list call
+            print(f"API enrichment: {api_stage.enriched} rows enriched in {api_stage.client.calls} calls "
+                  f"({api_stage.cache.hits} cache hits), {api_stage.failed} rows kept their scraped values.")
+            api_stage.client.close()
+            api_stage.cache.close()
+        if self.output_writer is not None:
+            self.output_writer.close()
+            print(f"Output writer: {self.output_writer.rows_written} rows written in {self.output_writer.batches_written} batches.")
+        if self.trend_index is not None:
+            print(f"Trend index: {self.trend_index.rows_indexed} rows indexed.")
+            self.trend_index.close()
+        if self.trend_sketches is not None:
+            self.trend_sketches.save(TREND_SKETCH_PATH)
+            print(f"Trend sketches: {self.trend_sketches.rows_added} rows added, saved to {TREND_SKETCH_PATH}.")
+        if self.video_catalog is not None:
+            print(f"Video catalog: {self.video_catalog.snapshots_recorded} snapshots recorded.")
+            self.video_catalog.close()
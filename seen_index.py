@@ -0,0 +1,78 @@
+# seen_index.py
+
+import sqlite3
+import threading
+import time
+
+class SeenVideoIndex:
+    """
+    Persistent index of already scraped video IDs, shared by all account threads and
+    kept across runs in a SQLite file. Lookups hit the primary key index, so opening
+    and querying stay fast with millions of IDs.
+
+    claim() is an atomic check-and-reserve: only one account gets to scrape a given
+    video. The reservation becomes permanent with mark_scraped(), or is dropped with
+    release() if the extraction fails. With a TTL, a video can be scraped again once
+    its last scrape is older than ttl_seconds.
+    """
+    def __init__(self, path, ttl_seconds=None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._claimed = set()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_videos ("
+            " video_id TEXT PRIMARY KEY,"
+            " last_scraped REAL NOT NULL,"
+            " dummy_account_id TEXT"
+            ") WITHOUT ROWID"
+        )
+
+    def _is_fresh(self, video_id, now):
+        row = self._conn.execute("SELECT last_scraped FROM seen_videos WHERE video_id = ?", (video_id,)).fetchone()
+        if row is None:
+            return False
+        return self.ttl_seconds is None or now - row[0] < self.ttl_seconds
+
+    def __contains__(self, video_id):
+        with self._lock:
+            return video_id in self._claimed or self._is_fresh(video_id, time.time())
+
+    def claim(self, video_id):
+        """Returns True if the caller should scrape this video, reserving it for them."""
+        with self._lock:
+            if video_id in self._claimed or self._is_fresh(video_id, time.time()):
+                self.hits += 1
+                return False
+            self._claimed.add(video_id)
+            self.misses += 1
+            return True
+
+    def release(self, video_id):
+        """Drops a claim without recording the video, so it can be scraped again."""
+        with self._lock:
+            self._claimed.discard(video_id)
+
+    def mark_scraped(self, video_id, dummy_id=None):
+        """Records a successful scrape of a video."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO seen_videos (video_id, last_scraped, dummy_account_id) VALUES (?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET last_scraped = excluded.last_scraped, "
+                "dummy_account_id = excluded.dummy_account_id",
+                (video_id, time.time(), dummy_id),
+            )
+            self._claimed.discard(video_id)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_videos").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
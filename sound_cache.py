@@ -0,0 +1,81 @@
+# sound_cache.py
+
+import sqlite3
+import threading
+import time
+
+SOUND_FIELDS = ('sound_id', 'sound_name', 'sound_artist', 'sound_usage')
+
+class SoundCache:
+    """
+    Persistent cache of sound metadata, shared by all account threads and kept across
+    runs in a SQLite file. Entries are keyed by the link of the sound pivot button,
+    which can be read before clicking it, so the sound pop-up only has to be opened
+    for sounds that are new or whose entry is older than ttl_seconds (to refresh the
+    sound_usage count).
+    """
+    def __init__(self, path, ttl_seconds=None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._fetch_seconds = 0.0
+        self._fetches = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sounds ("
+            " pivot_key TEXT PRIMARY KEY,"
+            " sound_id TEXT, sound_name TEXT, sound_artist TEXT, sound_usage TEXT,"
+            " fetched_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def get(self, pivot_key):
+        """Returns the cached sound fields as a dict, or None on a miss or a stale entry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sound_id, sound_name, sound_artist, sound_usage, fetched_at FROM sounds WHERE pivot_key = ?",
+                (pivot_key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl_seconds is not None and time.time() - row[4] >= self.ttl_seconds:
+                self.stale += 1
+                return None
+            self.hits += 1
+            return dict(zip(SOUND_FIELDS, row[:4]))
+
+    def put(self, pivot_key, sound, fetch_seconds=None):
+        """
+        Stores the sound fields fetched from the pop-up. fetch_seconds is how long the
+        click-and-parse path took, used to estimate the time saved by later hits.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sounds (pivot_key, sound_id, sound_name, sound_artist, sound_usage, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (pivot_key, *(sound.get(field) for field in SOUND_FIELDS), time.time()),
+            )
+            if fetch_seconds is not None:
+                self._fetch_seconds += fetch_seconds
+                self._fetches += 1
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses + self.stale
+        return self.hits / lookups if lookups else 0.0
+
+    def format_summary(self):
+        """One-line hit-rate report with the estimated browser time saved."""
+        with self._lock:
+            average_fetch = self._fetch_seconds / self._fetches if self._fetches else 0.0
+            return (f"{self.hits} hits, {self.misses} misses, {self.stale} stale refreshes "
+                    f"({self.hit_rate() * 100:.1f}% hit rate), ~{self.hits * average_fetch:.0f}s of sound pop-up clicks saved")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
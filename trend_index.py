@@ -0,0 +1,393 @@
+# trend_index.py
+# Incremental inverted index over hashtags, keywords, sounds and channels.
+#
+# Usage:
+#   python trend_index.py build lhana_shorts_raw_data.csv             # index an existing CSV/NDJSON history
+#   python trend_index.py search --tag "#fyp" --since 2025-03-01 --until 2025-03-07
+#   python trend_index.py cooccur --sound "original sound - dailyvibes" --with tag --top 20
+#   python trend_index.py stats
+#
+# The scraper keeps the index up to date while it writes (ENABLE_TREND_INDEX), so
+# lookups never need a scan of the raw output.
+
+import argparse
+import ast
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from normalize import read_chunks
+
+# Term kinds and the output fields they are taken from.
+TERM_KINDS = ('tag', 'keyword', 'sound', 'channel')
+# A posting block is extended in place until it holds this many scans, then a new block starts.
+POSTING_BLOCK_SIZE = 4096
+
+EPOCH = datetime(1970, 1, 1)
+# Smallest unsigned type for a block, stored as the first byte of its blob.
+PACK_TYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+def pack_uints(values):
+    """Packs non-negative integers with the narrowest type that holds the largest one."""
+    values = np.asarray(values, dtype=np.uint64)
+    largest = int(values.max()) if len(values) else 0
+    code = next(i for i, dtype in enumerate(PACK_TYPES) if largest <= np.iinfo(dtype).max)
+    return bytes([code]) + values.astype(PACK_TYPES[code]).tobytes()
+
+def unpack_uints(blob):
+    return np.frombuffer(blob, dtype=PACK_TYPES[blob[0]], offset=1).astype(np.int64)
+
+def encode_postings(doc_ids):
+    """Delta-encodes a sorted doc ID array: the first ID, then the gaps to the previous one."""
+    doc_ids = np.asarray(doc_ids, dtype=np.int64)
+    return pack_uints(np.diff(doc_ids, prepend=0))
+
+def decode_postings(blob):
+    return np.cumsum(unpack_uints(blob))
+
+def to_epoch(value):
+    """Scan time as whole seconds, from an ISO string ('2025-03-10T12:00:00.123') or a datetime."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return int((value.replace(tzinfo=None) - EPOCH).total_seconds())
+
+def _missing(value):
+    return value is None or value != value or value in ('', 'NaN')  # value != value is NaN
+
+def _hashtags(value):
+    """Live rows carry lists; CSV history stores them as "['#a', '#b']" strings."""
+    if isinstance(value, str) and value.startswith('['):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return []
+    return value if isinstance(value, (list, tuple)) else []
+
+def row_terms(row):
+    """Returns the (kind, term, label) triples a row is indexed under. Terms are lowercased labels."""
+    terms = []
+    for hashtag in (*_hashtags(row.get('hashtags_on_caption')), *_hashtags(row.get('hashtags_on_description'))):
+        hashtag = str(hashtag).strip()
+        if hashtag:
+            terms.append(('tag', hashtag.lower(), hashtag))
+    keywords = row.get('extracted_keywords')
+    if not _missing(keywords) and str(keywords).strip():
+        terms.append(('keyword', str(keywords).strip().lower(), str(keywords).strip()))
+    sound_id = row.get('sound_id')
+    if not _missing(sound_id):
+        sound_name = row.get('sound_name')
+        terms.append(('sound', str(sound_id), str(sound_id) if _missing(sound_name) else str(sound_name)))
+    channel = row.get('channel_name')
+    if not _missing(channel):
+        terms.append(('channel', str(channel).lower(), str(channel)))
+    return terms
+
+class TrendIndex:
+    """
+    On-disk inverted index from hashtags, keywords, sounds and channels to the scans
+    that carried them, kept in a SQLite file and updated incrementally as rows are
+    written (add_rows is the output writer's batch callback).
+
+    Every written row is one scan with a doc ID that only ever grows, so each term's
+    posting list is a sorted doc ID array, stored in blocks of delta-encoded integers
+    packed at the narrowest width that fits (most gaps fit in one or two bytes). New
+    scans extend the term's last block until it holds POSTING_BLOCK_SIZE scans. Blocks
+    carry their scan time range, so date-bounded lookups skip blocks outside it. A
+    forward list of term IDs per scan answers co-occurrence questions.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.rows_indexed = 0
+        self._term_ids = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " doc_id INTEGER PRIMARY KEY,"
+            " video_id TEXT NOT NULL,"
+            " scan_ts INTEGER NOT NULL,"
+            " term_ids BLOB NOT NULL,"
+            " UNIQUE (video_id, scan_ts)"
+            ")"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS terms ("
+            " term_id INTEGER PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " term TEXT NOT NULL,"
+            " label TEXT,"
+            " UNIQUE (kind, term)"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS terms_label ON terms (kind, label)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term_id INTEGER NOT NULL,"
+            " first_doc INTEGER NOT NULL,"
+            " doc_count INTEGER NOT NULL,"
+            " min_ts INTEGER NOT NULL,"
+            " max_ts INTEGER NOT NULL,"
+            " docs BLOB NOT NULL,"
+            " PRIMARY KEY (term_id, first_doc)"
+            ") WITHOUT ROWID"
+        )
+
+    # --- Updates ---
+    def _term_id(self, kind, term, label):
+        key = (kind, term)
+        term_id = self._term_ids.get(key)
+        if term_id is None:
+            self._conn.execute(
+                "INSERT INTO terms (kind, term, label) VALUES (?, ?, ?) "
+                "ON CONFLICT(kind, term) DO UPDATE SET label = excluded.label", (kind, term, label))
+            term_id = self._conn.execute("SELECT term_id FROM terms WHERE kind = ? AND term = ?", key).fetchone()[0]
+            self._term_ids[key] = term_id
+        return term_id
+
+    def _append_postings(self, term_id, doc_ids, timestamps):
+        last = self._conn.execute(
+            "SELECT first_doc, doc_count, min_ts, max_ts, docs FROM postings WHERE term_id = ? "
+            "ORDER BY first_doc DESC LIMIT 1", (term_id,)).fetchone()
+        if last is not None and last[1] < POSTING_BLOCK_SIZE:
+            # Extend the open block; new doc IDs are always larger than the ones in it
+            first_doc, _, min_ts, max_ts, blob = last
+            doc_ids = np.concatenate([decode_postings(blob), doc_ids])
+            min_ts, max_ts = min(min_ts, min(timestamps)), max(max_ts, max(timestamps))
+            self._conn.execute(
+                "UPDATE postings SET doc_count = ?, min_ts = ?, max_ts = ?, docs = ? WHERE term_id = ? AND first_doc = ?",
+                (len(doc_ids), min_ts, max_ts, encode_postings(doc_ids), term_id, first_doc))
+            return
+        self._conn.execute(
+            "INSERT INTO postings (term_id, first_doc, doc_count, min_ts, max_ts, docs) VALUES (?, ?, ?, ?, ?, ?)",
+            (term_id, int(doc_ids[0]), len(doc_ids), min(timestamps), max(timestamps), encode_postings(doc_ids)))
+
+    def add_rows(self, rows):
+        """
+        Indexes written rows (dicts). A row whose video ID and scan time are already
+        indexed is skipped, so indexing the same history twice changes nothing.
+        Returns the number of rows indexed.
+        """
+        new_postings = {}
+        indexed = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    video_id, scan_ts = row.get('video_id'), to_epoch(row.get('timestamp_scan'))
+                    if _missing(video_id) or scan_ts is None:
+                        continue
+                    term_ids = sorted({self._term_id(kind, term, label) for kind, term, label in row_terms(row)})
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO docs (video_id, scan_ts, term_ids) VALUES (?, ?, ?)",
+                        (str(video_id), scan_ts, np.asarray(term_ids, dtype='<u4').tobytes()))
+                    if not cursor.rowcount:
+                        continue  # Already indexed
+                    indexed += 1
+                    for term_id in term_ids:
+                        postings = new_postings.setdefault(term_id, ([], []))
+                        postings[0].append(cursor.lastrowid)
+                        postings[1].append(scan_ts)
+                for term_id, (doc_ids, timestamps) in new_postings.items():
+                    for start in range(0, len(doc_ids), POSTING_BLOCK_SIZE):
+                        self._append_postings(term_id, np.asarray(doc_ids[start:start + POSTING_BLOCK_SIZE], dtype=np.int64),
+                                              timestamps[start:start + POSTING_BLOCK_SIZE])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._term_ids = {}  # Term IDs created in the rolled back transaction are gone
+                raise
+            self.rows_indexed += indexed
+        return indexed
+
+    # --- Lookups ---
+    def find_terms(self, kind, value):
+        """Term IDs matching a value: the term itself (case-insensitive) or its label, e.g. a sound name."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT term_id FROM terms WHERE kind = ? AND (term = ? OR label = ?)",
+                (kind, str(value).lower() if kind != 'sound' else str(value), str(value))).fetchall()
+        return [row[0] for row in rows]
+
+    def postings(self, term_ids, since=None, until=None):
+        """
+        Returns the sorted doc IDs of the given terms, limited to scans between since and
+        until (epoch seconds, inclusive). Blocks whose time range misses the window are skipped.
+        """
+        lists = []
+        bounded = since is not None or until is not None
+        since = -2**63 if since is None else since
+        until = 2**63 - 1 if until is None else until
+        with self._lock:
+            for term_id in term_ids:
+                blocks = self._conn.execute(
+                    "SELECT docs, min_ts, max_ts FROM postings WHERE term_id = ? AND max_ts >= ? AND min_ts <= ?",
+                    (term_id, since, until)).fetchall()
+                for blob, min_ts, max_ts in blocks:
+                    doc_ids = decode_postings(blob)
+                    if bounded and not (since <= min_ts and max_ts <= until):
+                        # Block straddles the window; check the scans' own times
+                        timestamps = self._scan_times(doc_ids)
+                        doc_ids = doc_ids[(timestamps >= since) & (timestamps <= until)]
+                    lists.append(doc_ids)
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(lists))
+
+    def _fetch_docs(self, columns, doc_ids):
+        rows = []
+        doc_ids = [int(doc_id) for doc_id in doc_ids]
+        for start in range(0, len(doc_ids), 900):  # SQLite parameter limit
+            chunk = doc_ids[start:start + 900]
+            rows.extend(self._conn.execute(
+                f"SELECT {columns} FROM docs WHERE doc_id IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+        return rows
+
+    def _scan_times(self, doc_ids):
+        times = dict(self._fetch_docs('doc_id, scan_ts', doc_ids))
+        return np.array([times[int(doc_id)] for doc_id in doc_ids], dtype=np.int64)
+
+    def scans(self, doc_ids):
+        """Returns (video_id, scan_ts) for doc IDs, newest scan first."""
+        with self._lock:
+            rows = self._fetch_docs('video_id, scan_ts', doc_ids)
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def search(self, kind, value, since=None, until=None):
+        """Returns the (video_id, latest scan_ts) of shorts carrying a term, newest first."""
+        latest = {}
+        for video_id, scan_ts in self.scans(self.postings(self.find_terms(kind, value), since, until)):
+            latest.setdefault(video_id, scan_ts)
+        return list(latest.items())
+
+    def cooccurring(self, kind, value, with_kind='tag', since=None, until=None, top=20):
+        """
+        Returns the most common with_kind terms on shorts carrying a term, as
+        (label, shorts) pairs. Each short counts once, with the terms of its latest scan.
+        """
+        term_ids = self.find_terms(kind, value)
+        doc_ids = self.postings(term_ids, since, until)
+        with self._lock:
+            rows = self._fetch_docs('video_id, scan_ts, term_ids', doc_ids)
+        latest = {}
+        for video_id, scan_ts, blob in rows:
+            if video_id not in latest or scan_ts > latest[video_id][0]:
+                latest[video_id] = (scan_ts, blob)
+        co_terms, counts = np.unique(np.frombuffer(b''.join(blob for _, blob in latest.values()), dtype='<u4'),
+                                     return_counts=True)
+        keep = ~np.isin(co_terms, term_ids)
+        co_terms, counts = co_terms[keep], counts[keep]
+        order = np.argsort(-counts, kind='stable')
+        ranked, ranked_counts = co_terms[order].tolist(), counts[order].tolist()
+        pairs = []
+        with self._lock:
+            # Labels for the most common terms first, until enough of them are of with_kind
+            for start in range(0, len(ranked), 900):
+                chunk = ranked[start:start + 900]
+                labels = dict(self._conn.execute(
+                    f"SELECT term_id, label FROM terms WHERE kind = ? AND term_id IN ({','.join('?' * len(chunk))})",
+                    (with_kind, *chunk)).fetchall())
+                pairs.extend((labels[term_id], count) for term_id, count in zip(chunk, ranked_counts[start:start + 900])
+                             if term_id in labels)
+                if len(pairs) >= top:
+                    break
+        return pairs[:top]
+
+    def stats(self):
+        with self._lock:
+            docs = self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            terms = dict(self._conn.execute("SELECT kind, COUNT(*) FROM terms GROUP BY kind").fetchall())
+            blocks, postings, posting_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(doc_count), 0), COALESCE(SUM(LENGTH(docs)), 0) FROM postings").fetchone()
+        return {'scans': docs, 'terms': terms, 'blocks': blocks, 'postings': postings, 'posting_bytes': posting_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def build(index, input_path, chunksize=50_000):
+    """Indexes a raw CSV or NDJSON history. Returns (rows read, rows indexed)."""
+    rows = indexed = 0
+    for chunk in read_chunks(input_path, chunksize):
+        records = chunk.to_dict('records')
+        rows += len(records)
+        indexed += index.add_rows(records)
+    return rows, indexed
+
+def _day(value, end=False):
+    """Epoch seconds of a YYYY-MM-DD date (the end of that day if end)."""
+    day = datetime.strptime(value, '%Y-%m-%d')
+    return to_epoch(day + timedelta(days=1, seconds=-1) if end else day)
+
+def _term_argument(args):
+    for kind in TERM_KINDS:
+        if getattr(args, kind) is not None:
+            return kind, getattr(args, kind)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the hashtag / keyword / sound / channel index.")
+    parser.add_argument('--index', default=None, help="Index file (default: TREND_INDEX_PATH from config.py).")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help="Index raw CSV or NDJSON histories (already indexed rows are skipped).")
+    build_parser.add_argument('inputs', nargs='+')
+    build_parser.add_argument('--chunksize', type=int, default=50_000)
+    for name, help_text in (('search', "List shorts carrying a term."), ('cooccur', "Most common terms next to a term.")):
+        command = commands.add_parser(name, help=help_text)
+        for kind in TERM_KINDS:
+            command.add_argument(f'--{kind}', help=f"Exact {kind} (sounds match their ID or name).")
+        command.add_argument('--since', help="First scan day, YYYY-MM-DD.")
+        command.add_argument('--until', help="Last scan day, YYYY-MM-DD (inclusive).")
+        if name == 'search':
+            command.add_argument('--limit', type=int, default=20, help="Shorts to print (newest first).")
+        else:
+            command.add_argument('--with', dest='with_kind', choices=TERM_KINDS, default='tag')
+            command.add_argument('--top', type=int, default=20)
+    commands.add_parser('stats', help="Index size.")
+    args = parser.parse_args()
+
+    if args.index is None:
+        from config import TREND_INDEX_PATH
+        args.index = TREND_INDEX_PATH
+    index = TrendIndex(args.index)
+    started = time.perf_counter()
+    try:
+        if args.command == 'build':
+            for input_path in args.inputs:
+                rows, indexed = build(index, input_path, args.chunksize)
+                print(f"{input_path}: {indexed} of {rows} rows indexed.")
+            print(f"Built in {time.perf_counter() - started:.1f}s.")
+        elif args.command == 'stats':
+            print(index.stats())
+        else:
+            term = _term_argument(args)
+            if term is None:
+                parser.error(f"{args.command} needs one of --{', --'.join(TERM_KINDS)}")
+            since = _day(args.since) if args.since else None
+            until = _day(args.until, end=True) if args.until else None
+            if args.command == 'search':
+                shorts = index.search(*term, since, until)
+                for video_id, scan_ts in shorts[:args.limit]:
+                    print(f"{video_id}  {EPOCH + timedelta(seconds=scan_ts):%Y-%m-%d %H:%M:%S}")
+                print(f"{len(shorts)} shorts in {(time.perf_counter() - started) * 1000:.1f} ms.")
+            else:
+                pairs = index.cooccurring(*term, args.with_kind, since, until, args.top)
+                for label, count in pairs:
+                    print(f"{count:>8}  {label}")
+                print(f"{len(pairs)} {args.with_kind} terms in {(time.perf_counter() - started) * 1000:.1f} ms.")
+    finally:
+        index.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+# trend_sketch.py
+# Bounded-memory streaming top-K of sounds, hashtags and keywords over sliding windows.
+#
+# Usage:
+#   python trend_sketch.py top --kind sound --window hour -k 20     # trending now, with growth
+#   python trend_sketch.py merge run_a.npz run_b.npz -o merged.npz  # combine sketches of several machines
+#   python trend_sketch.py build lhana_shorts_raw_data.csv          # sketch an existing CSV/NDJSON history
+#
+# The scraper feeds every written row into the sketches (ENABLE_TREND_SKETCHES) and
+# saves them to TREND_SKETCH_PATH at the end of a run, merged with the previous runs.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from normalize import read_chunks
+from trend_index import row_terms, to_epoch
+
+# Term kinds tracked (see trend_index.row_terms).
+SKETCH_KINDS = ('sound', 'tag', 'keyword')
+# Sliding windows: (bucket seconds, buckets per window). Each window keeps twice as many
+# buckets, so growth can be measured against the window before it.
+SKETCH_WINDOWS = {
+    'hour': (300, 12),
+    'day': (3600, 24),
+}
+
+def key_hash(key):
+    """Stable 64-bit hash of a term (the same on every machine and run, unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def sketch_columns(hashed, width, depth):
+    """Counter column of a hashed key in each sketch row, by double hashing (row i uses h1 + i * h2)."""
+    h1, h2 = hashed & 0xffffffff, (hashed >> 32) | 1
+    return [(h1 + i * h2) % width for i in range(depth)]
+
+class CountMinSketch:
+    """
+    Count-min sketch: depth rows of width counters. A key's estimate never undercounts
+    and overcounts by at most ~2/width of the total count with high probability.
+    Sketches of the same shape merge exactly by adding their tables.
+    """
+    __slots__ = ('width', 'depth', 'table', 'total')
+
+    def __init__(self, width, depth, table=None):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64) if table is None else table
+        self.total = int(self.table[0].sum())
+
+    def columns(self, hashed):
+        return sketch_columns(hashed, self.width, self.depth)
+
+    def add(self, columns, count=1):
+        self.table[range(self.depth), columns] += count
+        self.total += count
+
+    def estimate(self, columns):
+        return int(self.table[range(self.depth), columns].min())
+
+    def merge(self, other):
+        self.table += other.table
+        self.total += other.total
+
+class WindowedTopK:
+    """
+    Heavy hitters of one term kind over a sliding window, in constant memory. Time is
+    cut into buckets kept in a ring (twice the window); each bucket holds a count-min
+    sketch and its top candidates (up to 2 * capacity, trimmed back to capacity by
+    estimate). A query adds the bucket sketches inside the window, so counts are
+    exact up to the sketch error, and ranks the candidates of those buckets.
+    Buckets follow the scan times, not the wall clock, so sketches from different
+    runs and machines line up and merge bucket by bucket.
+    """
+    def __init__(self, bucket_seconds, window_buckets, width=2048, depth=4, capacity=100):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self.capacity = capacity
+        self.slots = 2 * window_buckets
+        self.bucket_ids = [-1] * self.slots
+        self.sketches = [CountMinSketch(width, depth) for _ in range(self.slots)]
+        self.candidates = [{} for _ in range(self.slots)]  # key -> [estimate, label]
+        self.latest_bucket = -1
+
+    def _slot(self, bucket_id):
+        """Returns the ring slot of a bucket, clearing it if it held an older bucket; None if too old."""
+        if bucket_id <= self.latest_bucket - self.slots:
+            return None
+        slot = bucket_id % self.slots
+        if self.bucket_ids[slot] != bucket_id:
+            if self.bucket_ids[slot] > bucket_id:
+                return None
+            self.bucket_ids[slot] = bucket_id
+            self.sketches[slot].table[:] = 0
+            self.sketches[slot].total = 0
+            self.candidates[slot] = {}
+        self.latest_bucket = max(self.latest_bucket, bucket_id)
+        return slot
+
+    def add(self, key, label, timestamp, count=1, hashed=None):
+        slot = self._slot(timestamp // self.bucket_seconds)
+        if slot is None:
+            return
+        sketch = self.sketches[slot]
+        columns = sketch.columns(key_hash(key) if hashed is None else hashed)
+        sketch.add(columns, count)
+        candidates = self.candidates[slot]
+        candidates[key] = [sketch.estimate(columns), label]
+        if len(candidates) > 2 * self.capacity:
+            self._trim(slot)
+
+    def _trim(self, slot):
+        candidates = self.candidates[slot]
+        keep = sorted(candidates.items(), key=lambda item: item[1][0], reverse=True)[:self.capacity]
+        self.candidates[slot] = dict(keep)
+
+    def _window(self, end_bucket):
+        """Sums the sketches of the window ending at end_bucket; returns (table, candidate labels)."""
+        table = np.zeros_like(self.sketches[0].table)
+        labels = {}
+        for slot, bucket_id in enumerate(self.bucket_ids):
+            if end_bucket - self.window_buckets < bucket_id <= end_bucket:
+                table += self.sketches[slot].table
+                for key, (_, label) in self.candidates[slot].items():
+                    labels[key] = label
+        return table, labels
+
+    def top(self, k=20, now=None):
+        """
+        Returns the k heaviest terms of the window ending at now (epoch seconds; default:
+        the latest scan seen) as dicts with key, label, count, previous (the count in
+        the window before) and growth (count / previous, None for terms new this window).
+        """
+        end_bucket = self.latest_bucket if now is None else now // self.bucket_seconds
+        current, labels = self._window(end_bucket)
+        previous, _ = self._window(end_bucket - self.window_buckets)
+        depth, width = current.shape
+        rows = range(depth)
+        results = []
+        for key, label in labels.items():
+            columns = sketch_columns(key_hash(key), width, depth)
+            count = int(current[rows, columns].min())
+            before = int(previous[rows, columns].min())
+            results.append({'key': key, 'label': label, 'count': count, 'previous': before,
+                            'growth': count / before if before else None})
+        results.sort(key=lambda result: result['count'], reverse=True)
+        return results[:k]
+
+    def merge(self, other):
+        """Adds another sketch of the same shape (e.g. from another machine) into this one."""
+        if (other.bucket_seconds, other.slots, other.sketches[0].table.shape) != \
+                (self.bucket_seconds, self.slots, self.sketches[0].table.shape):
+            raise ValueError("Cannot merge trend sketches with different windows or sketch sizes.")
+        for bucket_id, other_slot in sorted((bucket_id, slot) for slot, bucket_id in enumerate(other.bucket_ids)):
+            if bucket_id < 0:
+                continue
+            slot = self._slot(bucket_id)
+            if slot is None:
+                continue
+            self.sketches[slot].merge(other.sketches[other_slot])
+            candidates = self.candidates[slot]
+            for key, (_, label) in other.candidates[other_slot].items():
+                candidates[key] = [0, label]
+            # Re-rank the union by the merged sketch
+            sketch = self.sketches[slot]
+            for key, candidate in candidates.items():
+                candidate[0] = sketch.estimate(sketch.columns(key_hash(key)))
+            if len(candidates) > self.capacity:
+                self._trim(slot)
+
+class TrendSketches:
+    """
+    Windowed top-K sketches for sounds, hashtags and keywords. add_rows is the output
+    writer's batch callback; save/load/merge persist and combine the sketches across
+    runs and machines. Memory is fixed by the sketch size and the window lengths, no
+    matter how many rows are added.
+    """
+    def __init__(self, width=2048, depth=4, capacity=100):
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.rows_added = 0
+        self.windows = {
+            (kind, window): WindowedTopK(bucket_seconds, buckets, width, depth, capacity)
+            for kind in SKETCH_KINDS for window, (bucket_seconds, buckets) in SKETCH_WINDOWS.items()
+        }
+
+    def add_rows(self, rows):
+        for row in rows:
+            timestamp = to_epoch(row.get('timestamp_scan'))
+            if timestamp is None:
+                continue
+            for kind, term, label in row_terms(row):
+                if kind in SKETCH_KINDS:
+                    hashed = key_hash(term)
+                    for window in SKETCH_WINDOWS:
+                        self.windows[(kind, window)].add(term, label, timestamp, hashed=hashed)
+            self.rows_added += 1
+
+    def top(self, kind, window, k=20, now=None):
+        return self.windows[(kind, window)].top(k, now)
+
+    def merge(self, other):
+        for key, sketch in self.windows.items():
+            sketch.merge(other.windows[key])
+
+    def save(self, path):
+        """Writes the sketches to an .npz file, atomically."""
+        arrays = {}
+        meta = {'width': self.width, 'depth': self.depth, 'capacity': self.capacity, 'windows': {}}
+        for (kind, window), sketch in self.windows.items():
+            name = f'{kind}.{window}'
+            arrays[name] = np.stack([s.table for s in sketch.sketches])
+            meta['windows'][name] = {
+                'bucket_seconds': sketch.bucket_seconds, 'window_buckets': sketch.window_buckets,
+                'bucket_ids': sketch.bucket_ids, 'latest_bucket': sketch.latest_bucket,
+                'candidates': sketch.candidates,
+            }
+        arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+        tmp_path = path + '.tmp.npz'  # np.savez adds .npz to names without it
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            sketches = cls(meta['width'], meta['depth'], meta['capacity'])
+            for (kind, window), sketch in sketches.windows.items():
+                name = f'{kind}.{window}'
+                saved = meta['windows'].get(name)
+                if saved is None or (saved['bucket_seconds'], saved['window_buckets']) != \
+                        (sketch.bucket_seconds, sketch.window_buckets):
+                    continue  # Window definition changed since the file was written
+                tables = data[name]
+                sketch.bucket_ids = saved['bucket_ids']
+                sketch.latest_bucket = saved['latest_bucket']
+                sketch.sketches = [CountMinSketch(meta['width'], meta['depth'], tables[i].copy()) for i in range(len(tables))]
+                sketch.candidates = saved['candidates']
+        return sketches
+
+def load_trend_sketches(path, width=2048, depth=4, capacity=100):
+    """Loads saved sketches, or returns empty ones if there are none (or they have another size)."""
+    if os.path.exists(path):
+        try:
+            sketches = TrendSketches.load(path)
+            if (sketches.width, sketches.depth) == (width, depth):
+                return sketches
+            print(f"Trend sketches: {path} has another sketch size, starting new sketches.")
+        except Exception as e:
+            print(f"Trend sketches: Could not load {path} ({e}), starting new sketches.")
+    return TrendSketches(width, depth, capacity)
+
+def main():
+    parser = argparse.ArgumentParser(description="Query, merge and build the trend sketches.")
+    parser.add_argument('--sketch', default=None, help="Sketch file (default: TREND_SKETCH_PATH from config.py).")
+    commands = parser.add_subparsers(dest='command', required=True)
+    top_parser = commands.add_parser('top', help="Approximate top-K with growth against the previous window.")
+    top_parser.add_argument('--kind', choices=SKETCH_KINDS, default='sound')
+    top_parser.add_argument('--window', choices=tuple(SKETCH_WINDOWS), default='hour')
+    top_parser.add_argument('-k', type=int, default=20)
+    top_parser.add_argument('--now', help="End of the window, YYYY-MM-DDTHH:MM (default: the latest scan).")
+    merge_parser = commands.add_parser('merge', help="Merge sketch files into one.")
+    merge_parser.add_argument('inputs', nargs='+')
+    merge_parser.add_argument('-o', '--output', required=True)
+    build_parser = commands.add_parser('build', help="Add a raw CSV or NDJSON history to the sketches.")
+    build_parser.add_argument('inputs', nargs='+')
+    build_parser.add_argument('--chunksize', type=int, default=50_000)
+    args = parser.parse_args()
+
+    from config import TREND_SKETCH_PATH, TREND_SKETCH_WIDTH, TREND_SKETCH_DEPTH, TREND_SKETCH_CANDIDATES
+    path = args.sketch or TREND_SKETCH_PATH
+    if args.command == 'merge':
+        merged = TrendSketches.load(args.inputs[0])
+        for input_path in args.inputs[1:]:
+            merged.merge(TrendSketches.load(input_path))
+        merged.save(args.output)
+        print(f"Merged {len(args.inputs)} sketch files into {args.output}.")
+    elif args.command == 'build':
+        sketches = load_trend_sketches(path, TREND_SKETCH_WIDTH, TREND_SKETCH_DEPTH, TREND_SKETCH_CANDIDATES)
+        for input_path in args.inputs:
+            for chunk in read_chunks(input_path, args.chunksize):
+                sketches.add_rows(chunk.to_dict('records'))
+        sketches.save(path)
+        print(f"Added {sketches.rows_added} rows to {path}.")
+    else:
+        if not os.path.exists(path):
+            print(f"No trend sketches at {path} yet.")
+            return 1
+        now = to_epoch(datetime.fromisoformat(args.now)) if args.now else None
+        results = TrendSketches.load(path).top(args.kind, args.window, args.k, now)
+        for result in results:
+            growth = 'new' if result['growth'] is None else f"x{result['growth']:.2f}"
+            print(f"{result['count']:>10}  {growth:>8}  {result['label']}")
+        if not results:
+            print("No observations in this window.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
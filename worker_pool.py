@@ -0,0 +1,223 @@
+# worker_pool.py
+
+import ctypes
+import os
+import queue
+import random
+import threading
+import time
+import traceback
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, memory is read from the OS directly without it
+    psutil = None
+
+# Final states of a job, in the order they are reported.
+JOB_STATES = ('completed', 'failed', 'timed_out', 'cancelled')
+
+def available_memory_mb():
+    """Returns the memory available for new processes in MB, or None if it cannot be read."""
+    if psutil is not None:
+        return psutil.virtual_memory().available // (1024 * 1024)
+    if os.name == 'nt':
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('ullAvailExtendedVirtual', ctypes.c_ulonglong),
+            ]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys // (1024 * 1024)
+        return None
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+def recommended_workers(job_count, max_workers=None, cpu_per_worker=1.0, memory_per_worker_mb=1024, memory_reserve_mb=1024):
+    """
+    Number of browsers to run at once: what the CPU count and the available memory
+    can hold (keeping memory_reserve_mb free), never more than there are jobs.
+    An explicit max_workers overrides the estimate, with a warning if it is higher.
+    """
+    cpu_limit = max(1, int((os.cpu_count() or 1) / cpu_per_worker))
+    memory_mb = available_memory_mb()
+    memory_limit = max(1, (memory_mb - memory_reserve_mb) // memory_per_worker_mb) if memory_mb is not None else cpu_limit
+    estimate = min(cpu_limit, memory_limit)
+    if max_workers:
+        if max_workers > estimate:
+            print(f"Worker pool: Warning: {max_workers} concurrent browsers requested, but this machine "
+                  f"looks sized for {estimate} ({os.cpu_count()} CPUs, {memory_mb} MB available).")
+        estimate = max_workers
+    return max(1, min(estimate, job_count))
+
+
+class Job:
+    """
+    One account job. The task polls cancelled() between steps and registers an abort
+    callback (e.g. driver.quit) so a timed-out or cancelled job can be interrupted even
+    while it is blocked inside a browser call.
+    """
+    def __init__(self, job_id, payload):
+        self.job_id = job_id
+        self.payload = payload
+        self.slot = None
+        self.state = 'pending'
+        self.started_at = None
+        self.finished_at = None
+        self.deadline = None
+        self._cancel_event = threading.Event()
+        self._abort = None
+        self._lock = threading.Lock()
+
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def set_abort(self, abort):
+        """Registers the callback that unblocks the task, e.g. the driver's quit method."""
+        with self._lock:
+            self._abort = abort
+
+    def cancel(self, state):
+        """Flags the job as cancelled (state 'timed_out' or 'cancelled') and runs its abort callback."""
+        with self._lock:
+            if self._cancel_event.is_set():
+                return
+            self.state = state
+            self._cancel_event.set()
+            abort = self._abort
+        if abort is not None:
+            try:
+                abort()
+            except Exception as e:
+                print(f"Worker pool: Error aborting job {self.job_id}: {e}")
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+
+class BrowserWorkerPool:
+    """
+    Runs account jobs on a fixed number of worker threads, each driving at most one
+    browser at a time. Workers take the next job from the queue as soon as their
+    current one finishes, fails or times out, so peak memory follows the number of
+    workers, not the number of accounts. task(job) returns a falsy value or raises
+    to mark the job as failed.
+    """
+    def __init__(self, task, max_workers, job_timeout=None, start_delay=(0, 0), poll_interval=0.5):
+        self.task = task
+        self.max_workers = max(1, max_workers)
+        self.job_timeout = job_timeout
+        self.start_delay = start_delay
+        self.poll_interval = poll_interval
+        self.jobs = []
+        self._queue = queue.Queue()
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._workers = []
+
+    def submit(self, job_id, payload):
+        job = Job(job_id, payload)
+        self.jobs.append(job)
+        self._queue.put(job)
+        return job
+
+    def _worker(self, slot):
+        # Stagger the first browser launches instead of starting all of them at once.
+        if slot and self._stopping.wait(random.uniform(*self.start_delay) * slot):
+            return
+        while not self._stopping.is_set():
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            job.slot = slot
+            job.started_at = time.monotonic()
+            job.deadline = job.started_at + self.job_timeout if self.job_timeout else None
+            job.state = 'running'
+            with self._lock:
+                self._running[job.job_id] = job
+            print(f"Worker pool: Slot {slot} started job {job.job_id}.")
+            try:
+                ok = self.task(job)
+            except Exception as e:
+                ok = False
+                if not job.cancelled():
+                    print(f"Worker pool: Job {job.job_id} raised an error: {e}")
+                    traceback.print_exc()
+            job.finished_at = time.monotonic()
+            with self._lock:
+                self._running.pop(job.job_id, None)
+                if not job.cancelled():
+                    job.state = 'completed' if ok else 'failed'
+            print(f"Worker pool: Slot {slot} finished job {job.job_id} ({job.state}) in {job.elapsed():.0f}s.")
+
+    def _check_deadlines(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [job for job in self._running.values() if job.deadline is not None and now >= job.deadline]
+        for job in expired:
+            print(f"Worker pool: Job {job.job_id} exceeded its {self.job_timeout:.0f}s timeout, aborting it.")
+            job.cancel('timed_out')
+
+    def shutdown(self):
+        """Stops handing out jobs and aborts the running ones. Pending jobs are marked cancelled."""
+        self._stopping.set()
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            job.state = 'cancelled'
+        with self._lock:
+            running = list(self._running.values())
+        for job in running:
+            job.cancel('cancelled')
+
+    def run(self, shutdown_grace=30):
+        """
+        Starts the workers and blocks until every job is done. On Ctrl-C, pending jobs
+        are dropped, running ones are aborted and the workers get shutdown_grace seconds
+        to close their browsers; a second Ctrl-C stops waiting.
+        """
+        self._workers = [
+            threading.Thread(target=self._worker, args=(slot,), name=f'browser-worker-{slot}', daemon=True)
+            for slot in range(self.max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        try:
+            while any(worker.is_alive() for worker in self._workers):
+                self._check_deadlines()
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print("\nWorker pool: Interrupted, closing running browsers (press Ctrl-C again to stop waiting)...")
+            self.shutdown()
+            deadline = time.monotonic() + shutdown_grace
+            for worker in self._workers:
+                worker.join(max(0.0, deadline - time.monotonic()))
+            raise
+        return self.summary()
+
+    def summary(self):
+        counts = {state: 0 for state in JOB_STATES}
+        for job in self.jobs:
+            if job.state in counts:
+                counts[job.state] += 1
+        return counts
+
+    def format_summary(self):
+        counts = self.summary()
+        return f"{len(self.jobs)} jobs on {self.max_workers} workers: " + ", ".join(f"{counts[state]} {state}" for state in JOB_STATES)
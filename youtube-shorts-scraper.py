@@ -1,31 +1,57 @@
-import pandas as pd
 import time
 import random
-import threading
-import csv
 import os
 import traceback
 from datetime import datetime
-from bs4 import BeautifulSoup
-import undetected_chromedriver as uc
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By 
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-import tkinter as tk
 import sys
-import json
-import re
+import argparse
+import types
 
 # Import configurations from config.py
 from config import (
-    RAW_DATA_CSV, CSV_HEADERS, DUMMY_ACCOUNTS, YOUTUBE_API_KEY,
+    RAW_DATA_CSV, CSV_HEADERS, DUMMY_ACCOUNTS, YOUTUBE_API_KEY, YOUTUBE_BASE_URL,
     MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT, THREAD_START_DELAY_MIN, THREAD_START_DELAY_MAX,
-    MIN_BROWSER_WINDOW_SIZE, HORIZONTAL_PADDING, VERTICAL_PADDING, TASKBAR_HEIGHT_ASSUMPTION,
+    MIN_BROWSER_WINDOW_SIZE, HORIZONTAL_PADDING, VERTICAL_PADDING, TASKBAR_HEIGHT_ASSUMPTION, HEADLESS_WINDOW_SIZE,
     ENABLE_VPN, VPN_EXTENSION_ID, VPN_EXTENSION_VERSION, VPN_EXTENSIONS_BASE_PATH,
-    CUSTOM_CHROMEDRIVER_DIR, FORMAT_EXT
+    CUSTOM_CHROMEDRIVER_DIR, FORMAT_EXT, EXTRACTION_BACKEND, EXTRACTION_REPORT_SAVINGS,
+    OUTPUT_BATCH_SIZE, OUTPUT_FLUSH_INTERVAL_SEC, OUTPUT_FSYNC_POLICY, OUTPUT_QUEUE_MAXSIZE,
+    OUTPUT_COMPRESSION, OUTPUT_ROTATE_BYTES, OUTPUT_MAX_WRITE_ATTEMPTS, OUTPUT_DEAD_LETTER_PATH,
+    ENABLE_SEEN_INDEX, SEEN_INDEX_PATH, SEEN_INDEX_RESCRAPE_TTL_HOURS,
+    ENABLE_SOUND_CACHE, SOUND_CACHE_PATH, SOUND_CACHE_TTL_HOURS, EXTRACTION_MODE,
+    NETWORK_CAPTURE_URL_PATTERNS, MAX_CONCURRENT_BROWSERS, BROWSER_CPU_PER_WORKER,
+    BROWSER_MEMORY_PER_WORKER_MB, BROWSER_MEMORY_RESERVE_MB, ACCOUNT_JOB_TIMEOUT_MIN,
+    ENABLE_METRICS, METRICS_PROMETHEUS_PATH, METRICS_JSON_PATH, METRICS_DUMP_INTERVAL_SEC,
+    DAEMON_HOST, DAEMON_PORT, DAEMON_ACCOUNTS, DAEMON_RECYCLE_AFTER_SHORTS, DAEMON_RECYCLE_HEAP_MB,
+    DAEMON_HEALTH_CHECK_SEC, COORDINATOR_HOST, COORDINATOR_PORT, COORDINATOR_TOKEN, WORKER_ID, LEAN_MODE, LEAN_BLOCKED_URL_PATTERNS, MEASURE_TRANSFER_BYTES,
+    READY_TIMEOUT_SEC, READY_QUIET_MS, DWELL_AFTER_FEED_OPEN_SEC, DWELL_AFTER_CLICK_SEC, DWELL_AFTER_NAVIGATE_SEC,
+    ENABLE_CHECKPOINT_JOURNAL, CHECKPOINT_JOURNAL_DIR, EXTRACTION_STAGE_RETRIES, EXTRACTION_RETRY_DELAY_SEC,
+    ENABLE_ENRICHMENT_QUEUE, ENRICHMENT_QUEUE_PATH, ENRICHMENT_MAX_ATTEMPTS, ENRICHMENT_BATCH_SIZE,
+    ENABLE_API_ENRICHMENT, API_BASE_URL, API_CALLS_PER_SECOND, API_DAILY_QUOTA, API_SKIP_DOM_COUNTS,
+    ENABLE_VIDEO_CATALOG, VIDEO_CATALOG_PATH, RESCAN_BACKEND, RESCAN_BATCH_SIZE, RESCAN_MAX_VIDEOS_PER_RUN,
+    ENABLE_CAPTURE_ARCHIVE, CAPTURE_ARCHIVE_DIR, CAPTURE_ARCHIVE_COMPRESSION
 )
+from extractor import SUBTREE_SELECTORS, ExtractionEngine, ExtractionStats, missing_columns, parse_sound_id
+from output_pipeline import OutputWriter, create_sink
+from seen_index import SeenVideoIndex
+from sound_cache import SoundCache
+from embedded_json import build_row, capture_embedded_json, map_capture
+from network_capture import NetworkCapture, enable_performance_logging
+from worker_pool import BrowserWorkerPool, recommended_workers
+from metrics import METRICS, MetricsDumper, stage_timer
+from browser_daemon import BrowserDaemon, serve
+from lean_mode import DEFAULT_BLOCKED_URL_PATTERNS, TransferMeter, apply_lean_options, block_urls
+from readiness import wait_until_ready
+from checkpoint_journal import AccountProgress, CheckpointJournal
+from enrichment_queue import EnrichmentQueue
+from capture_archive import CaptureArchive
+from coordinator import CoordinatorClient, CoordinatorWorker, shard_output_path
+from api_enrichment import QuotaRateLimiter, YouTubeDataClient, api_key_configured
+from row_pipeline import RowPipeline
 
 # --- Dynamic Window Sizing and Positioning Calculation ---
 SCREEN_WIDTH, SCREEN_HEIGHT = 0, 0 # Will be updated by get_screen_resolution
@@ -38,6 +64,7 @@ def get_screen_resolution():
     Falls back to a default resolution if Tkinter encounters an error.
     """
     try:
+        import tkinter as tk # Imported here so headless runs and the tools never need a display
         root = tk.Tk()
         root.withdraw() # Hide the main Tkinter window
         screen_width = root.winfo_screenwidth()
@@ -49,15 +76,16 @@ def get_screen_resolution():
         print("Falling back to default resolution (1920x1080).")
         return 1920, 1080 # Fallback if tkinter has issues
 
-def calculate_window_layout():
+def calculate_window_layout(total_windows=None):
     """
     Calculates optimal browser window sizes and positions based on screen resolution
-    and the number of dummy accounts, to arrange them in a grid.
+    and the number of browsers open at once (by default one per dummy account),
+    to arrange them in a grid.
     """
     global SCREEN_WIDTH, SCREEN_HEIGHT, BROWSER_WINDOW_WIDTH, BROWSER_WINDOW_HEIGHT, WINDOW_POSITIONS
 
     SCREEN_WIDTH, SCREEN_HEIGHT = get_screen_resolution()
-    TOTAL_DUMMY_ACCOUNTS = len(DUMMY_ACCOUNTS)
+    TOTAL_DUMMY_ACCOUNTS = total_windows or len(DUMMY_ACCOUNTS)
 
     # Calculate optimal number of columns and rows for a grid layout
     num_cols = int(TOTAL_DUMMY_ACCOUNTS**0.5) # Square root for width approximation
@@ -96,8 +124,23 @@ def calculate_window_layout():
 
 # --- Anti-Bot Utility Functions ---
 def human_like_delay(min_sec=2, max_sec=5):
-    """Introduces a random human-like delay."""
-    time.sleep(random.uniform(min_sec, max_sec))
+    """
+    Introduces a random human-like delay. This is deliberate pacing (dwell time) only;
+    waiting for content to load is done by wait_for_page below.
+    """
+    with stage_timer('dwell'):
+        time.sleep(random.uniform(min_sec, max_sec))
+
+def wait_for_page(driver, dummy_id, selector, previous_url=None, what="page"):
+    """
+    Waits until the subtree matching selector is present and stable (and, with
+    previous_url, the browser moved on to another short), instead of sleeping for
+    the worst case. Returns the ReadyResult.
+    """
+    result = wait_until_ready(driver, selector, previous_url, READY_QUIET_MS, READY_TIMEOUT_SEC)
+    if not result.ok:
+        print(f"Dummy account {dummy_id}: {what} not ready after {result.waited:.1f}s ({result.reason}).")
+    return result
 
 def simulate_watch_video(video_url, min_duration=5, max_duration=15):
     """
@@ -109,12 +152,21 @@ def simulate_watch_video(video_url, min_duration=5, max_duration=15):
     return watch_duration
 
 # --- WebDriver Initialization Function (using undetected_chromedriver) ---
-def init_undetected_driver(profile_path=None, headless=False, position_index=None):
+def init_undetected_driver(profile_path=None, headless=False, position_index=None, capture_network=False, lean=False):
     """
     Initializes and configures an undetected_chromedriver instance.
     Includes options for user profiles, window positioning, and VPN extension loading.
+    With capture_network, DevTools network events are recorded for NetworkCapture and
+    the TransferMeter. With lean, video, font and unused image downloads are blocked.
+    Headed browsers are placed on the window grid, computed on first use if
+    calculate_window_layout has not run yet.
     """
+    import undetected_chromedriver as uc # Imported here: it loads most of Selenium and only browser runs need it
     options = uc.ChromeOptions()
+    if capture_network:
+        enable_performance_logging(options)
+    if lean:
+        apply_lean_options(options)
     # Assuming Chrome binary location, adjust if necessary
     options.binary_location = "C:/Program Files/Google/Chrome/Application/chrome.exe"
 
@@ -127,21 +179,23 @@ def init_undetected_driver(profile_path=None, headless=False, position_index=Non
         else:
             print(f"Warning: VPN extension not found at {vpn_ext_path}. Proceeding without VPN.")
 
-    # Set window size and position regardless of headless mode
-    options.add_argument(f"--window-size={BROWSER_WINDOW_WIDTH},{BROWSER_WINDOW_HEIGHT}")
-    if position_index is not None and position_index < len(WINDOW_POSITIONS):
-        x, y = WINDOW_POSITIONS[position_index]
-        options.add_argument(f"--window-position={x},{y}")
-    else:
-        print(f"Warning: Window position for index {position_index} not found or invalid. Browser might appear at default position.")
-
     if headless:
+        # No screen to share, so no layout: every headless browser gets the same size
+        options.add_argument(f"--window-size={HEADLESS_WINDOW_SIZE[0]},{HEADLESS_WINDOW_SIZE[1]}")
         options.add_argument("--headless=new")
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
         options.add_argument("--disable-gpu")
         options.add_argument("--mute-audio")
     else:
+        if not WINDOW_POSITIONS:
+            calculate_window_layout()
+        options.add_argument(f"--window-size={BROWSER_WINDOW_WIDTH},{BROWSER_WINDOW_HEIGHT}")
+        if position_index is not None and position_index < len(WINDOW_POSITIONS):
+            x, y = WINDOW_POSITIONS[position_index]
+            options.add_argument(f"--window-position={x},{y}")
+        else:
+            print(f"Warning: Window position for index {position_index} not found or invalid. Browser might appear at default position.")
         # Mute audio even if not headless to avoid noise
         options.add_argument("--mute-audio")
     
@@ -181,6 +235,13 @@ def init_undetected_driver(profile_path=None, headless=False, position_index=Non
     # Evade webdriver detection
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
 
+    if lean:
+        try:
+            block_urls(driver, LEAN_BLOCKED_URL_PATTERNS or DEFAULT_BLOCKED_URL_PATTERNS)
+            print(f"[{profile_path}] Lean mode: blocking video, font and unused image downloads.")
+        except WebDriverException as e:
+            print(f"[{profile_path}] Lean mode: Failed to set blocked URLs: {e}")
+
     # Force window size and position after launch
     try:
         driver.set_window_size(BROWSER_WINDOW_WIDTH, BROWSER_WINDOW_HEIGHT)
@@ -225,32 +286,83 @@ def init_undetected_driver(profile_path=None, headless=False, position_index=Non
 
     return driver
 
+# --- Extraction Stages ---
+# extract_shorts_data reads a short in three independent stages. Each one is retried on
+# its own and reports a status, so a failed click no longer throws away the fields the
+# other stages already collected:
+#   'ok'      the stage's page elements were found and parsed
+#   'partial' some of its page elements were still missing after the retries
+#   'failed'  every attempt raised a WebDriver error
+#   'absent'  the short has nothing to extract for it (e.g. no description button)
+#   'cached'  the sound came from the sound cache
+EXTRACTION_STAGES = ('core', 'description', 'sound')
+INCOMPLETE_STAGE_STATUSES = ('partial', 'failed')
+# Rows also get an 'api' status when the YouTube Data API enriches them (see api_enrichment.py).
+API_ENRICHMENT_ACTIVE = ENABLE_API_ENRICHMENT and api_key_configured(YOUTUBE_API_KEY)
+# The description header only holds the view count and upload date, which the API returns exactly.
+SKIPPED_DOM_ROOTS = ('description_header',) if API_ENRICHMENT_ACTIVE and API_SKIP_DOM_COUNTS else ()
+# Feed scraping stores the captured subtrees in the capture archive instead of parsing them (see capture_archive.py).
+CAPTURE_ARCHIVE_ACTIVE = ENABLE_CAPTURE_ARCHIVE and EXTRACTION_MODE == 'dom'
+
+def run_extraction_stage(dummy_id, stage, attempt, retries=EXTRACTION_STAGE_RETRIES):
+    """
+    Runs one extraction stage with bounded retries. attempt(retry) returns (result, status)
+    with status 'ok', 'partial' or 'absent'. Partial results and errors are retried up to
+    `retries` times; the last partial result is kept if a later attempt raises.
+    Returns (result, status), or (None, 'failed') if every attempt raised.
+    """
+    result, status = None, 'failed'
+    for attempt_number in range(retries + 1):
+        if attempt_number:
+            print(f"Dummy account {dummy_id}: Retrying {stage} stage ({attempt_number}/{retries}).")
+            time.sleep(EXTRACTION_RETRY_DELAY_SEC)
+        try:
+            result, status = attempt(attempt_number > 0)
+        except Exception as e:
+            print(f"Dummy account {dummy_id}: Error in {stage} stage: {getattr(e, 'msg', None) or e}")
+            continue
+        if status != 'partial':
+            break
+    return result, status
+
 # --- Function to Extract Data from YouTube Shorts Page ---
-def extract_shorts_data(driver, dummy_id, scraped_video_ids):
-    def extract_shorts_data(driver, dummy_id, scraped_video_ids):
-      """
+def extract_shorts_data(driver, dummy_id, scraped_video_ids, engine=None, seen_index=None, sound_cache=None):
+    """
     Extracts relevant data from the currently displayed YouTube Shorts video.
-    This revised version re-parses the HTML after interactions to ensure data is accurate.
+    Only the relevant DOM subtrees are pulled from the browser (one script call per
+    interaction step) and parsed with the configured extraction backend.
+    Videos already in the shared seen index are skipped before any clicks, and the
+    sound pop-up is only opened for sounds missing from the shared sound cache.
+    The core metadata, description and sound stages are retried independently; a row
+    is emitted even if a stage fails, with per-stage 'extraction_status' flags and the
+    'missing_fields' left at their defaults.
+    With a capture-only engine the fields stay at their defaults and the row carries
+    the captured 'subtrees' for the capture archive instead; the sound pop-up is then
+    always opened, since the sound cache is keyed by a parsed field.
     """
     scraped_data = []
+    claimed_video_id = None
+    if engine is None:
+        engine = ExtractionEngine(EXTRACTION_BACKEND, skip_roots=SKIPPED_DOM_ROOTS)
+    if engine.capture_only:
+        engine.take_captured() # Drop what an earlier, abandoned short left behind
 
     try:
         # Wait until the main shorts video element is loaded.
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.TAG_NAME, "ytd-reel-video-renderer"))
-        )
+        with stage_timer('wait_reel'):
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.TAG_NAME, "ytd-reel-video-renderer"))
+            )
         print(f"Dummy account {dummy_id}: Shorts element detected on page.")
 
-        # Get initial HTML and parse with BeautifulSoup
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        shorts_element = soup.find("ytd-reel-video-renderer")
+        # Capture the reel, metapanel and description header subtrees with the current URL
+        current_url, subtrees = engine.capture(driver, 'core')
 
-        if not shorts_element:
+        if not subtrees.get('reel'):
             print(f"Dummy account {dummy_id}: No 'ytd-reel-video-renderer' element found.")
             return scraped_data
 
         # Extract Video ID from the current URL
-        current_url = driver.current_url
         video_id = None
         if "/shorts/" in current_url:
             video_id = current_url.split("/shorts/")[1].split("?")[0].split("&")[0]
@@ -260,54 +372,46 @@ def extract_shorts_data(driver, dummy_id, scraped_video_ids):
         if not video_id or video_id in scraped_video_ids:
             return []
 
-        full_video_url = f"https://www.youtube.com/shorts/{video_id}" if video_id else "NaN"
-
-        # Locate relevant elements from the initial soup
-        metapanel_elem = soup.find("div", id="metapanel").find("yt-reel-metapanel-view-model")
-        short_description_elem = soup.find("ytd-video-description-header-renderer")
-
-        # --- EXTRACTING DATA FROM THE INITIAL PAGE LOAD ---
-        # Caption
-        caption_elem = metapanel_elem.find("yt-shorts-video-title-view-model").find("h2").find("span")
-        caption = caption_elem.get_text(strip=True, separator=' ') if caption_elem else "Caption not found"
-
-        # Channel Name
-        channel_name_elem = shorts_element.find("yt-reel-channel-bar-view-model").find("span").find("a")
-        channel_name = channel_name_elem.get_text(strip=True) if channel_name_elem else "Channel not found"
-
-        # Views Count
-        views_count_elem = short_description_elem.find("view-count-factoid-renderer")
-        raw_views_count = views_count_elem.find("span", class_="ytwFactoidRendererValue").find("span").get_text(strip=True) if views_count_elem else None
-
-        # Likes Count
-        likes_count_elem = shorts_element.find("div", id="like-button")
-        likes_count = likes_count_elem.find("button")['aria-label'] if likes_count_elem and 'aria-label' in likes_count_elem.find("button").attrs else None
-
-        # Comments Count
-        comments_button_elem = shorts_element.find("div", id="comments-button")
-        comments_count = comments_button_elem.find("button")['aria-label'] if comments_button_elem and 'aria-label' in comments_button_elem.find("button").attrs else None
-
-        # Remix Count
-        remix_button_elem = shorts_element.find("div", id="remix-button")
-        remix_count = remix_button_elem.find("button")['aria-label'] if remix_button_elem and 'aria-label' in remix_button_elem.find("button").attrs else None
-
-        # Upload Date
-        upload_date_elem = short_description_elem.find_all("factoid-renderer")[2]
-        upload_date = upload_date_elem.find("div", class_="ytwFactoidRendererFactoid")['aria-label'] if upload_date_elem else "NaN"
+        # Skip videos already scraped by any account, in this run or a previous one
+        if seen_index is not None:
+            if not seen_index.claim(video_id):
+                print(f"Dummy account {dummy_id}: Video {video_id} already scraped, skipping.")
+                return []
+            claimed_video_id = video_id
+
+        full_video_url = f"{YOUTUBE_BASE_URL}/shorts/{video_id}" if video_id else "NaN"
+        statuses = {}
+        missing_fields = set()
+
+        # --- STAGE 1: CORE METADATA FROM THE INITIAL PAGE LOAD ---
+        def attempt_core(retry):
+            # Retries capture again, the metapanel may have rendered in the meantime
+            url, core_subtrees = engine.capture(driver, 'core') if retry else (current_url, subtrees)
+            extraction = engine.parse(driver, 'core', url, core_subtrees)
+            return extraction, 'partial' if extraction.missing_roots else 'ok'
+
+        core_extraction, statuses['core'] = run_extraction_stage(dummy_id, 'core', attempt_core)
+        if core_extraction is not None:
+            core = core_extraction.fields
+            missing_fields.update(core_extraction.missing_fields)
+            if core_extraction.missing_roots:
+                print(f"Dummy account {dummy_id}: Missing page elements: {', '.join(core_extraction.missing_roots)}")
+        else:
+            core, core_missing, _ = engine.parse_group('core', {}) # All defaults
+            missing_fields.update(core_missing)
+
+        caption = core['caption']
+        channel_name = core['channel_name']
+        raw_views_count = core['raw_views_count']
+        likes_count = core['likes_count']
+        comments_count = core['comments_count']
+        remix_count = core['remix_count']
+        upload_date = core['upload_date']
+        keywords = core['extracted_keywords']
+        hashtags_on_caption = core['hashtags_on_caption']
 
         # Simulate video watch duration
         watch_duration = simulate_watch_video(full_video_url)
-        
-        # Keywords from suggested actions
-        keywords_model = metapanel_elem.find("yt-shorts-suggested-action-view-model")
-        extracted_keywords_elem = keywords_model.find("div", class_="ytShortsSuggestedActionViewModelStaticHostPrimaryText").find("span") if keywords_model else None
-        keywords = extracted_keywords_elem.get_text(strip=True, separator=' ') if extracted_keywords_elem else "NaN"
-
-        # Hashtags on caption
-        hashtags_on_caption = []
-        hashtags_on_caption_elem = caption_elem.find_all("a", class_="yt-core-attributed-string__link")
-        for hashtag in hashtags_on_caption_elem:
-            hashtags_on_caption.append(hashtag.get_text(strip=True))
 
         # --- EXTRACTING DATA REQUIRING INTERACTION (Clicks) ---
         description = "Description not found"
@@ -316,75 +420,115 @@ def extract_shorts_data(driver, dummy_id, scraped_video_ids):
         sound_name = "NaN"
         sound_artist = "NaN"
         sound_usage = "NaN"
-        
-        # 1. Expand Description
-        try:
-            expanded_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "div#expanded"))
-            )
-            print(f"Dummy account {dummy_id}: Clicking description expand button.")
-            expanded_button.click()
-            human_like_delay(random.uniform(2, 5))
-
-            # RE-PARSE THE HTML AFTER CLICKING
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            short_description_expander_elem = soup.find("ytd-expandable-video-description-body-renderer")
-
-            if short_description_expander_elem:
-                description_elem = short_description_expander_elem.find("div", id="expanded").find("yt-formatted-string")
-                if description_elem:
-                    description = description_elem.get_text(strip=True, separator=' ')
-                    hashtags_on_description_elem = description_elem.find_all("a")
-                    for hashtag2 in hashtags_on_description_elem:
-                        hashtags_on_description.append(hashtag2.get_text(strip=True))
 
-        except (TimeoutException, NoSuchElementException):
-            print(f"Dummy account {dummy_id}: Description expand button not found or clickable.")
-            
-        # 2. Open Sound Pop-up
-        try:
-            sound_elem = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "div#pivot-button"))
-            )
-            print(f"Dummy account {dummy_id}: Clicking sound popup.")
-            sound_elem.click()
-            human_like_delay(random.uniform(2, 5))
-
-            # RE-PARSE THE HTML AFTER CLICKING
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            sound_popup_elem = soup.find("yt-page-header-view-model")
-            
-            if sound_popup_elem:
-                # Get Sound Name
-                sound_name_elem = sound_popup_elem.find("yt-dynamic-text-view-model")
-                sound_name = sound_name_elem.get_text(strip=True, separator=' ') if sound_name_elem else "NaN"
-
-                # Get Sound Artist
-                sound_artist_elem = sound_popup_elem.find("yt-avatar-stack-view-model")
-                sound_artist = sound_artist_elem.get_text(strip=True, separator=' ') if sound_artist_elem else "NaN"
-
-                # Get Sound Usage Count (fixed to be more robust)
-                sound_usage_elem = sound_popup_elem.find("span", id="text", class_="yt-core-attributed-string")
-                sound_usage = sound_usage_elem.get_text(strip=True, separator=' ') if sound_usage_elem else remix_count
-
-                # Get Sound ID (from image src, as you correctly identified)
-                sound_id_elem = sound_popup_elem.find("yt-content-preview-image-view-model").find("img")
-                if sound_id_elem and 'src' in sound_id_elem.attrs:
-                    sound_img_src = sound_id_elem['src']
-                    match = re.search(r"https?://i\.ytimg\.com/vi/([a-zA-Z0-9_-]+)/", sound_img_src)
-                    if match:
-                        sound_id = match.group(1)
+        # --- STAGE 2: EXPAND DESCRIPTION ---
+        def attempt_description(retry):
+            if retry:
+                # The earlier click may have worked after all
+                extraction = engine.extract(driver, 'description')
+                if not extraction.missing_roots:
+                    return extraction, 'ok'
+            try:
+                with stage_timer('click_description'):
+                    expanded_button = WebDriverWait(driver, 5).until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, "div#expanded"))
+                    )
+                    print(f"Dummy account {dummy_id}: Clicking description expand button.")
+                    expanded_button.click()
+            except (TimeoutException, NoSuchElementException):
+                if retry:
+                    raise
+                print(f"Dummy account {dummy_id}: Description expand button not found or clickable.")
+                return None, 'absent'
+            wait_for_page(driver, dummy_id, SUBTREE_SELECTORS['description_body'], what="Description")
+            human_like_delay(*DWELL_AFTER_CLICK_SEC)
+
+            # RE-CAPTURE ONLY THE DESCRIPTION BODY AFTER CLICKING
+            extraction = engine.extract(driver, 'description')
+            return extraction, 'partial' if extraction.missing_roots else 'ok'
+
+        description_extraction, statuses['description'] = run_extraction_stage(dummy_id, 'description', attempt_description)
+        if description_extraction is not None:
+            description = description_extraction.fields['description']
+            hashtags_on_description = description_extraction.fields['hashtags_on_description']
+            missing_fields.update(description_extraction.missing_fields)
+        elif statuses['description'] == 'failed':
+            missing_fields.update(('description', 'hashtags_on_description'))
+
+        # --- STAGE 3: SOUND POP-UP (only if the sound is not cached yet or its entry is stale) ---
+        sound_pivot_key = core['sound_pivot_href']
+        cached_sound = sound_cache.get(sound_pivot_key) if sound_cache is not None and sound_pivot_key else None
+        if cached_sound:
+            print(f"Dummy account {dummy_id}: Sound cache hit for {sound_pivot_key}, skipping sound popup.")
+            statuses['sound'] = 'cached'
+            sound_id = cached_sound['sound_id']
+            sound_name = cached_sound['sound_name']
+            sound_artist = cached_sound['sound_artist']
+            sound_usage = cached_sound['sound_usage'] if cached_sound['sound_usage'] is not None else remix_count
+        else:
+            def attempt_sound(retry):
+                if retry:
+                    # The pop-up may have opened after the previous capture
+                    extraction = engine.extract(driver, 'sound')
+                    if not extraction.missing_roots:
+                        return extraction, 'ok'
+                try:
+                    with stage_timer('click_sound'):
+                        sound_elem = WebDriverWait(driver, 5).until(
+                            EC.element_to_be_clickable((By.CSS_SELECTOR, "div#pivot-button"))
+                        )
+                        print(f"Dummy account {dummy_id}: Clicking sound popup.")
+                        sound_elem.click()
+                except (TimeoutException, NoSuchElementException):
+                    if retry:
+                        raise
+                    print(f"Dummy account {dummy_id}: Sound button not found or clickable.")
+                    return None, 'absent'
+                wait_for_page(driver, dummy_id, SUBTREE_SELECTORS['sound_popup'], what="Sound pop-up")
+                human_like_delay(*DWELL_AFTER_CLICK_SEC)
+
+                # RE-CAPTURE ONLY THE SOUND POP-UP AFTER CLICKING
+                extraction = engine.extract(driver, 'sound')
+                return extraction, 'partial' if extraction.missing_roots else 'ok'
+
+            sound_fetch_started = time.perf_counter()
+            sound_data, statuses['sound'] = run_extraction_stage(dummy_id, 'sound', attempt_sound)
+
+            if statuses['sound'] == 'ok':
+                sound_name = sound_data.fields['sound_name']
+                sound_artist = sound_data.fields['sound_artist']
+                sound_usage = sound_data.fields['sound_usage'] if sound_data.fields['sound_usage'] is not None else remix_count
+                missing_fields.update(sound_data.missing_fields)
+
+                # Get Sound ID (from image src)
+                sound_img_src = sound_data.fields['sound_image_src']
+                if sound_img_src:
+                    sound_id = parse_sound_id(sound_img_src)
+                    if sound_id:
                         print(f"Dummy account {dummy_id}: Found Sound ID: {sound_id} from image src.")
                     else:
+                        sound_id = "NaN"
                         print(f"Dummy account {dummy_id}: No Sound ID pattern found in image src: {sound_img_src}")
-                else:
+                elif not engine.capture_only:
                     print(f"Dummy account {dummy_id}: No sound image element found or no src attribute.")
-            
-            # Navigate back to the shorts player (e.g., by closing the popup)
-            human_like_delay(random.uniform(1, 2))
-        except Exception as e:
-            print(f"Dummy account {dummy_id}: Error clicking sound popup: {e}")
-            return []
+
+                if sound_cache is not None and sound_pivot_key:
+                    sound_cache.put(sound_pivot_key, {
+                        'sound_id': sound_id,
+                        'sound_name': sound_name,
+                        'sound_artist': sound_artist,
+                        'sound_usage': sound_data.fields['sound_usage'],
+                    }, time.perf_counter() - sound_fetch_started)
+            elif statuses['sound'] != 'absent':
+                missing_fields.update(('sound_id', 'sound_name', 'sound_artist', 'sound_usage'))
+
+            if statuses['sound'] != 'absent':
+                # Navigate back to the shorts player (e.g., by closing the popup)
+                human_like_delay(random.uniform(1, 2))
+
+        incomplete = [stage for stage in EXTRACTION_STAGES if statuses[stage] in INCOMPLETE_STAGE_STATUSES]
+        if incomplete:
+            print(f"Dummy account {dummy_id}: Keeping partial record for {video_id} ({', '.join(incomplete)} incomplete).")
 
         # --- APPEND ALL SCRAPED DATA ---
         scraped_data.append({
@@ -407,77 +551,167 @@ def extract_shorts_data(driver, dummy_id, scraped_video_ids):
             'sound_artist': sound_artist,
             'sound_usage': sound_usage,
             'video_url_full': full_video_url,
-            'watch_duration_sec': watch_duration
+            'watch_duration_sec': watch_duration,
+            'extraction_status': statuses,
+            'missing_fields': missing_columns(missing_fields, CSV_HEADERS),
         })
+        if engine.capture_only:
+            scraped_data[-1]['subtrees'] = engine.take_captured()
         scraped_video_ids.add(video_id)
+        if seen_index is not None:
+            seen_index.mark_scraped(video_id, dummy_id)
+        if engine.stats is not None:
+            engine.stats.record_short()
         
     except TimeoutException:
         print(f"Timeout: Could not find shorts element after waiting.")
     except Exception as outer_exception:
         print(f"Error extracting shorts data from page for {dummy_id}: {outer_exception}")
         traceback.print_exc()
+    finally:
+        # Give the video back to the other accounts if it was not scraped
+        if claimed_video_id and not scraped_data:
+            seen_index.release(claimed_video_id)
 
     return scraped_data
 
-# --- Function to Write Data to CSV (with safe file handling) ---
-def write_to_csv(data, filename, headers):
+def incomplete_stages(row):
+    """Returns the extraction stages of a row that still need re-enrichment."""
+    statuses = row.get('extraction_status') or {}
+    return [stage for stage in EXTRACTION_STAGES if statuses.get(stage) in INCOMPLETE_STAGE_STATUSES]
+
+# --- Functions to Harvest Shorts from Structured Data (Embedded JSON / Network) ---
+def rows_from_mapped_videos(videos, dummy_id, scraped_video_ids, seen_index=None):
+    """
+    Builds output rows from {video_id: fields} metadata, skipping videos already
+    scraped in this session or claimed in the shared seen index.
+    """
+    scraped_data = []
+    for video_id, fields in videos.items():
+        if video_id in scraped_video_ids:
+            continue
+        if seen_index is not None and not seen_index.claim(video_id):
+            continue
+        scraped_data.append(build_row(video_id, fields, dummy_id, CSV_HEADERS, YOUTUBE_BASE_URL))
+        scraped_video_ids.add(video_id)
+        if seen_index is not None:
+            seen_index.mark_scraped(video_id, dummy_id)
+    return scraped_data
+
+def extract_embedded_shorts_data(driver, dummy_id, scraped_video_ids, seen_index=None):
     """
-    Appends a list of dictionaries (data rows) to a CSV file.
-    Writes headers only if the file is new or empty.
+    Reads the structured data YouTube embeds in the page (ytInitialData, the player
+    response and the data bound to each rendered reel) in one script call and maps it
+    onto the CSV_HEADERS schema. Returns a row for every short found with metadata,
+    which includes the prefetched next shorts, not only the one on screen.
     """
-    file_exists = os.path.isfile(filename) and os.path.getsize(filename) > 0
-    with open(filename, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerows(data)
+    try:
+        with stage_timer('wait_reel'):
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.TAG_NAME, "ytd-reel-video-renderer"))
+            )
+        videos = map_capture(capture_embedded_json(driver))
+        print(f"Dummy account {dummy_id}: Found {len(videos)} shorts in embedded page data.")
+        return rows_from_mapped_videos(videos, dummy_id, scraped_video_ids, seen_index)
+    except TimeoutException:
+        print("Timeout: Could not find shorts element after waiting.")
+    except Exception as e:
+        print(f"Error reading embedded shorts data for {dummy_id}: {e}")
+        traceback.print_exc()
+    return []
 
-# --- Main Task Function for Each Dummy Account ---
-def dummy_account_task(dummy_info):
+def extract_network_shorts_data(network_capture, dummy_id, scraped_video_ids, seen_index=None):
     """
-    Main task runner for a single dummy account.
-    Handles browser initialization, navigation, data scraping, and error handling.
+    Returns rows for every short described by the Shorts feed API responses the
+    browser downloaded since the last call (captured from DevTools network events).
     """
-    dummy_id = dummy_info['id']
-    profile_path = dummy_info['profile_path']
-    position_index = dummy_info.get('position_index')
-    print(f"Starting task for dummy account: {dummy_id}")
-    driver = None
-    scraped_video_ids = set() # Set to track video IDs scraped per session
     try:
-        # Pass headless=True if you want the browser to run in the background without UI
-        driver = init_undetected_driver(profile_path=profile_path, headless=False, position_index=position_index) 
-        
-        # Navigate to YouTube Shorts
-        driver.get("https://www.youtube.com/shorts")
-        human_like_delay(5, 10) # Initial delay to load the page
+        videos = network_capture.drain_videos()
+        print(f"Dummy account {dummy_id}: Found {len(videos)} shorts in captured feed responses.")
+        return rows_from_mapped_videos(videos, dummy_id, scraped_video_ids, seen_index)
+    except Exception as e:
+        print(f"Error reading captured network responses for {dummy_id}: {e}")
+        traceback.print_exc()
+    return []
 
-        all_scraped_data_for_account = []
-        scraped_count = 0
+# --- Scraping Session Functions (shared by one-shot runs and the browser daemon) ---
+def new_scrape_session(driver, capture_only=CAPTURE_ARCHIVE_ACTIVE):
+    """
+    Per-browser scraping state: video IDs seen by this browser, the extraction engine
+    with its statistics, the transfer meter and, in 'network' mode, the DevTools
+    network capture (which also feeds the transfer meter). A capture-only engine
+    captures every subtree, so the archive holds the counts the API would replace.
+    """
+    extraction_stats = ExtractionStats(measure_baseline=EXTRACTION_REPORT_SAVINGS)
+    transfer_meter = TransferMeter(driver) if MEASURE_TRANSFER_BYTES else None
+    return {
+        'scraped_video_ids': set(), # Set to track video IDs scraped per session
+        'extraction_stats': extraction_stats,
+        'engine': ExtractionEngine(EXTRACTION_BACKEND, extraction_stats, skip_roots=() if capture_only else SKIPPED_DOM_ROOTS,
+                                   capture_only=capture_only),
+        'network_capture': NetworkCapture(driver, NETWORK_CAPTURE_URL_PATTERNS, transfer_meter) if EXTRACTION_MODE == 'network' else None,
+        'transfer_meter': transfer_meter,
+        'shorts': 0,
+    }
+
+def open_shorts_feed(driver, dummy_id=None):
+    """Navigates to YouTube Shorts and waits for the first short to settle."""
+    driver.get(f"{YOUTUBE_BASE_URL}/shorts")
+    wait_for_page(driver, dummy_id, SUBTREE_SELECTORS['reel'], what="Shorts feed")
+    human_like_delay(*DWELL_AFTER_FEED_OPEN_SEC)
+
+def scrape_shorts_session(driver, dummy_id, session, output_writer, max_shorts, seen_index=None, sound_cache=None, job=None,
+                          enrichment_queue=None):
+    """
+    Scrapes up to max_shorts new shorts from the feed the browser is on, moving to the
+    next short after each one, and streams the rows to the output writer. Rows with
+    incomplete extraction stages are added to the re-enrichment queue.
+    Returns the number of rows scraped.
+    """
+    scraped_count = 0
 
-        while scraped_count < MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT:
-            print(f"Dummy account {dummy_id}: Scraping attempt {scraped_count + 1}/{MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT}")
-            
-            # Extract data from the currently active short
-            # We need to get page_source again each time as content changes without full page reload
-            new_data = extract_shorts_data(driver, dummy_id, scraped_video_ids)
+    while scraped_count < max_shorts:
+        if job is not None and job.cancelled():
+            print(f"Dummy account {dummy_id}: Job aborted ({job.state}), stopping scraping.")
+            break
+        print(f"Dummy account {dummy_id}: Scraping attempt {scraped_count + 1}/{max_shorts}")
+        
+        # Extract data from the currently active short
+        # The subtrees are captured again each time as content changes without full page reload
+        if EXTRACTION_MODE == 'network':
+            new_data = extract_network_shorts_data(session['network_capture'], dummy_id, session['scraped_video_ids'], seen_index)
+        elif EXTRACTION_MODE == 'embedded_json':
+            new_data = extract_embedded_shorts_data(driver, dummy_id, session['scraped_video_ids'], seen_index)
+        else:
+            new_data = extract_shorts_data(driver, dummy_id, session['scraped_video_ids'], session['engine'], seen_index, sound_cache)
+        if session['transfer_meter'] is not None and session['network_capture'] is None:
+            session['transfer_meter'].poll()
+        
+        if new_data:
+            output_writer.put_many(new_data)
+            METRICS.record_shorts(len(new_data))
+            if enrichment_queue is not None:
+                for row in new_data:
+                    stages = incomplete_stages(row)
+                    if stages:
+                        enrichment_queue.add(row['video_id'], dummy_id, stages, row['missing_fields'])
+            scraped_count += len(new_data)
+            session['shorts'] += len(new_data)
+            print(f"Dummy account {dummy_id}: Found {len(new_data)} new videos. Total: {scraped_count}")
             
-            if new_data:
-                all_scraped_data_for_account.extend(new_data)
-                scraped_count += len(new_data)
-                print(f"Dummy account {dummy_id}: Found {len(new_data)} new videos. Total: {scraped_count}")
-                
-                # Simulate watching (if new videos were found)
-                valid_urls = [d['video_url_full'] for d in new_data if d['video_url_full'] != "NaN"]
-                if valid_urls and random.random() < 0.3: # 30% chance to simulate watch
-                    random_video_url = random.choice(valid_urls)
-                    simulate_watch_video(random_video_url, 10, 30)
-                    human_like_delay(random.uniform(5, 10))
-
-            # --- Navigate to the Next Short ---
-            navigated = False
-            try:
-                # Attempt to click the "Next video" button (common selector)
+            # Simulate watching (if new videos were found)
+            valid_urls = [d['video_url_full'] for d in new_data if d['video_url_full'] != "NaN"]
+            if valid_urls and random.random() < 0.3: # 30% chance to simulate watch
+                random_video_url = random.choice(valid_urls)
+                simulate_watch_video(random_video_url, 10, 30)
+                human_like_delay(random.uniform(5, 10))
+
+        # --- Navigate to the Next Short ---
+        navigated = False
+        previous_url = driver.current_url
+        try:
+            # Attempt to click the "Next video" button (common selector)
+            with stage_timer('navigate'):
                 next_button = WebDriverWait(driver, 5).until(
                     EC.element_to_be_clickable((By.CSS_SELECTOR, 
                         "button.yt-spec-button-shape-next[aria-label='Video berikutnya'], " # Indonesian label
@@ -487,82 +721,464 @@ def dummy_account_task(dummy_info):
                 if next_button:
                     next_button.click()
                     print(f"Dummy account {dummy_id}: Clicking 'Next video' button.")
-                    human_like_delay(random.uniform(2, 5))
-                    navigated = True
-            except (TimeoutException, NoSuchElementException):
-                print(f"Dummy account {dummy_id}: 'Next video' button not found or clickable.")
-                pass
+            if next_button:
+                wait_for_page(driver, dummy_id, SUBTREE_SELECTORS['reel'], previous_url, what="Next short")
+                human_like_delay(*DWELL_AFTER_NAVIGATE_SEC)
+                navigated = True
+        except (TimeoutException, NoSuchElementException):
+            print(f"Dummy account {dummy_id}: 'Next video' button not found or clickable.")
+            pass
 
-            # If "Next" button not found, try sending Keys.ARROW_DOWN
-            if not navigated:
-                print(f"Dummy account {dummy_id}: Attempting to scroll Shorts player with ARROW_DOWN...")
-                try:
-                    # Sending Keys.ARROW_DOWN to the body scrolls the Shorts player
+        # If "Next" button not found, try sending Keys.ARROW_DOWN
+        if not navigated:
+            print(f"Dummy account {dummy_id}: Attempting to scroll Shorts player with ARROW_DOWN...")
+            try:
+                # Sending Keys.ARROW_DOWN to the body scrolls the Shorts player
+                with stage_timer('navigate'):
                     driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ARROW_DOWN)
-                    human_like_delay(random.uniform(2, 5))
-                    navigated = True
-                except Exception as scroll_exception:
-                    print(f"Dummy account {dummy_id}: Failed to scroll Shorts player with ARROW_DOWN: {scroll_exception}")
-
-            if not navigated:
-                print(f"Dummy account {dummy_id}: Could not navigate to the next video. Stopping scraping.")
-                break # Stop if unable to navigate
-
-            # Add a longer delay after several interactions to avoid detection
-            if (scraped_count + 1) % 10 == 0: # Every 10 videos
-                print(f"Dummy account {dummy_id}: Longer delay to avoid detection...")
-                human_like_delay(15, 30) 
-
-        if all_scraped_data_for_account:
-            # Remove final duplicates before saving to CSV
-            unique_scraped_data = []
-            seen_ids = set()
-            for item in all_scraped_data_for_account:
-                if item['video_id'] not in seen_ids:
-                    unique_scraped_data.append(item)
-                    seen_ids.add(item['video_id'])
-
-            if FORMAT_EXT == 'csv':
-                write_to_csv(unique_scraped_data, RAW_DATA_CSV, CSV_HEADERS)
-            elif FORMAT_EXT == 'json':
-                json_filename = RAW_DATA_CSV.replace('.csv', '.json')
-                with open(json_filename, 'w', encoding='utf-8') as json_file:
-                    json.dump(unique_scraped_data, json_file, ensure_ascii=False, indent=4)
-
-            print(f"Dummy account {dummy_id} scraped {len(unique_scraped_data)} unique videos and saved to {FORMAT_EXT}.")
+                wait_for_page(driver, dummy_id, SUBTREE_SELECTORS['reel'], previous_url, what="Next short")
+                human_like_delay(*DWELL_AFTER_NAVIGATE_SEC)
+                navigated = True
+            except Exception as scroll_exception:
+                print(f"Dummy account {dummy_id}: Failed to scroll Shorts player with ARROW_DOWN: {scroll_exception}")
+
+        if not navigated:
+            print(f"Dummy account {dummy_id}: Could not navigate to the next video. Stopping scraping.")
+            break # Stop if unable to navigate
+
+        # Add a longer delay after several interactions to avoid detection
+        if (scraped_count + 1) % 10 == 0: # Every 10 videos
+            print(f"Dummy account {dummy_id}: Longer delay to avoid detection...")
+            human_like_delay(15, 30) 
+
+    return scraped_count
+
+# --- Main Task Function for Each Dummy Account ---
+def dummy_account_task(dummy_info, output_writer, seen_index=None, sound_cache=None, job=None, progress=None,
+                       enrichment_queue=None, max_shorts=None):
+    """
+    Main task runner for a single dummy account.
+    Handles browser initialization, navigation, data scraping, and error handling.
+    Each scraped row is handed to the shared output writer as soon as it is extracted.
+    When run as a worker pool job, the browser is closed if the job is aborted and the
+    loop stops at the next short. When resuming, progress is the account's journaled
+    AccountProgress: its videos are skipped and only the remaining shorts are scraped.
+    max_shorts overrides MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT (e.g. the size of a leased job).
+    Returns False if the account failed.
+    """
+    dummy_id = dummy_info['id']
+    profile_path = dummy_info['profile_path']
+    position_index = dummy_info.get('position_index')
+    print(f"Starting task for dummy account: {dummy_id}")
+    METRICS.bind_account(dummy_id)
+    driver = None
+    try:
+        # Lean mode runs the browser headless; set LEAN_MODE in config.py
+        with stage_timer('driver_init'):
+            driver = init_undetected_driver(profile_path=profile_path, headless=LEAN_MODE, position_index=position_index,
+                                            capture_network=EXTRACTION_MODE == 'network' or MEASURE_TRANSFER_BYTES,
+                                            lean=LEAN_MODE)
+        if job is not None:
+            job.set_abort(driver.quit)
+        session = new_scrape_session(driver)
+        max_shorts = max_shorts or MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT
+        if progress is not None and progress.count:
+            session['scraped_video_ids'].update(progress.video_ids)
+            max_shorts -= progress.count
+            print(f"Dummy account {dummy_id}: Resuming after {progress.count} journaled shorts, {max_shorts} to go.")
+        open_shorts_feed(driver, dummy_id)
+
+        scraped_count = scrape_shorts_session(driver, dummy_id, session, output_writer, max_shorts,
+                                              seen_index, sound_cache, job, enrichment_queue)
+
+        if scraped_count:
+            destination = "the capture archive" if session['engine'].capture_only else f"{FORMAT_EXT} output"
+            print(f"Dummy account {dummy_id} scraped {scraped_count} unique videos and queued them for {destination}.")
         else:
             print(f"Dummy account {dummy_id} found no data.")
+        print(f"Dummy account {dummy_id}: Extraction stats: {session['extraction_stats'].format_summary()}")
+        if session['transfer_meter'] is not None:
+            print(f"Dummy account {dummy_id}: Transfer ({'lean' if LEAN_MODE else 'full'} mode): "
+                  f"{session['transfer_meter'].format_summary(session['shorts'])}")
 
     except Exception as main_exception:
-        print(f"An error occurred for dummy account {dummy_id}: {main_exception}")
+        if job is not None and job.cancelled():
+            print(f"Dummy account {dummy_id}: Browser closed after the job was aborted ({job.state}).")
+        else:
+            print(f"An error occurred for dummy account {dummy_id}: {main_exception}")
+            traceback.print_exc()
+        return False
+    finally:
+        if driver:
+            try:
+                driver.quit() # Close the browser
+            except Exception:
+                pass # Already closed when the job was aborted
+        METRICS.bind_account(None)
+    return True
+
+# --- Re-enrichment Pass ---
+def reenrich_task(dummy_info, output_writer, enrichment_queue, sound_cache=None, limit=None):
+    """
+    Revisits the shorts queued with incomplete extraction stages, one after the other in
+    a single browser, and extracts them again. The new row is written if it is complete
+    or fills more fields than the queued one (it supersedes the earlier row with the same
+    video_id). Complete shorts leave the queue, the others are retried by later passes
+    until ENRICHMENT_MAX_ATTEMPTS. Returns the number of shorts completed.
+    """
+    entries = enrichment_queue.pending(limit)
+    if not entries:
+        print("Re-enrichment: No shorts queued.")
+        return 0
+    dummy_id = dummy_info['id']
+    print(f"Re-enrichment: Revisiting {len(entries)} shorts with dummy account {dummy_id}.")
+    METRICS.bind_account(dummy_id)
+    driver = None
+    completed = 0
+    try:
+        with stage_timer('driver_init'):
+            driver = init_undetected_driver(profile_path=dummy_info['profile_path'], headless=LEAN_MODE,
+                                            position_index=dummy_info.get('position_index'),
+                                            capture_network=MEASURE_TRANSFER_BYTES, lean=LEAN_MODE)
+        session = new_scrape_session(driver, capture_only=False)
+        for entry in entries:
+            video_id = entry['video_id']
+            enrichment_queue.record_attempt(video_id)
+            driver.get(f"{YOUTUBE_BASE_URL}/shorts/{video_id}")
+            wait_for_page(driver, dummy_id, SUBTREE_SELECTORS['reel'], what="Queued short")
+            human_like_delay(*DWELL_AFTER_NAVIGATE_SEC)
+
+            # No seen index here: the short is already marked as scraped
+            rows = extract_shorts_data(driver, dummy_id, set(), session['engine'], sound_cache=sound_cache)
+            if not rows or rows[0]['video_id'] != video_id:
+                print(f"Re-enrichment: Could not extract {video_id} again, keeping it queued.")
+                continue
+            row = rows[0]
+            stages = incomplete_stages(row)
+            if not stages or len(row['missing_fields']) < len(entry['missing_fields']):
+                output_writer.put_many(rows)
+                METRICS.record_shorts(1)
+            if stages:
+                enrichment_queue.add(video_id, entry['dummy_account_id'], stages, row['missing_fields'])
+            else:
+                enrichment_queue.complete(video_id)
+                completed += 1
+        print(f"Re-enrichment: Completed {completed} of {len(entries)} shorts.")
+    except Exception as e:
+        print(f"Re-enrichment: An error occurred: {e}")
+        traceback.print_exc()
+    finally:
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        METRICS.bind_account(None)
+    return completed
+
+def rescan_task(dummy_info, output_writer, catalog, sound_cache=None):
+    """
+    Refreshes the catalog videos whose re-scan is due, most overdue first, with the
+    RESCAN_BACKEND: batched videos.list calls, or visits to each short's page in one
+    browser. The fresh rows are written as new snapshots. Returns the number refreshed.
+    """
+    from rescan_scheduler import ApiRescanBackend, RescanScheduler # Loads pandas, so only imported for --rescan
+    if RESCAN_BACKEND == 'api':
+        if not api_key_configured(YOUTUBE_API_KEY):
+            print("Re-scan: RESCAN_BACKEND = 'api' needs a YOUTUBE_API_KEY.")
+            return 0
+        client = YouTubeDataClient(YOUTUBE_API_KEY, API_BASE_URL, rate_limiter=QuotaRateLimiter(API_CALLS_PER_SECOND, API_DAILY_QUOTA))
+        try:
+            scheduler = RescanScheduler(catalog, ApiRescanBackend(client, CSV_HEADERS, YOUTUBE_BASE_URL), output_writer, RESCAN_BATCH_SIZE)
+            return scheduler.run(RESCAN_MAX_VIDEOS_PER_RUN)
+        finally:
+            client.close()
+    if RESCAN_BACKEND != 'browser':
+        raise ValueError(f"Unknown re-scan backend '{RESCAN_BACKEND}'. Options: 'api', 'browser'")
+
+    dummy_id = dummy_info['id']
+    METRICS.bind_account(dummy_id)
+    driver = None
+    try:
+        with stage_timer('driver_init'):
+            driver = init_undetected_driver(profile_path=dummy_info['profile_path'], headless=LEAN_MODE,
+                                            position_index=dummy_info.get('position_index'),
+                                            capture_network=MEASURE_TRANSFER_BYTES, lean=LEAN_MODE)
+        session = new_scrape_session(driver, capture_only=False)
+
+        def visit_shorts(video_ids):
+            rows = []
+            for video_id in video_ids:
+                try:
+                    driver.get(f"{YOUTUBE_BASE_URL}/shorts/{video_id}")
+                    wait_for_page(driver, dummy_id, SUBTREE_SELECTORS['reel'], what="Re-scanned short")
+                    human_like_delay(*DWELL_AFTER_NAVIGATE_SEC)
+                    # No seen index here: re-scanning known videos is the point
+                    extracted = extract_shorts_data(driver, dummy_id, set(), session['engine'], sound_cache=sound_cache)
+                except Exception as e:
+                    print(f"Re-scan: Could not read {video_id}: {e}")
+                    continue
+                rows.extend(row for row in extracted if row['video_id'] == video_id)
+            METRICS.record_shorts(len(rows))
+            return rows
+
+        return RescanScheduler(catalog, visit_shorts, output_writer, RESCAN_BATCH_SIZE).run(RESCAN_MAX_VIDEOS_PER_RUN)
+    except Exception as e:
+        print(f"Re-scan: An error occurred: {e}")
         traceback.print_exc()
+        return 0
     finally:
         if driver:
-            driver.quit() # Close the browser
-        return
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        METRICS.bind_account(None)
+
+# --- Browser Daemon Hooks ---
+def launch_warm_driver(dummy_info):
+    """Starts a browser for the daemon and leaves it settled on the Shorts feed."""
+    METRICS.bind_account(dummy_info['id'])
+    try:
+        with stage_timer('driver_init'):
+            driver = init_undetected_driver(profile_path=dummy_info['profile_path'], headless=LEAN_MODE,
+                                            position_index=dummy_info.get('position_index'),
+                                            capture_network=EXTRACTION_MODE == 'network' or MEASURE_TRANSFER_BYTES,
+                                            lean=LEAN_MODE)
+        open_shorts_feed(driver, dummy_info['id'])
+        return driver
+    finally:
+        METRICS.bind_account(None)
+
+def run_daemon_job(driver, dummy_id, session, max_shorts, output_writer, seen_index=None, sound_cache=None,
+                   enrichment_queue=None):
+    """Scrapes one daemon job on a warm browser. Returns (rows, seconds until the first row)."""
+    started = time.perf_counter()
+    first_row_at = []
+    def put_many(rows):
+        if not first_row_at:
+            first_row_at.append(time.perf_counter())
+        output_writer.put_many(rows)
+    METRICS.bind_account(dummy_id)
+    try:
+        rows = scrape_shorts_session(driver, dummy_id, session, types.SimpleNamespace(put_many=put_many),
+                                     max_shorts, seen_index, sound_cache, enrichment_queue=enrichment_queue)
+    finally:
+        METRICS.bind_account(None)
+    return rows, (first_row_at[0] - started if first_row_at else None)
 
 # --- Main Execution ---
+def main(argv=None, resume=False):
+    """Runs the scraper with command-line arguments argv (default sys.argv); resume=True implies --resume and hides it."""
+    parser = argparse.ArgumentParser(description="Scrape YouTube Shorts with the dummy accounts from config.py.")
+    if not resume:
+        parser.add_argument('--resume', action='store_true',
+                            help="Continue an interrupted run from the checkpoint journal: skip finished accounts, top up partial ones.")
+    # One run mode at a time; without any of them the accounts scrape their feeds
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--daemon', action='store_true',
+                      help="Keep one warm browser per account and take jobs on DAEMON_PORT (see browser_daemon.py).")
+    mode.add_argument('--reenrich', action='store_true',
+                      help="Revisit only the shorts queued with missing fields (ENRICHMENT_QUEUE_PATH) instead of scraping the feed.")
+    mode.add_argument('--rescan', action='store_true',
+                      help="Refresh the counts of known videos whose re-scan is due (VIDEO_CATALOG_PATH) instead of scraping the feed.")
+    mode.add_argument('--worker', nargs='?', const='', metavar='HOST:PORT',
+                      help="Scrape the account jobs leased by a coordinator (default COORDINATOR_HOST:COORDINATOR_PORT, "
+                           "see coordinator.py) into this worker's own output shard.")
+    args = parser.parse_args(argv)
+    args.resume = resume or args.resume
+
+    # Per-stage timings, exported at the end of the run (and periodically if configured)
+    METRICS.enabled = ENABLE_METRICS
+    metrics_dumper = None
+    if ENABLE_METRICS and METRICS_DUMP_INTERVAL_SEC:
+        metrics_dumper = MetricsDumper(METRICS, METRICS_DUMP_INTERVAL_SEC, METRICS_PROMETHEUS_PATH, METRICS_JSON_PATH).start()
+
+    if args.daemon:
+        # One warm browser per daemon account, all on screen at once
+        daemon_accounts = [account for account in DUMMY_ACCOUNTS if DAEMON_ACCOUNTS is None or account['id'] in DAEMON_ACCOUNTS]
+        window_count = len(daemon_accounts)
+    elif args.reenrich or args.rescan:
+        # One browser revisits the queued or due shorts
+        window_count = 1
+    else:
+        # Size the browser pool, then lay out one window per concurrent browser
+        max_workers = recommended_workers(
+            len(DUMMY_ACCOUNTS), max_workers=MAX_CONCURRENT_BROWSERS, cpu_per_worker=BROWSER_CPU_PER_WORKER,
+            memory_per_worker_mb=BROWSER_MEMORY_PER_WORKER_MB, memory_reserve_mb=BROWSER_MEMORY_RESERVE_MB,
+        )
+        print(f"Worker pool: Running {len(DUMMY_ACCOUNTS)} accounts on {max_workers} concurrent browsers.")
+        window_count = max_workers
+    # Only headed browsers are tiled on the screen; headless ones (LEAN_MODE) and API re-scans need no display
+    if not LEAN_MODE and not (args.rescan and RESCAN_BACKEND == 'api'):
+        calculate_window_layout(window_count)
+
+    # Per-account progress journal of feed scrapes, appended to once rows are written. Daemon jobs,
+    # re-enrichment and re-scans are not feed progress, and a coordinator tracks leased jobs itself.
+    journal = None
+    if ENABLE_CHECKPOINT_JOURNAL and not (args.daemon or args.reenrich or args.rescan or args.worker is not None):
+        journal = CheckpointJournal(CHECKPOINT_JOURNAL_DIR, resume=args.resume)
+    elif args.resume and not ENABLE_CHECKPOINT_JOURNAL:
+        print("Checkpoint journal is disabled (ENABLE_CHECKPOINT_JOURNAL), starting every account from zero.")
+    elif args.resume:
+        print("--resume is ignored: it only continues feed scrapes, not --daemon, --reenrich, --rescan or --worker runs.")
+
+    # Account jobs leased from a coordinator instead of the local account list; the coordinator tracks their progress
+    lease_worker = None
+    output_path = RAW_DATA_CSV
+    if args.worker is not None:
+        coordinator_host, _, coordinator_port = args.worker.rpartition(':')
+        lease_worker = CoordinatorWorker(
+            CoordinatorClient(coordinator_host or COORDINATOR_HOST, int(coordinator_port or COORDINATOR_PORT), WORKER_ID,
+                              COORDINATOR_TOKEN),
+            max_workers, accounts=[account['id'] for account in DUMMY_ACCOUNTS],
+            job_timeout=ACCOUNT_JOB_TIMEOUT_MIN * 60 if ACCOUNT_JOB_TIMEOUT_MIN else None,
+            start_delay=(THREAD_START_DELAY_MIN, THREAD_START_DELAY_MAX),
+        )
+        output_path = shard_output_path(RAW_DATA_CSV, lease_worker.client.worker_id)
+
+    def record_progress(rows):
+        # Rows on disk are an account's progress: journaled here, or reported to the coordinator
+        if journal is not None:
+            journal.record_rows(rows)
+        if lease_worker is not None:
+            lease_worker.record_rows(rows)
+
+    # API stage, trend index, trend sketches and video catalog (see row_pipeline.py)
+    pipeline = RowPipeline(video_catalog=ENABLE_VIDEO_CATALOG or args.rescan)
+    video_catalog = pipeline.video_catalog
+
+    def on_batch_written(rows):
+        # Runs on the writer thread once a batch is on disk
+        record_progress(rows)
+        pipeline.add_rows(rows)
+
+    # Single writer for the whole run: one open file handle and one header check
+    output_writer = OutputWriter(
+        create_sink(FORMAT_EXT, output_path, CSV_HEADERS, compression=OUTPUT_COMPRESSION, rotate_bytes=OUTPUT_ROTATE_BYTES,
+                    keep_existing=journal is not None and args.resume),
+        batch_size=OUTPUT_BATCH_SIZE, flush_interval=OUTPUT_FLUSH_INTERVAL_SEC,
+        fsync_policy=OUTPUT_FSYNC_POLICY, queue_maxsize=OUTPUT_QUEUE_MAXSIZE,
+        on_batch_written=on_batch_written, max_attempts=OUTPUT_MAX_WRITE_ATTEMPTS, dead_letter_path=OUTPUT_DEAD_LETTER_PATH,
+    ).start()
+    if FORMAT_EXT in ('csv', 'json'):
+        output_path = output_writer.sink.filename  # Older CSV columns or a resumed JSON run continue in a versioned file
+    row_writer = pipeline.writer_for(output_writer)
+
+    # Feed scraping archives the captured subtrees; `python capture_archive.py extract` turns them into rows
+    capture_archive = None
+    feed_writer = row_writer
+    if CAPTURE_ARCHIVE_ACTIVE and not (args.reenrich or args.rescan):
+        capture_archive = CaptureArchive(CAPTURE_ARCHIVE_DIR, CAPTURE_ARCHIVE_COMPRESSION, on_records_written=record_progress)
+        feed_writer = capture_archive
+        print(f"Capture archive: Storing captures in {CAPTURE_ARCHIVE_DIR}, run `python capture_archive.py extract` for the rows.")
+        # The archive holds captures, not rows: the row pipeline only sees them once extract writes them
+        print("Capture archive: API enrichment, the trend index, the trend sketches and the video catalog skip "
+              "this run's feed rows until `python capture_archive.py extract` runs them through the same pipeline.")
+    elif ENABLE_CAPTURE_ARCHIVE and EXTRACTION_MODE != 'dom':
+        print("Capture archive: Only used in 'dom' extraction mode, writing rows as usual.")
+
+    # Seen-video index shared by all accounts and kept across runs
+    seen_index = None
+    if ENABLE_SEEN_INDEX:
+        seen_ttl = SEEN_INDEX_RESCRAPE_TTL_HOURS * 3600 if SEEN_INDEX_RESCRAPE_TTL_HOURS else None
+        seen_index = SeenVideoIndex(SEEN_INDEX_PATH, ttl_seconds=seen_ttl)
+        print(f"Seen-video index: {len(seen_index)} known videos in {SEEN_INDEX_PATH}")
+
+    # Sound metadata cache shared by all accounts and kept across runs
+    sound_cache = None
+    if ENABLE_SOUND_CACHE:
+        sound_ttl = SOUND_CACHE_TTL_HOURS * 3600 if SOUND_CACHE_TTL_HOURS else None
+        sound_cache = SoundCache(SOUND_CACHE_PATH, ttl_seconds=sound_ttl)
+
+    # Shorts written with missing fields, kept across runs for --reenrich
+    enrichment_queue = None
+    if ENABLE_ENRICHMENT_QUEUE:
+        enrichment_queue = EnrichmentQueue(ENRICHMENT_QUEUE_PATH, max_attempts=ENRICHMENT_MAX_ATTEMPTS)
+
+    def run_account_job(job):
+        # Each worker slot owns one window position on screen
+        account_info, progress = job.payload
+        account_info = dict(account_info, position_index=job.slot)
+        return dummy_account_task(account_info, feed_writer, seen_index, sound_cache, job, progress, enrichment_queue)
+
+    def run_leased_job(job):
+        # The leased account runs with this machine's profile path; shorts already written by an earlier lease are skipped
+        leased = job.payload
+        account_info = dict(next(account for account in DUMMY_ACCOUNTS if account['id'] == leased['job_id']),
+                            position_index=job.slot)
+        progress = AccountProgress(leased['progress'], set()) if leased['progress'] else None
+        return dummy_account_task(account_info, feed_writer, seen_index, sound_cache, job, progress, enrichment_queue,
+                                  max_shorts=leased['shorts'])
+
+    pool = None
+    try:
+        if args.daemon:
+            daemon = BrowserDaemon(
+                daemon_accounts, launch_warm_driver, new_scrape_session,
+                lambda driver, dummy_id, session, shorts: run_daemon_job(
+                    driver, dummy_id, session, shorts, feed_writer, seen_index, sound_cache, enrichment_queue),
+                recycle_after_shorts=DAEMON_RECYCLE_AFTER_SHORTS, recycle_heap_mb=DAEMON_RECYCLE_HEAP_MB,
+                health_check_interval=DAEMON_HEALTH_CHECK_SEC,
+            )
+            serve(daemon, DAEMON_HOST, DAEMON_PORT) # Blocks until a 'stop' command or Ctrl-C
+        elif args.reenrich:
+            if enrichment_queue is None:
+                print("Re-enrichment queue is disabled (ENABLE_ENRICHMENT_QUEUE), nothing to revisit.")
+            else:
+                reenrich_task(dict(DUMMY_ACCOUNTS[0], position_index=0), row_writer, enrichment_queue,
+                              sound_cache, ENRICHMENT_BATCH_SIZE)
+        elif args.rescan:
+            # Written straight to the output: the API stage's cache could replace fresh counts with older ones
+            rescan_task(dict(DUMMY_ACCOUNTS[0], position_index=0), output_writer, video_catalog, sound_cache)
+        elif lease_worker is not None:
+            lease_worker.run(run_leased_job) # Blocks until the coordinator has no jobs left for this worker
+        else:
+            pool = BrowserWorkerPool(
+                run_account_job, max_workers,
+                job_timeout=ACCOUNT_JOB_TIMEOUT_MIN * 60 if ACCOUNT_JOB_TIMEOUT_MIN else None,
+                start_delay=(THREAD_START_DELAY_MIN, THREAD_START_DELAY_MAX), # Delay between starting browsers
+            )
+            for account_info in DUMMY_ACCOUNTS:
+                progress = journal.progress(account_info['id']) if args.resume and journal is not None else None
+                if progress is not None and progress.count >= MAX_SHORTS_TO_SCRAPE_PER_ACCOUNT:
+                    print(f"Dummy account {account_info['id']}: Already finished ({progress.count} shorts journaled), skipping.")
+                    continue
+                pool.submit(account_info['id'], (account_info, progress))
+            pool.run() # Blocks until every account job is done; Ctrl-C closes the browsers
+    except KeyboardInterrupt:
+        print("Run interrupted, keeping the rows scraped so far.")
+    finally:
+        if pool is not None:
+            print(f"Worker pool: {pool.format_summary()}")
+        if lease_worker is not None:
+            print(f"Coordinator worker: {lease_worker.format_summary()}")
+        pipeline.close() # Drains the API stage, closes the writer, saves the index, sketches and catalog
+        if capture_archive is not None:
+            print(f"Capture archive: {capture_archive.captures_written} captures archived "
+                  f"({capture_archive.bytes_written / 1e6:.1f} MB).")
+            capture_archive.close()
+        if journal is not None:
+            journal.close()
+        if seen_index is not None:
+            print(f"Seen-video index: skipped {seen_index.hits} already scraped videos.")
+            seen_index.close()
+        if sound_cache is not None:
+            print(f"Sound cache: {sound_cache.format_summary()}")
+            sound_cache.close()
+        if enrichment_queue is not None:
+            print(f"Re-enrichment queue: {enrichment_queue.queued} partial rows queued, {len(enrichment_queue)} shorts pending.")
+            enrichment_queue.close()
+        if ENABLE_METRICS:
+            if metrics_dumper is not None:
+                metrics_dumper.stop()
+            METRICS.write(METRICS_PROMETHEUS_PATH, METRICS_JSON_PATH)
+            print(f"Metrics: {METRICS.format_summary()}")
+            print(f"Metrics: Written to {METRICS_PROMETHEUS_PATH} and {METRICS_JSON_PATH}")
+
+    print("\nAll dummy account tasks completed. Raw data saved to:", output_path)
+    print("Next step: Use your data analysis skills to clean, analyze, and build your dashboard from this CSV!")
+    return 0
+
 if __name__ == "__main__":
-    # Calculate window layout once at the start
-    calculate_window_layout()
-
-    # Initialize CSV file if it doesn't exist (write header only)
-    if FORMAT_EXT == 'csv':
-        if not os.path.exists(RAW_DATA_CSV) or os.path.getsize(RAW_DATA_CSV) == 0:
-            with open(RAW_DATA_CSV, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-                writer.writeheader()
-
-    threads = []
-    for i, account_info in enumerate(DUMMY_ACCOUNTS):
-        account_info['position_index'] = i 
-        thread = threading.Thread(target=dummy_account_task, args=(account_info,))
-        threads.append(thread)
-        thread.start()
-        human_like_delay(random.uniform(THREAD_START_DELAY_MIN, THREAD_START_DELAY_MAX)) # Delay between starting threads
-
-    for thread in threads:
-        thread.join() # Wait for all threads to complete
-
-    print("\nAll dummy account tasks completed. Raw data saved to:", RAW_DATA_CSV)
-    print("Next step: Use your data analysis skills to clean, analyze, and build your dashboard from this CSV!")
\ No newline at end of file
+    sys.exit(main())